@@ -1,5 +1,8 @@
 import abc
 
+import numpy as np
+import pandas as pd
+
 from digiroad.carRoutingExceptions import deprecated
 from digiroad.entities import Point
 from digiroad.logic.Operations import Operations
@@ -29,6 +32,19 @@ class AbstractAdditionalLayerOperation(object):
         """
         raise NotImplementedError("Should have implemented this")
 
+    def runBatch(self, properties, prefix=""):
+        """
+        Columnar version of ``runOperation`` over all the start or end points at once. By default ``runOperation`` is
+        called for each point, override it to vectorize the operation.
+
+        :param properties: DataFrame with the feature properties of the start or end points, one row per point.
+        :param prefix: "startPoint_" or "endPoint_".
+        :return: DataFrame with the result values, with the same index as ``properties``.
+        """
+        results = [self.runOperation(featureJson={"properties": featureProperties}, prefix=prefix)
+                   for featureProperties in properties.to_dict("records")]
+        return pd.DataFrame(results, index=properties.index)
+
     @deprecated
     def getExecutionOrder(self):
         return self._executionOrder
@@ -66,6 +82,23 @@ class EuclideanDistanceOperation(AbstractAdditionalLayerOperation):
         }
         return newProperties
 
+    def runBatch(self, properties, prefix=""):
+        distances = np.zeros(len(properties))
+        for epsgCode, positions in properties.groupby(self.coordinatesCRSAttribute).indices.items():
+            selectedCoordinates = np.array(properties[self.selectedPointCoordinatesAttribute].iloc[positions].tolist(),
+                                           dtype=np.float64).reshape(-1, 2)
+            nearestCoordinates = np.array(properties[self.nearestVertexCoordinatesAttribute].iloc[positions].tolist(),
+                                          dtype=np.float64).reshape(-1, 2)
+            distances[positions] = self.operations.calculateEuclideanDistances(
+                startLongitudes=selectedCoordinates[:, 0],
+                startLatitudes=selectedCoordinates[:, 1],
+                endLongitudes=nearestCoordinates[:, 0],
+                endLatitudes=nearestCoordinates[:, 1],
+                epsgCode=epsgCode
+            )
+
+        return pd.DataFrame({prefix + PostfixAttribute.EUCLIDEAN_DISTANCE: distances}, index=properties.index)
+
 
 class WalkingTimeOperation(AbstractAdditionalLayerOperation):
     def __init__(self):
@@ -113,6 +146,34 @@ class WalkingTimeOperation(AbstractAdditionalLayerOperation):
         }
         return newProperties
 
+    def runBatch(self, properties, prefix=""):
+        euclideanDistances = np.zeros(len(properties))
+        for property in properties.columns:
+            if property.endswith(PostfixAttribute.EUCLIDEAN_DISTANCE):
+                euclideanDistances = pd.to_numeric(properties[property]).fillna(0).values
+                break
+
+        walkingDistances = np.full(len(properties), self.defaultWalkingDistance)
+        if self.walkingDistanceAttribute in properties.columns:
+            walkingDistances = pd.to_numeric(properties[self.walkingDistanceAttribute]) \
+                .fillna(self.defaultWalkingDistance).values
+
+        return pd.DataFrame({
+            prefix + PostfixAttribute.EUCLIDEAN_DISTANCE + PostfixAttribute.WALKING_TIME:
+                self.calculateTimes(euclideanDistances),
+            prefix + PostfixAttribute.AVG_WALKING_DISTANCE + PostfixAttribute.WALKING_TIME:
+                self.calculateTimes(walkingDistances),
+            prefix + PostfixAttribute.AVG_WALKING_DISTANCE: walkingDistances
+        }, index=properties.index)
+
+    def calculateTimes(self, distances):
+        """
+        Vectorized ``Operations.calculateTime`` with the walking speed, 0 when there is no distance or speed.
+        """
+        if not self.walkingSpeed:
+            return np.zeros(len(distances))
+        return np.asarray(distances, dtype=np.float64) / self.walkingSpeed
+
 
 class ParkingTimeOperation(AbstractAdditionalLayerOperation):
     def __init__(self):
@@ -140,6 +201,14 @@ class ParkingTimeOperation(AbstractAdditionalLayerOperation):
         }
         return newProperties
 
+    def runBatch(self, properties, prefix=""):
+        parkingTimes = np.full(len(properties), self.defaultParkingTime)
+        if self.parkingTimeAttribute in properties.columns:
+            parkingTimes = pd.to_numeric(properties[self.parkingTimeAttribute]).fillna(self.defaultParkingTime).values
+
+        return pd.DataFrame({prefix + PostfixAttribute.PARKING_TIME: parkingTimes.astype(np.float64)},
+                            index=properties.index)
+
 
 class PropertyTransference(AbstractAdditionalLayerOperation):
     def __init__(self):
@@ -154,3 +223,7 @@ class PropertyTransference(AbstractAdditionalLayerOperation):
                 newProperties[prefix + key] = featureJson["properties"][key]
 
         return newProperties
+
+    def runBatch(self, properties, prefix=""):
+        columns = [key for key in properties.columns if not key.startswith(prefix)]
+        return properties[columns].rename(columns={key: prefix + key for key in columns})
@@ -0,0 +1,136 @@
+import getopt
+import json
+import sys
+import time
+
+import numpy as np
+
+from digiroad.connection.PostgisServiceProvider import PostgisServiceProvider
+from digiroad.transportMode.ContractionHierarchyPrivateCarTransportMode import \
+    ContractionHierarchyPrivateCarTransportMode
+from digiroad.transportMode.InMemoryPrivateCarTransportMode import CAR_COST_ATTRIBUTES
+from digiroad.transportMode.PrivateCarTransportMode import PrivateCarTransportMode
+from digiroad.util import Logger
+
+
+def selectRandomVertexPairs(graph, numberOfPairs, seed=None):
+    """
+    :param graph: CSRGraph instance.
+    :param numberOfPairs: Number of (start vertex id, end vertex id) pairs.
+    :param seed: Random seed, to repeat the benchmark with the same pairs.
+    :return: List of vertex id pairs, taken from the vertices with at least one traversable arc.
+    """
+    randomState = np.random.RandomState(seed)
+    candidates = graph.vertexIDs[np.diff(graph.indptr) > 0]
+    starts = randomState.choice(candidates, numberOfPairs)
+    ends = randomState.choice(candidates, numberOfPairs)
+    return [(int(start), int(end)) for start, end in zip(starts, ends) if start != end]
+
+
+def getTotalCost(geojson):
+    if len(geojson["features"]) == 0:
+        return float("inf")
+    return float(geojson["features"][0]["properties"]["total_cost"])
+
+
+def benchmarkCostAttribute(pgRoutingTransportMode, hierarchyTransportMode, vertexPairs, costAttribute,
+                           tolerance=1e-6):
+    """
+    Query every vertex pair with pgr_dijkstraCost and with the contraction hierarchy and compare the total costs.
+
+    :return: Dictionary with the timings (seconds), settled vertices and mismatching pairs of the cost attribute.
+    """
+    graph = hierarchyTransportMode.getGraph()
+    hierarchy = hierarchyTransportMode.getContractionHierarchy(costAttribute)
+
+    pgRoutingTime = 0.0
+    hierarchyTime = 0.0
+    settledVertices = []
+    mismatches = []
+    for startVertexID, endVertexID in vertexPairs:
+        startTime = time.time()
+        pgRoutingCost = getTotalCost(pgRoutingTransportMode.getTotalShortestPathCostOneToOne(
+            startVertexID, endVertexID, costAttribute))
+        pgRoutingTime += time.time() - startTime
+
+        startIndex, endIndex = graph.getVertexIndices([startVertexID, endVertexID])
+        startTime = time.time()
+        hierarchyCost = hierarchy.getShortestPathCost(int(startIndex), int(endIndex))
+        hierarchyTime += time.time() - startTime
+        settledVertices.append(hierarchy.lastSettledVertices)
+
+        if not np.isclose(pgRoutingCost, hierarchyCost, rtol=tolerance, atol=tolerance) and \
+                not (np.isinf(pgRoutingCost) and np.isinf(hierarchyCost)):
+            mismatches.append({
+                "start_vertex_id": startVertexID,
+                "end_vertex_id": endVertexID,
+                "pgrouting_cost": pgRoutingCost if np.isfinite(pgRoutingCost) else None,
+                "contraction_hierarchy_cost": hierarchyCost if np.isfinite(hierarchyCost) else None
+            })
+
+    return {
+        "cost_attribute": costAttribute,
+        "pairs": len(vertexPairs),
+        "pgrouting_seconds": pgRoutingTime,
+        "contraction_hierarchy_seconds": hierarchyTime,
+        "speedup": pgRoutingTime / hierarchyTime if hierarchyTime > 0 else None,
+        "avg_settled_vertices": float(np.mean(settledVertices)) if settledVertices else 0.0,
+        "max_settled_vertices": int(np.max(settledVertices)) if settledVertices else 0,
+        "mismatches": mismatches
+    }
+
+
+def runBenchmark(numberOfPairs=100, costAttributes=CAR_COST_ATTRIBUTES, seed=None):
+    """
+    Compare the contraction hierarchy queries with the pgRouting results for each car impedance/cost attribute.
+
+    :param numberOfPairs: Number of random vertex pairs queried per cost attribute.
+    :param costAttributes: Impedance/cost attributes to benchmark.
+    :param seed: Random seed of the vertex pairs.
+    :return: List of results, one per cost attribute.
+    """
+    serviceProvider = PostgisServiceProvider()
+    pgRoutingTransportMode = PrivateCarTransportMode(serviceProvider)
+    hierarchyTransportMode = ContractionHierarchyPrivateCarTransportMode(serviceProvider)
+
+    vertexPairs = selectRandomVertexPairs(hierarchyTransportMode.getGraph(), numberOfPairs, seed)
+
+    results = []
+    for costAttribute in costAttributes:
+        result = benchmarkCostAttribute(pgRoutingTransportMode, hierarchyTransportMode, vertexPairs, costAttribute)
+        Logger.getInstance().info("%s: pgRouting %.3fs, contraction hierarchy %.3fs, %s mismatches" % (
+            costAttribute, result["pgrouting_seconds"], result["contraction_hierarchy_seconds"],
+            len(result["mismatches"])))
+        results.append(result)
+
+    return results
+
+
+def main():
+    """
+    Usage: python -m digiroad.benchmark.ContractionHierarchyBenchmark [-n pairs] [--seed seed] [-o output.json]
+    """
+    opts, _args = getopt.getopt(sys.argv[1:], "n:o:", ["pairs=", "seed=", "output="])
+
+    numberOfPairs = 100
+    seed = None
+    outputFilename = None
+    for opt, arg in opts:
+        if opt in ("-n", "--pairs"):
+            numberOfPairs = int(arg)
+        if opt == "--seed":
+            seed = int(arg)
+        if opt in ("-o", "--output"):
+            outputFilename = arg
+
+    results = runBenchmark(numberOfPairs=numberOfPairs, seed=seed)
+
+    if outputFilename:
+        with open(outputFilename, "w") as outputFile:
+            json.dump(results, outputFile, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
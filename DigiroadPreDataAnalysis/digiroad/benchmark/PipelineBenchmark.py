@@ -0,0 +1,219 @@
+import getopt
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from digiroad.benchmark.SyntheticNetwork import SyntheticNetwork, FIRST_YKR_ID
+from digiroad.benchmark.SyntheticPrivateCarTransportMode import SyntheticPrivateCarTransportMode
+from digiroad.logic.MetropAccessDigiroad import MetropAccessDigiroadApplication, createVertexPointsIndex, \
+    expandVertexPairs
+from digiroad.transportMode.InMemoryPrivateCarTransportMode import CAR_COST_ATTRIBUTES
+from digiroad.util import Configuration, FileActions, getConfigurationPath, Logger
+
+STAGES = ["network_generation", "graph_loading", "snapping", "matrix", "summary_assembly", "output_writing"]
+
+
+def createConfiguration(summaryFormat="csv"):
+    """
+    :return: Configuration of the working directory for a matrix only summary of the YKR_ID points.
+    """
+    configuration = Configuration(getConfigurationPath())
+    configuration.pointIdentifier = "YKR_ID"
+    configuration.matrixOnly = True
+    configuration.summaryFormat = summaryFormat
+    configuration.incremental = False
+    return configuration
+
+
+def snapPoints(application, pointsFilePath):
+    """
+    Read a points file and find the nearest routable vertex of every point.
+
+    :return: List of vertex ids and list of point features with the nearest vertex properties.
+    """
+    return application.getVerticesID(application.fileActions.readJson(pointsFilePath), "epsg:3857")
+
+
+def runBenchmark(rows=100, columns=100, numberOfStartPoints=500, numberOfEndPoints=500,
+                 costAttributes=CAR_COST_ATTRIBUTES, summaryFormat="csv", seed=None, outputFolderPath=None):
+    """
+    Run the matrix only routing pipeline over a synthetic network and synthetic YKR points, timing each stage:
+    the generation of the network and points files, the graph loading, the snapping of the points to their nearest
+    routable vertices, the cost matrix calculation, the assembly of the summary rows (travel times of every pair of
+    points) and the writing of the summary files. The matrix blocks are assembled and written as they are
+    calculated, as in ``streamGeneralSummary``, and the time of each block is added to its stage.
+
+    :param rows: Number of rows of vertices of the synthetic grid.
+    :param columns: Number of columns of vertices of the synthetic grid.
+    :param numberOfStartPoints: Number of start points.
+    :param numberOfEndPoints: Number of end points.
+    :param costAttributes: Impedance/cost attributes.
+    :param summaryFormat: csv or parquet.
+    :param seed: Random seed of the network and the points.
+    :param outputFolderPath: Folder to keep the points and summary files, by default a temporary folder removed at
+                             the end.
+    :return: Dictionary with the sizes, the seconds of each stage, the number of summary rows and the environment.
+    """
+    seconds = dict.fromkeys(STAGES, 0.0)
+    workFolderPath = outputFolderPath if outputFolderPath else tempfile.mkdtemp()
+    try:
+        startTime = time.time()
+        network = SyntheticNetwork(rows, columns, seed=seed)
+        fileActions = FileActions()
+        startPointsFilePath = fileActions.writeFile(workFolderPath, "startPoints.geojson", network.createYKRPoints(
+            numberOfStartPoints, seed=seed))
+        endPointsFilePath = fileActions.writeFile(workFolderPath, "endPoints.geojson", network.createYKRPoints(
+            numberOfEndPoints, firstYKRID=FIRST_YKR_ID + numberOfStartPoints,
+            seed=None if seed is None else seed + 1))
+        seconds["network_generation"] = time.time() - startTime
+
+        configuration = createConfiguration(summaryFormat)
+        transportMode = SyntheticPrivateCarTransportMode(network, configuration=configuration)
+        application = MetropAccessDigiroadApplication(transportMode=transportMode, configuration=configuration)
+
+        startTime = time.time()
+        graph = transportMode.getGraph()
+        seconds["graph_loading"] = time.time() - startTime
+
+        startTime = time.time()
+        startVerticesID, startPointsFeaturesList = snapPoints(application, startPointsFilePath)
+        endVerticesID, endPointsFeaturesList = snapPoints(application, endPointsFilePath)
+        seconds["snapping"] = time.time() - startTime
+
+        startTime = time.time()
+        startPointsID = np.array([feature["properties"]["YKR_ID"] for feature in startPointsFeaturesList])
+        endPointsID = np.array([feature["properties"]["YKR_ID"] for feature in endPointsFeaturesList])
+        startPointsTravelTime = np.array([application.operations.calculateStartPointTravelTime(properties)
+                                          for properties in application.getAdditionalPointsProperties(
+                                              startPointsFeaturesList, "startPoint_",
+                                              application.additionalStartFeaturePropertiesCache)], dtype=np.float64)
+        endPointsTravelTime = np.array([application.operations.calculateEndPointTravelTime(properties)
+                                        for properties in application.getAdditionalPointsProperties(
+                                            endPointsFeaturesList, "endPoint_",
+                                            application.additionalEndFeaturePropertiesCache)], dtype=np.float64)
+        startPointsIndex = createVertexPointsIndex(startVerticesID)
+        endPointsIndex = createVertexPointsIndex(endVerticesID)
+        seconds["summary_assembly"] += time.time() - startTime
+
+        startTime = time.time()
+        summaryFolderPath = os.path.join(workFolderPath, "summary")
+        writers = {costAttribute: application.createSummaryWriter(summaryFolderPath=summaryFolderPath,
+                                                                  costAttribute=costAttribute,
+                                                                  outputFilename="synthetic")
+                   for costAttribute in costAttributes}
+        seconds["output_writing"] += time.time() - startTime
+
+        numberOfPairs = 0
+        blocks = transportMode.iterateTotalShortestPathCostMatrixBlocks(startVerticesID=list(dict.fromkeys(
+            startVerticesID)), endVerticesID=endVerticesID, costAttributes=costAttributes)
+        while True:
+            startTime = time.time()
+            block = next(blocks, None)
+            seconds["matrix"] += time.time() - startTime
+            if block is None:
+                break
+            numberOfPairs += len(block["start_vertex_id"])
+
+            startTime = time.time()
+            pairPositions, startPositions, endPositions = expandVertexPairs(
+                block["start_vertex_id"], block["end_vertex_id"], startPointsIndex, endPointsIndex)
+            blockRows = []
+            for costAttribute in costAttributes:
+                travelTimes = startPointsTravelTime[startPositions] + block[costAttribute][pairPositions] + \
+                              endPointsTravelTime[endPositions]
+                reachable = ~np.isnan(travelTimes)
+                blockRows.append((costAttribute, startPointsID[startPositions[reachable]],
+                                  endPointsID[endPositions[reachable]], travelTimes[reachable]))
+            seconds["summary_assembly"] += time.time() - startTime
+
+            startTime = time.time()
+            for costAttribute, startPointsColumn, endPointsColumn, travelTimes in blockRows:
+                writers[costAttribute].writeRows(startPointsColumn, endPointsColumn, travelTimes)
+            seconds["output_writing"] += time.time() - startTime
+
+        startTime = time.time()
+        for writer in writers.values():
+            writer.close()
+            application.compressSummaryFile(summaryFolderPath=summaryFolderPath, filepath=writer.filePath)
+        seconds["output_writing"] += time.time() - startTime
+    finally:
+        if not outputFolderPath:
+            shutil.rmtree(workFolderPath)
+
+    return {
+        "grid_rows": rows,
+        "grid_columns": columns,
+        "vertices": graph.getNumberOfVertices(),
+        "arcs": graph.getNumberOfArcs(),
+        "start_points": numberOfStartPoints,
+        "end_points": numberOfEndPoints,
+        "snapped_start_points": len(startPointsFeaturesList),
+        "snapped_end_points": len(endPointsFeaturesList),
+        "cost_attributes": list(costAttributes),
+        "summary_format": summaryFormat,
+        "seed": seed,
+        "vertex_pairs": numberOfPairs,
+        "summary_rows": {costAttribute: writer.numberOfRows for costAttribute, writer in writers.items()},
+        "stage_seconds": seconds,
+        "total_seconds": sum(seconds.values()),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform()
+    }
+
+
+def main():
+    """
+    Usage: python -m digiroad.benchmark.PipelineBenchmark [--rows rows] [--columns columns] [-s start points]
+           [-e end points] [--format csv|parquet] [--seed seed] [--keep folder] [-o output.json]
+    """
+    opts, _args = getopt.getopt(sys.argv[1:], "s:e:o:", ["rows=", "columns=", "start_points=", "end_points=",
+                                                         "format=", "seed=", "keep=", "output="])
+
+    rows = 100
+    columns = 100
+    numberOfStartPoints = 500
+    numberOfEndPoints = 500
+    summaryFormat = "csv"
+    seed = None
+    outputFolderPath = None
+    outputFilename = None
+    for opt, arg in opts:
+        if opt == "--rows":
+            rows = int(arg)
+        if opt == "--columns":
+            columns = int(arg)
+        if opt in ("-s", "--start_points"):
+            numberOfStartPoints = int(arg)
+        if opt in ("-e", "--end_points"):
+            numberOfEndPoints = int(arg)
+        if opt == "--format":
+            summaryFormat = arg
+        if opt == "--seed":
+            seed = int(arg)
+        if opt == "--keep":
+            outputFolderPath = arg
+        if opt in ("-o", "--output"):
+            outputFilename = arg
+
+    result = runBenchmark(rows=rows, columns=columns, numberOfStartPoints=numberOfStartPoints,
+                          numberOfEndPoints=numberOfEndPoints, summaryFormat=summaryFormat, seed=seed,
+                          outputFolderPath=outputFolderPath)
+    Logger.getInstance().info("Pipeline benchmark: %s" % ", ".join(
+        "%s %.3fs" % (stage, result["stage_seconds"][stage]) for stage in STAGES))
+
+    if outputFilename:
+        with open(outputFilename, "w") as outputFile:
+            json.dump(result, outputFile, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+
+from digiroad.transportMode.InMemoryPrivateCarTransportMode import CAR_COST_ATTRIBUTES
+from digiroad.util import CostAttributes
+
+# speed limit (km/h) of each functional class (TOIMINN_LK), 8 are the pedestrian and bicycle ways
+SPEED_LIMITS = {1: 100.0, 2: 80.0, 3: 60.0, 4: 50.0, 5: 40.0, 6: 30.0, 7: 30.0, 8: 10.0}
+FUNCTIONAL_CLASS_PROBABILITIES = {1: 0.02, 2: 0.05, 3: 0.1, 4: 0.15, 5: 0.3, 6: 0.38}
+
+# AJOSUUNTA: 2 both directions, 3 against the digitizing direction, 4 along the digitizing direction
+BOTH_DIRECTIONS = 2
+AGAINST_DIGITIZING_DIRECTION = 3
+ALONG_DIGITIZING_DIRECTION = 4
+
+# lower left corner of the Helsinki region in EPSG:3857
+DEFAULT_ORIGIN = (2760000.0, 8430000.0)
+FIRST_YKR_ID = 5785640
+
+
+class SyntheticNetwork:
+    def __init__(self, rows, columns, spacing=250.0, origin=DEFAULT_ORIGIN, oneWayRatio=0.1, pedestrianRatio=0.05,
+                 seed=None):
+        """
+        Grid network with the columns of the Digiroad edges table (TOIMINN_LK, AJOSUUNTA, pituus and the travel
+        times of every impedance), to run the routing pipeline without the Digiroad data or a database.
+
+        The vertices are the ``rows`` x ``columns`` intersections of a grid in EPSG:3857, moved randomly up to a
+        quarter of the ``spacing``, and the edges join every vertex with its right and upper neighbours, digitized in
+        a random direction. The same ``seed`` generates the same network.
+
+        :param rows: Number of rows of vertices.
+        :param columns: Number of columns of vertices.
+        :param spacing: Distance between the grid rows and columns.
+        :param origin: Coordinates of the first vertex.
+        :param oneWayRatio: Ratio of edges that can only be travelled in one direction.
+        :param pedestrianRatio: Ratio of non routable edges (TOIMINN_LK = 8).
+        :param seed: Random seed.
+        """
+        self.rows = rows
+        self.columns = columns
+        self.spacing = spacing
+        self.origin = origin
+        self.seed = seed
+        randomState = np.random.RandomState(seed)
+
+        gridColumns, gridRows = np.meshgrid(np.arange(columns), np.arange(rows))
+        self.vertexIDs = np.arange(1, rows * columns + 1, dtype=np.int64)
+        self.vertexCoordinates = np.column_stack((origin[0] + gridColumns.ravel() * spacing,
+                                                  origin[1] + gridRows.ravel() * spacing)) + \
+                                 randomState.uniform(-spacing / 4, spacing / 4, (rows * columns, 2))
+
+        vertexIndices = np.arange(rows * columns).reshape(rows, columns)
+        tails = np.concatenate((vertexIndices[:, :-1].ravel(), vertexIndices[:-1, :].ravel()))
+        heads = np.concatenate((vertexIndices[:, 1:].ravel(), vertexIndices[1:, :].ravel()))
+        digitizedBackwards = randomState.random_sample(len(tails)) < 0.5
+        sources = np.where(digitizedBackwards, heads, tails)
+        targets = np.where(digitizedBackwards, tails, heads)
+        numberOfEdges = len(sources)
+
+        functionalClasses = randomState.choice(list(FUNCTIONAL_CLASS_PROBABILITIES), numberOfEdges,
+                                               p=list(FUNCTIONAL_CLASS_PROBABILITIES.values()))
+        functionalClasses[randomState.random_sample(numberOfEdges) < pedestrianRatio] = 8
+        directions = np.full(numberOfEdges, BOTH_DIRECTIONS)
+        oneWay = randomState.random_sample(numberOfEdges) < oneWayRatio
+        directions[oneWay] = randomState.choice([AGAINST_DIGITIZING_DIRECTION, ALONG_DIGITIZING_DIRECTION],
+                                                oneWay.sum())
+
+        lengths = np.linalg.norm(self.vertexCoordinates[targets] - self.vertexCoordinates[sources], axis=1)
+        speedLimitTimes = lengths / (np.vectorize(SPEED_LIMITS.get)(functionalClasses) / 3.6) / 60.0
+
+        self.edges = pd.DataFrame({
+            "id": np.arange(1, numberOfEdges + 1, dtype=np.int64),
+            "source": self.vertexIDs[sources],
+            "target": self.vertexIDs[targets],
+            "TOIMINN_LK": functionalClasses,
+            "AJOSUUNTA": directions,
+            CostAttributes.DISTANCE: lengths,
+            CostAttributes.SPEED_LIMIT_TIME: speedLimitTimes,
+            CostAttributes.DAY_AVG_DELAY_TIME: speedLimitTimes * randomState.uniform(1.1, 1.5, numberOfEdges),
+            CostAttributes.MIDDAY_DELAY_TIME: speedLimitTimes * randomState.uniform(1.05, 1.3, numberOfEdges),
+            CostAttributes.RUSH_HOUR_DELAY: speedLimitTimes * randomState.uniform(1.2, 2.5, numberOfEdges)
+        })
+
+    def getFingerprint(self):
+        return "synthetic:%s:%s:%s:%s" % (self.rows, self.columns, self.spacing, self.seed)
+
+    def getBoundingBox(self):
+        """
+        :return: (minimum x, minimum y, maximum x, maximum y) of the vertices.
+        """
+        return tuple(self.vertexCoordinates.min(axis=0)) + tuple(self.vertexCoordinates.max(axis=0))
+
+    def getRoutableEdges(self, costAttributes=CAR_COST_ATTRIBUTES):
+        """
+        Same result as the ``PrivateCarTransportMode.getRoutableEdgesSQL`` query over the synthetic edges.
+
+        :param costAttributes: Impedance/cost attributes.
+        :return: DataFrame with the columns id, source, target, <cost>_cost and <cost>_reverse_cost, -1 in the
+                 directions that can not be travelled.
+        """
+        routable = self.edges["TOIMINN_LK"].values != 8
+        directions = self.edges["AJOSUUNTA"].values
+        forward = routable & ((directions == BOTH_DIRECTIONS) | (directions == ALONG_DIGITIZING_DIRECTION))
+        backward = routable & ((directions == BOTH_DIRECTIONS) | (directions == AGAINST_DIGITIZING_DIRECTION))
+
+        routableEdges = self.edges[["id", "source", "target"]].copy()
+        for costAttribute in costAttributes:
+            costs = self.edges[costAttribute].values
+            routableEdges[costAttribute + "_cost"] = np.where(forward, costs, -1.0)
+            routableEdges[costAttribute + "_reverse_cost"] = np.where(backward, costs, -1.0)
+        return routableEdges
+
+    def getRoutableVertexIDs(self):
+        """
+        :return: Sorted array with the vertices of at least one edge with TOIMINN_LK <> 8, the vertices a point can be
+                 snapped to.
+        """
+        routableEdges = self.edges[self.edges["TOIMINN_LK"] != 8]
+        return np.unique(np.concatenate((routableEdges["source"].values, routableEdges["target"].values)))
+
+    def getVertices(self):
+        """
+        :return: DataFrame with the columns id, x and y, as the ``PrivateCarTransportMode.getVerticesSQL`` query.
+        """
+        return pd.DataFrame({"id": self.vertexIDs,
+                             "x": self.vertexCoordinates[:, 0],
+                             "y": self.vertexCoordinates[:, 1]})
+
+    def createYKRPoints(self, numberOfPoints, firstYKRID=FIRST_YKR_ID, seed=None):
+        """
+        Random points within the network in the format of the YKR grid points files.
+
+        :param numberOfPoints: Number of points.
+        :param firstYKRID: YKR_ID of the first point, the next ones are consecutive.
+        :param seed: Random seed.
+        :return: Geojson FeatureCollection of Point features in EPSG:3857 with the YKR_ID property.
+        """
+        randomState = np.random.RandomState(seed)
+        minimumX, minimumY, maximumX, maximumY = self.getBoundingBox()
+        xs = randomState.uniform(minimumX, maximumX, numberOfPoints)
+        ys = randomState.uniform(minimumY, maximumY, numberOfPoints)
+
+        return {
+            "type": "FeatureCollection",
+            "crs": {"type": "name", "properties": {"name": "urn:ogc:def:crs:EPSG::3857"}},
+            "features": [{
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [x, y]},
+                "properties": {"YKR_ID": firstYKRID + position}
+            } for position, (x, y) in enumerate(zip(xs.tolist(), ys.tolist()))]
+        }
@@ -0,0 +1,109 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+from digiroad.connection.PostgisServiceProvider import PostgisServiceProvider
+from digiroad.graph.CSRGraph import CSRGraph
+from digiroad.transportMode.InMemoryPrivateCarTransportMode import InMemoryPrivateCarTransportMode, \
+    CAR_COST_ATTRIBUTES
+from digiroad.util import dgl_timer, Logger
+
+
+class SyntheticPrivateCarTransportMode(InMemoryPrivateCarTransportMode):
+    def __init__(self, syntheticNetwork, configuration=None):
+        """
+        In-memory private car transport mode over a ``SyntheticNetwork``: the graph is built from the synthetic edges
+        and the points are snapped with a KD-tree of the routable vertices, so the pipeline runs without a database.
+
+        :param syntheticNetwork: SyntheticNetwork instance.
+        :param configuration: Application Configuration, by default the one of the working directory.
+        """
+        super(SyntheticPrivateCarTransportMode, self).__init__(PostgisServiceProvider(configuration=configuration),
+                                                               configuration=configuration)
+        self.syntheticNetwork = syntheticNetwork
+        self.routableVertexIDs = None
+        self.routableVerticesTree = None
+
+    @dgl_timer
+    def loadGraph(self, costAttributes=CAR_COST_ATTRIBUTES):
+        """
+        Build the CSR graph from the routable edges of the synthetic network.
+
+        :param costAttributes: Impedance/cost attributes to load.
+        :return: CSRGraph instance.
+        """
+        edges = self.syntheticNetwork.getRoutableEdges(costAttributes)
+        vertices = self.syntheticNetwork.getVertices()
+
+        graph = CSRGraph.fromEdges(edgeIDs=edges["id"].values,
+                                   sources=edges["source"].values,
+                                   targets=edges["target"].values,
+                                   costs={costAttribute: edges[costAttribute + "_cost"].values
+                                          for costAttribute in costAttributes},
+                                   reverseCosts={costAttribute: edges[costAttribute + "_reverse_cost"].values
+                                                 for costAttribute in costAttributes},
+                                   vertexIDs=vertices["id"].values,
+                                   vertexCoordinates=vertices[["x", "y"]].values)
+
+        Logger.getInstance().info("Synthetic CSR graph built: %s vertices, %s arcs" % (graph.getNumberOfVertices(),
+                                                                                       graph.getNumberOfArcs()))
+        return graph
+
+    def getNearestRoutableVerticesFromPoints(self, points, radius=3000):
+        """
+        Nearest routable vertex of every point, by the distance in the network coordinate reference system.
+
+        :param points: List of Point, in the network coordinate reference system.
+        :param radius: Maximum distance between the point and its nearest vertex.
+        :return: Tuple (vertex ids array, (n, 2) array with the vertex coordinates), -1 and NaN for the points without
+                 a routable vertex within the radius.
+        """
+        vertexIDs = np.full(len(points), -1, dtype=np.int64)
+        coordinates = np.full((len(points), 2), np.nan)
+        if len(points) == 0:
+            return vertexIDs, coordinates
+
+        if self.routableVerticesTree is None:
+            graph = self.getGraph()
+            self.routableVertexIDs = self.syntheticNetwork.getRoutableVertexIDs()
+            self.routableVerticesTree = cKDTree(
+                graph.vertexCoordinates[graph.getVertexIndices(self.routableVertexIDs)])
+
+        distances, positions = self.routableVerticesTree.query(
+            [[point.getLongitude(), point.getLatitude()] for point in points], distance_upper_bound=radius)
+        found = np.isfinite(distances)
+        vertexIDs[found] = self.routableVertexIDs[positions[found]]
+        coordinates[found] = self.routableVerticesTree.data[positions[found]]
+        return vertexIDs, coordinates
+
+    def getNearestRoutableVertexFromAPoint(self, coordinates, radius=3000):
+        """
+        Nearest routable vertex of a point from the KD-tree, in the format of the database query.
+
+        :param coordinates: Point, in the network coordinate reference system.
+        :param radius: Maximum distance between the point and its nearest vertex.
+        :return: Geojson (Geometry type: Point) with the nearest vertex, without features if there is not any
+                 routable vertex within the radius.
+        """
+        vertexIDs, vertexCoordinates = self.getNearestRoutableVerticesFromPoints([coordinates], radius=radius)
+        geojson = {
+            "type": "FeatureCollection",
+            "crs": {"type": "name", "properties": {"name": "urn:ogc:def:crs:EPSG::3857"}},
+            "features": []
+        }
+        if vertexIDs[0] >= 0:
+            geojson["features"].append({
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": vertexCoordinates[0].tolist()},
+                "properties": {"id": int(vertexIDs[0])}
+            })
+        return geojson
+
+    def getSummaryVerticesCoordinates(self, startVerticesID, endVerticesID):
+        graph = self.getGraph()
+        verticesID = np.unique(np.concatenate([np.asarray(startVerticesID, dtype=np.int64),
+                                               np.asarray(endVerticesID, dtype=np.int64)]))
+        coordinates = graph.vertexCoordinates[graph.getVertexIndices(verticesID)]
+        return {"id": verticesID, "x": coordinates[:, 0], "y": coordinates[:, 1]}
+
+    def getNetworkFingerprint(self):
+        return self.syntheticNetwork.getFingerprint()
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import threading
+
+from digiroad.util import Configuration
+
+
+class AdditionalLayersCache:
+    __instance = None
+    __instanceLock = threading.Lock()
+
+    def __init__(self, folderPath=None):
+        """
+        Cache of the additional layers merge: the polygon layers are read, reprojected and spatially indexed once per
+        process, and the points merged with all the layers are kept by hash of the points file and of the layers, so
+        the same grid is merged only once for the start and end points, every impedance and every entry list pair.
+
+        :param folderPath: Optional folder where the merged points are also stored, shared by all the runs.
+        """
+        if folderPath and not os.path.exists(folderPath):
+            os.makedirs(folderPath)
+
+        self.folderPath = folderPath
+        self.__lock = threading.Lock()
+        self.__polygonLayers = {}
+        self.__mergedLayers = {}
+
+    @staticmethod
+    def getInstance():
+        """
+        :return: Cache shared by all the Operations, with the ``additional_layers_cache`` folder of the configuration.
+        """
+        with AdditionalLayersCache.__instanceLock:
+            if not AdditionalLayersCache.__instance:
+                AdditionalLayersCache.__instance = AdditionalLayersCache(
+                    Configuration.getInstance().getString("CACHE", "additional_layers_cache"))
+            return AdditionalLayersCache.__instance
+
+    @staticmethod
+    def createFileKey(filePath):
+        """
+        :return: Path, modification time and size of the file, changing when the file is modified.
+        """
+        fileStat = os.stat(filePath)
+        return os.path.abspath(filePath), fileStat.st_mtime_ns, fileStat.st_size
+
+    @staticmethod
+    def createMergedLayerKey(pointsURL, layers):
+        """
+        :param pointsURL: Points file.
+        :param layers: List of (layer name, polygons file, attributes).
+        :return: Hash of the points file content and of the layers files and attributes.
+        """
+        digest = hashlib.sha1()
+        with open(pointsURL, "rb") as pointsFile:
+            for chunk in iter(lambda: pointsFile.read(1 << 20), b""):
+                digest.update(chunk)
+
+        for layerName, polygonsURL, attributes in layers:
+            digest.update(repr((layerName, AdditionalLayersCache.createFileKey(polygonsURL), attributes))
+                          .encode("utf-8"))
+        return digest.hexdigest()
+
+    def getPolygonLayer(self, polygonsURL, attributes, readPolygonLayer):
+        """
+        :param polygonsURL: Polygons file.
+        :param attributes: Polygons attributes to be merged.
+        :param readPolygonLayer: Function (polygonsURL, attributes) returning the GeoDataFrame, called if the layer is
+                                 not cached.
+        :return: GeoDataFrame of the layer.
+        """
+        key = AdditionalLayersCache.createFileKey(polygonsURL) + (tuple(attributes),)
+        with self.__lock:
+            if key not in self.__polygonLayers:
+                self.__polygonLayers[key] = readPolygonLayer(polygonsURL, attributes)
+            return self.__polygonLayers[key]
+
+    def getMergedLayer(self, key):
+        """
+        :param key: Key returned by ``createMergedLayerKey``.
+        :return: Merged geojson, None if it is not cached (do not modify it, it is cached).
+        """
+        with self.__lock:
+            if key in self.__mergedLayers:
+                return self.__mergedLayers[key]
+
+            filePath = self.__getMergedLayerFilePath(key)
+            if filePath and os.path.isfile(filePath):
+                with open(filePath) as mergedLayerFile:
+                    self.__mergedLayers[key] = json.load(mergedLayerFile)
+                return self.__mergedLayers[key]
+
+        return None
+
+    def putMergedLayer(self, key, mergedLayer):
+        """
+        :param key: Key returned by ``createMergedLayerKey``.
+        :param mergedLayer: Merged geojson.
+        """
+        with self.__lock:
+            self.__mergedLayers[key] = mergedLayer
+
+            filePath = self.__getMergedLayerFilePath(key)
+            if filePath:
+                temporalFilePath = filePath + ".%s.tmp" % threading.get_ident()
+                with open(temporalFilePath, "w") as mergedLayerFile:
+                    json.dump(mergedLayer, mergedLayerFile)
+                os.replace(temporalFilePath, filePath)
+
+    def clear(self):
+        with self.__lock:
+            self.__polygonLayers.clear()
+            self.__mergedLayers.clear()
+
+    def __getMergedLayerFilePath(self, key):
+        if not self.folderPath:
+            return None
+        return os.path.join(self.folderPath, key + ".geojson")
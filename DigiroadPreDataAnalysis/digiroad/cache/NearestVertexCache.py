@@ -0,0 +1,100 @@
+import hashlib
+import os
+import sqlite3
+import threading
+
+
+class NearestVertexCache:
+    def __init__(self, filePath, tableName, modeFilter, networkFingerprint):
+        """
+        Persistent (SQLite) cache of the nearest routable vertex of the points, shared by all the runs and entry
+        lists that use the same network.
+
+        The entries are keyed by (network table, routable edges filter of the transport mode, point id, coordinates
+        hash). When the fingerprint of the network table is different from the one stored with the entries, all the
+        entries of the table are discarded.
+
+        :param filePath: SQLite file, created if it does not exist.
+        :param tableName: Network table name.
+        :param modeFilter: SQL condition used by the transport mode to select the routable vertices.
+        :param networkFingerprint: Current fingerprint of the network table.
+        """
+        folder = os.path.dirname(filePath)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
+        self.tableName = tableName
+        self.modeFilter = modeFilter
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(filePath, check_same_thread=False)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS network ("
+                                  "table_name TEXT PRIMARY KEY, "
+                                  "fingerprint TEXT NOT NULL)")
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS nearest_vertex ("
+                                  "table_name TEXT NOT NULL, "
+                                  "mode_filter TEXT NOT NULL, "
+                                  "point_id TEXT NOT NULL, "
+                                  "coordinates_hash TEXT NOT NULL, "
+                                  "vertex_id INTEGER NOT NULL, "
+                                  "x REAL NOT NULL, "
+                                  "y REAL NOT NULL, "
+                                  "PRIMARY KEY (table_name, mode_filter, point_id, coordinates_hash)) WITHOUT ROWID")
+        self.__connection.commit()
+        self.validate(networkFingerprint)
+
+    def validate(self, networkFingerprint):
+        """
+        Discard the entries of the network table if they were created with a different network fingerprint.
+
+        :param networkFingerprint: Current fingerprint of the network table.
+        """
+        with self.__lock:
+            row = self.__connection.execute("SELECT fingerprint FROM network WHERE table_name = ?",
+                                            (self.tableName,)).fetchone()
+            if row is None or row[0] != networkFingerprint:
+                self.__connection.execute("DELETE FROM nearest_vertex WHERE table_name = ?", (self.tableName,))
+                self.__connection.execute("INSERT OR REPLACE INTO network (table_name, fingerprint) VALUES (?, ?)",
+                                          (self.tableName, networkFingerprint))
+                self.__connection.commit()
+
+    @staticmethod
+    def createCoordinatesHash(point):
+        """
+        :param point: Point as given in the input file.
+        :return: Hash of the point coordinates (rounded to the millimetre/1e-9 degree) and its CRS.
+        """
+        text = "%s:%.9f:%.9f" % (point.getEPSGCode().lower(), point.getLongitude(), point.getLatitude())
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+    def getVertices(self, pointKeys):
+        """
+        :param pointKeys: List of (point id, coordinates hash).
+        :return: Dictionary {(point id, coordinates hash): (vertex id, x, y)} with the cached points.
+        """
+        vertices = {}
+        with self.__lock:
+            for pointId, coordinatesHash in pointKeys:
+                row = self.__connection.execute(
+                    "SELECT vertex_id, x, y FROM nearest_vertex "
+                    "WHERE table_name = ? AND mode_filter = ? AND point_id = ? AND coordinates_hash = ?",
+                    (self.tableName, self.modeFilter, str(pointId), coordinatesHash)).fetchone()
+                if row is not None:
+                    vertices[(pointId, coordinatesHash)] = row
+        return vertices
+
+    def putVertices(self, entries):
+        """
+        :param entries: List of (point id, coordinates hash, vertex id, x, y).
+        """
+        with self.__lock:
+            self.__connection.executemany(
+                "INSERT OR REPLACE INTO nearest_vertex "
+                "(table_name, mode_filter, point_id, coordinates_hash, vertex_id, x, y) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(self.tableName, self.modeFilter, str(pointId), coordinatesHash, int(vertexID), float(x), float(y))
+                 for pointId, coordinatesHash, vertexID, x, y in entries])
+            self.__connection.commit()
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
@@ -0,0 +1,178 @@
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+
+class RouteCache:
+    # end vertices per query, below the SQLite limit of variables
+    QUERY_BLOCK_SIZE = 500
+    # stored routes between two counts of the routes of the file, which can be shared with other processes
+    RECOUNT_INTERVAL = 10000
+
+    def __init__(self, filePath, tableName, modeFilter, networkFingerprint, maxRoutes=1000000):
+        """
+        Persistent (SQLite) least recently used cache of the shortest paths, shared by all the runs and entry lists
+        that use the same network.
+
+        The entries are keyed by (network table, routable edges filter of the transport mode, cost attribute, start
+        vertex, end vertex) and store only the ordered edge ids of the path, the geometry and attributes of the
+        segments are read again from the network. When the fingerprint of the network table is different from the
+        one stored with the entries, all the entries of the table are discarded. When the cache has more than
+        ``maxRoutes`` paths, the least recently used ones are evicted. The number of paths is kept as a running count,
+        counted again every ``RECOUNT_INTERVAL`` stored paths to include the ones stored by other processes.
+
+        :param filePath: SQLite file, created if it does not exist.
+        :param tableName: Network table name.
+        :param modeFilter: SQL condition used by the transport mode to select the routable edges.
+        :param networkFingerprint: Current fingerprint of the network table.
+        :param maxRoutes: Maximum number of paths kept in the cache.
+        """
+        folder = os.path.dirname(filePath)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
+        self.tableName = tableName
+        self.modeFilter = modeFilter
+        self.maxRoutes = maxRoutes
+        self.__lock = threading.Lock()
+        self.__lastUsed = 0.0
+        self.__numberOfRoutes = 0
+        self.__routesSinceCount = 0
+        self.__connection = sqlite3.connect(filePath, timeout=60, check_same_thread=False)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS network ("
+                                  "table_name TEXT PRIMARY KEY, "
+                                  "fingerprint TEXT NOT NULL)")
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS route ("
+                                  "table_name TEXT NOT NULL, "
+                                  "mode_filter TEXT NOT NULL, "
+                                  "cost_attribute TEXT NOT NULL, "
+                                  "start_vertex_id INTEGER NOT NULL, "
+                                  "end_vertex_id INTEGER NOT NULL, "
+                                  "edges BLOB NOT NULL, "
+                                  "last_used REAL NOT NULL, "
+                                  "PRIMARY KEY (table_name, mode_filter, cost_attribute, start_vertex_id, "
+                                  "end_vertex_id))")
+        self.__connection.execute("CREATE INDEX IF NOT EXISTS route_last_used ON route (last_used)")
+        self.__connection.commit()
+        self.validate(networkFingerprint)
+
+    def validate(self, networkFingerprint):
+        """
+        Discard the entries of the network table if they were created with a different network fingerprint.
+
+        :param networkFingerprint: Current fingerprint of the network table.
+        """
+        with self.__lock:
+            row = self.__connection.execute("SELECT fingerprint FROM network WHERE table_name = ?",
+                                            (self.tableName,)).fetchone()
+            if row is None or row[0] != networkFingerprint:
+                self.__connection.execute("DELETE FROM route WHERE table_name = ?", (self.tableName,))
+                self.__connection.execute("INSERT OR REPLACE INTO network (table_name, fingerprint) VALUES (?, ?)",
+                                          (self.tableName, networkFingerprint))
+                self.__connection.commit()
+            self.__countRoutes()
+
+    def __countRoutes(self):
+        self.__numberOfRoutes = self.__connection.execute("SELECT COUNT(*) FROM route").fetchone()[0]
+        self.__routesSinceCount = 0
+
+    @staticmethod
+    def encodeEdges(edgeIDs):
+        """
+        :param edgeIDs: Ordered edge ids of a path.
+        :return: Compact binary representation of the path.
+        """
+        return np.asarray(edgeIDs, dtype="<i8").tobytes()
+
+    @staticmethod
+    def decodeEdges(edges):
+        """
+        :param edges: Binary representation created with ``encodeEdges``.
+        :return: List with the ordered edge ids of the path.
+        """
+        return np.frombuffer(edges, dtype="<i8").tolist()
+
+    def __getUseTime(self):
+        # strictly increasing in this process, so the routes used in the same clock tick keep their order
+        self.__lastUsed = max(time.time(), self.__lastUsed + 1e-6)
+        return self.__lastUsed
+
+    def getRoutes(self, costAttribute, startVertexId, endVerticesID):
+        """
+        Retrieve the cached paths and mark them as recently used.
+
+        :param costAttribute: Impedance/cost attribute of the paths.
+        :param startVertexId: Start vertex of the paths.
+        :param endVerticesID: End vertices of the paths.
+        :return: Dictionary {end vertex id: ordered edge ids of the path} with the cached paths, an empty list if the
+                 end vertex is not reachable.
+        """
+        endVerticesID = list(dict.fromkeys(int(endVertexId) for endVertexId in endVerticesID))
+        cachedRoutes = {}
+        with self.__lock:
+            lastUsed = self.__getUseTime()
+            for blockStart in range(0, len(endVerticesID), RouteCache.QUERY_BLOCK_SIZE):
+                blockEndVerticesID = endVerticesID[blockStart:blockStart + RouteCache.QUERY_BLOCK_SIZE]
+                keys = [self.tableName, self.modeFilter, costAttribute, int(startVertexId)]
+                rows = self.__connection.execute(
+                    "SELECT end_vertex_id, edges FROM route "
+                    "WHERE table_name = ? AND mode_filter = ? AND cost_attribute = ? AND start_vertex_id = ? "
+                    "AND end_vertex_id IN (%s)" % ",".join("?" * len(blockEndVerticesID)),
+                    keys + blockEndVerticesID).fetchall()
+                if not rows:
+                    continue
+
+                blockRoutes = {endVertexId: RouteCache.decodeEdges(edges) for endVertexId, edges in rows}
+                self.__connection.execute(
+                    "UPDATE route SET last_used = ? "
+                    "WHERE table_name = ? AND mode_filter = ? AND cost_attribute = ? AND start_vertex_id = ? "
+                    "AND end_vertex_id IN (%s)" % ",".join("?" * len(blockRoutes)),
+                    [lastUsed] + keys + list(blockRoutes))
+                cachedRoutes.update(blockRoutes)
+
+            if cachedRoutes:
+                self.__connection.commit()
+        return {endVertexId: cachedRoutes[endVertexId] for endVertexId in endVerticesID if endVertexId in cachedRoutes}
+
+    def putRoutes(self, costAttribute, startVertexId, routes):
+        """
+        Store the paths and evict the least recently used ones beyond ``maxRoutes``.
+
+        :param costAttribute: Impedance/cost attribute of the paths.
+        :param startVertexId: Start vertex of the paths.
+        :param routes: Dictionary {end vertex id: ordered edge ids of the path}.
+        """
+        with self.__lock:
+            lastUsed = self.__getUseTime()
+            self.__connection.executemany(
+                "INSERT OR REPLACE INTO route "
+                "(table_name, mode_filter, cost_attribute, start_vertex_id, end_vertex_id, edges, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(self.tableName, self.modeFilter, costAttribute, int(startVertexId), int(endVertexId),
+                  RouteCache.encodeEdges(edgeIDs), lastUsed) for endVertexId, edgeIDs in routes.items()])
+
+            # only the paths not found in the cache are stored, a replaced path is counted as a new one until the
+            # next count
+            self.__numberOfRoutes += len(routes)
+            self.__routesSinceCount += len(routes)
+            if self.__routesSinceCount >= RouteCache.RECOUNT_INTERVAL:
+                self.__countRoutes()
+
+            if self.__numberOfRoutes > self.maxRoutes:
+                cursor = self.__connection.execute(
+                    "DELETE FROM route WHERE rowid IN (SELECT rowid FROM route ORDER BY last_used LIMIT ?)",
+                    (self.__numberOfRoutes - self.maxRoutes,))
+                self.__numberOfRoutes -= cursor.rowcount
+            self.__connection.commit()
+
+    def getNumberOfRoutes(self):
+        with self.__lock:
+            return self.__connection.execute("SELECT COUNT(*) FROM route").fetchone()[0]
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
@@ -50,6 +50,25 @@ class NotParameterGivenException(Exception):
         super(NotParameterGivenException, self).__init__(message)
 
 
+class InvalidConfigurationException(Exception):
+    """
+    Thrown when a property of the configuration file can not be parsed to its expected type.
+    """
+
+    def __init__(self, message):
+        super(InvalidConfigurationException, self).__init__(message)
+
+
+class NearestVertexNotFoundException(IndexError):
+    """
+    Thrown when there is not any routable vertex near a point, even with the largest search radius. It is an
+    IndexError, as the error thrown when reading the first feature of the empty nearest vertex geojson.
+    """
+
+    def __init__(self, message):
+        super(NearestVertexNotFoundException, self).__init__(message)
+
+
 def deprecated(func):
     """This is a decorator which can be used to mark functions
     as deprecated. It will result in a warning being emmitted
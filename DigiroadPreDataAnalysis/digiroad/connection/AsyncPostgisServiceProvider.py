@@ -0,0 +1,171 @@
+import asyncio
+import atexit
+import threading
+
+import asyncpg
+import geopandas as gpd
+import pandas as pd
+import shapely.wkb
+
+from digiroad.connection.BinaryCopyReader import BinaryCopyReader
+from digiroad.connection.PostgisConnectionPool import PostgisConnectionPool
+from digiroad.connection.PostgisServiceProvider import PostgisServiceProvider
+from digiroad.util import GPD_CRS, dgl_timer
+
+
+class AsyncPostgisServiceProvider(PostgisServiceProvider):
+    splittableErrors = (asyncpg.exceptions.QueryCanceledError, asyncpg.exceptions.OutOfMemoryError)
+
+    def __init__(self, epsgCode="EPSG:3857", concurrency=100, connectionParameters=None, sessionSettings=None,
+                 configuration=None):
+        """
+        asyncio counterpart of the PostgisServiceProvider: the queries are run by an asyncpg pool in an event loop of
+        its own thread, so hundreds of queries can be in flight with a single client thread decoding the results.
+
+        The blocking methods of the PostgisServiceProvider (used by the transport modes) submit the query to the
+        event loop and wait for the result, and ``executeQueriesReturningDataFrames`` runs all its queries at the
+        same time. The transport modes run up to ``concurrency`` blocks of vertices and snapping queries at the same
+        time with this provider.
+
+        :param epsgCode: Coordinate reference system of the geometries.
+        :param concurrency: Maximum number of queries running at the same time (connections of the pool).
+        :param connectionParameters: Dictionary with the database, user, password, host and port, by default the
+                                     ``DATABASE_CONFIG`` section.
+        :param sessionSettings: List of (parameter, value) applied to each new connection, by default the
+                                ``pool_session_settings``.
+        :param configuration: Application Configuration, by default the one of the working directory.
+        """
+        super().__init__(epsgCode, configuration)
+        self.concurrency = concurrency
+
+        if connectionParameters is None or sessionSettings is None:
+            databaseConfig = self.configuration.getSection("DATABASE_CONFIG")
+            if connectionParameters is None:
+                connectionParameters = PostgisConnectionPool.getConnectionParameters(databaseConfig)
+            if sessionSettings is None:
+                sessionSettings = PostgisConnectionPool.getSessionSettings(databaseConfig)
+
+        self.connectionParameters = dict(connectionParameters)
+        if "port" in self.connectionParameters:
+            self.connectionParameters["port"] = int(self.connectionParameters["port"])
+        self.sessionSettings = sessionSettings
+
+        self.__pool = None
+        self.__loop = asyncio.new_event_loop()
+        self.__thread = threading.Thread(target=self.__loop.run_forever, name="AsyncPostgisServiceProvider",
+                                         daemon=True)
+        self.__thread.start()
+        atexit.register(self.close)
+
+    def run(self, coroutine):
+        """
+        :param coroutine: Coroutine of this provider.
+        :return: Result of the coroutine, run in the event loop of the provider.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.__loop).result()
+
+    async def getPool(self):
+        """
+        :return: asyncpg pool of the provider, created by the first query.
+        """
+        if self.__pool is None:
+            # the task is stored before awaiting it, so the concurrent first queries share the same pool
+            self.__pool = asyncio.ensure_future(asyncpg.create_pool(min_size=1,
+                                                                    max_size=self.concurrency,
+                                                                    init=self.__initConnection,
+                                                                    **self.connectionParameters))
+        pool = self.__pool
+        try:
+            return await pool
+        except Exception:
+            # a failed creation (e.g. the database is down) is not kept, the next query creates the pool again
+            if self.__pool is pool:
+                self.__pool = None
+            raise
+
+    async def __initConnection(self, con):
+        for parameter, value in self.sessionSettings:
+            await con.execute("SELECT set_config($1, $2, false)", parameter, value)
+        await con.set_type_codec("geometry", schema="public", format="binary",
+                                 encoder=shapely.wkb.dumps, decoder=shapely.wkb.loads)
+
+    async def fetchDataFrame(self, sql):
+        """
+        :param sql: PG_SQL sentence.
+        :return: Pandas DataFrame with the sentence query results (geometries as shapely geometries).
+        """
+        pool = await self.getPool()
+        async with pool.acquire() as con:
+            statement = await con.prepare(sql)
+            records = await statement.fetch()
+            columns = [attribute.name for attribute in statement.get_attributes()]
+
+        return pd.DataFrame([tuple(record) for record in records], columns=columns)
+
+    async def fetchRow(self, sql):
+        pool = await self.getPool()
+        async with pool.acquire() as con:
+            return tuple(await con.fetchrow(sql))
+
+    async def fetchArrays(self, sql, columns, capacity=0):
+        """
+        Same as ``executeCopyReturningArrays``, the binary COPY is parsed while it is received.
+        """
+        reader = BinaryCopyReader(columns, capacity)
+
+        async def write(data):
+            reader.write(data)
+
+        pool = await self.getPool()
+        async with pool.acquire() as con:
+            await con.copy_from_query(sql, output=write, format="binary")
+
+        return reader.getArrays()
+
+    async def fetchAll(self, coroutines):
+        return await asyncio.gather(*coroutines)
+
+    @dgl_timer
+    def execute(self, sql):
+        """
+        Given a PG_SQL execute the query and retrieve the attributes and its respective geometries.
+
+        :param sql: Postgis SQL sentence with a ``geom`` column.
+        :return: Sentence query results.
+        """
+        df = gpd.GeoDataFrame(self.run(self.fetchDataFrame(sql)), geometry="geom", crs=GPD_CRS.PSEUDO_MERCATOR)
+        return self.fileActions.convertToGeojson(df)
+
+    @dgl_timer
+    def executeQueryReturningDataFrame(self, sql):
+        return self.run(self.fetchDataFrame(sql))
+
+    def executeQueriesReturningDataFrames(self, sqls):
+        """
+        :param sqls: List of PG_SQL sentences without geometry columns.
+        :return: List with the Pandas DataFrame of each sentence, executed at the same time (up to ``concurrency``).
+        """
+        return self.run(self.fetchAll([self.fetchDataFrame(sql) for sql in sqls]))
+
+    def executeCopyReturningArrays(self, sql, columns, capacity=0):
+        return self.run(self.fetchArrays(sql, columns, capacity))
+
+    def getTableFingerprint(self, tableName):
+        row = self.run(self.fetchRow(self.getTableFingerprintSQL(tableName)))
+        return tableName + ":" + ":".join(str(value) for value in row)
+
+    def close(self):
+        """
+        Close the connections of the pool and stop the event loop.
+        """
+        if not self.__loop.is_running():
+            return
+
+        if self.__pool is not None:
+            self.run(self.__closePool())
+        self.__loop.call_soon_threadsafe(self.__loop.stop)
+        self.__thread.join()
+
+    async def __closePool(self):
+        pool = await self.__pool
+        await pool.close()
@@ -0,0 +1,83 @@
+import struct
+
+import numpy as np
+
+
+class BinaryCopyReader:
+    SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+    HEADER_SIZE = len(SIGNATURE) + 8
+    TRAILER = b"\xff\xff"
+
+    def __init__(self, columns, capacity=0):
+        """
+        File-like object given to ``cursor.copy_expert`` to parse the output of ``COPY ... TO STDOUT WITH (FORMAT
+        binary)`` straight into NumPy arrays, chunk by chunk, without creating a Python object per value.
+
+        All the columns must be fixed size and NOT NULL (e.g. bigint and double precision, use COALESCE with 'NaN'
+        for the nullable costs), so every row has the same size and the chunks are decoded with ``np.frombuffer``.
+
+        :param columns: List of (column name, numpy dtype), in the order of the query columns.
+        :param capacity: Expected number of rows, the arrays are preallocated with this size and grown if needed.
+        """
+        self.columns = [(name, np.dtype(dtype)) for name, dtype in columns]
+
+        fields = [("fieldCount", ">i2")]
+        for name, dtype in self.columns:
+            fields.append((name + "_length", ">i4"))
+            fields.append((name, dtype.newbyteorder(">")))
+        self.rowDtype = np.dtype(fields)
+
+        self.arrays = {name: np.empty(capacity, dtype=dtype) for name, dtype in self.columns}
+        self.size = 0
+        self.__buffer = bytearray()
+        self.__headerRead = False
+
+    def write(self, data):
+        self.__buffer.extend(data)
+
+        if not self.__headerRead:
+            if len(self.__buffer) < BinaryCopyReader.HEADER_SIZE:
+                return len(data)
+            if not self.__buffer.startswith(BinaryCopyReader.SIGNATURE):
+                raise ValueError("The COPY output is not in binary format")
+            extensionLength = struct.unpack(">i", self.__buffer[len(BinaryCopyReader.SIGNATURE) + 4:
+                                                                BinaryCopyReader.HEADER_SIZE])[0]
+            if len(self.__buffer) < BinaryCopyReader.HEADER_SIZE + extensionLength:
+                return len(data)
+            del self.__buffer[:BinaryCopyReader.HEADER_SIZE + extensionLength]
+            self.__headerRead = True
+
+        # the 2 bytes trailer is shorter than a row, it is never decoded as a row
+        numberOfRows = len(self.__buffer) // self.rowDtype.itemsize
+        if numberOfRows > 0:
+            self.__appendRows(np.frombuffer(self.__buffer, dtype=self.rowDtype, count=numberOfRows))
+            del self.__buffer[:numberOfRows * self.rowDtype.itemsize]
+
+        return len(data)
+
+    def __appendRows(self, rows):
+        if np.any(rows["fieldCount"] != len(self.columns)):
+            raise ValueError("Unexpected number of columns in the COPY output")
+        for name, dtype in self.columns:
+            if np.any(rows[name + "_length"] != dtype.itemsize):
+                raise ValueError("Column %s contains NULL values or is not of type %s" % (name, dtype))
+
+        newSize = self.size + len(rows)
+        if newSize > len(self.arrays[self.columns[0][0]]):
+            capacity = max(newSize, 2 * len(self.arrays[self.columns[0][0]]))
+            for name, dtype in self.columns:
+                array = np.empty(capacity, dtype=dtype)
+                array[:self.size] = self.arrays[name][:self.size]
+                self.arrays[name] = array
+
+        for name, dtype in self.columns:
+            self.arrays[name][self.size:newSize] = rows[name]
+        self.size = newSize
+
+    def getArrays(self):
+        """
+        :return: Dictionary {column name: array} with the rows read.
+        """
+        if bytes(self.__buffer) != BinaryCopyReader.TRAILER:
+            raise ValueError("The COPY output is incomplete")
+        return {name: self.arrays[name][:self.size] for name, dtype in self.columns}
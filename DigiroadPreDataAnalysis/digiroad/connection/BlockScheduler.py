@@ -0,0 +1,145 @@
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2.errors
+
+from digiroad.util import Logger
+
+
+class BlockScheduler:
+    SPLITTABLE_ERRORS = (psycopg2.errors.QueryCanceled, psycopg2.errors.OutOfMemory)
+
+    def __init__(self, blockSize=100, targetSeconds=0, minBlockSize=1, maxBlockSize=1000,
+                 splittableErrors=SPLITTABLE_ERRORS):
+        """
+        Split a many-to-many cost matrix in blocks of start and end vertices and adapt the block size to the latency
+        of the queries.
+
+        After each block the seconds per pair of vertices are measured (exponential moving average) and the next blocks
+        are resized to last about ``targetSeconds``, growing or shrinking at most twice per block. A block that fails
+        with one of the ``splittableErrors`` (e.g. statement timeout or out of memory) is split in halves and the halves
+        are solved instead, so a single heavy block does not fail the whole matrix.
+
+        :param blockSize: Initial number of start and end vertices per block.
+        :param targetSeconds: Expected duration of a block, 0 to keep the ``blockSize`` fixed.
+        :param minBlockSize: Minimum block size when adapting.
+        :param maxBlockSize: Maximum block size when adapting.
+        :param splittableErrors: Tuple of exceptions that split the block.
+        """
+        self.blockSize = blockSize
+        self.targetSeconds = targetSeconds
+        self.minBlockSize = minBlockSize
+        self.maxBlockSize = max(maxBlockSize, blockSize)
+        self.splittableErrors = splittableErrors
+        self.secondsPerPair = None
+        self.numberOfSplits = 0
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def fromConfiguration(configuration, splittableErrors=SPLITTABLE_ERRORS):
+        """
+        :param configuration: Application Configuration.
+        :param splittableErrors: Tuple of exceptions that split the block, see the service provider.
+        :return: Scheduler with the block settings of the PARALLELIZATION section.
+        """
+        return BlockScheduler(blockSize=configuration.maxVerticesBlocks,
+                              targetSeconds=configuration.blockTargetSeconds,
+                              minBlockSize=configuration.minVerticesBlocks,
+                              maxBlockSize=configuration.maxAdaptiveVerticesBlocks,
+                              splittableErrors=splittableErrors)
+
+    def iterateBlocks(self, startVerticesID, endVerticesID, runBlock, jobs=1):
+        """
+        Run the blocks in ``jobs`` threads and return the results in order, as soon as each block is finished. At
+        most ``2 * jobs`` blocks are running or waiting to be consumed, so the size of the next blocks is decided with
+        recent measurements and the memory is bounded by the block size.
+
+        :param startVerticesID: Set of initial vertexes.
+        :param endVerticesID: Set of ending vertexes.
+        :param runBlock: Function (startVerticesBlock, endVerticesBlock) returning a dictionary {column: array}.
+        :param jobs: Number of parallel blocks.
+        :return: Generator of the ``runBlock`` results, a split block returns one result per solved part.
+        """
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            pending = deque()
+            for startVerticesBlock, endVerticesBlock in self.__iterateVerticesBlocks(startVerticesID, endVerticesID):
+                pending.append(executor.submit(self.runSplittingBlock, runBlock, startVerticesBlock, endVerticesBlock))
+                while len(pending) >= 2 * jobs:
+                    yield from pending.popleft().result()
+
+            while pending:
+                yield from pending.popleft().result()
+
+    def __iterateVerticesBlocks(self, startVerticesID, endVerticesID):
+        # the size is read again for every block, so it changes in the middle of a row of blocks
+        startPosition = 0
+        while startPosition < len(startVerticesID):
+            startVerticesBlock = startVerticesID[startPosition:startPosition + self.blockSize]
+            endPosition = 0
+            while endPosition < len(endVerticesID):
+                endVerticesBlock = endVerticesID[endPosition:endPosition + self.blockSize]
+                yield startVerticesBlock, endVerticesBlock
+                endPosition += len(endVerticesBlock)
+            startPosition += len(startVerticesBlock)
+
+    def runSplittingBlock(self, runBlock, startVerticesBlock, endVerticesBlock):
+        """
+        :return: List with the result of the block, or the results of its halves if the block had to be split.
+        """
+        startTime = time.time()
+        try:
+            result = runBlock(startVerticesBlock, endVerticesBlock)
+        except self.splittableErrors as err:
+            if len(startVerticesBlock) <= 1 and len(endVerticesBlock) <= 1:
+                raise
+
+            Logger.getInstance().warning("Splitting block of %sx%s vertices: %s" % (len(startVerticesBlock),
+                                                                                   len(endVerticesBlock), err))
+            with self.__lock:
+                self.numberOfSplits += 1
+                self.blockSize = max(self.minBlockSize, min(self.blockSize,
+                                                            max(len(startVerticesBlock), len(endVerticesBlock)) // 2))
+
+            results = []
+            for startHalf, endHalf in splitBlock(startVerticesBlock, endVerticesBlock):
+                results.extend(self.runSplittingBlock(runBlock, startHalf, endHalf))
+            return results
+
+        self.__measure(len(startVerticesBlock) * len(endVerticesBlock), time.time() - startTime)
+        return [result]
+
+    def __measure(self, pairs, seconds):
+        if not self.targetSeconds or not pairs:
+            return
+
+        with self.__lock:
+            secondsPerPair = seconds / pairs
+            if self.secondsPerPair is None:
+                self.secondsPerPair = secondsPerPair
+            else:
+                self.secondsPerPair = 0.7 * self.secondsPerPair + 0.3 * secondsPerPair
+
+            if self.secondsPerPair > 0:
+                targetBlockSize = int(math.sqrt(self.targetSeconds / self.secondsPerPair))
+            else:
+                targetBlockSize = self.maxBlockSize
+            targetBlockSize = min(max(targetBlockSize, self.blockSize // 2), self.blockSize * 2)
+            self.blockSize = min(max(targetBlockSize, self.minBlockSize), self.maxBlockSize)
+
+            Logger.getInstance().info("Block of %s pairs in %.2f s (%.0f pairs/s), next block size %s" % (
+                pairs, seconds, pairs / seconds if seconds else float("inf"), self.blockSize))
+
+
+def splitBlock(startVerticesBlock, endVerticesBlock):
+    """
+    :return: The two halves of a block, splitting its largest dimension.
+    """
+    if len(startVerticesBlock) >= len(endVerticesBlock):
+        half = len(startVerticesBlock) // 2
+        return [(startVerticesBlock[:half], endVerticesBlock), (startVerticesBlock[half:], endVerticesBlock)]
+
+    half = len(endVerticesBlock) // 2
+    return [(startVerticesBlock, endVerticesBlock[:half]), (startVerticesBlock, endVerticesBlock[half:])]
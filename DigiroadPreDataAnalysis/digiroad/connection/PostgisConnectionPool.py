@@ -0,0 +1,192 @@
+import atexit
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+import psycopg2.pool
+
+from digiroad.util import Configuration, Logger
+
+
+class PostgisConnectionPool:
+    __instance = None
+    __instanceLock = threading.Lock()
+
+    def __init__(self, connectionParameters, minConnections=1, maxConnections=8, sessionSettings=None,
+                 healthCheckSeconds=60):
+        """
+        Thread-safe pool of database connections shared by the joblib threading workers.
+
+        The connections are opened on demand up to ``maxConnections`` and kept open when they are returned. A worker
+        asking for a connection while all of them are in use waits until one is returned.
+
+        :param connectionParameters: Dictionary with the psycopg2.connect keyword arguments.
+        :param minConnections: Connections opened when the pool is created.
+        :param maxConnections: Maximum number of simultaneous connections.
+        :param sessionSettings: List of (parameter, value) applied with SET to each new connection.
+        :param healthCheckSeconds: A connection idle for longer than this is checked with ``SELECT 1`` before being
+                                   reused, and replaced if it is broken.
+        """
+        self.connectionParameters = connectionParameters
+        self.sessionSettings = sessionSettings if sessionSettings else []
+        self.healthCheckSeconds = healthCheckSeconds
+        self.__semaphore = threading.BoundedSemaphore(maxConnections)
+        self.__idleConnections = []
+        self.__lastUsed = {}
+        self.__lock = threading.Lock()
+        self.__closed = False
+
+        for _ in range(minConnections):
+            self.__idleConnections.append(self.__connect())
+
+    @staticmethod
+    def getInstance(configuration=None):
+        """
+        :param configuration: Application Configuration used to create the pool, by default the one of the working
+                              directory.
+        :return: The pool configured with the ``DATABASE_CONFIG`` section, created the first time it is requested.
+        """
+        with PostgisConnectionPool.__instanceLock:
+            if PostgisConnectionPool.__instance is None:
+                PostgisConnectionPool.__instance = PostgisConnectionPool.fromConfiguration(
+                    configuration if configuration else Configuration.getInstance())
+                atexit.register(PostgisConnectionPool.__instance.closeAll)
+            return PostgisConnectionPool.__instance
+
+    @staticmethod
+    def fromConfiguration(configuration):
+        """
+        :param configuration: Application Configuration. The pool options of the ``DATABASE_CONFIG`` section are
+                              optional: pool_min_connections, pool_max_connections (default: the number of parallel
+                              jobs + 1), pool_health_check_seconds and pool_session_settings (e.g.
+                              work_mem=256MB;jit=off).
+        :return: New PostgisConnectionPool.
+        """
+        databaseConfig = configuration.getSection("DATABASE_CONFIG")
+        maxConnections = int(databaseConfig.get("pool_max_connections", str(configuration.jobs + 1)))
+        return PostgisConnectionPool(connectionParameters=PostgisConnectionPool.getConnectionParameters(databaseConfig),
+                                     minConnections=min(int(databaseConfig.get("pool_min_connections", "1")),
+                                                        maxConnections),
+                                     maxConnections=maxConnections,
+                                     sessionSettings=PostgisConnectionPool.getSessionSettings(databaseConfig),
+                                     healthCheckSeconds=float(databaseConfig.get("pool_health_check_seconds", "60")))
+
+    @staticmethod
+    def getConnectionParameters(databaseConfig):
+        """
+        :param databaseConfig: ``DATABASE_CONFIG`` section.
+        :return: Dictionary with the database, user, password, host and (optional) port of the connections.
+        """
+        connectionParameters = {
+            "database": databaseConfig["database_name"],
+            "user": databaseConfig["user"],
+            "password": databaseConfig["password"],
+            "host": databaseConfig["host"]
+        }
+        if databaseConfig.get("port"):
+            connectionParameters["port"] = databaseConfig["port"]
+        return connectionParameters
+
+    @staticmethod
+    def getSessionSettings(databaseConfig):
+        """
+        :param databaseConfig: ``DATABASE_CONFIG`` section.
+        :return: List of (parameter, value) of the ``pool_session_settings``.
+        """
+        sessionSettings = []
+        for setting in databaseConfig.get("pool_session_settings", "").split(";"):
+            if "=" in setting:
+                parameter, value = setting.split("=", 1)
+                sessionSettings.append((parameter.strip(), value.strip()))
+        return sessionSettings
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection from the pool. The open transaction is rolled back when the connection is returned, the
+        broken connections are closed instead of being returned to the pool.
+        """
+        self.__semaphore.acquire()
+        con = None
+        broken = False
+        try:
+            con = self.__getHealthyConnection()
+            yield con
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            if con is not None:
+                self.__returnConnection(con, broken)
+            self.__semaphore.release()
+
+    def __connect(self):
+        con = psycopg2.connect(**self.connectionParameters)
+        if self.sessionSettings:
+            cursor = con.cursor()
+            for parameter, value in self.sessionSettings:
+                cursor.execute("SELECT set_config(%s, %s, false)", (parameter, value))
+            con.commit()
+        return con
+
+    def __getHealthyConnection(self):
+        with self.__lock:
+            if self.__closed:
+                raise psycopg2.pool.PoolError("connection pool is closed")
+            con = self.__idleConnections.pop() if self.__idleConnections else None
+            lastUsed = self.__lastUsed.pop(id(con), None) if con is not None else None
+
+        if con is not None and (con.closed or (lastUsed is not None
+                                               and time.time() - lastUsed > self.healthCheckSeconds
+                                               and not self.__isAlive(con))):
+            Logger.getInstance().warning("Replacing a broken database connection of the pool")
+            self.__close(con)
+            con = None
+
+        if con is None:
+            con = self.__connect()
+        return con
+
+    def __isAlive(self, con):
+        try:
+            cursor = con.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            con.rollback()
+            return True
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            return False
+
+    def __close(self, con):
+        try:
+            con.close()
+        except psycopg2.Error:
+            pass
+
+    def __returnConnection(self, con, broken):
+        if not broken and not con.closed:
+            try:
+                if con.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    con.rollback()
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                broken = True
+
+        with self.__lock:
+            if not broken and not con.closed and not self.__closed:
+                self.__lastUsed[id(con)] = time.time()
+                self.__idleConnections.append(con)
+                return
+
+        self.__close(con)
+
+    def closeAll(self):
+        with self.__lock:
+            self.__closed = True
+            idleConnections = self.__idleConnections
+            self.__idleConnections = []
+            self.__lastUsed = {}
+
+        for con in idleConnections:
+            self.__close(con)
@@ -1,8 +1,12 @@
 import psycopg2
 import geopandas as gpd
+import numpy as np
+import pandas as pd
 
 from digiroad.connection import AbstractGeojsonProvider
-from digiroad.util import getConfigurationProperties, GPD_CRS, FileActions, \
+from digiroad.connection.BinaryCopyReader import BinaryCopyReader
+from digiroad.connection.PostgisConnectionPool import PostgisConnectionPool
+from digiroad.util import Configuration, GPD_CRS, FileActions, \
     dgl_timer
 
 
@@ -14,33 +18,42 @@ def executePostgisQueryReturningDataFrame(self, sql):
     :return: Sentence query results.
     """
 
-    con = self.getConnection()
-
-    try:
+    with self.getPooledConnection() as con:
         df = gpd.GeoDataFrame.from_postgis(sql, con, geom_col='geom', crs=GPD_CRS.PSEUDO_MERCATOR)
-    finally:
-        con.close()
 
     return df
 
 
 class PostgisServiceProvider(AbstractGeojsonProvider):
-    def __init__(self, epsgCode="EPSG:3857"):
+    def __init__(self, epsgCode="EPSG:3857", configuration=None):
         self.epsgCode = epsgCode
         self.fileActions = FileActions()
+        self.configuration = configuration if configuration else Configuration.getInstance()
 
     def getConnection(self):
         """
-        Creates a new connection to the pg_database
+        Creates a new connection to the pg_database, the caller is responsible of closing it. The queries of the
+        provider use the shared connection pool instead, see ``getPooledConnection``.
 
         :return: New connection.
         """
-        config = getConfigurationProperties(section="DATABASE_CONFIG")
+        config = self.configuration.getSection("DATABASE_CONFIG")
         con = psycopg2.connect(database=config["database_name"], user=config["user"], password=config["password"],
                                host=config["host"])
 
         return con
 
+    def getPooledConnection(self):
+        """
+        Borrow a connection of the shared connection pool, to be used in a ``with`` statement:
+
+            with serviceProvider.getPooledConnection() as con:
+                ...
+
+        :return: Context manager returning the connection to the pool at the end of the block.
+        """
+        return PostgisConnectionPool.getInstance(self.configuration).connection()
+
     @dgl_timer
     def execute(self, sql):
         """
@@ -50,17 +63,93 @@ class PostgisServiceProvider(AbstractGeojsonProvider):
         :return: Sentence query results.
         """
 
-        con = self.getConnection()
-
-        try:
+        with self.getPooledConnection() as con:
             df = gpd.GeoDataFrame.from_postgis(sql, con, geom_col='geom', crs=GPD_CRS.PSEUDO_MERCATOR)
-        finally:
-            con.close()
 
         newJson = self.fileActions.convertToGeojson(df)
 
         return newJson
 
+    @dgl_timer
+    def executeQueryReturningDataFrame(self, sql):
+        """
+        Given a PG_SQL without geometry columns execute the query and retrieve the attributes.
+
+        :param sql: Postgis SQL sentence.
+        :return: Pandas DataFrame with the sentence query results.
+        """
+
+        with self.getPooledConnection() as con:
+            df = pd.read_sql_query(sql, con)
+
+        return df
+
+    def executeQueriesReturningDataFrames(self, sqls):
+        """
+        :param sqls: List of PG_SQL sentences without geometry columns.
+        :return: List with the Pandas DataFrame of each sentence, executed one after another.
+        """
+        return [self.executeQueryReturningDataFrame(sql) for sql in sqls]
+
+    def executeCopyReturningArrays(self, sql, columns, capacity=0):
+        """
+        Given a PG_SQL without geometry columns, stream the results with ``COPY ... TO STDOUT`` in binary format
+        directly into NumPy arrays, no DataFrame nor Python object is created per row.
+
+        :param sql: Postgis SQL sentence, its columns must be fixed size and NOT NULL (e.g. bigint, double precision).
+        :param columns: List of (column name, numpy dtype) of the sentence columns, e.g. [("id", np.int64)].
+        :param capacity: Expected number of rows, used to preallocate the arrays.
+        :return: Dictionary {column name: array}.
+        """
+        reader = BinaryCopyReader(columns, capacity)
+        with self.getPooledConnection() as con:
+            cursor = con.cursor()
+            cursor.copy_expert("COPY (%s) TO STDOUT WITH (FORMAT binary)" % sql, reader)
+            cursor.close()
+
+        return reader.getArrays()
+
+    def getVerticesCoordinates(self, tableName, verticesID):
+        """
+        :param tableName: Network table name.
+        :param verticesID: List of vertices.
+        :return: Dictionary with the arrays id, x and y of the vertices found.
+        """
+        sql = "SELECT " \
+              "v.id::bigint AS id, " \
+              "ST_X(v.the_geom)::double precision AS x, " \
+              "ST_Y(v.the_geom)::double precision AS y " \
+              "FROM table_name_vertices_pgr AS v " \
+              "WHERE v.id = ANY(ARRAY[%s]::bigint[])".replace("table_name", tableName) % (
+                  ",".join(map(str, verticesID)))
+        return self.executeCopyReturningArrays(sql, [("id", np.int64), ("x", np.float64), ("y", np.float64)],
+                                               capacity=len(verticesID))
+
+    def getTableFingerprint(self, tableName):
+        """
+        Fingerprint of the content of a pgRouting network: md5 of the rows of the edges table (every column but the
+        geometry, i.e. the topology, traffic rules and costs) and of the vertices table, in id order. It changes with
+        any modification of the routing content, in place or recreating the tables (e.g. new intersection delays
+        with the same edges and ids), and it does not change when the tables are recreated with the same content.
+
+        :param tableName: Edges table name, the vertices table is ``<tableName>_vertices_pgr``.
+        :return: Fingerprint string.
+        """
+        with self.getPooledConnection() as con:
+            cursor = con.cursor()
+            cursor.execute(self.getTableFingerprintSQL(tableName))
+            row = cursor.fetchone()
+
+        return tableName + ":" + ":".join(str(value) for value in row)
+
+    def getTableFingerprintSQL(self, tableName):
+        # the md5 of every row is aggregated instead of the rows, so the aggregated text is 32 bytes per row
+        return "SELECT " \
+               "(SELECT md5(string_agg(md5((to_jsonb(e) - 'the_geom')::text), '' ORDER BY e.id)) " \
+               "FROM table_name AS e) AS edges, " \
+               "(SELECT md5(string_agg(md5(v::text), '' ORDER BY v.id)) " \
+               "FROM table_name_vertices_pgr AS v) AS vertices".replace("table_name", tableName)
+
     def createTemporaryTable(self, con, tableName, columns):
 
         cursor = con.cursor()
@@ -1,4 +1,12 @@
+import psycopg2.errors
+
+
 class AbstractGeojsonProvider:
+    # maximum number of queries the provider runs at the same time, None to use the PARALLELIZATION jobs
+    concurrency = None
+    # errors of a query that is too heavy, the BlockScheduler splits the blocks failing with them
+    splittableErrors = (psycopg2.errors.QueryCanceled, psycopg2.errors.OutOfMemory)
+
     def getConnection(self):
         raise NotImplementedError("Should have implemented this")
 
@@ -1,5 +1,6 @@
 import getopt
 import gc
+import multiprocessing
 import sys
 
 import os
@@ -14,10 +15,15 @@ from digiroad.carRoutingExceptions import ImpedanceAttributeNotDefinedException,
 from digiroad.connection.PostgisServiceProvider import PostgisServiceProvider
 from digiroad.connection.WFSServiceProvider import WFSServiceProvider
 from digiroad.logic.MetropAccessDigiroad import MetropAccessDigiroadApplication
+from digiroad.logic.RunManifest import RunManifest
+from digiroad.logic.WorkQueue import WorkQueue
 from digiroad.transportMode.BicycleTransportMode import BicycleTransportMode
+from digiroad.transportMode.InMemoryPrivateCarTransportMode import InMemoryPrivateCarTransportMode
+from digiroad.transportMode.ContractionHierarchyPrivateCarTransportMode import \
+    ContractionHierarchyPrivateCarTransportMode
 from digiroad.transportMode.PrivateCarTransportMode import PrivateCarTransportMode
-from digiroad.util import CostAttributes, getConfigurationProperties, TransportModes, Logger, FileActions, \
-    getFormattedDatetime, GeneralLogger, timeDifference
+from digiroad.util import CostAttributes, Configuration, TransportModes, Logger, \
+    FileActions, getFormattedDatetime, GeneralLogger, timeDifference
 
 
 def printHelp():
@@ -94,7 +100,7 @@ def main():
     isEntryList = False
 
     impedanceErrorMessage = "Use the paramenter -c or --cost.\nValues allowed: DISTANCE, SPEED_LIMIT_TIME, DAY_AVG_DELAY_TIME, MIDDAY_DELAY_TIME, RUSH_HOUR_DELAY.\nThe parameter --all enable the analysis for all the impedance attributes."
-    transportModeErrorMessage = "Use the paramenter -t or --transportMode.\nValues allowed: PRIVATE_CAR, BICYCLE."
+    transportModeErrorMessage = "Use the paramenter -t or --transportMode.\nValues allowed: PRIVATE_CAR, PRIVATE_CAR_IN_MEMORY, PRIVATE_CAR_CH, BICYCLE."
 
     for opt, arg in opts:
         if opt in "--help":
@@ -154,23 +160,19 @@ def main():
     generalLogger = GeneralLogger(loggerName="GENERAL", outputFolder=outputFolder, prefix="General")
     MAX_TRIES = 2
     RECOVERY_WAIT_TIME = 10
-    RECOVERY_WAIT_TIME_8_MIN = 480
 
-    postgisServiceProvider = PostgisServiceProvider()
-
-    transportMode = None
-    impedances = None
+    configuration = Configuration.getInstance()
+    RECOVERY_WAIT_TIME_LONG = configuration.recoveryWaitTime
 
     if transportModeSelected == TransportModes.BICYCLE:
-        transportMode = BicycleTransportMode(postgisServiceProvider)
         impedances = bicycle_impedances
-    elif transportModeSelected == TransportModes.PRIVATE_CAR:
-        transportMode = PrivateCarTransportMode(postgisServiceProvider)
+    else:
         impedances = car_impedances
 
-    starter = MetropAccessDigiroadApplication(
-        transportMode=transportMode
-    )
+    useWorkQueue = isEntryList and configuration.workers > 1
+    if not useWorkQueue:
+        # the worker processes create their own application and database connections
+        starter = createStarterApplication(transportModeSelected, outputFolder, configuration)
 
     startTime = time.time()
     functionName = "Routing Data Analysis"
@@ -209,7 +211,7 @@ def main():
                 time.sleep(RECOVERY_WAIT_TIME)
                 generalLogger.getLogger().warning("Calling garbage collector...")
                 gc.collect()
-                time.sleep(RECOVERY_WAIT_TIME_8_MIN)
+                time.sleep(RECOVERY_WAIT_TIME_LONG)
                 memory = psutil.virtual_memory()
                 generalLogger.getLogger().warning(
                     "MEMORY USAGE: total=%s, available=%s, percent=%s, used=%s, free=%s" % (
@@ -227,6 +229,10 @@ def main():
                     generalLogger.getLogger().warning(message)
                     Logger.getInstance().warning(message)
                     executed = True
+    elif useWorkQueue:
+        executeWorkQueue(outputFolder, startPointsGeojsonFilename, endPointsGeojsonFilename, transportModeSelected,
+                         impedanceList, impedances, allImpedanceAttribute, summaryOnly, routesOnly,
+                         configuration, generalLogger, MAX_TRIES)
     else:
         for startRoot, startDirs, startFiles in os.walk(startPointsGeojsonFilename):
             for startPointsFilename in startFiles:
@@ -270,7 +276,7 @@ def main():
                                         time.sleep(RECOVERY_WAIT_TIME)
                                         generalLogger.getLogger().warning("Calling garbage collector...")
                                         gc.collect()
-                                        time.sleep(RECOVERY_WAIT_TIME_8_MIN)
+                                        time.sleep(RECOVERY_WAIT_TIME_LONG)
                                         memory = psutil.virtual_memory()
                                         generalLogger.getLogger().warning(
                                             "MEMORY USAGE: total=%s, available=%s, percent=%s, used=%s, free=%s" % (
@@ -295,6 +301,140 @@ def main():
     generalLogger.getLogger().info("%s Total Time: %s m" % (functionName, totalTime))
 
 
+def createStarterApplication(transportModeSelected, outputFolder, configuration):
+    """
+    :param transportModeSelected: Transport mode given in the command line.
+    :param outputFolder: Output folder, where the run manifest is stored.
+    :param configuration: Application Configuration.
+    :return: MetropAccessDigiroadApplication with its own database connections.
+    """
+    if configuration.asyncConcurrency > 0:
+        # asyncpg is only required for the asyncio provider
+        from digiroad.connection.AsyncPostgisServiceProvider import AsyncPostgisServiceProvider
+        postgisServiceProvider = AsyncPostgisServiceProvider(concurrency=configuration.asyncConcurrency,
+                                                             configuration=configuration)
+    else:
+        postgisServiceProvider = PostgisServiceProvider(configuration=configuration)
+
+    transportMode = None
+    if transportModeSelected == TransportModes.BICYCLE:
+        transportMode = BicycleTransportMode(postgisServiceProvider, configuration=configuration)
+    elif transportModeSelected == TransportModes.PRIVATE_CAR:
+        transportMode = PrivateCarTransportMode(postgisServiceProvider, configuration=configuration)
+    elif transportModeSelected == TransportModes.PRIVATE_CAR_IN_MEMORY:
+        transportMode = InMemoryPrivateCarTransportMode(postgisServiceProvider, configuration=configuration)
+    elif transportModeSelected == TransportModes.PRIVATE_CAR_CH:
+        transportMode = ContractionHierarchyPrivateCarTransportMode(postgisServiceProvider, configuration=configuration)
+
+    starter = MetropAccessDigiroadApplication(
+        transportMode=transportMode,
+        configuration=configuration
+    )
+    if configuration.runManifest:
+        # completed units and blocks are skipped when the same run is started again, or retried after an error
+        starter.runManifest = RunManifest(os.path.join(outputFolder, "run_manifest.sqlite"))
+    return starter
+
+
+def executeWorkQueue(outputFolder, startPointsFolder, endPointsFolder, transportModeSelected,
+                     impedanceList, impedances, allImpedanceAttribute, summaryOnly, routesOnly,
+                     configuration, generalLogger, maxTries):
+    """
+    Add every (start file, end file, impedance) of the entry lists to the work queue of the output folder and run
+    them in ``workers`` processes of the ``configuration``. When the run is started again every unit is queued
+    again, and with a run manifest the units already done with the same files, network and output configuration are
+    skipped by ``executeUnit``.
+
+    :return: None. Each unit is stored in ``<outputFolder>/units/unit-<unit id>`` and its summary files are merged
+             into ``<outputFolder>/summary``.
+    """
+    units = []
+    for startRoot, startDirs, startFiles in os.walk(startPointsFolder):
+        for startPointsFilename in startFiles:
+            if startPointsFilename.endswith("geojson"):
+                for endRoot, endDirs, endFiles in os.walk(endPointsFolder):
+                    for endPointsFilename in endFiles:
+                        if endPointsFilename.endswith("geojson"):
+                            for impedance in (["ALL"] if allImpedanceAttribute else impedanceList):
+                                units.append((os.path.join(startRoot, startPointsFilename),
+                                              os.path.join(endRoot, endPointsFilename),
+                                              impedance))
+
+    workQueuePath = os.path.join(outputFolder, "work_queue.sqlite")
+    workQueue = WorkQueue(workQueuePath)
+    workQueue.addUnits(units)
+    generalLogger.getLogger().info("Work queue %s: %s" % (workQueuePath, workQueue.getStatusCounts()))
+
+    # every unit is run in its own folder and merged into the summary folder one at a time
+    summaryLock = multiprocessing.Lock()
+    processes = []
+    for worker in range(configuration.workers):
+        process = multiprocessing.Process(target=executeWorker,
+                                          name="worker-%s" % worker,
+                                          args=("worker-%s" % worker, workQueuePath, outputFolder,
+                                                transportModeSelected, impedances, allImpedanceAttribute,
+                                                summaryOnly, routesOnly, maxTries, summaryLock, configuration))
+        process.start()
+        processes.append(process)
+
+    while any(process.is_alive() for process in processes):
+        for process in processes:
+            process.join(timeout=60)
+        generalLogger.getLogger().info("Work queue status: %s" % workQueue.getStatusCounts())
+
+    statusCounts = workQueue.getStatusCounts()
+    if statusCounts.get(WorkQueue.FAILED):
+        generalLogger.getLogger().warning("%s units failed, see the error column of %s" % (
+            statusCounts[WorkQueue.FAILED], workQueuePath))
+    workQueue.close()
+
+
+def executeWorker(workerName, workQueuePath, outputFolder, transportModeSelected, impedances, allImpedanceAttribute,
+                  summaryOnly, routesOnly, maxTries, summaryLock, configuration):
+    """
+    Worker process of ``executeWorkQueue``: claim the pending units one by one until the queue is empty and report
+    whether each of them is done or failed.
+
+    The units sharing an impedance write the same route folders and summary zips, so every unit is run in its own
+    folder and its summary files are merged into the summary folder of the ``outputFolder`` holding the
+    ``summaryLock``. The ``configuration`` is the one of the process starting the work queue.
+    """
+    generalLogger = GeneralLogger(loggerName="GENERAL-" + workerName, outputFolder=outputFolder,
+                                  prefix="General-" + workerName)
+    starter = createStarterApplication(transportModeSelected, outputFolder, configuration)
+    workQueue = WorkQueue(workQueuePath)
+
+    unit = workQueue.claimUnit(workerName)
+    while unit:
+        unitId, startPointsGeojsonFilename, endPointsGeojsonFilename, impedance = unit
+        prefix = os.path.basename(startPointsGeojsonFilename) + "_" + os.path.basename(endPointsGeojsonFilename)
+        try:
+            generalLogger.getLogger().info("Analyzing %s %s" % (prefix, impedance))
+            unitFolder = WorkQueue.getUnitFolderPath(outputFolder, unitId)
+            executeSpatialDataAnalysis(unitFolder, startPointsGeojsonFilename, endPointsGeojsonFilename,
+                                       starter,
+                                       [impedance], impedances, allImpedanceAttribute,
+                                       summaryOnly,
+                                       routesOnly,
+                                       prefix + "-")
+            with summaryLock:
+                WorkQueue.mergeUnitSummary(unitFolder, outputFolder)
+            workQueue.completeUnit(unitId)
+            gc.collect()
+        except Exception as err:
+            exc_type, exc_value, exc_traceback = sys.exc_info()
+            lines = traceback.format_exception(exc_type, exc_value, exc_traceback)
+            generalLogger.getLogger().exception(''.join('>> ' + line for line in lines))
+            Logger.getInstance().exception(''.join('>> ' + line for line in lines))
+            # the unit is retried later, after the pending units with fewer attempts, the worker does not wait
+            workQueue.failUnit(unitId, repr(err), maxTries + 1)
+            gc.collect()
+
+        unit = workQueue.claimUnit(workerName)
+
+    workQueue.close()
+
+
 def executeSpatialDataAnalysis(outputFolder, startPointsGeojsonFilename, endPointsGeojsonFilename,
                                starterApplication,
                                impedanceList, impedances, allImpedanceAttribute,
@@ -302,7 +442,6 @@ def executeSpatialDataAnalysis(outputFolder, startPointsGeojsonFilename, endPoin
                                routesOnly,
                                prefix):
     Logger.configureLogger(outputFolder, prefix)
-    config = getConfigurationProperties()
     # wfsServiceProvider = WFSServiceProvider(
     #     wfs_url=config["wfs_url"],
     #     nearestVertexTypeName=config["nearestVertexTypeName"],
@@ -311,53 +450,99 @@ def executeSpatialDataAnalysis(outputFolder, startPointsGeojsonFilename, endPoin
     #     outputFormat=config["outputFormat"]
     # )
 
+    # the units completed with another version of the network or another output configuration are run again, in
+    # incremental mode updating their previous summary
+    runFingerprint = None
+    if starterApplication.runManifest:
+        runFingerprint = RunManifest.createFingerprint(
+            starterApplication.transportMode.getNetworkFingerprint(),
+            sorted(starterApplication.configuration.getOutputProperties().items()))
+
     if not allImpedanceAttribute:
         for impedance in impedanceList:
+            def analyzeImpedance():
+                if routesOnly:
+                    starterApplication.calculateTotalTimeTravel(
+                        startCoordinatesGeojsonFilename=startPointsGeojsonFilename,
+                        endCoordinatesGeojsonFilename=endPointsGeojsonFilename,
+                        outputFolderPath=outputFolder,
+                        costAttribute=impedance
+                    )
+
+                    if summaryOnly:
+                        starterApplication.createDetailedSummary(
+                            folderPath=outputFolder,
+                            costAttribute=impedance,
+                            outputFilename=prefix + "metroAccessDigiroadSummary.geojson"
+                        )
+
+                elif summaryOnly:
+                    starterApplication.createGeneralSummary(
+                        startCoordinatesGeojsonFilename=startPointsGeojsonFilename,
+                        endCoordinatesGeojsonFilename=endPointsGeojsonFilename,
+                        costAttribute=impedance,
+                        outputFolderPath=outputFolder,
+                        outputFilename=prefix + "dijsktraCostMetroAccessDigiroadSummary"
+                    )
+
+            executeUnit(starterApplication.runManifest, startPointsGeojsonFilename, endPointsGeojsonFilename,
+                        [impedance, routesOnly, summaryOnly], analyzeImpedance, runFingerprint)
+
+    if allImpedanceAttribute:
+        def analyzeAllImpedances():
             if routesOnly:
                 starterApplication.calculateTotalTimeTravel(
                     startCoordinatesGeojsonFilename=startPointsGeojsonFilename,
                     endCoordinatesGeojsonFilename=endPointsGeojsonFilename,
                     outputFolderPath=outputFolder,
-                    costAttribute=impedance
+                    costAttribute=impedances
                 )
 
-                if summaryOnly:
+            if routesOnly and summaryOnly:
+                for key in impedances:
                     starterApplication.createDetailedSummary(
                         folderPath=outputFolder,
-                        costAttribute=impedance,
+                        costAttribute=impedances[key],
                         outputFilename=prefix + "metroAccessDigiroadSummary.geojson"
                     )
-
             elif summaryOnly:
-                starterApplication.createGeneralSummary(
+                starterApplication.createGeneralSummaryForAllImpedances(
                     startCoordinatesGeojsonFilename=startPointsGeojsonFilename,
                     endCoordinatesGeojsonFilename=endPointsGeojsonFilename,
-                    costAttribute=impedance,
+                    costAttributes=[impedances[key] for key in impedances],
                     outputFolderPath=outputFolder,
                     outputFilename=prefix + "dijsktraCostMetroAccessDigiroadSummary"
                 )
 
-    if allImpedanceAttribute:
-        if routesOnly:
-            starterApplication.calculateTotalTimeTravel(
-                startCoordinatesGeojsonFilename=startPointsGeojsonFilename,
-                endCoordinatesGeojsonFilename=endPointsGeojsonFilename,
-                outputFolderPath=outputFolder,
-                costAttribute=impedances
-            )
-
-        for key in impedances:
-            if routesOnly and summaryOnly:
-                starterApplication.createDetailedSummary(
-                    folderPath=outputFolder,
-                    costAttribute=impedances[key],
-                    outputFilename=prefix + "metroAccessDigiroadSummary.geojson"
-                )
-            elif summaryOnly:
-                starterApplication.createGeneralSummary(
-                    startCoordinatesGeojsonFilename=startPointsGeojsonFilename,
-                    endCoordinatesGeojsonFilename=endPointsGeojsonFilename,
-                    costAttribute=impedances[key],
-                    outputFolderPath=outputFolder,
-                    outputFilename=prefix + "dijsktraCostMetroAccessDigiroadSummary"
-                )
+        executeUnit(starterApplication.runManifest, startPointsGeojsonFilename, endPointsGeojsonFilename,
+                    [sorted(impedances.values()), routesOnly, summaryOnly], analyzeAllImpedances,
+                    runFingerprint)
+
+
+def executeUnit(runManifest, startPointsGeojsonFilename, endPointsGeojsonFilename, unitOptions, analyze,
+                runFingerprint):
+    """
+    Call ``analyze`` unless a previous run already completed the same unit of work (same start file, end file and
+    options, the files were not modified since then and the run fingerprint is the same), and record the unit as
+    completed in the ``runManifest``.
+
+    :param runManifest: RunManifest of the output folder, None to always call ``analyze``.
+    :param unitOptions: Impedance and options that identify the unit for the pair of files.
+    :param analyze: Function without parameters doing the work of the unit.
+    :param runFingerprint: Fingerprint of the network and the output configuration, the unit is run again when it
+                           changes.
+    """
+    if not runManifest:
+        analyze()
+        return
+
+    unitKey = "|".join([os.path.abspath(startPointsGeojsonFilename), os.path.abspath(endPointsGeojsonFilename),
+                        repr(unitOptions)])
+    fingerprint = RunManifest.createFingerprint(
+        RunManifest.createFileFingerprint(startPointsGeojsonFilename, endPointsGeojsonFilename), runFingerprint)
+    if runManifest.isUnitCompleted(unitKey, fingerprint):
+        Logger.getInstance().info("Skipping %s, completed by a previous run" % unitKey)
+        return
+
+    analyze()
+    runManifest.completeUnit(unitKey, fingerprint)
@@ -0,0 +1,273 @@
+import threading
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+
+class CSRGraph:
+    def __init__(self, vertexIDs, indptr, heads, arcEdgeIDs, arcForward, weights, vertexCoordinates=None):
+        """
+        Directed routing graph stored as compressed sparse row (CSR) arrays.
+
+        Every network edge produces up to two arcs: the forward arc (source -> target) weighted by ``cost`` and the
+        backward arc (target -> source) weighted by ``reverse_cost``. Arcs that are not traversable for a given
+        impedance/cost attribute have an infinite weight.
+
+        :param vertexIDs: Sorted array of the original (pgRouting) vertex ids, the position is the internal index.
+        :param indptr: CSR row pointer, the arcs leaving the vertex ``i`` are ``indptr[i]:indptr[i + 1]``.
+        :param heads: Internal index of the vertex reached by each arc.
+        :param arcEdgeIDs: Original edge id of each arc.
+        :param arcForward: True if the arc follows the edge digitizing direction (source -> target).
+        :param weights: Dictionary {costAttribute: weight array aligned with the arcs}.
+        :param vertexCoordinates: Optional (n, 2) array with the vertex coordinates [x, y].
+        """
+        self.vertexIDs = vertexIDs
+        self.indptr = indptr
+        self.heads = heads
+        self.arcEdgeIDs = arcEdgeIDs
+        self.arcForward = arcForward
+        self.weights = weights
+        self.vertexCoordinates = vertexCoordinates
+        self.__costMatrices = {}
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def fromEdges(edgeIDs, sources, targets, costs, reverseCosts, vertexIDs=None, vertexCoordinates=None):
+        """
+        Build the CSR graph from the edge table columns.
+
+        :param edgeIDs: Edge ids.
+        :param sources: Source vertex id of each edge.
+        :param targets: Target vertex id of each edge.
+        :param costs: Dictionary {costAttribute: cost array}, negative or NaN values mean not traversable.
+        :param reverseCosts: Dictionary {costAttribute: reverse cost array}, same rules than ``costs``.
+        :param vertexIDs: Optional vertex ids, by default the vertices found in ``sources`` and ``targets``.
+        :param vertexCoordinates: Optional (n, 2) array with the coordinates of ``vertexIDs``.
+        :return: CSRGraph instance.
+        """
+        edgeIDs = np.asarray(edgeIDs, dtype=np.int64)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+
+        if vertexIDs is None:
+            vertexIDs = np.unique(np.concatenate((sources, targets)))
+            vertexCoordinates = None
+        else:
+            vertexIDs = np.asarray(vertexIDs, dtype=np.int64)
+            order = np.argsort(vertexIDs, kind="stable")
+            vertexIDs = vertexIDs[order]
+            if vertexCoordinates is not None:
+                vertexCoordinates = np.asarray(vertexCoordinates, dtype=np.float64)[order]
+
+        sourceIndices = CSRGraph._indicesOf(vertexIDs, sources)
+        targetIndices = CSRGraph._indicesOf(vertexIDs, targets)
+        if (sourceIndices < 0).any() or (targetIndices < 0).any():
+            raise ValueError("Some edges reference vertices that are not defined in the vertex ids")
+
+        tails = np.concatenate((sourceIndices, targetIndices))
+        heads = np.concatenate((targetIndices, sourceIndices))
+        arcEdgeIDs = np.concatenate((edgeIDs, edgeIDs))
+        arcForward = np.concatenate((np.ones(len(edgeIDs), dtype=bool), np.zeros(len(edgeIDs), dtype=bool)))
+
+        weights = {}
+        traversable = np.zeros(len(tails), dtype=bool)
+        for costAttribute in costs:
+            weight = np.concatenate((np.asarray(costs[costAttribute], dtype=np.float64),
+                                     np.asarray(reverseCosts[costAttribute], dtype=np.float64)))
+            valid = np.isfinite(weight) & (weight >= 0)
+            weight[~valid] = np.inf
+            traversable |= valid
+            weights[costAttribute] = weight
+
+        order = np.argsort(tails[traversable], kind="stable")
+        tails = tails[traversable][order]
+        indptr = np.zeros(len(vertexIDs) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(tails, minlength=len(vertexIDs)), out=indptr[1:])
+
+        for costAttribute in weights:
+            weights[costAttribute] = weights[costAttribute][traversable][order]
+
+        return CSRGraph(vertexIDs=vertexIDs,
+                        indptr=indptr,
+                        heads=heads[traversable][order],
+                        arcEdgeIDs=arcEdgeIDs[traversable][order],
+                        arcForward=arcForward[traversable][order],
+                        weights=weights,
+                        vertexCoordinates=vertexCoordinates)
+
+    @staticmethod
+    def _indicesOf(sortedIDs, ids):
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(sortedIDs) == 0:
+            return np.full(len(ids), -1, dtype=np.int64)
+        positions = np.searchsorted(sortedIDs, ids)
+        positions[positions >= len(sortedIDs)] = 0
+        return np.where(sortedIDs[positions] == ids, positions, -1).astype(np.int64)
+
+    def getNumberOfVertices(self):
+        return len(self.vertexIDs)
+
+    def getNumberOfArcs(self):
+        return len(self.heads)
+
+    def getCostAttributes(self):
+        return list(self.weights.keys())
+
+    def getVertexIndices(self, vertexIDs):
+        """
+        :param vertexIDs: Original vertex ids.
+        :return: Internal vertex indices, -1 for the vertices that are not part of the graph.
+        """
+        return CSRGraph._indicesOf(self.vertexIDs, vertexIDs)
+
+    def getTails(self):
+        """
+        :return: Internal index of the vertex where each arc starts.
+        """
+        return np.repeat(np.arange(len(self.vertexIDs), dtype=np.int64), np.diff(self.indptr))
+
+    def getCostMatrix(self, costAttribute):
+        """
+        Sparse adjacency matrix for the given impedance. Parallel arcs are reduced to the cheapest one.
+
+        :param costAttribute: Impedance/cost attribute.
+        :return: Tuple (scipy csr_matrix, arc positions of the matrix entries).
+        """
+        if costAttribute not in self.weights:
+            raise KeyError("Cost attribute not loaded in the graph: %s" % costAttribute)
+
+        with self.__lock:
+            if costAttribute not in self.__costMatrices:
+                weight = self.weights[costAttribute]
+                tails = self.getTails()
+                arcs = np.flatnonzero(np.isfinite(weight))
+                arcs = arcs[np.lexsort((weight[arcs], self.heads[arcs], tails[arcs]))]
+                first = np.ones(len(arcs), dtype=bool)
+                first[1:] = (tails[arcs][1:] != tails[arcs][:-1]) | (self.heads[arcs][1:] != self.heads[arcs][:-1])
+                arcs = arcs[first]
+
+                indptr = np.zeros(len(self.vertexIDs) + 1, dtype=np.int64)
+                np.cumsum(np.bincount(tails[arcs], minlength=len(self.vertexIDs)), out=indptr[1:])
+                matrix = csr_matrix((weight[arcs], self.heads[arcs], indptr),
+                                    shape=(len(self.vertexIDs), len(self.vertexIDs)))
+                self.__costMatrices[costAttribute] = (matrix, arcs)
+
+            return self.__costMatrices[costAttribute]
+
+    def calculateShortestPathCosts(self, startIndices, endIndices, costAttribute):
+        """
+        Run Dijkstra from each start vertex and collect the cost to each end vertex. When there are fewer end vertices
+        than start vertices, Dijkstra is run backwards from each end vertex over the reversed arcs instead.
+
+        :param startIndices: Internal indices of the start vertices.
+        :param endIndices: Internal indices of the end vertices.
+        :param costAttribute: Impedance/cost attribute.
+        :return: (len(startIndices), len(endIndices)) array, ``inf`` when the end vertex is not reachable.
+        """
+        startIndices = np.asarray(startIndices, dtype=np.int64)
+        endIndices = np.asarray(endIndices, dtype=np.int64)
+        matrix, _arcs = self.getCostMatrix(costAttribute)
+
+        costs = np.full((len(startIndices), len(endIndices)), np.inf)
+        validStarts = np.flatnonzero(startIndices >= 0)
+        validEnds = np.flatnonzero(endIndices >= 0)
+        if len(validStarts) == 0 or len(validEnds) == 0:
+            return costs
+
+        if len(validEnds) < len(validStarts):
+            distances = dijkstra(matrix.T.tocsr(), directed=True, indices=endIndices[validEnds])
+            costs[np.ix_(validStarts, validEnds)] = distances[:, startIndices[validStarts]].T
+        else:
+            distances = dijkstra(matrix, directed=True, indices=startIndices[validStarts])
+            costs[np.ix_(validStarts, validEnds)] = distances[:, endIndices[validEnds]]
+        return costs
+
+    def calculateShortestPathTree(self, startIndex, costAttribute):
+        """
+        :param startIndex: Internal index of the root vertex.
+        :param costAttribute: Impedance/cost attribute.
+        :return: Tuple (distances, predecessors) for all the vertices, predecessor -9999 marks no predecessor.
+        """
+        matrix, _arcs = self.getCostMatrix(costAttribute)
+        distances, predecessors = dijkstra(matrix, directed=True, indices=startIndex, return_predecessors=True)
+        return distances, predecessors
+
+    def calculateShortestPathsEdges(self, startIndex, endIndices, costAttribute):
+        """
+        Run Dijkstra once from the start vertex and follow the predecessors of the shortest path tree back from each
+        end vertex.
+
+        :param startIndex: Internal index of the root vertex.
+        :param endIndices: Internal indices of the end vertices.
+        :param costAttribute: Impedance/cost attribute.
+        :return: List with the ordered edge ids of the shortest path to each end vertex, None when the end vertex is
+                 not reachable.
+        """
+        matrix, arcs = self.getCostMatrix(costAttribute)
+        _distances, predecessors = self.calculateShortestPathTree(startIndex, costAttribute)
+
+        # arc of the tree reaching each vertex, the matrix entries are sorted by tail and head
+        numberOfVertices = len(self.vertexIDs)
+        tails = np.repeat(np.arange(numberOfVertices, dtype=np.int64), np.diff(matrix.indptr))
+        keys = tails * numberOfVertices + matrix.indices.astype(np.int64)
+        reachedVertices = np.flatnonzero(predecessors >= 0)
+        predecessorArcs = np.full(numberOfVertices, -1, dtype=np.int64)
+        predecessorArcs[reachedVertices] = arcs[np.searchsorted(
+            keys, predecessors[reachedVertices].astype(np.int64) * numberOfVertices + reachedVertices)]
+
+        paths = []
+        for endIndex in endIndices:
+            endIndex = int(endIndex)
+            if endIndex < 0 or (endIndex != startIndex and predecessors[endIndex] < 0):
+                paths.append(None)
+                continue
+
+            pathArcs = []
+            vertex = endIndex
+            while vertex != startIndex:
+                pathArcs.append(predecessorArcs[vertex])
+                vertex = predecessors[vertex]
+            paths.append(self.arcEdgeIDs[pathArcs[::-1]].tolist())
+
+        return paths
+
+    def save(self, path):
+        """
+        Store the graph arrays in a compressed numpy file.
+
+        :param path: File path, ``.npz`` is appended by numpy if missing.
+        """
+        arrays = {
+            "vertexIDs": self.vertexIDs,
+            "indptr": self.indptr,
+            "heads": self.heads,
+            "arcEdgeIDs": self.arcEdgeIDs,
+            "arcForward": self.arcForward,
+            "costAttributes": np.array(list(self.weights.keys()))
+        }
+        for costAttribute in self.weights:
+            arrays["weight_" + costAttribute] = self.weights[costAttribute]
+        if self.vertexCoordinates is not None:
+            arrays["vertexCoordinates"] = self.vertexCoordinates
+
+        np.savez_compressed(path, **arrays)
+
+    @staticmethod
+    def load(path):
+        """
+        :param path: File created with ``save``.
+        :return: CSRGraph instance.
+        """
+        with np.load(path) as data:
+            weights = {}
+            for costAttribute in data["costAttributes"]:
+                weights[str(costAttribute)] = data["weight_" + str(costAttribute)]
+
+            return CSRGraph(vertexIDs=data["vertexIDs"],
+                            indptr=data["indptr"],
+                            heads=data["heads"],
+                            arcEdgeIDs=data["arcEdgeIDs"],
+                            arcForward=data["arcForward"],
+                            weights=weights,
+                            vertexCoordinates=data["vertexCoordinates"] if "vertexCoordinates" in data else None)
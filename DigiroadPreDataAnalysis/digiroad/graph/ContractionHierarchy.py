@@ -0,0 +1,423 @@
+import heapq
+
+import numpy as np
+
+INFINITY = float("inf")
+
+
+class ContractionHierarchy:
+    def __init__(self, costAttribute, vertexIDs, rank,
+                 upIndptr, upHeads, upWeights, upMiddles, upEdgeIDs, upForward,
+                 downIndptr, downHeads, downWeights, downMiddles, downEdgeIDs, downForward, networkFingerprint=None):
+        """
+        Contraction hierarchy of a CSRGraph for a single impedance/cost attribute.
+
+        The hierarchy is stored as two CSR graphs using the same internal vertex indices of the CSRGraph:
+            * up: arcs v -> x where x was contracted after v (forward search graph).
+            * down: arcs u -> v, stored in the row of v, where u was contracted after v (backward search graph).
+
+        Each arc keeps its middle vertex (-1 for the original network arcs) to unpack the shortcuts, and the original
+        edge id and direction (True when the arc follows source -> target) of the non-shortcut arcs.
+
+        The ``networkFingerprint`` of the network the hierarchy was built from is stored with it, so a stored
+        hierarchy is only used with the same network.
+        """
+        self.costAttribute = costAttribute
+        self.networkFingerprint = networkFingerprint
+        self.vertexIDs = vertexIDs
+        self.rank = rank
+        self.upIndptr = upIndptr
+        self.upHeads = upHeads
+        self.upWeights = upWeights
+        self.upMiddles = upMiddles
+        self.upEdgeIDs = upEdgeIDs
+        self.upForward = upForward
+        self.downIndptr = downIndptr
+        self.downHeads = downHeads
+        self.downWeights = downWeights
+        self.downMiddles = downMiddles
+        self.downEdgeIDs = downEdgeIDs
+        self.downForward = downForward
+        self.lastSettledVertices = 0
+        self._prepareSearchLists()
+
+    def _prepareSearchLists(self):
+        # Plain python lists are much faster than numpy scalars inside the heap based searches.
+        self._upIndptr = self.upIndptr.tolist()
+        self._upHeads = self.upHeads.tolist()
+        self._upWeights = self.upWeights.tolist()
+        self._downIndptr = self.downIndptr.tolist()
+        self._downHeads = self.downHeads.tolist()
+        self._downWeights = self.downWeights.tolist()
+
+    @staticmethod
+    def build(graph, costAttribute, witnessSettleLimit=500, networkFingerprint=None):
+        """
+        Contract all the vertices of the graph ordered by edge difference (shortcuts added minus arcs removed)
+        plus the number of contracted neighbours, using lazy priority updates and witness searches limited to
+        ``witnessSettleLimit`` settled vertices.
+
+        :param graph: CSRGraph instance.
+        :param costAttribute: Impedance/cost attribute loaded in the graph.
+        :param witnessSettleLimit: Maximum settled vertices in each witness search.
+        :param networkFingerprint: Fingerprint of the network of the graph.
+        :return: ContractionHierarchy instance.
+        """
+        matrix, arcs = graph.getCostMatrix(costAttribute)
+        numberOfVertices = graph.getNumberOfVertices()
+        tails = np.repeat(np.arange(numberOfVertices), np.diff(matrix.indptr)).tolist()
+        heads = matrix.indices.tolist()
+        weights = matrix.data.tolist()
+        arcEdgeIDs = graph.arcEdgeIDs[arcs].tolist()
+        arcForward = graph.arcForward[arcs].tolist()
+
+        # {head: [weight, middle, edgeId, forward]}
+        outArcs = [{} for _ in range(numberOfVertices)]
+        inArcs = [{} for _ in range(numberOfVertices)]
+        for tail, head, weight, edgeId, forward in zip(tails, heads, weights, arcEdgeIDs, arcForward):
+            if tail == head:
+                continue
+            arc = [weight, -1, edgeId, forward]
+            outArcs[tail][head] = arc
+            inArcs[head][tail] = arc
+
+        contracted = [False] * numberOfVertices
+        contractedNeighbours = [0] * numberOfVertices
+        rank = [0] * numberOfVertices
+
+        priorityQueue = []
+        for vertex in range(numberOfVertices):
+            shortcuts = ContractionHierarchy._findShortcuts(outArcs, inArcs, vertex, witnessSettleLimit)
+            heapq.heappush(priorityQueue, (ContractionHierarchy._priority(outArcs, inArcs, vertex, shortcuts,
+                                                                          contractedNeighbours), vertex))
+
+        upArcs = [None] * numberOfVertices
+        downArcs = [None] * numberOfVertices
+        order = 0
+        while priorityQueue:
+            _priority, vertex = heapq.heappop(priorityQueue)
+            if contracted[vertex]:
+                continue
+
+            shortcuts = ContractionHierarchy._findShortcuts(outArcs, inArcs, vertex, witnessSettleLimit)
+            priority = ContractionHierarchy._priority(outArcs, inArcs, vertex, shortcuts, contractedNeighbours)
+            if priorityQueue and priority > priorityQueue[0][0]:
+                heapq.heappush(priorityQueue, (priority, vertex))
+                continue
+
+            contracted[vertex] = True
+            rank[vertex] = order
+            order += 1
+
+            upArcs[vertex] = [(head, arc) for head, arc in outArcs[vertex].items()]
+            downArcs[vertex] = [(tail, arc) for tail, arc in inArcs[vertex].items()]
+
+            for head in outArcs[vertex]:
+                del inArcs[head][vertex]
+                contractedNeighbours[head] += 1
+            for tail in inArcs[vertex]:
+                del outArcs[tail][vertex]
+                contractedNeighbours[tail] += 1
+
+            for tail, head, weight in shortcuts:
+                existing = outArcs[tail].get(head)
+                if existing is None or weight < existing[0]:
+                    arc = [weight, vertex, -1, True]
+                    outArcs[tail][head] = arc
+                    inArcs[head][tail] = arc
+
+            outArcs[vertex] = {}
+            inArcs[vertex] = {}
+
+        up = ContractionHierarchy._toCSR(upArcs)
+        down = ContractionHierarchy._toCSR(downArcs)
+        return ContractionHierarchy(costAttribute, graph.vertexIDs, np.asarray(rank, dtype=np.int64),
+                                    *(up + down), networkFingerprint=networkFingerprint)
+
+    @staticmethod
+    def _priority(outArcs, inArcs, vertex, shortcuts, contractedNeighbours):
+        return len(shortcuts) - len(outArcs[vertex]) - len(inArcs[vertex]) + contractedNeighbours[vertex]
+
+    @staticmethod
+    def _findShortcuts(outArcs, inArcs, vertex, witnessSettleLimit):
+        """
+        :return: List of shortcuts (tail, head, weight) needed to preserve the distances if the vertex is contracted.
+        """
+        shortcuts = []
+        if not inArcs[vertex] or not outArcs[vertex]:
+            return shortcuts
+
+        maxOutWeight = max(arc[0] for arc in outArcs[vertex].values())
+        for tail, inArc in inArcs[vertex].items():
+            targets = {}
+            for head, outArc in outArcs[vertex].items():
+                if head != tail:
+                    targets[head] = inArc[0] + outArc[0]
+            if not targets:
+                continue
+
+            distances = ContractionHierarchy._witnessSearch(outArcs, tail, vertex, targets,
+                                                            inArc[0] + maxOutWeight, witnessSettleLimit)
+            for head, viaWeight in targets.items():
+                if distances.get(head, INFINITY) > viaWeight:
+                    shortcuts.append((tail, head, viaWeight))
+
+        return shortcuts
+
+    @staticmethod
+    def _witnessSearch(outArcs, source, excludedVertex, targets, maxCost, witnessSettleLimit):
+        distances = {source: 0.0}
+        heap = [(0.0, source)]
+        pendingTargets = len(targets)
+        settled = 0
+        while heap and pendingTargets > 0 and settled < witnessSettleLimit:
+            distance, vertex = heapq.heappop(heap)
+            if distance > distances[vertex]:
+                continue
+            if distance > maxCost:
+                break
+
+            settled += 1
+            if vertex in targets:
+                pendingTargets -= 1
+
+            for head, arc in outArcs[vertex].items():
+                if head == excludedVertex:
+                    continue
+                newDistance = distance + arc[0]
+                if newDistance < distances.get(head, INFINITY):
+                    distances[head] = newDistance
+                    heapq.heappush(heap, (newDistance, head))
+
+        return distances
+
+    @staticmethod
+    def _toCSR(arcsPerVertex):
+        indptr = np.zeros(len(arcsPerVertex) + 1, dtype=np.int64)
+        heads = []
+        weights = []
+        middles = []
+        edgeIDs = []
+        forward = []
+        for vertex, arcs in enumerate(arcsPerVertex):
+            indptr[vertex + 1] = indptr[vertex] + len(arcs)
+            for head, arc in arcs:
+                heads.append(head)
+                weights.append(arc[0])
+                middles.append(arc[1])
+                edgeIDs.append(arc[2])
+                forward.append(arc[3])
+
+        return (indptr,
+                np.asarray(heads, dtype=np.int64),
+                np.asarray(weights, dtype=np.float64),
+                np.asarray(middles, dtype=np.int64),
+                np.asarray(edgeIDs, dtype=np.int64),
+                np.asarray(forward, dtype=bool))
+
+    def _search(self, source, indptr, heads, weights):
+        """
+        Upward Dijkstra search (without stopping criteria) in the given search graph.
+
+        :return: Tuple ({vertex: distance}, {vertex: predecessor}).
+        """
+        distances = {source: 0.0}
+        predecessors = {source: -1}
+        heap = [(0.0, source)]
+        settled = set()
+        while heap:
+            distance, vertex = heapq.heappop(heap)
+            if vertex in settled:
+                continue
+            settled.add(vertex)
+
+            for position in range(indptr[vertex], indptr[vertex + 1]):
+                head = heads[position]
+                newDistance = distance + weights[position]
+                if newDistance < distances.get(head, INFINITY):
+                    distances[head] = newDistance
+                    predecessors[head] = vertex
+                    heapq.heappush(heap, (newDistance, head))
+
+        self.lastSettledVertices += len(settled)
+        return distances, predecessors
+
+    def queryOneToOne(self, sourceIndex, targetIndex):
+        """
+        Bidirectional upward search.
+
+        :param sourceIndex: Internal index of the start vertex.
+        :param targetIndex: Internal index of the end vertex.
+        :return: Tuple (total cost, meeting vertex, forward predecessors, backward predecessors), the cost is ``inf``
+                 when the end vertex is not reachable.
+        """
+        self.lastSettledVertices = 0
+        if sourceIndex < 0 or targetIndex < 0:
+            return INFINITY, -1, {}, {}
+
+        forwardDistances, forwardPredecessors = self._search(sourceIndex, self._upIndptr, self._upHeads,
+                                                             self._upWeights)
+        backwardDistances, backwardPredecessors = self._search(targetIndex, self._downIndptr, self._downHeads,
+                                                               self._downWeights)
+
+        bestCost = INFINITY
+        meetingVertex = -1
+        for vertex, distance in forwardDistances.items():
+            backwardDistance = backwardDistances.get(vertex)
+            if backwardDistance is not None and distance + backwardDistance < bestCost:
+                bestCost = distance + backwardDistance
+                meetingVertex = vertex
+
+        return bestCost, meetingVertex, forwardPredecessors, backwardPredecessors
+
+    def getShortestPathCost(self, sourceIndex, targetIndex):
+        """
+        :return: Total cost of the shortest path, ``inf`` if the end vertex is not reachable.
+        """
+        return self.queryOneToOne(sourceIndex, targetIndex)[0]
+
+    def getShortestPathArcs(self, sourceIndex, targetIndex):
+        """
+        Retrieve the original network edges of the shortest path by unpacking the shortcuts.
+
+        :return: Tuple (total cost, list of edge ids, list of directions), empty lists if there is no path.
+        """
+        cost, meetingVertex, forwardPredecessors, backwardPredecessors = self.queryOneToOne(sourceIndex, targetIndex)
+        if meetingVertex < 0:
+            return cost, [], []
+
+        hierarchyArcs = []
+        vertex = meetingVertex
+        while forwardPredecessors[vertex] != -1:
+            hierarchyArcs.append((forwardPredecessors[vertex], vertex))
+            vertex = forwardPredecessors[vertex]
+        hierarchyArcs.reverse()
+
+        vertex = meetingVertex
+        while backwardPredecessors[vertex] != -1:
+            hierarchyArcs.append((vertex, backwardPredecessors[vertex]))
+            vertex = backwardPredecessors[vertex]
+
+        edgeIDs = []
+        directions = []
+        for tail, head in hierarchyArcs:
+            self._unpackArc(tail, head, edgeIDs, directions)
+
+        return cost, edgeIDs, directions
+
+    def _findArc(self, tail, head, isUpArc):
+        """
+        :return: Position of the cheapest hierarchy arc tail -> head.
+        """
+        if isUpArc:
+            positions = range(self.upIndptr[tail], self.upIndptr[tail + 1])
+            heads, weights = self.upHeads, self.upWeights
+            other = head
+        else:
+            positions = range(self.downIndptr[head], self.downIndptr[head + 1])
+            heads, weights = self.downHeads, self.downWeights
+            other = tail
+
+        best = -1
+        for position in positions:
+            if heads[position] == other and (best < 0 or weights[position] < weights[best]):
+                best = position
+        return best
+
+    def _unpackArc(self, tail, head, edgeIDs, directions):
+        """
+        Replace recursively the shortcut tail -> head by its original arcs. An arc is stored in the up graph of its
+        tail when the head has a higher rank, otherwise in the down graph of its head.
+        """
+        stack = [(tail, head)]
+        while stack:
+            tail, head = stack.pop()
+            isUpArc = self.rank[head] > self.rank[tail]
+            position = self._findArc(tail, head, isUpArc)
+            middles = self.upMiddles if isUpArc else self.downMiddles
+            middle = middles[position]
+            if middle < 0:
+                edgeIDs.append(int((self.upEdgeIDs if isUpArc else self.downEdgeIDs)[position]))
+                directions.append(bool((self.upForward if isUpArc else self.downForward)[position]))
+            else:
+                stack.append((middle, head))
+                stack.append((tail, middle))
+
+    def queryManyToMany(self, sourceIndices, targetIndices):
+        """
+        Bucket based many-to-many query: one backward upward search per target fills the buckets of the settled
+        vertices and one forward upward search per source scans the buckets.
+
+        :param sourceIndices: Internal indices of the start vertices.
+        :param targetIndices: Internal indices of the end vertices.
+        :return: (len(sourceIndices), len(targetIndices)) array, ``inf`` when the end vertex is not reachable.
+        """
+        buckets = self.createBuckets(targetIndices)
+        return self.queryBuckets(sourceIndices, len(targetIndices), buckets)
+
+    def createBuckets(self, targetIndices):
+        """
+        :return: Dictionary {vertex: [(target position, distance from the vertex to the target)]}.
+        """
+        buckets = {}
+        for targetPosition, targetIndex in enumerate(targetIndices):
+            if targetIndex < 0:
+                continue
+            distances, _predecessors = self._search(int(targetIndex), self._downIndptr, self._downHeads,
+                                                    self._downWeights)
+            for vertex, distance in distances.items():
+                buckets.setdefault(vertex, []).append((targetPosition, distance))
+        return buckets
+
+    def queryBuckets(self, sourceIndices, numberOfTargets, buckets):
+        costs = np.full((len(sourceIndices), numberOfTargets), np.inf)
+        for sourcePosition, sourceIndex in enumerate(sourceIndices):
+            if sourceIndex < 0:
+                continue
+            row = costs[sourcePosition]
+            distances, _predecessors = self._search(int(sourceIndex), self._upIndptr, self._upHeads,
+                                                    self._upWeights)
+            for vertex, distance in distances.items():
+                for targetPosition, targetDistance in buckets.get(vertex, ()):
+                    if distance + targetDistance < row[targetPosition]:
+                        row[targetPosition] = distance + targetDistance
+        return costs
+
+    def save(self, path):
+        """
+        Store the hierarchy arrays in a compressed numpy file.
+
+        :param path: File path, ``.npz`` is appended by numpy if missing.
+        """
+        np.savez_compressed(path,
+                            costAttribute=np.array(self.costAttribute),
+                            networkFingerprint=np.array(self.networkFingerprint or ""),
+                            vertexIDs=self.vertexIDs,
+                            rank=self.rank,
+                            upIndptr=self.upIndptr,
+                            upHeads=self.upHeads,
+                            upWeights=self.upWeights,
+                            upMiddles=self.upMiddles,
+                            upEdgeIDs=self.upEdgeIDs,
+                            upForward=self.upForward,
+                            downIndptr=self.downIndptr,
+                            downHeads=self.downHeads,
+                            downWeights=self.downWeights,
+                            downMiddles=self.downMiddles,
+                            downEdgeIDs=self.downEdgeIDs,
+                            downForward=self.downForward)
+
+    @staticmethod
+    def load(path):
+        """
+        :param path: File created with ``save``.
+        :return: ContractionHierarchy instance, without network fingerprint if the file was stored without it.
+        """
+        with np.load(path) as data:
+            networkFingerprint = str(data["networkFingerprint"]) if "networkFingerprint" in data.files else ""
+            return ContractionHierarchy(str(data["costAttribute"]), data["vertexIDs"], data["rank"],
+                                        data["upIndptr"], data["upHeads"], data["upWeights"], data["upMiddles"],
+                                        data["upEdgeIDs"], data["upForward"],
+                                        data["downIndptr"], data["downHeads"], data["downWeights"],
+                                        data["downMiddles"], data["downEdgeIDs"], data["downForward"],
+                                        networkFingerprint=networkFingerprint or None)
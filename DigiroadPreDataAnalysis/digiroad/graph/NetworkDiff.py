@@ -0,0 +1,116 @@
+import numpy as np
+
+
+class NetworkDiff:
+    def __init__(self, previousGraph, currentGraph):
+        """
+        Differences between two versions of the routing graph, matched by edge id and direction, used to find the
+        start vertices whose shortest path costs can be different in the current version.
+
+        :param previousGraph: CSRGraph of the network used to calculate the stored results.
+        :param currentGraph: CSRGraph of the current network.
+        """
+        self.previousGraph = previousGraph
+        self.currentGraph = currentGraph
+
+    @staticmethod
+    def _getArcs(graph, costAttribute):
+        # (edge id, direction) identifies an arc in both versions of the network
+        keys = graph.arcEdgeIDs.astype(np.int64) * 2 + graph.arcForward.astype(np.int64)
+        order = np.argsort(keys, kind="stable")
+        return (keys[order],
+                graph.vertexIDs[graph.getTails()][order],
+                graph.vertexIDs[graph.heads][order],
+                graph.weights[costAttribute][order])
+
+    def getChangedArcs(self, costAttribute):
+        """
+        :param costAttribute: Impedance/cost attribute.
+        :return: Dictionary with the arrays edgeID, forward, previousTail, previousHead, previousWeight, currentTail,
+                 currentHead and currentWeight of the arcs added, removed or modified (vertices or weight). The
+                 vertices of a missing arc are -1 and its weight ``inf``.
+        """
+        previousArcs = NetworkDiff._getArcs(self.previousGraph, costAttribute)
+        currentArcs = NetworkDiff._getArcs(self.currentGraph, costAttribute)
+        keys = np.union1d(previousArcs[0], currentArcs[0])
+
+        aligned = []
+        for arcKeys, tails, heads, weights in [previousArcs, currentArcs]:
+            # arrays aligned with the keys of both versions, -1 and inf for the arcs missing in this version
+            alignedTails = np.full(len(keys), -1, dtype=np.int64)
+            alignedHeads = np.full(len(keys), -1, dtype=np.int64)
+            alignedWeights = np.full(len(keys), np.inf)
+            positions = np.searchsorted(keys, arcKeys)
+            alignedTails[positions] = tails
+            alignedHeads[positions] = heads
+            alignedWeights[positions] = weights
+            aligned.append((alignedTails, alignedHeads, alignedWeights))
+
+        (previousTails, previousHeads, previousWeights), (currentTails, currentHeads, currentWeights) = aligned
+        changed = (previousTails != currentTails) | (previousHeads != currentHeads) | \
+                  (previousWeights != currentWeights)
+        return {
+            "edgeID": keys[changed] // 2,
+            "forward": keys[changed] % 2 == 1,
+            "previousTail": previousTails[changed],
+            "previousHead": previousHeads[changed],
+            "previousWeight": previousWeights[changed],
+            "currentTail": currentTails[changed],
+            "currentHead": currentHeads[changed],
+            "currentWeight": currentWeights[changed]
+        }
+
+    def getChangedEdgeIDs(self, costAttributes):
+        """
+        :param costAttributes: List of impedance/cost attributes.
+        :return: Sorted array with the ids of the edges changed for any of the cost attributes.
+        """
+        edgeIDs = [self.getChangedArcs(costAttribute)["edgeID"] for costAttribute in costAttributes]
+        return np.unique(np.concatenate(edgeIDs)) if edgeIDs else np.empty(0, dtype=np.int64)
+
+    def getAffectedStartVertices(self, startVerticesID, costAttributes, blockSize=500):
+        """
+        Find the start vertices whose shortest path tree of the previous network touches a changed arc: a previous
+        arc (u -> v) removed or modified is in the tree of the start vertex s if d(s, u) + weight = d(s, v), and a
+        current arc added or modified can shorten the paths of s if d(s, u) + new weight < d(s, v), d being the
+        previous network costs. The costs from every start vertex to the vertices of the changed arcs are calculated
+        backwards from those vertices, one block of ``blockSize`` changed arcs at a time, so the work grows with the
+        number of changes instead of the number of start vertices.
+
+        :param startVerticesID: Start vertex ids.
+        :param costAttributes: List of impedance/cost attributes.
+        :param blockSize: Number of changed arcs checked together.
+        :return: Sorted array with the affected start vertex ids, the start vertices missing in the previous network
+                 are always affected.
+        """
+        startVerticesID = np.unique(np.asarray(startVerticesID, dtype=np.int64))
+        startIndices = self.previousGraph.getVertexIndices(startVerticesID)
+        affected = startIndices < 0
+
+        for costAttribute in costAttributes:
+            changedArcs = self.getChangedArcs(costAttribute)
+            removed = np.isfinite(changedArcs["previousWeight"])
+            added = np.isfinite(changedArcs["currentWeight"])
+            # (tail, head, weight, True when the arc must be a tree arc or False when it must be a shortcut)
+            tails = np.concatenate((changedArcs["previousTail"][removed], changedArcs["currentTail"][added]))
+            heads = np.concatenate((changedArcs["previousHead"][removed], changedArcs["currentHead"][added]))
+            weights = np.concatenate((changedArcs["previousWeight"][removed], changedArcs["currentWeight"][added]))
+            treeArcs = np.concatenate((np.ones(removed.sum(), dtype=bool), np.zeros(added.sum(), dtype=bool)))
+
+            for blockStart in range(0, len(tails), blockSize):
+                block = slice(blockStart, blockStart + blockSize)
+                vertexIDs, positions = np.unique(np.concatenate((tails[block], heads[block])), return_inverse=True)
+                costs = self.previousGraph.calculateShortestPathCosts(
+                    startIndices, self.previousGraph.getVertexIndices(vertexIDs), costAttribute)
+
+                numberOfArcs = len(tails[block])
+                tailCosts = costs[:, positions[:numberOfArcs]] + weights[block]
+                headCosts = costs[:, positions[numberOfArcs:]]
+                tolerance = 1e-9 * np.maximum(1.0, np.where(np.isfinite(headCosts), headCosts, 0.0))
+                reachable = np.isfinite(tailCosts)
+                with np.errstate(invalid="ignore"):
+                    inTree = reachable & (np.abs(tailCosts - headCosts) <= tolerance)
+                shortcut = reachable & (tailCosts < headCosts - tolerance)
+                affected |= np.where(treeArcs[block], inTree, shortcut).any(axis=1)
+
+        return startVerticesID[affected]
@@ -0,0 +1,25 @@
+import sys
+
+from digiroad.connection.PostgisServiceProvider import PostgisServiceProvider
+from digiroad.transportMode.ContractionHierarchyPrivateCarTransportMode import \
+    ContractionHierarchyPrivateCarTransportMode
+from digiroad.transportMode.InMemoryPrivateCarTransportMode import CAR_COST_ATTRIBUTES
+from digiroad.util import Logger
+
+
+def main(costAttributes=CAR_COST_ATTRIBUTES):
+    """
+    Build (or load, if already stored) the contraction hierarchy of the car network for each impedance/cost attribute
+    and store them in the folder configured in the ``CONTRACTION_HIERARCHY`` section.
+
+    :param costAttributes: Impedance/cost attributes to prepare.
+    """
+    transportMode = ContractionHierarchyPrivateCarTransportMode(PostgisServiceProvider())
+    for costAttribute in costAttributes:
+        hierarchy = transportMode.getContractionHierarchy(costAttribute)
+        Logger.getInstance().info("Contraction hierarchy ready: %s (%s up arcs, %s down arcs)" % (
+            transportMode.getHierarchyFilePath(costAttribute), len(hierarchy.upHeads), len(hierarchy.downHeads)))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or CAR_COST_ATTRIBUTES)
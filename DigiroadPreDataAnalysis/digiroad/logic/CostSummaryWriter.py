@@ -0,0 +1,58 @@
+import csv
+import os
+
+
+class CostSummaryWriter:
+    def __init__(self, csvFilePath, fieldNames, separator=";", checkpoint=None):
+        """
+        Append the rows of a cost summary csv block by block, so the whole summary is never held in memory.
+
+        :param csvFilePath: csv file, overwritten if it already exists.
+        :param fieldNames: Header of the csv.
+        :param separator: csv separator.
+        :param checkpoint: Value returned by ``checkpoint`` in a previous run, the existing csv is truncated there and
+                           the new rows are appended after it.
+        """
+        folder = os.path.dirname(csvFilePath)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
+        self.filePath = csvFilePath
+        if checkpoint:
+            offset, self.numberOfRows = checkpoint
+            self.__file = open(csvFilePath, "r+", newline="")
+            self.__file.seek(offset)
+            self.__file.truncate()
+            self.__writer = csv.writer(self.__file, delimiter=separator)
+        else:
+            self.numberOfRows = 0
+            self.__file = open(csvFilePath, "w", newline="")
+            self.__writer = csv.writer(self.__file, delimiter=separator)
+            self.__writer.writerow(fieldNames)
+
+    def writeRows(self, *columns):
+        """
+        :param columns: One sequence (list or array) per field, all with the same length.
+        """
+        rows = list(zip(*[column.tolist() if hasattr(column, "tolist") else column for column in columns]))
+        self.__writer.writerows(rows)
+        self.numberOfRows += len(rows)
+
+    def checkpoint(self):
+        """
+        Flush the rows written so far to the disk.
+
+        :return: [file offset, number of rows] to resume the csv after these rows.
+        """
+        self.__file.flush()
+        os.fsync(self.__file.fileno())
+        return [self.__file.tell(), self.numberOfRows]
+
+    def close(self):
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
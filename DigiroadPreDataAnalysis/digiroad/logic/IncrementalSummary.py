@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import time
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from digiroad.graph.CSRGraph import CSRGraph
+
+
+class IncrementalSummary:
+    SNAPSHOTS_FOLDER = "network"
+    METADATA_SUFFIX = "_incremental.json"
+    CSV_ZIP_FILENAME = "summary_csv.zip"
+    PREVIOUS_SUFFIX = ".previous"
+
+    def __init__(self, summaryFolderPath, networkFingerprint, separator=";"):
+        """
+        State needed to update the cost summaries of a summary folder after the network is modified, instead of
+        calculating them again from scratch.
+
+        Every summary file (csv or parquet) is stored with a metadata file: the fingerprint of the network used to
+        calculate it, the vertex and travel time of each start point and a fingerprint of the end points. The graph of
+        each network version is stored once in the ``network`` subfolder, named after its fingerprint, so the
+        next run can compare it with the current graph and calculate again only the rows of the start points
+        affected by the changes.
+
+        :param summaryFolderPath: Summary folder.
+        :param networkFingerprint: Fingerprint of the current network table.
+        :param separator: csv separator of the summaries.
+        """
+        self.summaryFolderPath = summaryFolderPath
+        self.networkFingerprint = networkFingerprint
+        self.separator = separator
+
+    def getSnapshotPath(self, networkFingerprint):
+        return os.path.join(self.summaryFolderPath, IncrementalSummary.SNAPSHOTS_FOLDER,
+                            hashlib.sha1(networkFingerprint.encode("utf-8")).hexdigest() + ".npz")
+
+    def storeSnapshot(self, graph):
+        """
+        Store the graph of the current network, if it was not already stored.
+
+        :param graph: CSRGraph of the current network.
+        """
+        snapshotPath = self.getSnapshotPath(self.networkFingerprint)
+        if os.path.isfile(snapshotPath):
+            return
+
+        folder = os.path.dirname(snapshotPath)
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        # the snapshots are shared by the summaries of the folder, it is written under a temporary name and renamed
+        temporaryPath = "%s.%s.tmp.npz" % (snapshotPath[:-len(".npz")], os.getpid())
+        graph.save(temporaryPath)
+        os.replace(temporaryPath, snapshotPath)
+
+    def loadSnapshot(self, networkFingerprint):
+        """
+        :return: CSRGraph of the network version, None if it is not stored.
+        """
+        snapshotPath = self.getSnapshotPath(networkFingerprint)
+        if not os.path.isfile(snapshotPath):
+            return None
+        return CSRGraph.load(snapshotPath)
+
+    def removeUnusedSnapshots(self, minimumAge=3600):
+        """
+        Delete the network snapshots not referenced by any summary of the folder. The snapshots modified in the last
+        ``minimumAge`` seconds are kept, they can belong to a summary of another process that is not finished yet.
+        """
+        snapshotsFolder = os.path.join(self.summaryFolderPath, IncrementalSummary.SNAPSHOTS_FOLDER)
+        if not os.path.isdir(snapshotsFolder):
+            return
+
+        usedSnapshots = set()
+        for filename in os.listdir(self.summaryFolderPath):
+            if filename.endswith(IncrementalSummary.METADATA_SUFFIX):
+                with open(os.path.join(self.summaryFolderPath, filename)) as metadataFile:
+                    usedSnapshots.add(self.getSnapshotPath(json.load(metadataFile)["networkFingerprint"]))
+
+        for filename in os.listdir(snapshotsFolder):
+            snapshotPath = os.path.join(snapshotsFolder, filename)
+            if snapshotPath not in usedSnapshots and time.time() - os.path.getmtime(snapshotPath) > minimumAge:
+                os.remove(snapshotPath)
+
+    @staticmethod
+    def getMetadataPath(summaryFilePath):
+        return os.path.splitext(summaryFilePath)[0] + IncrementalSummary.METADATA_SUFFIX
+
+    def readMetadata(self, summaryFilePath):
+        """
+        :param summaryFilePath: csv or parquet summary file.
+        :return: Metadata stored with the summary, None if there is not any.
+        """
+        metadataPath = IncrementalSummary.getMetadataPath(summaryFilePath)
+        if not os.path.isfile(metadataPath):
+            return None
+        with open(metadataPath) as metadataFile:
+            return json.load(metadataFile)
+
+    def writeMetadata(self, summaryFilePath, startPoints, endPointsFingerprint):
+        """
+        :param summaryFilePath: csv or parquet summary file.
+        :param startPoints: Dictionary {start point identifier: [vertex id, start point travel time]}.
+        :param endPointsFingerprint: Fingerprint of the end points identifiers, vertices and travel times.
+        """
+        with open(IncrementalSummary.getMetadataPath(summaryFilePath), "w") as metadataFile:
+            json.dump({
+                "networkFingerprint": self.networkFingerprint,
+                "startPoints": startPoints,
+                "endPointsFingerprint": endPointsFingerprint
+            }, metadataFile)
+
+    @staticmethod
+    def discardMetadata(summaryFilePath):
+        metadataPath = IncrementalSummary.getMetadataPath(summaryFilePath)
+        if os.path.isfile(metadataPath):
+            os.remove(metadataPath)
+
+    def preparePreviousSummary(self, summaryFilePath):
+        """
+        Keep the rows of the previous summary readable while the new summary is written: the csv summaries are read
+        from the ``summary_csv.zip``, the parquet summaries are renamed because they are overwritten.
+
+        :param summaryFilePath: csv or parquet summary file.
+        :return: True if there is a previous summary.
+        """
+        if summaryFilePath.endswith(".parquet"):
+            previousFilePath = summaryFilePath + IncrementalSummary.PREVIOUS_SUFFIX
+            if os.path.isfile(previousFilePath):
+                # left by an interrupted update, the summary file is not complete
+                return True
+            if not os.path.isfile(summaryFilePath):
+                return False
+            os.replace(summaryFilePath, previousFilePath)
+            return True
+
+        zipFilePath = os.path.join(self.summaryFolderPath, IncrementalSummary.CSV_ZIP_FILENAME)
+        if not os.path.isfile(zipFilePath):
+            return False
+        with zipfile.ZipFile(zipFilePath) as zipFile:
+            return os.path.basename(summaryFilePath) in zipFile.namelist()
+
+    def iteratePreviousRows(self, summaryFilePath, chunkSize=1000000):
+        """
+        :param summaryFilePath: csv or parquet summary file.
+        :param chunkSize: Number of rows of each chunk.
+        :return: Generator of (start point identifiers, end point identifiers, travel times) arrays of the previous
+                 summary, the csv values are returned as they are written (strings).
+        """
+        if summaryFilePath.endswith(".parquet"):
+            # pyarrow is only required for the parquet summaries
+            import pyarrow.parquet as pq
+            parquetFile = pq.ParquetFile(summaryFilePath + IncrementalSummary.PREVIOUS_SUFFIX)
+            for batch in parquetFile.iter_batches(batch_size=chunkSize, columns=["ykr_from_id", "ykr_to_id",
+                                                                                  "travel_time"]):
+                yield tuple(column.to_numpy(zero_copy_only=False) for column in batch.columns)
+            return
+
+        with zipfile.ZipFile(os.path.join(self.summaryFolderPath, IncrementalSummary.CSV_ZIP_FILENAME)) as zipFile:
+            with zipFile.open(os.path.basename(summaryFilePath)) as csvFile:
+                for chunk in pd.read_csv(csvFile, sep=self.separator, dtype=str, keep_default_na=False,
+                                         chunksize=chunkSize):
+                    yield tuple(chunk[column].values for column in chunk.columns[:3])
+
+    @staticmethod
+    def discardPreviousSummary(summaryFilePath):
+        previousFilePath = summaryFilePath + IncrementalSummary.PREVIOUS_SUFFIX
+        if os.path.isfile(previousFilePath):
+            os.remove(previousFilePath)
+
+    @staticmethod
+    def selectRows(startPointsID, keptStartPointsID):
+        """
+        :param startPointsID: Start point identifiers of a chunk of rows.
+        :param keptStartPointsID: Identifiers (as strings) of the start points whose rows are kept.
+        :return: Boolean array, True for the rows to keep.
+        """
+        return np.isin(np.asarray(startPointsID).astype(str), list(keptStartPointsID))
@@ -1,17 +1,26 @@
 import copy
 import os
 
-import time
+import numpy as np
+import pandas as pd
 from joblib import delayed, Parallel
 
+from digiroad.cache.NearestVertexCache import NearestVertexCache
+from digiroad.cache.RouteCache import RouteCache
 from digiroad.carRoutingExceptions import NotURLDefinedException, \
-    TransportModeNotDefinedException
+    TransportModeNotDefinedException, NearestVertexNotFoundException
 from digiroad.entities import Point
+from digiroad.graph.NetworkDiff import NetworkDiff
+from digiroad.logic.CostSummaryWriter import CostSummaryWriter
+from digiroad.logic.IncrementalSummary import IncrementalSummary
 from digiroad.logic.Operations import Operations
+from digiroad.logic.RouteStore import RouteStore, createRouteSummaryFeature
+from digiroad.logic.RunManifest import RunManifest
+from digiroad.logic.SummaryGeojsonWriter import SummaryGeojsonWriter
 from digiroad.reflection import Reflection
-from digiroad.util import GeometryType, getEnglishMeaning, FileActions, extractCRS, createPointFromPointFeature, \
-    getConfigurationProperties, dgl_timer_enabled, \
-    dgl_timer, parallel_job_print, Logger, PostfixAttribute, getFormattedDatetime, timeDifference
+from digiroad.util import getEnglishMeaning, FileActions, extractCRS, createPointFromPointFeature, \
+    Configuration, dgl_timer_enabled, GPD_CRS, \
+    dgl_timer, parallel_job_print, Logger, PostfixAttribute
 
 # from src.digiroad.carRoutingExceptions import NotWFSDefinedException, NotURLDefinedException  # ONLY test purposes
 from digiroad.util import CostAttributes
@@ -26,9 +35,35 @@ def createShortestPathFileWithAdditionalProperties(self,
                                                    summaryFolderPath,
                                                    csv_filename,
                                                    epsgCode,
-                                                   endEpsgCode):
+                                                   endEpsgCode,
+                                                   routeStore=None):
+    shortestPathFiles = createShortestPathFilesFromAnOrigin(self, costAttribute, startPointFeature,
+                                                            [endPointFeature], outputFolderPath, summaryFolderPath,
+                                                            csv_filename, epsgCode, endEpsgCode, routeStore)
+    if not shortestPathFiles:
+        return None, None, None, None
+
+    return shortestPathFiles[0]
+
+
+def createShortestPathFilesFromAnOrigin(self,
+                                        costAttribute,
+                                        startPointFeature,
+                                        endPointFeatures,
+                                        outputFolderPath,
+                                        summaryFolderPath,
+                                        csv_filename,
+                                        epsgCode,
+                                        endEpsgCode,
+                                        routeStore=None):
+    """
+    Calculate and store the shortest paths from a start point to several end points, all the paths are retrieved
+    from a single search of the transport mode (``getShortestPathsFromAnOrigin``).
+
+    :return: List with the (outputFolderPath, filename, summaryFolderPath, csv_filename) of each stored path.
+    """
     # startTime = time.time()
-    # functionName = "createShortestPathFileWithAdditionalProperties"
+    # functionName = "createShortestPathFilesFromAnOrigin"
     # Logger.getInstance().info("%s Start Time: %s" % (functionName, getFormattedDatetime(timemilis=startTime)))
 
     ####################################
@@ -50,87 +85,89 @@ def createShortestPathFileWithAdditionalProperties(self,
                               longitude=nearestStartCoordinates[0],
                               epsgCode=self.transportMode.getEPSGCode())
     ####################################
-    endVertexId, newEndPointFeature = extractFeatureInformation(
-        self=self,
-        epsgCode=endEpsgCode,
-        feature=endPointFeature,
-        geojsonServiceProvider=self.transportMode,
-        operations=self.operations
-    )
+    endPoints = []
+    for endPointFeature in endPointFeatures:
+        endVertexId, newEndPointFeature = extractFeatureInformation(
+            self=self,
+            epsgCode=endEpsgCode,
+            feature=endPointFeature,
+            geojsonServiceProvider=self.transportMode,
+            operations=self.operations
+        )
 
-    endCoordinates = newEndPointFeature["properties"]["selectedPointCoordinates"]
-    endPoint = Point(latitute=endCoordinates[1],
-                     longitude=endCoordinates[0],
-                     epsgCode=self.transportMode.getEPSGCode())
+        endCoordinates = newEndPointFeature["properties"]["selectedPointCoordinates"]
+        endPoint = Point(latitute=endCoordinates[1],
+                         longitude=endCoordinates[0],
+                         epsgCode=self.transportMode.getEPSGCode())
 
-    nearestEndCoordinates = newEndPointFeature["properties"]["nearestVertexCoordinates"]
-    nearestEndPoint = Point(latitute=nearestEndCoordinates[1],
-                            longitude=nearestEndCoordinates[0],
-                            epsgCode=self.transportMode.getEPSGCode())
+        nearestEndCoordinates = newEndPointFeature["properties"]["nearestVertexCoordinates"]
+        nearestEndPoint = Point(latitute=nearestEndCoordinates[1],
+                                longitude=nearestEndCoordinates[0],
+                                epsgCode=self.transportMode.getEPSGCode())
+
+        if not startPoint.equals(endPoint):
+            endPoints.append((endVertexId, newEndPointFeature, endPoint, nearestEndPoint))
     ####################################
 
-    if startPoint.equals(endPoint):
-        return None, None, None, None
+    if not endPoints:
+        return []
 
-    # shortestPathId = str(startVertexId) + "_" + str(endVertexId)
-    # existShortestPath = shortestPathId in self.shortestPathCache
-    # if existShortestPath:
-    #     shortestPath = self.shortestPathCache[shortestPathId]
-    #     Logger.getInstance().info("Shortest path is cached %s " + shortestPathId)
-    # else:
-    #     shortestPath = self.transportMode.getShortestPath(startVertexId=startVertexId,
-    #                                                       endVertexId=endVertexId,
-    #                                                       cost=costAttribute)
-    #     self.shortestPathCache[shortestPathId] = shortestPath
-
-    # shortestPath = copy.deepcopy(shortestPath)
-    ### The above cache procedure is too large that exceed the shared memory.
-
-    shortestPath = self.transportMode.getShortestPath(startVertexId=startVertexId,
-                                                      endVertexId=endVertexId,
-                                                      cost=costAttribute)
-
-    shortestPath["overallProperties"] = self.insertAdditionalProperties(
-        newStartPointFeature,
-        newEndPointFeature
+    shortestPaths = self.getShortestPathsFromAnOrigin(
+        startVertexId=startVertexId,
+        endVerticesID=[endVertexId for endVertexId, _feature, _point, _nearestPoint in endPoints],
+        cost=costAttribute
     )
 
-    shortestPath["overallProperties"]["selectedStartCoordinates"] = [startPoint.getLongitude(),
-                                                                     startPoint.getLatitude()]
-    shortestPath["overallProperties"]["selectedEndCoordinates"] = [endPoint.getLongitude(),
-                                                                   endPoint.getLatitude()]
-    shortestPath["overallProperties"]["nearestStartCoordinates"] = [nearestStartPoint.getLongitude(),
-                                                                    nearestStartPoint.getLatitude()]
-    shortestPath["overallProperties"]["nearestEndCoordinates"] = [nearestEndPoint.getLongitude(),
-                                                                  nearestEndPoint.getLatitude()]
+    pointIdentifierKey = self.configuration.pointIdentifier
+    startPointIdentifier = newStartPointFeature["properties"][pointIdentifierKey]
 
-    shortestPath["overallProperties"]["startVertexId"] = startVertexId
-    shortestPath["overallProperties"]["endVertexId"] = endVertexId
+    shortestPathFiles = []
+    for endVertexId, newEndPointFeature, endPoint, nearestEndPoint in endPoints:
+        # several end points can share the nearest vertex, each one gets its own overall properties
+        shortestPath = dict(shortestPaths[endVertexId])
 
-    if "totalFeatures" not in shortestPath:
-        shortestPath["totalFeatures"] = len(shortestPath["features"])
+        shortestPath["overallProperties"] = self.insertAdditionalProperties(
+            newStartPointFeature,
+            newEndPointFeature
+        )
 
-    pointIdentifierKey = getConfigurationProperties(section="WFS_CONFIG")["point_identifier"]
+        shortestPath["overallProperties"]["selectedStartCoordinates"] = [startPoint.getLongitude(),
+                                                                         startPoint.getLatitude()]
+        shortestPath["overallProperties"]["selectedEndCoordinates"] = [endPoint.getLongitude(),
+                                                                       endPoint.getLatitude()]
+        shortestPath["overallProperties"]["nearestStartCoordinates"] = [nearestStartPoint.getLongitude(),
+                                                                        nearestStartPoint.getLatitude()]
+        shortestPath["overallProperties"]["nearestEndCoordinates"] = [nearestEndPoint.getLongitude(),
+                                                                      nearestEndPoint.getLatitude()]
 
-    startPointIdentifier = newStartPointFeature["properties"][pointIdentifierKey]
-    endPointIdentifier = newEndPointFeature["properties"][pointIdentifierKey]
+        shortestPath["overallProperties"]["startVertexId"] = startVertexId
+        shortestPath["overallProperties"]["endVertexId"] = endVertexId
 
-    filename = "shortestPath"
-    extension = "geojson"
-    completeFilename = "%s-%s-%s-%s.%s" % (
-        filename, getEnglishMeaning(costAttribute), startPointIdentifier, endPointIdentifier, extension)
+        if "totalFeatures" not in shortestPath:
+            shortestPath["totalFeatures"] = len(shortestPath["features"])
 
-    startPointId, endPointId, totalDistance, totalTravelTime = self.calculateSmallSummary(
-        shortestPath=shortestPath,
-        costAttribute=CostAttributes.BICYCLE_FAST_TIME
-    )
+        endPointIdentifier = newEndPointFeature["properties"][pointIdentifierKey]
 
-    valueList = [startPointId, endPointId, totalDistance, totalTravelTime]
-    self.fileActions.writeInCSV(summaryFolderPath, csv_filename, valueList)
+        filename = "shortestPath"
+        extension = "geojson"
+        completeFilename = "%s-%s-%s-%s.%s" % (
+            filename, getEnglishMeaning(costAttribute), startPointIdentifier, endPointIdentifier, extension)
 
-    if "True".__eq__(getConfigurationProperties(section="WFS_CONFIG")["storeShortPathFile"]):
-        self.fileActions.writeFile(folderPath=outputFolderPath, filename=completeFilename,
-                                   data=shortestPath)
+        startPointId, endPointId, totalDistance, totalTravelTime = self.calculateSmallSummary(
+            shortestPath=shortestPath,
+            costAttribute=CostAttributes.BICYCLE_FAST_TIME
+        )
+
+        valueList = [startPointId, endPointId, totalDistance, totalTravelTime]
+        self.fileActions.writeInCSV(summaryFolderPath, csv_filename, valueList)
+
+        if routeStore is not None:
+            routeStore.addRoute(completeFilename.replace("." + extension, ""), shortestPath)
+        elif self.configuration.storeShortPathFile:
+            self.fileActions.writeFile(folderPath=outputFolderPath, filename=completeFilename,
+                                       data=shortestPath)
+
+        shortestPathFiles.append((outputFolderPath, completeFilename, summaryFolderPath, csv_filename))
 
     # endTime = time.time()
     # Logger.getInstance().info("%s End Time: %s" % (functionName, getFormattedDatetime(timemilis=endTime)))
@@ -138,11 +175,11 @@ def createShortestPathFileWithAdditionalProperties(self,
     # totalTime = timeDifference(startTime, endTime)
     # Logger.getInstance().info("%s Total Time: %s m" % (functionName, totalTime))
 
-    return outputFolderPath, completeFilename, summaryFolderPath, csv_filename
+    return shortestPathFiles
 
 
 def extractFeatureInformation(self, epsgCode, feature, geojsonServiceProvider, operations):
-    pointIdentifierKey = getConfigurationProperties(section="WFS_CONFIG")["point_identifier"]
+    pointIdentifierKey = self.configuration.pointIdentifier
 
     pointId = feature["properties"][pointIdentifierKey]
     if pointId in self.nearestVerticesCache:
@@ -157,87 +194,119 @@ def extractFeatureInformation(self, epsgCode, feature, geojsonServiceProvider, o
         featurePoint)
     newFeaturePoint = nearestVertexGeojson["features"][0]
     vertexID = newFeaturePoint["properties"]["id"]
-    feature["properties"]["vertex_id"] = vertexID
     ###
     epsgCodeNearestVertexCoordinates = extractCRS(nearestVertexGeojson)
     nearestPoint = createPointFromPointFeature(newFeaturePoint, epsgCodeNearestVertexCoordinates)
     nearestPoint = operations.transformPoint(nearestPoint, geojsonServiceProvider.getEPSGCode())
-    ######## Add new properties to the start point feature
-    feature["properties"]["selectedPointCoordinates"] = [featurePoint.getLongitude(),
-                                                         featurePoint.getLatitude()]
-    feature["properties"]["nearestVertexCoordinates"] = [nearestPoint.getLongitude(),
-                                                         nearestPoint.getLatitude()]
-    feature["properties"]["coordinatesCRS"] = featurePoint.getEPSGCode()
-    ###
+
+    addNearestVertexProperties(feature, vertexID, featurePoint, nearestPoint)
 
     self.nearestVerticesCache[pointId] = (vertexID, feature)
 
     return vertexID, feature
 
 
-def createCostSummaryWithAdditionalProperties(self, costAttribute, startPointFeature, endPointFeature,
-                                              costSummaryMap):
-    startVertexID = startPointFeature["properties"]["vertex_id"]
-    endVertexID = endPointFeature["properties"]["vertex_id"]
+def addNearestVertexProperties(feature, vertexID, featurePoint, nearestPoint):
+    """
+    Add to the point feature the nearest vertex id and the selected and nearest vertex coordinates.
 
-    # if startVertexID == endVertexID:
-    #     return None
-    if (startVertexID not in costSummaryMap) or (endVertexID not in costSummaryMap[startVertexID]):
-        Logger.getInstance().warning("Not contained into the costSummaryMap: %s %s" % (startVertexID, endVertexID))
-        return None
-
-    summaryFeature = costSummaryMap[startVertexID][endVertexID]
-    summaryFeature = copy.deepcopy(summaryFeature)
-
-    total_cost = summaryFeature["properties"]["total_cost"]
-
-    del summaryFeature["properties"]["start_vertex_id"]
-    del summaryFeature["properties"]["end_vertex_id"]
-    del summaryFeature["properties"]["total_cost"]
-
-    # pointIdentifierKey = getConfigurationProperties(section="WFS_CONFIG")["point_identifier"]
-
-    # startPointId = startPointFeature["properties"][pointIdentifierKey]
-    # endPointId = endPointFeature["properties"][pointIdentifierKey]
-
-    # newPropertiesId = startPointId + "-" + endPointId
-    # if newPropertiesId in self.additionalFeaturePropertiesCache:
-    #     newProperties = self.additionalFeaturePropertiesCache[newPropertiesId]
-    # else:
-    newProperties = self.insertAdditionalProperties(
-        startPointFeature,
-        endPointFeature
-    )
-    # self.additionalFeaturePropertiesCache[newPropertiesId] = newProperties
-
-    # coordinates = summaryFeature["geometry"]["coordinates"]
-    # coordinates[0] = startPointFeature["properties"]["selectedPointCoordinates"]
-    # coordinates[1] = endPointFeature["properties"]["selectedPointCoordinates"]
+    :param feature: Point feature.
+    :param vertexID: Nearest routable vertex id.
+    :param featurePoint: Point of the feature transformed to the transport mode coordinate reference system.
+    :param nearestPoint: Nearest vertex point in the transport mode coordinate reference system.
+    """
+    feature["properties"]["vertex_id"] = vertexID
+    feature["properties"]["selectedPointCoordinates"] = [featurePoint.getLongitude(),
+                                                         featurePoint.getLatitude()]
+    feature["properties"]["nearestVertexCoordinates"] = [nearestPoint.getLongitude(),
+                                                         nearestPoint.getLatitude()]
+    feature["properties"]["coordinatesCRS"] = featurePoint.getEPSGCode()
 
-    newProperties["costAttribute"] = getEnglishMeaning(costAttribute)
-    newProperties[getEnglishMeaning(costAttribute)] = total_cost
-    newProperties["startVertexId"] = startVertexID
-    newProperties["endVertexId"] = endVertexID
-    newProperties["selectedStartCoordinates"] = startPointFeature["properties"]["selectedPointCoordinates"]
-    newProperties["selectedEndCoordinates"] = endPointFeature["properties"]["selectedPointCoordinates"]
-    newProperties["nearestStartCoordinates"] = startPointFeature["properties"]["nearestVertexCoordinates"]
-    newProperties["nearestEndCoordinates"] = endPointFeature["properties"]["nearestVertexCoordinates"]
-    for key in newProperties:
-        summaryFeature["properties"][key] = newProperties[key]
 
-    return summaryFeature
+def createVertexPointsIndex(pointsVertexID):
+    """
+    :param pointsVertexID: Nearest vertex of each point.
+    :return: Tuple (point positions sorted by vertex, sorted vertices) to find the points of a vertex.
+    """
+    pointsVertexID = np.asarray(pointsVertexID, dtype=np.int64)
+    order = np.argsort(pointsVertexID, kind="mergesort")
+    return order, pointsVertexID[order]
+
+
+def expandVertexPairs(startVerticesID, endVerticesID, startPointsIndex, endPointsIndex):
+    """
+    Several points can share the same nearest vertex, so each pair of vertices is expanded to all the pairs of
+    points of those vertices.
+
+    :param startVerticesID: Array with the start vertex of each pair.
+    :param endVerticesID: Array with the end vertex of each pair.
+    :param startPointsIndex: ``createVertexPointsIndex`` of the start points.
+    :param endPointsIndex: ``createVertexPointsIndex`` of the end points.
+    :return: Tuple of arrays (position of the pair of vertices, start point position, end point position), one item
+             per pair of points.
+    """
+    startOrder, startSortedVerticesID = startPointsIndex
+    endOrder, endSortedVerticesID = endPointsIndex
+
+    startFirst = np.searchsorted(startSortedVerticesID, startVerticesID, side="left")
+    startCount = np.searchsorted(startSortedVerticesID, startVerticesID, side="right") - startFirst
+    endFirst = np.searchsorted(endSortedVerticesID, endVerticesID, side="left")
+    endCount = np.searchsorted(endSortedVerticesID, endVerticesID, side="right") - endFirst
+
+    counts = startCount * endCount
+    pairPositions = np.repeat(np.arange(len(counts)), counts)
+    positionInPair = np.arange(pairPositions.size) - np.repeat(np.cumsum(counts) - counts, counts)
+    pairEndCount = endCount[pairPositions]
+
+    startPositions = startOrder[startFirst[pairPositions] + positionInPair // pairEndCount]
+    endPositions = endOrder[endFirst[pairPositions] + positionInPair % pairEndCount]
+    return pairPositions, startPositions, endPositions
+
+
+def extractImpedanceCostSummary(allImpedancesTotals, costAttribute):
+    """
+    From a summary with a cost property per impedance, create the summary of a single impedance in the format
+    returned by the pgr_dijkstraCost queries (total_cost property, unreachable pairs not included).
+
+    :param allImpedancesTotals: Shortest path summary json with a cost property per impedance.
+    :param costAttribute: Impedance/cost attribute to extract.
+    :return: Shortest path summary json.
+    """
+    features = []
+    for feature in allImpedancesTotals["features"]:
+        totalCost = feature["properties"].get(costAttribute)
+        if totalCost is None:
+            continue
+
+        features.append({
+            "id": feature.get("id", str(len(features))),
+            "type": "Feature",
+            "properties": {
+                "start_vertex_id": feature["properties"]["start_vertex_id"],
+                "end_vertex_id": feature["properties"]["end_vertex_id"],
+                "total_cost": totalCost
+            },
+            "geometry": feature["geometry"]
+        })
+
+    totals = {key: allImpedancesTotals[key] for key in allImpedancesTotals if key != "features"}
+    totals["features"] = features
+    return totals
 
 
 class MetropAccessDigiroadApplication:
-    def __init__(self, transportMode=None):
+    def __init__(self, transportMode=None, configuration=None):
+        self.configuration = configuration if configuration else Configuration.getInstance()
         self.fileActions = FileActions()
-        self.operations = Operations(FileActions())
+        self.operations = Operations(FileActions(), configuration=self.configuration)
         self.reflection = Reflection()
         self.transportMode = transportMode
         self.nearestVerticesCache = {}
         self.additionalStartFeaturePropertiesCache = {}
         self.additionalEndFeaturePropertiesCache = {}
-        self.shortestPathCache = {}
+        self.nearestVertexCache = None
+        self.routeCache = None
+        self.runManifest = None
 
     @dgl_timer_enabled
     def calculateTotalTimeTravel(self,
@@ -266,6 +335,7 @@ class MetropAccessDigiroadApplication:
         else:
             summaryFolderPath = outputFolderPath + "summary" + os.sep
 
+        routeStores = {}
         if isinstance(costAttribute, dict):
             for key in costAttribute:
                 newOutputFolderPath = outputFolderPath + os.sep + "geoms" + os.sep + \
@@ -277,6 +347,7 @@ class MetropAccessDigiroadApplication:
                 self.fileActions.deleteFolder(path=newOutputFolderPath)
                 self.fileActions.deleteFile(summaryFolderPath, csv_filename)
                 # self.fileActions.deleteFile(summaryFolderPath, zipCSVFilename)
+                routeStores[costAttribute[key]] = self.createRouteStore(newOutputFolderPath, costAttribute[key])
 
         else:
             newOutputFolderPath = outputFolderPath + os.sep + "geoms" + os.sep + getEnglishMeaning(
@@ -289,34 +360,35 @@ class MetropAccessDigiroadApplication:
             self.fileActions.deleteFolder(path=newOutputFolderPath)
             self.fileActions.deleteFile(summaryFolderPath, csv_filename)
             # self.fileActions.deleteFile(summaryFolderPath, zipCSVFilename)
+            routeStores[costAttribute] = self.createRouteStore(newOutputFolderPath, costAttribute)
 
         inputStartCoordinates = self.operations.mergeAdditionalLayers(
-            originalJsonURL=startCoordinatesGeojsonFilename,
-            outputFolderPath=outputFolderPath
+            originalJsonURL=startCoordinatesGeojsonFilename
         )
 
         inputEndCoordinates = self.operations.mergeAdditionalLayers(
-            originalJsonURL=endCoordinatesGeojsonFilename,
-            outputFolderPath=outputFolderPath
+            originalJsonURL=endCoordinatesGeojsonFilename
         )
 
         epsgCode = self.operations.extractCRSWithGeopandas(
             startCoordinatesGeojsonFilename)  # extractCRS(inputStartCoordinates)
 
-        delayedShortedPathCalculations = []
+        endEpsgCode = self.operations.extractCRSWithGeopandas(endCoordinatesGeojsonFilename)
 
-        ################################################################################################################
-        for startPointFeature in inputStartCoordinates["features"]:
-            # nearestStartPoint, startPoint, startPointEPSGCode, startVertexId = self.featureDataCompilation(
-            #     startPointFeature, startCoordinatesGeojsonFilename, epsgCode
-            # )
+        # Snap all the points at once, the shortest path calculations find them in the nearestVerticesCache.
+        self.getVerticesID(inputStartCoordinates, epsgCode)
+        self.getVerticesID(inputEndCoordinates, endEpsgCode)
 
+        delayedShortedPathCalculations = []
 
-            for endPointFeature in inputEndCoordinates["features"]:
-                # nearestEndPoint, endPoint, endPointEPSGCode, endVertexId = self.featureDataCompilation(
-                #     endPointFeature, endCoordinatesGeojsonFilename, epsgCode
-                # )
+        # The pairs are grouped by start point, the paths of each block of end points come from a single search.
+        blockSize = self.configuration.maxVerticesBlocks
+        endPointFeaturesBlocks = [inputEndCoordinates["features"][blockStart:blockStart + blockSize]
+                                  for blockStart in range(0, len(inputEndCoordinates["features"]), blockSize)]
 
+        ################################################################################################################
+        for startPointFeature in inputStartCoordinates["features"]:
+            for endPointFeatures in endPointFeaturesBlocks:
                 if isinstance(costAttribute, dict):
                     for key in costAttribute:
                         newOutputFolderPath = outputFolderPath + os.sep + "geoms" + os.sep + getEnglishMeaning(
@@ -325,52 +397,44 @@ class MetropAccessDigiroadApplication:
                             endCoordinatesGeojsonFilename) + "_" + getEnglishMeaning(
                             costAttribute[key]) + "_costSummary.csv"
 
-                        # self.createShortestPathFileWithAdditionalProperties(costAttribute[key], startVertexId,
-                        #                                                     endVertexId,
-                        #                                                     startPoint, newStartPointFeature,
-                        #                                                     endPoint,
-                        #                                                     newEndPointFeature, nearestEndPoint,
-                        #                                                     nearestStartPoint,
-                        #                                                     newOutputFolderPath, summaryFolderPath,
-                        #                                                     csv_filename)
-
                         delayedShortedPathCalculations.append(
-                            delayed(createShortestPathFileWithAdditionalProperties)(
+                            delayed(createShortestPathFilesFromAnOrigin)(
                                 self, costAttribute[key],
-                                startPointFeature, endPointFeature,
+                                startPointFeature, endPointFeatures,
                                 newOutputFolderPath, summaryFolderPath,
                                 csv_filename,
-                                epsgCode
+                                epsgCode,
+                                endEpsgCode,
+                                routeStores[costAttribute[key]]
                             )
                         )
                 else:
                     csv_filename = os.path.basename(startCoordinatesGeojsonFilename) + "_" + os.path.basename(
                         endCoordinatesGeojsonFilename) + "_" + getEnglishMeaning(costAttribute) + "_costSummary.csv"
 
-                    # self.createShortestPathFileWithAdditionalProperties(costAttribute, startVertexId, endVertexId,
-                    #                                                     startPoint, newStartPointFeature, endPoint,
-                    #                                                     newEndPointFeature, nearestEndPoint,
-                    #                                                     nearestStartPoint,
-                    #                                                     newOutputFolderPath, summaryFolderPath,
-                    #                                                     csv_filename)
-
                     delayedShortedPathCalculations.append(
-                        delayed(createShortestPathFileWithAdditionalProperties)(
+                        delayed(createShortestPathFilesFromAnOrigin)(
                             self,
                             costAttribute,
-                            startPointFeature, endPointFeature,
+                            startPointFeature, endPointFeatures,
                             newOutputFolderPath, summaryFolderPath,
                             csv_filename,
-                            epsgCode)
+                            epsgCode,
+                            endEpsgCode,
+                            routeStores[costAttribute])
                     )
 
         ################################################################################################################
 
-        with Parallel(n_jobs=int(getConfigurationProperties(section="PARALLELIZATION")["jobs"]),
-                      backend="threading",
-                      verbose=int(getConfigurationProperties(section="PARALLELIZATION")["verbose"])) as parallel:
-            parallel._print = parallel_job_print
-            returns = parallel(tuple(delayedShortedPathCalculations))
+        try:
+            with Parallel(n_jobs=self.configuration.jobs,
+                          backend="threading",
+                          verbose=self.configuration.verbose) as parallel:
+                parallel._print = parallel_job_print
+                returns = parallel(tuple(delayedShortedPathCalculations))
+        finally:
+            for routeStore in routeStores.values():
+                routeStore.close()
 
         if isinstance(costAttribute, dict):
             for key in costAttribute:
@@ -384,6 +448,16 @@ class MetropAccessDigiroadApplication:
 
             self.storeCSVFile(getEnglishMeaning(costAttribute), outputFolderPath, csv_filename)
 
+    def createRouteStore(self, folderPath, costAttribute):
+        """
+        :param folderPath: Folder of the shortest paths of the cost attribute.
+        :param costAttribute: Impedance of the shortest paths.
+        :return: RouteStore of the shortest paths, storing only their summary if ``storeShortPathFile`` is disabled.
+        """
+        return RouteStore(folderPath=folderPath,
+                          costAttribute=getEnglishMeaning(costAttribute),
+                          storeRoutes=self.configuration.storeShortPathFile)
+
     def storeCSVFile(self, costAttribute, outputFolderPath, csv_filename):
         if not outputFolderPath.endswith(os.sep):
             summaryFolderPath = outputFolderPath + os.sep + "summary" + os.sep
@@ -396,74 +470,72 @@ class MetropAccessDigiroadApplication:
             filepath=summaryFolderPath + os.sep + csv_filename
         )
 
-        debug = False
-        if "debug" in getConfigurationProperties(section="WFS_CONFIG"):
-            debug = "True".__eq__(getConfigurationProperties(section="WFS_CONFIG")["debug"])
-
-        if not debug:
+        if not self.configuration.debug:
             # self.fileActions.deleteFile(folderPath=summaryFolderPath, filename=outputFilename + ".geojson")
             self.fileActions.deleteFile(folderPath=summaryFolderPath, filename=csv_filename)
 
     def insertAdditionalProperties(self, startPointFeature, endPointFeature):
-        startFeatureProperties = {}
-        endFeatureProperties = {}
+        featureProperties = copy.deepcopy(self.getAdditionalPointProperties(
+            pointFeature=startPointFeature,
+            prefix="startPoint_",
+            propertiesCache=self.additionalStartFeaturePropertiesCache
+        ))
+        featureProperties.update(copy.deepcopy(self.getAdditionalPointProperties(
+            pointFeature=endPointFeature,
+            prefix="endPoint_",
+            propertiesCache=self.additionalEndFeaturePropertiesCache
+        )))
 
-        pointIdentifierKey = getConfigurationProperties(section="WFS_CONFIG")["point_identifier"]
+        return featureProperties
 
-        startPointId = startPointFeature["properties"][pointIdentifierKey]
-        endPointId = endPointFeature["properties"][pointIdentifierKey]
+    def getAdditionalPointProperties(self, pointFeature, prefix, propertiesCache):
+        """
+        Run the additional layer operations over a start or end point, once per point identifier.
 
-        existStartFeaturePropertiesCache = startPointId in self.additionalStartFeaturePropertiesCache
-        if existStartFeaturePropertiesCache:
-            startFeatureProperties = self.additionalStartFeaturePropertiesCache[startPointId]
+        :param pointFeature: Point feature with the nearest vertex properties.
+        :param prefix: "startPoint_" or "endPoint_".
+        :param propertiesCache: Dictionary {point identifier: properties} of the start or end points.
+        :return: Properties added by the additional layer operations (do not modify them, they are cached).
+        """
+        return self.getAdditionalPointsProperties([pointFeature], prefix, propertiesCache)[0]
 
-        existEndFeaturePropertiesCache = endPointId in self.additionalEndFeaturePropertiesCache
-        if existEndFeaturePropertiesCache:
-            endFeatureProperties = self.additionalEndFeaturePropertiesCache[endPointId]
+    def getAdditionalPointsProperties(self, pointsFeaturesList, prefix, propertiesCache):
+        """
+        Run the ``runBatch`` of the additional layer operations once over all the points not cached yet.
 
+        :param pointsFeaturesList: Point features with the nearest vertex properties.
+        :param prefix: "startPoint_" or "endPoint_".
+        :param propertiesCache: Dictionary {point identifier: properties} of the start or end points.
+        :return: List with the properties added by the additional layer operations to each point (do not modify
+                 them, they are cached).
+        """
+        pointIdentifierKey = self.configuration.pointIdentifier
+        pointsID = [feature["properties"][pointIdentifierKey] for feature in pointsFeaturesList]
 
-            # self.additionalFeaturePropertiesCache[newPropertiesId] = newProperties
-        if (not existStartFeaturePropertiesCache) or (not existEndFeaturePropertiesCache):
+        newPoints = {}
+        for pointId, feature in zip(pointsID, pointsFeaturesList):
+            if pointId not in propertiesCache and pointId not in newPoints:
+                newPoints[pointId] = feature
+
+        if newPoints:
+            properties = pd.DataFrame([feature["properties"] for feature in newPoints.values()], dtype=object)
+            properties = properties.where(pd.notnull(properties), None)
+
+            results = []
             additionalLayerOperationLinkedList = self.reflection.getLinkedAbstractAdditionalLayerOperation()
             while additionalLayerOperationLinkedList.hasNext():
                 additionalLayerOperation = additionalLayerOperationLinkedList.next()
+                results.append(additionalLayerOperation.runBatch(properties=properties, prefix=prefix))
 
-                if not existStartFeaturePropertiesCache:
-                    newPropertiesStartPointFeature = additionalLayerOperation.runOperation(
-                        featureJson=startPointFeature,
-                        prefix="startPoint_")
-                    # for property in newPropertiesStartPointFeature:
-                    #     startPointFeature["properties"][property] = newPropertiesStartPointFeature[property]
-                    #     featureProperties[property] = newPropertiesStartPointFeature[property]
-                    startFeatureProperties.update(newPropertiesStartPointFeature)
-
-                if not existEndFeaturePropertiesCache:
-                    newPropertiesEndPointFeature = additionalLayerOperation.runOperation(
-                        featureJson=endPointFeature,
-                        prefix="endPoint_")
-                    # for property in newPropertiesEndPointFeature:
-                    #     endPointFeature["properties"][property] = newPropertiesEndPointFeature[property]
-                    #     featureProperties[property] = newPropertiesEndPointFeature[property]
-                    endFeatureProperties.update(newPropertiesEndPointFeature)
-
-        if not existStartFeaturePropertiesCache:
-            self.additionalStartFeaturePropertiesCache[startPointId] = copy.deepcopy(startFeatureProperties)
-
-        if not existEndFeaturePropertiesCache:
-            self.additionalEndFeaturePropertiesCache[endPointId] = copy.deepcopy(endFeatureProperties)
-
-        # featureProperties = {}
-        # if existStartFeaturePropertiesCache:
-        #     startFeatureProperties.update(endFeatureProperties)
-        #     featureProperties = startFeatureProperties
-        # elif existEndFeaturePropertiesCache:
-        #     endFeatureProperties.update(startFeatureProperties)
-        #     featureProperties = endFeatureProperties
-        # else:
-        startFeatureProperties.update(endFeatureProperties)
-        featureProperties = startFeatureProperties
+            # as in dict.update, the last operation returning a property overwrites it
+            newProperties = pd.concat(results, axis=1).astype(object)
+            newProperties = newProperties.loc[:, ~newProperties.columns.duplicated(keep="last")]
+            newProperties = newProperties.where(pd.notnull(newProperties), None)
 
-        return featureProperties
+            for pointId, pointProperties in zip(newPoints, newProperties.to_dict("records")):
+                propertiesCache[pointId] = pointProperties
+
+        return [propertiesCache[pointId] for pointId in pointsID]
 
     @dgl_timer_enabled
     def createDetailedSummary(self, folderPath, costAttribute, outputFilename):
@@ -473,6 +545,9 @@ class MetropAccessDigiroadApplication:
         rush_hour_delay_time) and create a simple features Geojson (Geometry type: LineString)
         with the summary information.
 
+        When the shortest paths are in a RouteStore its route summary, calculated while the routes were produced, is
+        written instead of reading the shortest paths again.
+
         :param folderPath: Folder containing the shortest path geojson features.
         :param outputFilename: Filename to give to the summary file.
         :return: None. Store the summary information in the folderPath with the name given in outputFilename.
@@ -486,6 +561,12 @@ class MetropAccessDigiroadApplication:
             attributeFolderPath = folderPath + "geoms" + os.sep + getEnglishMeaning(costAttribute) + os.sep
             summaryFolderPath = folderPath + "summary" + os.sep
 
+        outputFilename = getEnglishMeaning(costAttribute) + "_" + outputFilename
+        if RouteStore.isRouteStore(attributeFolderPath):
+            # the route summary was calculated while the routes were produced
+            RouteStore.writeSummary(attributeFolderPath, summaryFolderPath + outputFilename)
+            return
+
         totals = {
             "features": [],
             "totalFeatures": 0,
@@ -503,59 +584,15 @@ class MetropAccessDigiroadApplication:
                 if "crs" not in totals:
                     totals["crs"] = shortestPath["crs"]
 
-                newSummaryFeature = {
-                    "geometry": {
-                        "coordinates": [
-                        ],
-                        "type": GeometryType.LINE_STRING
-                    },
-                    "properties": {
-                        # "startVertexId": int(filemetadata[2]),
-                        # "endVertexId": int(filemetadata[3].replace(".geojson", "")),
-                        "costAttribute": filemetadata[1]
-                    }
-                }
-
-                for property in shortestPath["overallProperties"]:
-                    newSummaryFeature["properties"][property] = shortestPath["overallProperties"][property]
-
-                startPoints = None
-                endPoints = None
-                lastSequence = 1
-
-                for segmentFeature in shortestPath["features"]:
-                    for key in segmentFeature["properties"]:
-                        if key == "seq":
-                            if segmentFeature["properties"][key] == 1:
-                                # Sequence one is the first linestring geometry in the path
-                                startPoints = segmentFeature["geometry"]["coordinates"]
-                            if segmentFeature["properties"][key] > lastSequence:
-                                # The last sequence is the last linestring geometry in the path
-                                endPoints = segmentFeature["geometry"]["coordinates"]
-                                lastSequence = segmentFeature["properties"][key]
-
-                        if key not in ["id", "direction", "seq"]:
-                            if key not in newSummaryFeature["properties"]:
-                                newSummaryFeature["properties"][key] = 0
-
-                            newSummaryFeature["properties"][key] = newSummaryFeature["properties"][key] + \
-                                                                   segmentFeature["properties"][key]
-
                 try:
-                    newSummaryFeature["geometry"]["coordinates"] = newSummaryFeature["geometry"]["coordinates"] + \
-                                                                   startPoints
-
-                    startAndEndPointAreDifferent = lastSequence > 1
-                    if startAndEndPointAreDifferent:
-                        newSummaryFeature["geometry"]["coordinates"] = newSummaryFeature["geometry"]["coordinates"] + \
-                                                                       endPoints
-                    totals["features"].append(newSummaryFeature)
+                    summaryFeature = createRouteSummaryFeature(shortestPath, filemetadata[1])
                 except Exception as err:
                     Logger.getInstance().exception(err)
                     raise err
+                if summaryFeature is not None:
+                    totals["features"].append(summaryFeature)
 
         totals["totalFeatures"] = len(totals["features"])
-        outputFilename = getEnglishMeaning(costAttribute) + "_" + outputFilename
         self.fileActions.writeFile(folderPath=summaryFolderPath, filename=outputFilename, data=totals)
 
     @dgl_timer
@@ -572,7 +609,7 @@ class MetropAccessDigiroadApplication:
 
         Logger.getInstance().info("Start calculateSmallSummary for: %s" % costAttribute)
 
-        pointIdentifierKey = getConfigurationProperties(section="WFS_CONFIG")["point_identifier"]
+        pointIdentifierKey = self.configuration.pointIdentifier
 
         startPointId = shortestPath["overallProperties"]["startPoint_" + pointIdentifierKey]
         endPointId = shortestPath["overallProperties"]["endPoint_" + pointIdentifierKey]
@@ -617,15 +654,90 @@ class MetropAccessDigiroadApplication:
         """
         Logger.getInstance().info("Start createGeneralSummary for: %s" % costAttribute)
 
+        startVerticesID, startPointsFeaturesList, endVerticesID, endPointsFeaturesList = self.prepareSummaryPoints(
+            startCoordinatesGeojsonFilename=startCoordinatesGeojsonFilename,
+            endCoordinatesGeojsonFilename=endCoordinatesGeojsonFilename
+        )
+
+        if self.configuration.matrixOnly:
+            self.streamGeneralSummary(costAttributes=[costAttribute],
+                                      startVerticesID=startVerticesID,
+                                      startPointsFeaturesList=startPointsFeaturesList,
+                                      endVerticesID=endVerticesID,
+                                      endPointsFeaturesList=endPointsFeaturesList,
+                                      outputFolderPath=outputFolderPath,
+                                      outputFilename=outputFilename)
+            return
+
+        self.warnIncrementalNotSupported(outputFilename)
+        self.storeGeneralSummary(costAttributes=[costAttribute],
+                                 startPointsFeaturesList=startPointsFeaturesList,
+                                 endVerticesID=endVerticesID,
+                                 endPointsFeaturesList=endPointsFeaturesList,
+                                 outputFolderPath=outputFolderPath,
+                                 outputFilename=outputFilename)
+
+    @dgl_timer_enabled
+    def createGeneralSummaryForAllImpedances(self, startCoordinatesGeojsonFilename, endCoordinatesGeojsonFilename,
+                                             costAttributes, outputFolderPath, outputFilename):
+        """
+        Same output as calling ``createGeneralSummary`` for each cost attribute, but the additional layers are merged,
+        the nearest vertices are found and the routing is calculated only once for all the cost attributes.
+
+        :param startCoordinatesGeojsonFilename: Geojson file (Geometry type: MultiPoint) containing pair of points.
+        :param endCoordinatesGeojsonFilename: Geojson file (Geometry type: MultiPoint) containing pair of points.
+        :param costAttributes: List of attributes to calculate the impedance of the Shortest Path algorithm.
+        :param outputFolderPath: Folder containing the shortest path geojson features.
+        :param outputFilename: Filename to give to the summary file.
+        :return: None. Store the information in the ``outputFolderPath``.
+        """
+        Logger.getInstance().info("Start createGeneralSummaryForAllImpedances for: %s" % costAttributes)
+
+        startVerticesID, startPointsFeaturesList, endVerticesID, endPointsFeaturesList = self.prepareSummaryPoints(
+            startCoordinatesGeojsonFilename=startCoordinatesGeojsonFilename,
+            endCoordinatesGeojsonFilename=endCoordinatesGeojsonFilename
+        )
+
+        if self.configuration.matrixOnly:
+            self.streamGeneralSummary(costAttributes=costAttributes,
+                                      startVerticesID=startVerticesID,
+                                      startPointsFeaturesList=startPointsFeaturesList,
+                                      endVerticesID=endVerticesID,
+                                      endPointsFeaturesList=endPointsFeaturesList,
+                                      outputFolderPath=outputFolderPath,
+                                      outputFilename=outputFilename)
+            return
+
+        self.warnIncrementalNotSupported(outputFilename)
+        self.storeGeneralSummary(costAttributes=costAttributes,
+                                 startPointsFeaturesList=startPointsFeaturesList,
+                                 endVerticesID=endVerticesID,
+                                 endPointsFeaturesList=endPointsFeaturesList,
+                                 outputFolderPath=outputFolderPath,
+                                 outputFilename=outputFilename)
+
+    def warnIncrementalNotSupported(self, outputFilename):
+        """
+        Log a warning if the incremental mode is enabled for a summary that is not updated incrementally: only the
+        ``matrixOnly`` summaries are.
+        """
+        if self.configuration.incremental:
+            Logger.getInstance().warning("The incremental mode only updates the matrixOnly summaries, %s is "
+                                         "calculated from scratch" % outputFilename)
+
+    def prepareSummaryPoints(self, startCoordinatesGeojsonFilename, endCoordinatesGeojsonFilename):
+        """
+        Merge the additional layers into the start and end points and find their nearest routable vertices.
+
+        :return: start vertices, start point features, end vertices and end point features.
+        """
         Logger.getInstance().info("Start merge additional layers")
         inputStartCoordinates = self.operations.mergeAdditionalLayers(
-            originalJsonURL=startCoordinatesGeojsonFilename,
-            outputFolderPath=outputFolderPath
+            originalJsonURL=startCoordinatesGeojsonFilename
         )
 
         inputEndCoordinates = self.operations.mergeAdditionalLayers(
-            originalJsonURL=endCoordinatesGeojsonFilename,
-            outputFolderPath=outputFolderPath
+            originalJsonURL=endCoordinatesGeojsonFilename
         )
         Logger.getInstance().info("End merge additional layers")
 
@@ -636,213 +748,652 @@ class MetropAccessDigiroadApplication:
         endVerticesID, endPointsFeaturesList = self.getVerticesID(inputEndCoordinates, endEpsgCode)
         Logger.getInstance().info("End nearest vertices finding")
 
-        totals = None
+        return startVerticesID, startPointsFeaturesList, endVerticesID, endPointsFeaturesList
 
-        Logger.getInstance().info("Start cost summary calculation")
-        if len(startVerticesID) == 1 and len(endVerticesID) == 1:
-            totals = self.transportMode.getTotalShortestPathCostOneToOne(
-                startVertexID=startVerticesID[0],
-                endVertexID=endVerticesID[0],
-                costAttribute=costAttribute
-            )
-        elif len(startVerticesID) == 1 and len(endVerticesID) > 1:
-            totals = self.transportMode.getTotalShortestPathCostOneToMany(
-                startVertexID=startVerticesID[0],
-                endVerticesID=endVerticesID,
-                costAttribute=costAttribute
-            )
-        elif len(startVerticesID) > 1 and len(endVerticesID) == 1:
-            totals = self.transportMode.getTotalShortestPathCostManyToOne(
-                startVerticesID=startVerticesID,
-                endVertexID=endVerticesID[0],
-                costAttribute=costAttribute
-            )
-        elif len(startVerticesID) > 1 and len(endVerticesID) > 1:
-            totals = self.transportMode.getTotalShortestPathCostManyToMany(
-                startVerticesID=startVerticesID,
-                endVerticesID=endVerticesID,
-                costAttribute=costAttribute
-            )
-        Logger.getInstance().info("End cost summary calculation")
+    def streamGeneralSummary(self, costAttributes, startVerticesID, startPointsFeaturesList, endVerticesID,
+                             endPointsFeaturesList, outputFolderPath, outputFilename):
+        """
+        ``matrixOnly`` version of ``storeGeneralSummary``: every block of costs calculated by the transport mode is
+        turned into the final csv rows (ykr_from_id, ykr_to_id, travel_time) and appended to the csv summary of each
+        cost attribute as soon as the block is finished. The memory used is bounded by the block size.
+
+        :param costAttributes: List of attributes used to calculate the impedance of the Shortest Path algorithm.
+        :param startVerticesID: Start vertices.
+        :param startPointsFeaturesList: Start point features with the nearest vertex information.
+        :param endVerticesID: End vertices.
+        :param endPointsFeaturesList: End point features with the nearest vertex information.
+        :param outputFolderPath: Folder containing the shortest path geojson features.
+        :param outputFilename: Filename to give to the summary file.
+        :return: None. Store the information in the ``outputFolderPath``.
+        """
+        if not outputFolderPath.endswith(os.sep):
+            summaryFolderPath = outputFolderPath + os.sep + "summary" + os.sep
+        else:
+            summaryFolderPath = outputFolderPath + "summary" + os.sep
 
-        costSummaryMap = self.createCostSummaryMap(totals)
-        # summaryFeature = costSummaryMap[startVertexID][endVertexID]
-        # KeyError: 125736
+        pointIdentifierKey = self.configuration.pointIdentifier
+        startPointsID = [feature["properties"][pointIdentifierKey] for feature in startPointsFeaturesList]
+        endPointsID = [feature["properties"][pointIdentifierKey] for feature in endPointsFeaturesList]
+        startPointsTravelTime = np.array([self.operations.calculateStartPointTravelTime(properties)
+                                          for properties in self.getAdditionalPointsProperties(
+                                              startPointsFeaturesList, "startPoint_",
+                                              self.additionalStartFeaturePropertiesCache)], dtype=np.float64)
+        endPointsTravelTime = np.array([self.operations.calculateEndPointTravelTime(properties)
+                                        for properties in self.getAdditionalPointsProperties(
+                                            endPointsFeaturesList, "endPoint_",
+                                            self.additionalEndFeaturePropertiesCache)], dtype=np.float64)
+
+        startPointsVertexID = [feature["properties"]["vertex_id"] for feature in startPointsFeaturesList]
+        endPointsVertexID = [feature["properties"]["vertex_id"] for feature in endPointsFeaturesList]
+        startPointsIndex = createVertexPointsIndex(startPointsVertexID)
+        endPointsIndex = createVertexPointsIndex(endPointsVertexID)
+        startPointsID = np.array(startPointsID, dtype=object)
+        endPointsID = np.array(endPointsID, dtype=object)
+        startVerticesID = list(dict.fromkeys(startVerticesID))
+        summaryFilePaths = {costAttribute: self.getSummaryFilePath(summaryFolderPath, costAttribute, outputFilename)
+                            for costAttribute in costAttributes}
+
+        # in incremental mode the rows of the start points not affected by the changes of the network (or of the
+        # points) since the previous summaries are copied from them, and only the other start vertices are solved
+        incrementalSummary = None
+        keptStartPointsID = set()
+        if self.configuration.incremental:
+            startPointsState = {str(pointID): [int(vertexID), float(travelTime)] for pointID, vertexID, travelTime
+                                in zip(startPointsID, startPointsVertexID, startPointsTravelTime)}
+            endPointsFingerprint = RunManifest.createFingerprint(endPointsID.tolist(), endPointsVertexID,
+                                                                 endPointsTravelTime.tolist())
+            incrementalSummary, startVerticesID, keptStartPointsID = self.startIncrementalSummary(
+                summaryFolderPath, summaryFilePaths, startVerticesID, startPointsState, endPointsFingerprint)
+
+        # with a run manifest the start vertices are solved in checkpoint blocks, each finished block is recorded with
+        # the length of the csv files so a restarted run truncates them there and solves only the missing blocks
+        # (the start vertices shared by several points are solved only once, in a single checkpoint block)
+        checkpointEnabled = self.runManifest is not None and self.configuration.summaryFormat == "csv" and \
+                            incrementalSummary is None
+        checkpointVertices = max(1, self.configuration.checkpointVertices if checkpointEnabled
+                                 else len(startVerticesID))
+        checkpointKey = outputFolderPath + "|" + outputFilename + "|" + ",".join(costAttributes)
+        checkpointFingerprint = RunManifest.createFingerprint(list(startVerticesID), list(endVerticesID),
+                                                              startPointsID.tolist(), endPointsID.tolist(),
+                                                              checkpointVertices)
+        completedBlocks = self.getCompletedCheckpointBlocks(checkpointKey, checkpointFingerprint, summaryFolderPath,
+                                                            costAttributes, outputFilename) \
+            if checkpointEnabled else {}
+        lastState = completedBlocks[max(completedBlocks)] if completedBlocks else {}
+
+        writers = {}
+        for costAttribute in costAttributes:
+            writers[costAttribute] = self.createSummaryWriter(summaryFolderPath=summaryFolderPath,
+                                                              costAttribute=costAttribute,
+                                                              outputFilename=outputFilename,
+                                                              checkpoint=lastState.get(costAttribute))
+
+        Logger.getInstance().info("Start streaming cost summary calculation")
+        try:
+            if keptStartPointsID:
+                self.copyIncrementalSummaryRows(incrementalSummary, summaryFilePaths, writers, keptStartPointsID)
+
+            for blockIndex, blockStart in enumerate(range(0, len(startVerticesID), checkpointVertices)):
+                if blockIndex in completedBlocks:
+                    continue
+
+                for block in self.transportMode.iterateTotalShortestPathCostMatrixBlocks(
+                        startVerticesID=startVerticesID[blockStart:blockStart + checkpointVertices],
+                        endVerticesID=endVerticesID,
+                        costAttributes=costAttributes):
+                    pairPositions, startPositions, endPositions = expandVertexPairs(
+                        block["start_vertex_id"], block["end_vertex_id"], startPointsIndex, endPointsIndex)
+
+                    for costAttribute in costAttributes:
+                        travelTimes = startPointsTravelTime[startPositions] + block[costAttribute][pairPositions] + \
+                                      endPointsTravelTime[endPositions]
+                        reachable = ~np.isnan(travelTimes)
+                        writers[costAttribute].writeRows(startPointsID[startPositions[reachable]],
+                                                         endPointsID[endPositions[reachable]],
+                                                         travelTimes[reachable])
+
+                if checkpointEnabled:
+                    self.runManifest.completeBlock(checkpointKey, checkpointFingerprint, blockIndex,
+                                                   {costAttribute: writer.checkpoint()
+                                                    for costAttribute, writer in writers.items()})
+        finally:
+            for writer in writers.values():
+                writer.close()
+        Logger.getInstance().info("End streaming cost summary calculation")
+
+        for costAttribute, writer in writers.items():
+            Logger.getInstance().info("%s rows stored in %s" % (writer.numberOfRows, writer.filePath))
+            self.compressSummaryFile(summaryFolderPath=summaryFolderPath, filepath=writer.filePath)
+
+        if checkpointEnabled:
+            self.runManifest.discardBlocks(checkpointKey)
+
+        if incrementalSummary is not None:
+            self.completeIncrementalSummary(incrementalSummary, summaryFilePaths, startPointsState,
+                                            endPointsFingerprint)
+
+    def startIncrementalSummary(self, summaryFolderPath, summaryFilePaths, startVerticesID, startPointsState,
+                                endPointsFingerprint):
+        """
+        Find the start vertices to solve again to update the previous summaries, and discard the metadata of the
+        summaries until the new ones are complete.
+
+        :param summaryFolderPath: Folder of the summary files.
+        :param summaryFilePaths: Dictionary {cost attribute: summary file}.
+        :param startVerticesID: Start vertices.
+        :param startPointsState: Dictionary {start point identifier: [vertex id, start point travel time]}.
+        :param endPointsFingerprint: Fingerprint of the end points identifiers, vertices and travel times.
+        :return: Tuple (IncrementalSummary, start vertices to solve, identifiers of the start points whose rows are
+                 copied from the previous summaries), (None, all the start vertices, empty set) if the transport mode
+                 does not support the incremental update.
+        """
+        if not self.transportMode.supportsIncrementalUpdate():
+            Logger.getInstance().warning("The incremental mode requires an in-memory transport mode, %s is calculated "
+                                         "from scratch" % ", ".join(summaryFilePaths.values()))
+            return None, startVerticesID, set()
+
+        incrementalSummary = IncrementalSummary(summaryFolderPath=summaryFolderPath,
+                                                networkFingerprint=self.transportMode.getNetworkFingerprint(),
+                                                separator=self.configuration.csvSeparator)
+        keptStartPointsID = set()
+        incrementalStart = self.getIncrementalStartVertices(incrementalSummary, summaryFilePaths, startVerticesID,
+                                                            startPointsState, endPointsFingerprint)
+        if incrementalStart is not None:
+            startVerticesID, keptStartPointsID = incrementalStart
+        for summaryFilePath in summaryFilePaths.values():
+            # written again when the new summary is complete
+            incrementalSummary.discardMetadata(summaryFilePath)
+
+        return incrementalSummary, startVerticesID, keptStartPointsID
+
+    def copyIncrementalSummaryRows(self, incrementalSummary, summaryFilePaths, writers, keptStartPointsID):
+        """
+        Write the rows of the kept start points from the previous summary of each cost attribute.
 
-        counterStartPoints = 0
-        counterEndPoints = 0
+        :param incrementalSummary: IncrementalSummary of the summary folder.
+        :param summaryFilePaths: Dictionary {cost attribute: summary file}.
+        :param writers: Dictionary {cost attribute: summary writer}.
+        :param keptStartPointsID: Identifiers of the start points whose rows are copied.
+        """
+        for costAttribute, writer in writers.items():
+            for previousRows in incrementalSummary.iteratePreviousRows(summaryFilePaths[costAttribute]):
+                kept = IncrementalSummary.selectRows(previousRows[0], keptStartPointsID)
+                writer.writeRows(*[column[kept] for column in previousRows])
 
-        ################################################################################################################
-        # for featureShortPathSummary in totals["features"]:
-        #     startVertexID = featureShortPathSummary["properties"]["start_vertex_id"]
-        #     endVertexID = featureShortPathSummary["properties"]["end_vertex_id"]
-        #     total_cost = featureShortPathSummary["properties"]["total_cost"]
-        #     del featureShortPathSummary["properties"]["start_vertex_id"]
-        #     del featureShortPathSummary["properties"]["end_vertex_id"]
-        #     del featureShortPathSummary["properties"]["total_cost"]
-        #
-        #     startPointFeature = startPointsFeaturesList[counterStartPoints]
-        #     endPointFeature = endPointsFeaturesList[counterEndPoints]
-        #
-        #     self.createCostSummaryWithAdditionalProperties(costAttribute, endPointFeature, endVertexID,
-        #                                                    featureShortPathSummary, startPointFeature,
-        #                                                    startVertexID,
-        #                                                    total_cost)
-        #     counterEndPoints += 1
-        #     if counterEndPoints == len(endPointsFeaturesList):
-        #         counterStartPoints += 1
-        #         counterEndPoints = 0
-        ################################################################################################################
+    def completeIncrementalSummary(self, incrementalSummary, summaryFilePaths, startPointsState,
+                                   endPointsFingerprint):
+        """
+        Store the network snapshot and the metadata of the new summaries, to update them in the next run, and remove
+        the previous summaries.
 
+        :param incrementalSummary: IncrementalSummary of the summary folder.
+        :param summaryFilePaths: Dictionary {cost attribute: summary file}.
+        :param startPointsState: Dictionary {start point identifier: [vertex id, start point travel time]}.
+        :param endPointsFingerprint: Fingerprint of the end points identifiers, vertices and travel times.
+        """
+        incrementalSummary.storeSnapshot(self.transportMode.getGraph())
+        for summaryFilePath in summaryFilePaths.values():
+            incrementalSummary.writeMetadata(summaryFilePath, startPointsState, endPointsFingerprint)
+            incrementalSummary.discardPreviousSummary(summaryFilePath)
+        incrementalSummary.removeUnusedSnapshots()
+
+    def getIncrementalStartVertices(self, incrementalSummary, summaryFilePaths, startVerticesID, startPointsState,
+                                    endPointsFingerprint):
+        """
+        Compare the previous summary of each cost attribute with the current network and points: the start vertices
+        whose shortest path tree touches a changed edge and the vertices of the start points added or modified must
+        be solved again. The end points must be the same, otherwise every row changes.
+
+        :param incrementalSummary: IncrementalSummary of the summary folder.
+        :param summaryFilePaths: Dictionary {cost attribute: summary file}.
+        :param startVerticesID: Start vertices.
+        :param startPointsState: Dictionary {start point identifier: [vertex id, start point travel time]}.
+        :param endPointsFingerprint: Fingerprint of the end points identifiers, vertices and travel times.
+        :return: Tuple (start vertices to solve, identifiers of the start points whose rows are copied from the
+                 previous summaries), None if the summaries must be calculated from scratch.
+        """
+        graph = self.transportMode.getGraph()
+        affectedVerticesID = set()
+        for costAttribute, summaryFilePath in summaryFilePaths.items():
+            metadata = incrementalSummary.readMetadata(summaryFilePath)
+            if metadata is None or metadata["endPointsFingerprint"] != endPointsFingerprint or \
+                    not incrementalSummary.preparePreviousSummary(summaryFilePath):
+                Logger.getInstance().info("No previous summary to update in %s" % summaryFilePath)
+                return None
+
+            if metadata["networkFingerprint"] != incrementalSummary.networkFingerprint:
+                previousGraph = incrementalSummary.loadSnapshot(metadata["networkFingerprint"])
+                if previousGraph is None:
+                    Logger.getInstance().info("No snapshot of the network used in %s" % summaryFilePath)
+                    return None
+
+                networkDiff = NetworkDiff(previousGraph, graph)
+                Logger.getInstance().info("%s edges changed since %s" % (
+                    len(networkDiff.getChangedEdgeIDs([costAttribute])), summaryFilePath))
+                affectedVerticesID.update(networkDiff.getAffectedStartVertices(startVerticesID,
+                                                                               [costAttribute]).tolist())
+
+            affectedVerticesID.update(state[0] for pointID, state in startPointsState.items()
+                                      if metadata["startPoints"].get(pointID) != state)
+
+        Logger.getInstance().info("%s of %s start vertices to update" % (len(affectedVerticesID), len(startVerticesID)))
+        keptStartPointsID = {pointID for pointID, state in startPointsState.items()
+                             if state[0] not in affectedVerticesID}
+        return [vertexID for vertexID in startVerticesID if vertexID in affectedVerticesID], keptStartPointsID
+
+    def getCompletedCheckpointBlocks(self, checkpointKey, checkpointFingerprint, summaryFolderPath, costAttributes,
+                                     outputFilename):
+        """
+        :return: Dictionary {block index: {cost attribute: csv checkpoint}} of the blocks finished by a previous run,
+                 empty if they can not be resumed (e.g. a csv file was already compressed and deleted).
+        """
+        completedBlocks = self.runManifest.getCompletedBlocks(checkpointKey, checkpointFingerprint)
+        if not completedBlocks:
+            return {}
+
+        resumable = sorted(completedBlocks) == list(range(len(completedBlocks)))
+        for costAttribute in costAttributes:
+            csvFilePath = self.getSummaryFilePath(summaryFolderPath, costAttribute, outputFilename)
+            state = completedBlocks[max(completedBlocks)].get(costAttribute)
+            if not state or not os.path.isfile(csvFilePath) or os.path.getsize(csvFilePath) < state[0]:
+                resumable = False
+
+        if not resumable:
+            self.runManifest.discardBlocks(checkpointKey)
+            return {}
 
+        Logger.getInstance().info("Resuming %s after %s completed blocks" % (outputFilename, len(completedBlocks)))
+        return completedBlocks
 
+    def createSummaryDataFrame(self, costAttribute, totals, startPointsFeaturesList, endPointsFeaturesList):
+        """
+        Join the cost of each pair of vertices with the additional properties of the start and end points of those
+        vertices, one row per pair of points in the order of the start and end points.
+
+        :param costAttribute: Attribute used to calculate the impedance of the Shortest Path algorithm.
+        :param totals: Shortest path summary json with the total_cost of each pair of vertices.
+        :param startPointsFeaturesList: Start point features with the nearest vertex information.
+        :param endPointsFeaturesList: End point features with the nearest vertex information.
+        :return: DataFrame with the summary properties plus the summaryFeaturePosition of the pair in ``totals``.
+        """
+        costName = getEnglishMeaning(costAttribute)
+        costs = pd.DataFrame({
+            "startVertexId": np.array([feature["properties"]["start_vertex_id"] for feature in totals["features"]],
+                                      dtype=np.int64),
+            "endVertexId": np.array([feature["properties"]["end_vertex_id"] for feature in totals["features"]],
+                                    dtype=np.int64),
+            costName: np.array([feature["properties"]["total_cost"] for feature in totals["features"]],
+                               dtype=np.float64),
+            "summaryFeaturePosition": np.arange(len(totals["features"]))
+        })
+
+        startPoints = self.createPointsDataFrame(startPointsFeaturesList, "startPoint_", "Start",
+                                                 self.additionalStartFeaturePropertiesCache)
+        endPoints = self.createPointsDataFrame(endPointsFeaturesList, "endPoint_", "End",
+                                               self.additionalEndFeaturePropertiesCache)
+
+        summary = startPoints.merge(costs, on="startVertexId").merge(endPoints, on="endVertexId")
+        summary = summary.sort_values(["startPointPosition", "endPointPosition"]).reset_index(drop=True)
+
+        missingPairs = len(startPoints) * len(endPoints) - len(summary)
+        if missingPairs > 0:
+            Logger.getInstance().warning("%s pairs of points not contained in the cost summary" % missingPairs)
+
+        summary["costAttribute"] = costName
+        startColumns = [column for column in startPoints.columns if column.startswith("startPoint_")]
+        endColumns = [column for column in endPoints.columns if column.startswith("endPoint_")]
+        return summary[startColumns + endColumns + ["costAttribute", costName, "startVertexId", "endVertexId",
+                                                    "selectedStartCoordinates", "selectedEndCoordinates",
+                                                    "nearestStartCoordinates", "nearestEndCoordinates",
+                                                    "summaryFeaturePosition"]]
+
+    def createPointsDataFrame(self, pointsFeaturesList, prefix, suffix, propertiesCache):
+        """
+        :param pointsFeaturesList: Point features with the nearest vertex information.
+        :param prefix: "startPoint_" or "endPoint_".
+        :param suffix: "Start" or "End", suffix of the vertex and coordinates columns.
+        :param propertiesCache: Dictionary {point identifier: properties} of the start or end points.
+        :return: DataFrame with one row per point: additional properties, vertex and coordinates.
+        """
+        points = pd.DataFrame(self.getAdditionalPointsProperties(pointsFeaturesList, prefix, propertiesCache))
+        points[suffix.lower() + "VertexId"] = np.array([feature["properties"]["vertex_id"]
+                                                        for feature in pointsFeaturesList], dtype=np.int64)
+        points["selected" + suffix + "Coordinates"] = [feature["properties"]["selectedPointCoordinates"]
+                                                      for feature in pointsFeaturesList]
+        points["nearest" + suffix + "Coordinates"] = [feature["properties"]["nearestVertexCoordinates"]
+                                                     for feature in pointsFeaturesList]
+        points[suffix.lower() + "PointPosition"] = np.arange(len(pointsFeaturesList))
+        return points
+
+    def createSummaryFeatures(self, summaryDataFrame, totals):
+        """
+        :param summaryDataFrame: DataFrame returned by ``createSummaryDataFrame``.
+        :param totals: Shortest path summary json with the geometry of each pair of vertices.
+        :return: Summary features with the properties of each row of the DataFrame.
+        """
         features = []
-        ################################################################################################################
-        # for startPointFeature in startPointsFeaturesList:
-        #     for endPointFeature in endPointsFeaturesList:
-        #         newFeature = createCostSummaryWithAdditionalProperties(costAttribute,
-        #                                                                     startPointFeature,
-        #                                                                     endPointFeature,
-        #                                                                     costSummaryMap)
-        #         if newFeature:
-        #             features.append(newFeature)
-        ################################################################################################################
+        summaryFeaturePositions = summaryDataFrame["summaryFeaturePosition"].tolist()
+        properties = summaryDataFrame.drop(columns="summaryFeaturePosition").to_dict("records")
+        for summaryFeaturePosition, featureProperties in zip(summaryFeaturePositions, properties):
+            summaryFeature = totals["features"][summaryFeaturePosition]
+            features.append({
+                "id": summaryFeature.get("id", str(len(features))),
+                "type": "Feature",
+                "properties": featureProperties,
+                "geometry": summaryFeature["geometry"]
+            })
+        return features
+
+    def createSummaryWriter(self, summaryFolderPath, costAttribute, outputFilename, checkpoint=None):
+        """
+        :param summaryFolderPath: Summary folder.
+        :param costAttribute: Attribute used to calculate the impedance of the Shortest Path algorithm.
+        :param outputFilename: Filename to give to the summary file.
+        :param checkpoint: csv checkpoint to resume the summary from, see ``CostSummaryWriter``.
+        :return: Writer of the ykr_from_id, ykr_to_id and travel_time columns, in the ``summary_format`` of the
+                 configuration.
+        """
+        summaryFilePath = self.getSummaryFilePath(summaryFolderPath, costAttribute, outputFilename)
+        if self.configuration.summaryFormat == "parquet":
+            # pyarrow is only required for the parquet summaries
+            from digiroad.logic.ParquetCostSummaryWriter import ParquetCostSummaryWriter
+            return ParquetCostSummaryWriter(parquetFilePath=summaryFilePath,
+                                            costAttribute=getEnglishMeaning(costAttribute))
+
+        return CostSummaryWriter(csvFilePath=summaryFilePath,
+                                 fieldNames=list(self.getSummaryColumns().values()),
+                                 separator=self.configuration.csvSeparator,
+                                 checkpoint=checkpoint)
+
+    def getSummaryFilePath(self, summaryFolderPath, costAttribute, outputFilename):
+        """
+        :return: csv or parquet file (depending on the ``summary_format``) of the summary of the cost attribute.
+        """
+        extension = ".parquet" if self.configuration.summaryFormat == "parquet" else ".csv"
+        return os.path.join(summaryFolderPath, getEnglishMeaning(costAttribute) + "_" + outputFilename + extension)
 
-        Logger.getInstance().info("Start createCostSummaryWithAdditionalProperties")
-        with Parallel(n_jobs=int(getConfigurationProperties(section="PARALLELIZATION")["jobs"]),
-                      backend="threading",
-                      verbose=int(getConfigurationProperties(section="PARALLELIZATION")["verbose"])) as parallel:
-            # while len(verticesID) <= len(geojson["features"]):
-            parallel._print = parallel_job_print
-            returns = parallel(delayed(createCostSummaryWithAdditionalProperties)(self,
-                                                                                  costAttribute,
-                                                                                  copy.deepcopy(startPointFeature),
-                                                                                  copy.deepcopy(endPointFeature),
-                                                                                  costSummaryMap)
-                               for startPointFeature in startPointsFeaturesList
-                               for endPointFeature in endPointsFeaturesList)
-
-            for newFeature in returns:
-                if newFeature:
-                    features.append(newFeature)
-                    # print(returns)
-
-        Logger.getInstance().info("End createCostSummaryWithAdditionalProperties")
+    def compressSummaryFile(self, summaryFolderPath, filepath):
+        """
+        Add the csv summary to the summary_csv.zip and delete it (unless debug). The parquet summaries are already
+        compressed, they are kept as they are.
 
-        ################################################################################################################
+        :param summaryFolderPath: Summary folder.
+        :param filepath: Summary file.
+        """
+        if not filepath.endswith(".csv"):
+            return
 
-        totals["features"] = features
+        self.fileActions.compressOutputFile(
+            folderPath=summaryFolderPath,
+            zip_filename="summary_csv.zip",
+            filepath=filepath
+        )
+
+        if not self.configuration.debug:
+            self.fileActions.deleteFile(folderPath=summaryFolderPath, filename=os.path.basename(filepath))
+
+    def storeGeneralSummary(self, costAttributes, startPointsFeaturesList, endVerticesID, endPointsFeaturesList,
+                            outputFolderPath, outputFilename):
+        """
+        Calculate the cost summary of the start points in blocks of ``checkpoint_vertices`` points, attach the
+        additional properties of the start and end points to the cost of each pair of points and append the features
+        to the summary geojson and the rows to the csv (or parquet) summary of each cost attribute as soon as the
+        block is finished. The memory used is bounded by the block size, as in the ``matrixOnly`` summaries.
+
+        :param costAttributes: List of attributes used to calculate the impedance of the Shortest Path algorithm.
+        :param startPointsFeaturesList: Start point features with the nearest vertex information.
+        :param endVerticesID: End vertices.
+        :param endPointsFeaturesList: End point features with the nearest vertex information.
+        :param outputFolderPath: Folder containing the shortest path geojson features.
+        :param outputFilename: Filename to give to the summary file.
+        :return: None. Store the information in the ``outputFolderPath``.
+        """
         if not outputFolderPath.endswith(os.sep):
             summaryFolderPath = outputFolderPath + os.sep + "summary" + os.sep
         else:
             summaryFolderPath = outputFolderPath + "summary" + os.sep
 
-        pointIdentifierKey = getConfigurationProperties(section="WFS_CONFIG")["point_identifier"]
-        columns = {
-            "startPoint_" + pointIdentifierKey: "ykr_from_id",
-            "endPoint_" + pointIdentifierKey: "ykr_to_id",
-            "total_travel_time": "travel_time"
-        }
-
+        columns = self.getSummaryColumns()
+        # the summaries of every cost attribute are stored in the same zip files
+        geojsonWriters = {costAttribute: SummaryGeojsonWriter(os.path.join(
+            summaryFolderPath, getEnglishMeaning(costAttribute) + "_" + outputFilename + ".geojson"))
+            for costAttribute in costAttributes}
+        writers = {costAttribute: self.createSummaryWriter(summaryFolderPath=summaryFolderPath,
+                                                           costAttribute=costAttribute,
+                                                           outputFilename=outputFilename)
+                   for costAttribute in costAttributes}
 
-        filepath = self.fileActions.writeFile(folderPath=summaryFolderPath, filename=outputFilename + ".geojson",
-                                              data=totals)
-        del totals
-
-        dataframeSummary = self.operations.calculateTravelTimeFromGeojsonFile(
-            travelTimeSummaryURL=filepath
-        )
-
-        dataframeSummary = self.operations.renameColumnsAndExtractSubSet(
-            travelTimeMatrix=dataframeSummary,
-            columns=columns
-        )
+        Logger.getInstance().info("Start cost summary calculation")
+        blockSize = max(1, self.configuration.checkpointVertices)
+        try:
+            for blockStart in range(0, len(startPointsFeaturesList), blockSize):
+                blockStartPointsFeaturesList = startPointsFeaturesList[blockStart:blockStart + blockSize]
+                blockStartVerticesID = list(dict.fromkeys(feature["properties"]["vertex_id"]
+                                                          for feature in blockStartPointsFeaturesList))
+                blockTotals = self.calculateCostSummaries(startVerticesID=blockStartVerticesID,
+                                                          endVerticesID=endVerticesID,
+                                                          costAttributes=costAttributes)
+
+                for costAttribute, totals in blockTotals.items():
+                    summaryDataFrame = self.createSummaryDataFrame(costAttribute=costAttribute,
+                                                                   totals=totals,
+                                                                   startPointsFeaturesList=blockStartPointsFeaturesList,
+                                                                   endPointsFeaturesList=endPointsFeaturesList)
+                    if summaryDataFrame.empty:
+                        continue
+
+                    totals["features"] = self.createSummaryFeatures(summaryDataFrame, totals)
+                    geojsonWriters[costAttribute].writeFeatures(totals)
+
+                    dataframeSummary = self.operations.calculateTravelTimeFromDataframe(summaryDataFrame)
+                    dataframeSummary = self.operations.renameColumnsAndExtractSubSet(
+                        travelTimeMatrix=dataframeSummary,
+                        columns=columns
+                    )
+                    writers[costAttribute].writeRows(*[dataframeSummary[column].values
+                                                       for column in columns.values()])
+        finally:
+            for writer in list(geojsonWriters.values()) + list(writers.values()):
+                writer.close()
+        Logger.getInstance().info("End cost summary calculation")
 
-        outputFilename = getEnglishMeaning(costAttribute) + "_" + outputFilename
+        for costAttribute in costAttributes:
+            geojsonWriter = geojsonWriters[costAttribute]
+            Logger.getInstance().info("%s features stored in %s" % (geojsonWriter.numberOfFeatures,
+                                                                    geojsonWriter.filePath))
+            self.fileActions.compressOutputFile(
+                folderPath=summaryFolderPath,
+                zip_filename="summary.zip",
+                filepath=geojsonWriter.filePath
+            )
 
-        csv_separator = getConfigurationProperties(section="WFS_CONFIG")["csv_separator"]
-        csv_path = os.path.join(summaryFolderPath, outputFilename + ".csv")
+            if not self.configuration.debug:
+                self.fileActions.deleteFile(folderPath=summaryFolderPath,
+                                            filename=os.path.basename(geojsonWriter.filePath))
 
-        if not os.path.exists(summaryFolderPath):
-            os.makedirs(summaryFolderPath)
+            self.compressSummaryFile(summaryFolderPath=summaryFolderPath, filepath=writers[costAttribute].filePath)
 
-        dataframeSummary.to_csv(csv_path, sep=csv_separator, index=False)
+    def calculateCostSummaries(self, startVerticesID, endVerticesID, costAttributes):
+        """
+        :return: Dictionary {cost attribute: shortest path summary json with the total_cost of each pair of
+                 vertices}, all the cost attributes are calculated in a single routing pass.
+        """
+        if len(costAttributes) == 1:
+            return {costAttributes[0]: self.transportMode.getTotalShortestPathCost(
+                startVerticesID=startVerticesID,
+                endVerticesID=endVerticesID,
+                costAttribute=costAttributes[0]
+            )}
 
-        self.fileActions.compressOutputFile(
-            folderPath=summaryFolderPath,
-            zip_filename="summary.zip",
-            filepath=filepath
+        allImpedancesTotals = self.transportMode.getTotalShortestPathCostAllImpedances(
+            startVerticesID=startVerticesID,
+            endVerticesID=endVerticesID,
+            costAttributes=costAttributes
         )
+        return {costAttribute: extractImpedanceCostSummary(allImpedancesTotals, costAttribute)
+                for costAttribute in costAttributes}
 
-        self.fileActions.compressOutputFile(
-            folderPath=summaryFolderPath,
-            zip_filename="summary_csv.zip",
-            filepath=csv_path
-        )
+    def getSummaryColumns(self):
+        """
+        :return: Dictionary {summary property: csv column} of the columns stored in the csv summary.
+        """
+        pointIdentifierKey = self.configuration.pointIdentifier
+        return {
+            "startPoint_" + pointIdentifierKey: "ykr_from_id",
+            "endPoint_" + pointIdentifierKey: "ykr_to_id",
+            "total_travel_time": "travel_time"
+        }
 
-        debug = False
-        if "debug" in getConfigurationProperties(section="WFS_CONFIG"):
-            debug = "True".__eq__(getConfigurationProperties(section="WFS_CONFIG")["debug"])
+    def getNearestVertexCache(self):
+        """
+        :return: The persistent nearest vertex cache of the transport mode network, None if the ``nearest_vertex_cache``
+                 file is not configured.
+        """
+        if self.nearestVertexCache is None:
+            filePath = self.configuration.getString("CACHE", "nearest_vertex_cache")
+            if not filePath:
+                return None
+
+            self.nearestVertexCache = NearestVertexCache(filePath=filePath,
+                                                         tableName=self.transportMode.tableName,
+                                                         modeFilter=self.transportMode.getRoutableEdgeFilterSQL(),
+                                                         networkFingerprint=self.transportMode.getNetworkFingerprint())
+        return self.nearestVertexCache
+
+    def getRouteCache(self):
+        """
+        :return: The persistent route cache of the transport mode network, None if the ``route_cache`` file is not
+                 configured.
+        """
+        if self.routeCache is None:
+            filePath = self.configuration.getString("CACHE", "route_cache")
+            if not filePath:
+                return None
+
+            self.routeCache = RouteCache(filePath=filePath,
+                                         tableName=self.transportMode.tableName,
+                                         modeFilter=self.transportMode.getRoutableEdgeFilterSQL(),
+                                         networkFingerprint=self.transportMode.getNetworkFingerprint(),
+                                         maxRoutes=self.configuration.routeCacheMaxRoutes)
+        return self.routeCache
+
+    def getShortestPathsFromAnOrigin(self, startVertexId, endVerticesID, cost):
+        """
+        Retrieve the shortest paths from the start vertex to the end vertices, the paths found in the route cache are
+        rebuilt from their edges and only the other ones are searched by the transport mode.
 
-        if not debug:
-            self.fileActions.deleteFile(folderPath=summaryFolderPath, filename=outputFilename + ".geojson")
-            self.fileActions.deleteFile(folderPath=summaryFolderPath, filename=outputFilename + ".csv")
+        :return: Dictionary {end vertex id: Geojson (Geometry type: LineString) with the segment features of the
+                 shortest path}.
+        """
+        routeCache = self.getRouteCache()
+        if routeCache is None:
+            return self.transportMode.getShortestPathsFromAnOrigin(startVertexId, endVerticesID, cost)
+
+        endVerticesID = list(dict.fromkeys(endVerticesID))
+        cachedRoutes = routeCache.getRoutes(cost, startVertexId, endVerticesID)
+        shortestPaths = self.transportMode.getShortestPathsFromEdges(cachedRoutes) if cachedRoutes else {}
+
+        missingEndVerticesID = [endVertexId for endVertexId in endVerticesID if endVertexId not in cachedRoutes]
+        if missingEndVerticesID:
+            newShortestPaths = self.transportMode.getShortestPathsFromAnOrigin(startVertexId, missingEndVerticesID,
+                                                                               cost)
+            routeCache.putRoutes(cost, startVertexId, {
+                endVertexId: self.transportMode.getShortestPathEdges(shortestPath)
+                for endVertexId, shortestPath in newShortestPaths.items()
+            })
+            shortestPaths.update(newShortestPaths)
+
+        return shortestPaths
 
     @dgl_timer
     def getVerticesID(self, geojson, endEPSGCode):
+        """
+        Find the nearest routable vertex of every point feature, snapping all the points not found in the
+        ``nearestVerticesCache`` with a single call to the transport mode. The points missed by the bulk snapping are
+        looked up again one by one with ``getNearestRoutableVertexFromAPoint``.
+
+        :raises NearestVertexNotFoundException: If a point does not have any routable vertex nearby.
+
+        :param geojson: Point features.
+        :param endEPSGCode: Coordinate reference system of the point features.
+        :return: List of vertex ids and list of features with the nearest vertex properties.
+        """
+        pointIdentifierKey = self.configuration.pointIdentifier
+        transportModeEPSGCode = self.transportMode.getEPSGCode()
+
+        pendingFeatures = []
+        pendingPoints = []
+        pendingPointKeys = []
+        pendingPointIds = set()
+        for feature in geojson["features"]:
+            pointId = feature["properties"][pointIdentifierKey]
+            if pointId in self.nearestVerticesCache or pointId in pendingPointIds:
+                continue
+
+            coordinates = feature["geometry"]["coordinates"]
+            featurePoint = Point(latitute=coordinates[1],
+                                 longitude=coordinates[0],
+                                 epsgCode=endEPSGCode)
+            pendingFeatures.append(feature)
+            pendingPoints.append(featurePoint)
+            pendingPointKeys.append((pointId, NearestVertexCache.createCoordinatesHash(featurePoint)))
+            pendingPointIds.add(pointId)
+
+        pendingPoints = self.operations.transformPoints(pendingPoints, transportModeEPSGCode)
+
+        nearestVertexCache = self.getNearestVertexCache()
+        cachedVertices = {}
+        if nearestVertexCache and pendingPointKeys:
+            cachedVertices = nearestVertexCache.getVertices(pendingPointKeys)
+            Logger.getInstance().info("Nearest vertices found in the persistent cache: %s of %s" % (
+                len(cachedVertices), len(pendingPointKeys)))
+
+        snappingPositions = [position for position, pointKey in enumerate(pendingPointKeys)
+                             if pointKey not in cachedVertices]
+        vertexIDs, vertexCoordinates = self.transportMode.getNearestRoutableVerticesFromPoints(
+            [pendingPoints[position] for position in snappingPositions])
+
+        # the vertex coordinates are stored in the coordinate reference system of the network geojson
+        verticesEPSGCode = GPD_CRS.PSEUDO_MERCATOR["init"]
+        newCacheEntries = []
+        for position, vertexID, coordinates in zip(snappingPositions, vertexIDs, vertexCoordinates):
+            if vertexID < 0:
+                pointId = pendingFeatures[position]["properties"][pointIdentifierKey]
+                nearestVertexGeojson = self.transportMode.getNearestRoutableVertexFromAPoint(pendingPoints[position])
+                if len(nearestVertexGeojson["features"]) == 0:
+                    raise NearestVertexNotFoundException("Nearest routable vertex not found for the point: %s" %
+                                                         pointId)
+
+                newFeaturePoint = nearestVertexGeojson["features"][0]
+                vertexID = newFeaturePoint["properties"]["id"]
+                nearestPoint = self.operations.transformPoint(
+                    createPointFromPointFeature(newFeaturePoint, extractCRS(nearestVertexGeojson)), verticesEPSGCode)
+                coordinates = (nearestPoint.getLongitude(), nearestPoint.getLatitude())
+
+            cachedVertices[pendingPointKeys[position]] = (int(vertexID), coordinates[0], coordinates[1])
+            newCacheEntries.append(pendingPointKeys[position] + (int(vertexID), coordinates[0], coordinates[1]))
+
+        if nearestVertexCache and newCacheEntries:
+            nearestVertexCache.putVertices(newCacheEntries)
+
+        nearestPoints = self.operations.transformPoints(
+            [Point(latitute=cachedVertices[pointKey][2],
+                   longitude=cachedVertices[pointKey][1],
+                   epsgCode=verticesEPSGCode) for pointKey in pendingPointKeys], transportModeEPSGCode)
+        for feature, featurePoint, pointKey, nearestPoint in zip(pendingFeatures, pendingPoints, pendingPointKeys,
+                                                                 nearestPoints):
+            pointId = feature["properties"][pointIdentifierKey]
+            vertexID = cachedVertices[pointKey][0]
+            addNearestVertexProperties(feature, vertexID, featurePoint, nearestPoint)
+            self.nearestVerticesCache[pointId] = (vertexID, feature)
 
         verticesID = []
         features = []
-
-        # for feature in geojson["features"]:
-        #     vertexID, feature = self.extractFeatureInformation(endEPSGCode, feature)
-        #
-        #     verticesID.append(vertexID)
-        #     features.append(feature)
-        with Parallel(n_jobs=int(getConfigurationProperties(section="PARALLELIZATION")["jobs"]),
-                      backend="threading",
-                      verbose=int(getConfigurationProperties(section="PARALLELIZATION")["verbose"])) as parallel:
-            # while len(verticesID) <= len(geojson["features"]):
-            parallel._print = parallel_job_print
-            returns = parallel(
-                delayed(extractFeatureInformation)(self, endEPSGCode, feature, self.transportMode, self.operations)
-                for feature in geojson["features"])
-            for vertexID, feature in returns:
+        for feature in geojson["features"]:
+            pointId = feature["properties"][pointIdentifierKey]
+            if pointId in self.nearestVerticesCache:
+                vertexID, feature = self.nearestVerticesCache[pointId]
                 verticesID.append(vertexID)
                 features.append(feature)
-                # print(returns)
 
         return verticesID, features
-
-    @dgl_timer
-    def createCostSummaryMap(self, totals):
-        """
-
-        :param totals:
-        :return:
-        """
-        """
-            {
-                "startId1": {
-                    endId1: {feature1},
-                    endId2: {feature2}
-                }
-                "startId2": {
-                    endId1: {feature3},
-                    endId2: {feature4}
-                }
-            }
-            
-        """
-
-        costSummaryMap = {}
-        for featureShortPathSummary in totals["features"]:
-            startVertexID = featureShortPathSummary["properties"]["start_vertex_id"]
-            endVertexID = featureShortPathSummary["properties"]["end_vertex_id"]
-            if startVertexID not in costSummaryMap:
-                costSummaryMap[startVertexID] = {}
-
-            startVertexMap = costSummaryMap[startVertexID]
-            startVertexMap[endVertexID] = featureShortPathSummary
-
-        return costSummaryMap
@@ -1,59 +1,134 @@
+import copy
 import json
 import os
+from functools import lru_cache
 
 import geopandas as gpd
 import numpy as np
 import nvector as nv
-from pyproj import Proj, transform
+from pyproj import Transformer
 
+from digiroad.cache.AdditionalLayersCache import AdditionalLayersCache
 from digiroad.entities import Point
-from digiroad.util import getConfigurationProperties, GPD_CRS, dgl_timer, Logger
+from digiroad.util import Configuration, GPD_CRS, dgl_timer, Logger, PostfixAttribute
 
 from digiroad.util import getFormattedDatetime, timeDifference
 
 
+WGS84_SEMI_MAJOR_AXIS = 6378137.0
+WGS84_FLATTENING = 1 / 298.257223563
+WGS84_ECCENTRICITY_SQUARED = WGS84_FLATTENING * (2 - WGS84_FLATTENING)
+
+
+@lru_cache(maxsize=None)
+def getTransformer(epsgCode, targetEPSGCode):
+    """
+    The PROJ initialization of a transformation is expensive, so the transformers are created once per pair of
+    coordinate reference systems and shared (pyproj transformers are thread-safe).
+
+    :param epsgCode: Source CRS in lower case, e.g. "epsg:3857".
+    :param targetEPSGCode: Target CRS in lower case.
+    :return: Transformer with the coordinates in (x, y)/(longitude, latitude) order.
+    """
+    return Transformer.from_crs(epsgCode, targetEPSGCode, always_xy=True)
+
+
+def geodeticToECEF(longitudes, latitudes):
+    """
+    :param longitudes: Array of WGS84 longitudes in degrees.
+    :param latitudes: Array of WGS84 latitudes in degrees.
+    :return: Array (3, n) with the ECEF coordinates in meters of the points at the ellipsoid surface.
+    """
+    longitudes = np.radians(longitudes)
+    latitudes = np.radians(latitudes)
+    sinLatitudes = np.sin(latitudes)
+    primeVerticalRadius = WGS84_SEMI_MAJOR_AXIS / np.sqrt(1 - WGS84_ECCENTRICITY_SQUARED * sinLatitudes ** 2)
+
+    return np.array([primeVerticalRadius * np.cos(latitudes) * np.cos(longitudes),
+                     primeVerticalRadius * np.cos(latitudes) * np.sin(longitudes),
+                     primeVerticalRadius * (1 - WGS84_ECCENTRICITY_SQUARED) * sinLatitudes])
+
+
+def readPolygonLayer(polygonsURL, attributes):
+    """
+    :param polygonsURL: Polygons file.
+    :param attributes: Polygons attributes to be merged.
+    :return: GeoDataFrame with the attributes and geometry of the polygons in WGS84, with its spatial index built.
+    """
+    columns = list(attributes)
+    if "geometry" not in columns:
+        columns.append("geometry")
+
+    polygons = gpd.read_file(polygonsURL)[columns].to_crs(GPD_CRS.WGS_84)
+    # geopandas builds the spatial index lazily on its first access, it is built up front so the cached layer is
+    # shared by the sjoin of every points file with its index already built
+    _spatialIndex = polygons.sindex
+    return polygons
+
+
 class Operations:
-    def __init__(self, fileActions):
+    def __init__(self, fileActions, configuration=None):
         self.fileActions = fileActions
+        self.configuration = configuration if configuration else Configuration.getInstance()
 
     @dgl_timer
-    def mergeAdditionalLayers(self, originalJsonURL, outputFolderPath):
+    def mergeAdditionalLayers(self, originalJsonURL):
         """
         Merge all the layers listed in the ./resources/configuration.properties with the original json that contains the
         selected points.
 
+        The merge is done in memory and cached (see ``AdditionalLayersCache``), the same points file is merged only
+        once while the points file and the layers do not change.
+
         :param originalJsonURL: Points of interest.
-        :param outputFolderPath: Output folder to store the temporal files.
         :return: Merged layer in geojson format.
         """
 
-        layerNames = getConfigurationProperties("GEOJSON_LAYERS")
-        layerAttributes = getConfigurationProperties("GEOJSON_LAYERS_ATTRIBUTES")
+        layerNames = self.configuration.getSection("GEOJSON_LAYERS")
+        layerAttributes = self.configuration.getSection("GEOJSON_LAYERS_ATTRIBUTES")
+        layers = [(layerName, layerNames[layerName], layerAttributes[layerName + "_attributes"].split(","))
+                  for layerName in layerNames]
 
-        originalJson = self.fileActions.readJson(originalJsonURL)
-        completeFilename = "mergedLayer.geojson"
-        temporalPath = outputFolderPath + os.sep + "temp"
-        temporalLayer = temporalPath + os.sep + completeFilename
-        self.fileActions.writeFile(folderPath=temporalPath,
-                                   filename=completeFilename,
-                                   data=originalJson)
+        additionalLayersCache = AdditionalLayersCache.getInstance()
+        key = AdditionalLayersCache.createMergedLayerKey(originalJsonURL, layers)
+        mergedLayer = additionalLayersCache.getMergedLayer(key)
+        if mergedLayer is None:
+            mergedLayer = self.mergeLayersInMemory(originalJsonURL, layers, additionalLayersCache)
+            additionalLayersCache.putMergedLayer(key, mergedLayer)
+        else:
+            Logger.getInstance().info("Additional layers of %s found in the cache" % originalJsonURL)
 
-        for layerName in layerNames:
-            attributes = layerAttributes[layerName + "_attributes"].split(",")
-            fields = tuple(attributes)
-            mergedLayer = self.mergeWithinPointsDataWithPolygonsAttributes(
-                temporalLayer,
-                layerNames[layerName],
-                *fields)
+        # the features are modified by the callers
+        return copy.deepcopy(mergedLayer)
 
-            self.fileActions.writeFile(folderPath=temporalPath,
-                                       filename=completeFilename,
-                                       data=mergedLayer)
+    def mergeLayersInMemory(self, pointsURL, layers, additionalLayersCache):
+        """
+        Same result as ``mergeWithinPointsDataWithPolygonsAttributes`` applied layer after layer, without writing and
+        reading the points after each layer. The polygon layers come from the cache with their spatial index (STRtree)
+        already built, and the points keep their original coordinates.
 
-        originalJson = self.fileActions.readJson(temporalLayer)
-        self.fileActions.deleteFolder(temporalPath)
+        :param pointsURL: Points of interest.
+        :param layers: List of (layer name, polygons file, attributes).
+        :param additionalLayersCache: Cache of the polygon layers.
+        :return: Merged layer in geojson format.
+        """
+        points = gpd.read_file(pointsURL)
+        originalPointsCRS = points.crs
+        mergedPoints = points.to_crs(GPD_CRS.WGS_84)
+
+        for layerName, polygonsURL, attributes in layers:
+            polygons = additionalLayersCache.getPolygonLayer(polygonsURL, attributes, readPolygonLayer)
+            mergedPoints = gpd.sjoin(mergedPoints, polygons, how="left").drop(columns="index_right")
 
-        return originalJson
+        # a point within several polygons is repeated, as in the sjoin
+        mergedPoints = gpd.GeoDataFrame(mergedPoints.drop(columns="geometry"),
+                                        geometry=points.geometry.loc[mergedPoints.index].values,
+                                        crs=originalPointsCRS)
+
+        jsonResult = json.loads(mergedPoints.to_json())
+        # geopandas is not exporting the CRS from the GeoDataFrame to the Geojson (see below)
+        jsonResult["crs"] = self.fileActions.readJson(pointsURL)["crs"]
+        return jsonResult
 
     def mergeWithinPointsDataWithPolygonsAttributes(self, pointsURL, polygonsURL, *fields):
         """
@@ -134,6 +209,63 @@ class Operations:
 
         return euclideanDistance
 
+    def calculateEuclideanDistances(self, startLongitudes, startLatitudes, endLongitudes, endLatitudes, epsgCode):
+        """
+        Vectorized ``calculateEuclideanDistance``: distances in meters between several pairs of points, calculated as
+        the norm of the difference of their WGS84 ECEF (earth-centered, earth-fixed) coordinates.
+
+        :param startLongitudes: Array with the x coordinate of the first points.
+        :param startLatitudes: Array with the y coordinate of the first points.
+        :param endLongitudes: Array with the x coordinate of the second points.
+        :param endLatitudes: Array with the y coordinate of the second points.
+        :param epsgCode: CRS in which are given all the coordinates.
+        :return: Array with the euclidean distance between each pair of points in meters.
+        """
+        startLongitudes, startLatitudes = self.transformCoordinates(startLongitudes, startLatitudes, epsgCode)
+        endLongitudes, endLatitudes = self.transformCoordinates(endLongitudes, endLatitudes, epsgCode)
+
+        startECEF = geodeticToECEF(startLongitudes, startLatitudes)
+        endECEF = geodeticToECEF(endLongitudes, endLatitudes)
+        return np.linalg.norm(endECEF - startECEF, axis=0)
+
+    def transformCoordinates(self, longitudes, latitudes, epsgCode, targetEPSGCode="epsg:4326"):
+        """
+        Vectorized ``transformPoint``.
+
+        :return: Tuple of arrays (longitudes, latitudes) in the ``targetEPSGCode``.
+        """
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        if epsgCode.lower() == targetEPSGCode.lower():
+            return longitudes, latitudes
+
+        return getTransformer(epsgCode.lower(), targetEPSGCode.lower()).transform(longitudes, latitudes)
+
+    def transformPoints(self, points, targetEPSGCode="epsg:4326"):
+        """
+        Bulk ``transformPoint``: the points of each coordinate reference system are transformed in a single call.
+
+        :param points: List of points, in any CRS.
+        :param targetEPSGCode: Target CRS.
+        :return: List with the transformed points, in the same order.
+        """
+        transformedPoints = list(points)
+        positionsByEPSGCode = {}
+        for position, point in enumerate(points):
+            positionsByEPSGCode.setdefault(point.getEPSGCode(), []).append(position)
+
+        for epsgCode, positions in positionsByEPSGCode.items():
+            if epsgCode.lower() == targetEPSGCode.lower():
+                continue
+
+            longitudes, latitudes = self.transformCoordinates([points[position].getLongitude() for position in positions],
+                                                              [points[position].getLatitude() for position in positions],
+                                                              epsgCode, targetEPSGCode)
+            for position, longitude, latitude in zip(positions, longitudes.tolist(), latitudes.tolist()):
+                transformedPoints[position] = Point(latitute=latitude, longitude=longitude, epsgCode=targetEPSGCode)
+
+        return transformedPoints
+
     def transformPoint(self, point, targetEPSGCode="epsg:4326"):
         """
         Coordinates Transform from one CRS to another CRS.
@@ -145,10 +277,8 @@ class Operations:
         if point.getEPSGCode().lower() == targetEPSGCode.lower():
             return point
 
-        inProj = Proj(init=point.getEPSGCode())
-        outProj = Proj(init=targetEPSGCode)
-
-        lng, lat = transform(inProj, outProj, point.getLongitude(), point.getLatitude())
+        lng, lat = getTransformer(point.getEPSGCode().lower(), targetEPSGCode.lower()).transform(point.getLongitude(),
+                                                                                                 point.getLatitude())
 
         return Point(latitute=lat, longitude=lng, epsgCode=targetEPSGCode)
 
@@ -182,6 +312,27 @@ class Operations:
 
         return travelTimeSummaryDF
 
+    def calculateStartPointTravelTime(self, startPointProperties):
+        """
+        :param startPointProperties: Additional properties of the start point (startPoint_ prefix).
+        :return: Part of the total travel time that only depends on the start point, as in
+                 ``calculateTravelTimeFromDataframe``.
+        """
+        prefix = "startPoint_"
+        return startPointProperties[prefix + PostfixAttribute.EUCLIDEAN_DISTANCE + PostfixAttribute.WALKING_TIME] + \
+               startPointProperties[prefix + PostfixAttribute.AVG_WALKING_DISTANCE + PostfixAttribute.WALKING_TIME]
+
+    def calculateEndPointTravelTime(self, endPointProperties):
+        """
+        :param endPointProperties: Additional properties of the end point (endPoint_ prefix).
+        :return: Part of the total travel time that only depends on the end point, as in
+                 ``calculateTravelTimeFromDataframe``.
+        """
+        prefix = "endPoint_"
+        return endPointProperties[prefix + PostfixAttribute.PARKING_TIME] + \
+               endPointProperties[prefix + PostfixAttribute.AVG_WALKING_DISTANCE + PostfixAttribute.WALKING_TIME] + \
+               endPointProperties[prefix + PostfixAttribute.EUCLIDEAN_DISTANCE + PostfixAttribute.WALKING_TIME]
+
     @dgl_timer
     def renameColumnsAndExtractSubSet(self, travelTimeMatrix, columns, geometryColumn="geometry"):
         if columns:
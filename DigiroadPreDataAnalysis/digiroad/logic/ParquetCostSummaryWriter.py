@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+class ParquetCostSummaryWriter:
+    SCHEMA = pa.schema([
+        ("ykr_from_id", pa.int32()),
+        ("ykr_to_id", pa.int32()),
+        ("cost_attribute", pa.dictionary(pa.int8(), pa.string())),
+        ("travel_time", pa.float32())
+    ])
+
+    def __init__(self, parquetFilePath, costAttribute, rowGroupSize=1000000, compression="zstd"):
+        """
+        Parquet version of the ``CostSummaryWriter``: the rows are buffered and written as a row group every
+        ``rowGroupSize`` rows, sorted by ykr_from_id so the readers can load single origins using the row group
+        statistics.
+
+        Compact types are used: int32 point identifiers, float32 travel times and the cost attribute dictionary
+        encoded, so the summaries of several cost attributes can be read together as a single dataset.
+
+        :param parquetFilePath: parquet file, overwritten if it already exists.
+        :param costAttribute: Name of the cost attribute stored in the cost_attribute column.
+        :param rowGroupSize: Number of rows of each row group.
+        :param compression: Parquet compression codec.
+        """
+        folder = os.path.dirname(parquetFilePath)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
+        self.filePath = parquetFilePath
+        self.costAttribute = costAttribute
+        self.rowGroupSize = rowGroupSize
+        self.numberOfRows = 0
+        self.__buffer = []
+        self.__bufferSize = 0
+        self.__writer = pq.ParquetWriter(parquetFilePath, ParquetCostSummaryWriter.SCHEMA, compression=compression)
+
+    def writeRows(self, startPointsID, endPointsID, travelTimes):
+        """
+        :param startPointsID: Integer identifiers of the start points (ykr_from_id).
+        :param endPointsID: Integer identifiers of the end points (ykr_to_id).
+        :param travelTimes: Total travel time of each pair of points.
+        """
+        columns = (np.asarray(startPointsID).astype(np.int32),
+                   np.asarray(endPointsID).astype(np.int32),
+                   np.asarray(travelTimes).astype(np.float32))
+        if len(columns[0]) == 0:
+            return
+
+        self.__buffer.append(columns)
+        self.__bufferSize += len(columns[0])
+        self.numberOfRows += len(columns[0])
+        if self.__bufferSize >= self.rowGroupSize:
+            self.__flush()
+
+    def __flush(self):
+        if not self.__buffer:
+            return
+
+        startPointsID, endPointsID, travelTimes = [np.concatenate(column) for column in zip(*self.__buffer)]
+        order = np.lexsort((endPointsID, startPointsID))
+        costAttributes = pa.DictionaryArray.from_arrays(np.zeros(len(order), dtype=np.int8), [self.costAttribute])
+
+        table = pa.Table.from_arrays([pa.array(startPointsID[order]),
+                                      pa.array(endPointsID[order]),
+                                      costAttributes,
+                                      pa.array(travelTimes[order])],
+                                     schema=ParquetCostSummaryWriter.SCHEMA)
+        self.__writer.write_table(table, row_group_size=len(order))
+        self.__buffer = []
+        self.__bufferSize = 0
+
+    def close(self):
+        self.__flush()
+        self.__writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,388 @@
+import base64
+import json
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from digiroad.util import GeometryType
+
+
+def createRouteSummaryFeature(shortestPath, costAttribute):
+    """
+    Summary feature of a shortest path: the overall properties plus the sum of the segment properties, with a
+    LineString made of the first and last segments.
+
+    :param shortestPath: Shortest path geojson with its ``overallProperties``.
+    :param costAttribute: English name of the cost attribute of the shortest path.
+    :return: Summary feature, None if the shortest path has no segments (the end point is not reachable or both
+             points have the same nearest vertex).
+    """
+    if not shortestPath["features"]:
+        return None
+
+    summaryFeature = {
+        "geometry": {
+            "coordinates": [
+            ],
+            "type": GeometryType.LINE_STRING
+        },
+        "properties": {
+            "costAttribute": costAttribute
+        }
+    }
+
+    for property in shortestPath["overallProperties"]:
+        summaryFeature["properties"][property] = shortestPath["overallProperties"][property]
+
+    startPoints = None
+    endPoints = None
+    lastSequence = 1
+
+    for segmentFeature in shortestPath["features"]:
+        for key in segmentFeature["properties"]:
+            if key == "seq":
+                if segmentFeature["properties"][key] == 1:
+                    # Sequence one is the first linestring geometry in the path
+                    startPoints = segmentFeature["geometry"]["coordinates"]
+                if segmentFeature["properties"][key] > lastSequence:
+                    # The last sequence is the last linestring geometry in the path
+                    endPoints = segmentFeature["geometry"]["coordinates"]
+                    lastSequence = segmentFeature["properties"][key]
+
+            if key not in ["id", "direction", "seq"]:
+                if key not in summaryFeature["properties"]:
+                    summaryFeature["properties"][key] = 0
+
+                summaryFeature["properties"][key] = summaryFeature["properties"][key] + \
+                                                    segmentFeature["properties"][key]
+
+    summaryFeature["geometry"]["coordinates"] = summaryFeature["geometry"]["coordinates"] + startPoints
+
+    startAndEndPointAreDifferent = lastSequence > 1
+    if startAndEndPointAreDifferent:
+        summaryFeature["geometry"]["coordinates"] = summaryFeature["geometry"]["coordinates"] + endPoints
+
+    return summaryFeature
+
+
+def encodeEdges(edgeIDs):
+    """
+    :param edgeIDs: Ordered edge ids of a route.
+    :return: Tuple (dtype, base64 text) of the ids as a little endian int32 array, int64 if an id does not fit.
+    """
+    edgeIDs = np.asarray(edgeIDs, dtype=np.int64)
+    dtype = "<i4" if len(edgeIDs) == 0 or (edgeIDs.min() >= np.iinfo(np.int32).min and
+                                          edgeIDs.max() <= np.iinfo(np.int32).max) else "<i8"
+    return dtype, base64.b64encode(edgeIDs.astype(dtype).tobytes()).decode("ascii")
+
+
+def decodeEdges(dtype, edges):
+    return np.frombuffer(base64.b64decode(edges), dtype=dtype).tolist()
+
+
+def encodeBits(bits):
+    """
+    :param bits: List of booleans.
+    :return: Base64 text of the packed bits.
+    """
+    return base64.b64encode(np.packbits(np.asarray(bits, dtype=bool)).tobytes()).decode("ascii")
+
+
+def decodeBits(bits, length):
+    return np.unpackbits(np.frombuffer(base64.b64decode(bits), dtype=np.uint8))[:length].astype(bool).tolist()
+
+
+def getLineEndpoints(geometry):
+    """
+    :param geometry: LineString or MultiLineString geojson geometry.
+    :return: Tuple (first coordinates, last coordinates) of the line.
+    """
+    coordinates = geometry["coordinates"]
+    if geometry["type"] == "MultiLineString":
+        return tuple(coordinates[0][0]), tuple(coordinates[-1][-1])
+    return tuple(coordinates[0]), tuple(coordinates[-1])
+
+
+def getReversedSegments(geometries):
+    """
+    Find the segments of a route travelled against their digitizing direction, joining each segment with the next
+    one (the last segment with the previous one).
+
+    :param geometries: Geometries of the route segments, in travel order.
+    :return: List with True for the segments travelled from their last to their first coordinates.
+    """
+    endpoints = [getLineEndpoints(geometry) for geometry in geometries]
+    reversedSegments = []
+    for position, (first, last) in enumerate(endpoints):
+        if position + 1 < len(endpoints):
+            reversedSegments.append(last not in endpoints[position + 1] and first in endpoints[position + 1])
+        elif position > 0:
+            reversedSegments.append(first not in endpoints[position - 1] and last in endpoints[position - 1])
+        else:
+            reversedSegments.append(False)
+    return reversedSegments
+
+
+def reverseGeometry(geometry):
+    if geometry["type"] == "MultiLineString":
+        coordinates = [line[::-1] for line in geometry["coordinates"][::-1]]
+    else:
+        coordinates = geometry["coordinates"][::-1]
+    return dict(geometry, coordinates=coordinates)
+
+
+class RouteStore:
+    METADATA_FILENAME = "routeStore.json"
+    SUMMARY_FILENAME = "routeSummary.ndjson"
+    SHARD_FILENAME = "routes-%05d.ndjson"
+    EDGES_FILENAME = "edges.sqlite"
+    ROUTE_FORMAT = "edges"
+
+    def __init__(self, folderPath, costAttribute, storeRoutes=True, routesPerShard=10000):
+        """
+        Consolidated store of the shortest paths of a cost attribute, instead of one geojson file per pair of points.
+
+        Each route is appended to shards of ``routesPerShard`` routes as a compact line: the int32 array of its edge
+        ids, one bit per edge set when the edge is travelled against its digitizing direction, the totals of the
+        segment attributes and the overall properties. The segment features (geometry and attributes) are stored
+        once per edge in the edge store of the folder, and the route geojson is rebuilt from them only when it is
+        read with ``iterateRoutes``.
+
+        The summary feature of each route (the features of ``createDetailedSummary``) is calculated and appended to
+        the route summary while the routes are produced, so the routes are never read again to summarize them.
+
+        :param folderPath: Folder of the cost attribute, e.g. <outputFolder>/geoms/distance/.
+        :param costAttribute: English name of the cost attribute.
+        :param storeRoutes: False to only store the route summary (``storeShortPathFile=False``).
+        :param routesPerShard: Maximum number of routes per shard.
+        """
+        if not os.path.exists(folderPath):
+            os.makedirs(folderPath)
+
+        self.folderPath = folderPath
+        self.costAttribute = costAttribute
+        self.storeRoutes = storeRoutes
+        self.routesPerShard = routesPerShard
+        self.numberOfRoutes = 0
+        self.crs = None
+        self.shards = []
+        self.__lock = threading.Lock()
+        self.__shardFile = None
+        self.__summaryFile = open(os.path.join(folderPath, RouteStore.SUMMARY_FILENAME), "w")
+        self.__storedEdges = set()
+        self.__edgesConnection = None
+        if storeRoutes:
+            edgesFilePath = os.path.join(folderPath, RouteStore.EDGES_FILENAME)
+            if os.path.exists(edgesFilePath):
+                os.remove(edgesFilePath)
+            self.__edgesConnection = sqlite3.connect(edgesFilePath, check_same_thread=False)
+            self.__edgesConnection.execute("CREATE TABLE edge (edge_id INTEGER PRIMARY KEY, feature TEXT NOT NULL)")
+
+    def addRoute(self, routeId, shortestPath):
+        """
+        Thread-safe.
+
+        :param routeId: Identifier of the route, e.g. shortestPath-distance-<start point>-<end point>.
+        :param shortestPath: Shortest path geojson with its ``overallProperties``.
+        """
+        summaryFeature = createRouteSummaryFeature(shortestPath, self.costAttribute)
+        # the routes without segments are stored but they are not part of the summary
+        summaryLine = json.dumps(summaryFeature, sort_keys=True) + "\n" if summaryFeature else None
+
+        routeLine = None
+        features = []
+        if self.storeRoutes:
+            features = sorted(shortestPath["features"], key=lambda feature: feature["properties"]["seq"])
+            edgeIDs = [feature["properties"]["id"] for feature in features]
+            dtype, edges = encodeEdges(edgeIDs)
+            overallProperties = shortestPath["overallProperties"]
+            seqs = [feature["properties"]["seq"] for feature in features]
+            compactRoute = {
+                "routeId": routeId,
+                "dtype": dtype,
+                "edges": edges,
+                "reversed": encodeBits(getReversedSegments([feature["geometry"] for feature in features])),
+                "firstSeq": seqs[0] if seqs else 1,
+                "totals": {key: value for key, value in summaryFeature["properties"].items()
+                           if key not in overallProperties and key != "costAttribute"} if summaryFeature else {},
+                "overallProperties": overallProperties
+            }
+            if seqs != list(range(compactRoute["firstSeq"], compactRoute["firstSeq"] + len(seqs))):
+                # the sequences have gaps when the query groups several rows of the same edge
+                compactRoute["seqs"] = encodeEdges(seqs)[1]
+            routeLine = json.dumps(compactRoute) + "\n"
+
+        with self.__lock:
+            if self.crs is None:
+                self.crs = shortestPath.get("crs")
+
+            if summaryLine:
+                self.__summaryFile.write(summaryLine)
+            if routeLine:
+                if self.__shardFile is None or self.numberOfRoutes % self.routesPerShard == 0:
+                    self.__openShard()
+                self.__shardFile.write(routeLine)
+
+                # the feature of each edge is stored once, without the route dependent seq and feature id
+                newEdges = []
+                for feature in features:
+                    edgeID = feature["properties"]["id"]
+                    if edgeID not in self.__storedEdges:
+                        self.__storedEdges.add(edgeID)
+                        edgeFeature = {key: value for key, value in feature.items() if key != "id"}
+                        edgeFeature["properties"] = {key: value for key, value in feature["properties"].items()
+                                                     if key != "seq"}
+                        newEdges.append((edgeID, json.dumps(edgeFeature)))
+                self.__edgesConnection.executemany("INSERT OR IGNORE INTO edge (edge_id, feature) VALUES (?, ?)",
+                                                   newEdges)
+            self.numberOfRoutes += 1
+
+    def __openShard(self):
+        if self.__shardFile is not None:
+            self.__shardFile.close()
+            self.__edgesConnection.commit()
+        shardFilename = RouteStore.SHARD_FILENAME % len(self.shards)
+        self.shards.append(shardFilename)
+        self.__shardFile = open(os.path.join(self.folderPath, shardFilename), "w")
+
+    def close(self):
+        """
+        Close the files and store the metadata (crs, number of routes and shards) of the store.
+        """
+        with self.__lock:
+            if self.__shardFile is not None:
+                self.__shardFile.close()
+            if self.__edgesConnection is not None:
+                self.__edgesConnection.commit()
+                self.__edgesConnection.close()
+            self.__summaryFile.close()
+            with open(os.path.join(self.folderPath, RouteStore.METADATA_FILENAME), "w") as metadataFile:
+                json.dump({
+                    "costAttribute": self.costAttribute,
+                    "crs": self.crs,
+                    "format": RouteStore.ROUTE_FORMAT,
+                    "numberOfRoutes": self.numberOfRoutes,
+                    "shards": self.shards
+                }, metadataFile, sort_keys=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def isRouteStore(folderPath):
+        return os.path.isfile(os.path.join(folderPath, RouteStore.METADATA_FILENAME))
+
+    @staticmethod
+    def readMetadata(folderPath):
+        with open(os.path.join(folderPath, RouteStore.METADATA_FILENAME)) as metadataFile:
+            return json.load(metadataFile)
+
+    @staticmethod
+    def iterateSummaryFeatures(folderPath):
+        """
+        :return: Generator of the summary feature of each route of the store.
+        """
+        with open(os.path.join(folderPath, RouteStore.SUMMARY_FILENAME)) as summaryFile:
+            for line in summaryFile:
+                yield json.loads(line)
+
+    @staticmethod
+    def iterateCompactRoutes(folderPath):
+        """
+        :return: Generator of the compact routes of the store, dictionaries with the routeId, the list of edgeIDs,
+                 the list of reversed flags and seqs of the edges, the totals and the overallProperties of each
+                 route.
+        """
+        for shardFilename in RouteStore.readMetadata(folderPath)["shards"]:
+            with open(os.path.join(folderPath, shardFilename)) as shardFile:
+                for line in shardFile:
+                    route = json.loads(line)
+                    edgeIDs = decodeEdges(route.pop("dtype"), route.pop("edges"))
+                    route["edgeIDs"] = edgeIDs
+                    route["reversed"] = decodeBits(route["reversed"], len(edgeIDs))
+                    if "seqs" in route:
+                        route["seqs"] = decodeEdges("<i4", route["seqs"])
+                    else:
+                        route["seqs"] = list(range(route["firstSeq"], route["firstSeq"] + len(edgeIDs)))
+                    yield route
+
+    @staticmethod
+    def iterateRoutes(folderPath, travelOrder=False):
+        """
+        Rebuild the shortest path geojson of each route of the store from the edge store.
+
+        :param folderPath: Folder of the store.
+        :param travelOrder: True to reverse the geometry of the segments travelled against their digitizing direction.
+        :return: Generator of the shortest path geojson of each route of the store, with its ``routeId``.
+        """
+        metadata = RouteStore.readMetadata(folderPath)
+        if not metadata["shards"]:
+            return
+
+        connection = sqlite3.connect(os.path.join(folderPath, RouteStore.EDGES_FILENAME))
+        try:
+            for route in RouteStore.iterateCompactRoutes(folderPath):
+                features = {}
+                uniqueEdgeIDs = list(set(route["edgeIDs"]))
+                for blockStart in range(0, len(uniqueEdgeIDs), 500):
+                    blockEdgeIDs = uniqueEdgeIDs[blockStart:blockStart + 500]
+                    features.update(connection.execute(
+                        "SELECT edge_id, feature FROM edge WHERE edge_id IN (%s)" % ",".join("?" * len(blockEdgeIDs)),
+                        blockEdgeIDs).fetchall())
+
+                shortestPath = {
+                    "type": "FeatureCollection",
+                    "features": [],
+                    "totalFeatures": len(route["edgeIDs"]),
+                    "overallProperties": route["overallProperties"],
+                    "routeId": route["routeId"]
+                }
+                if metadata["crs"] is not None:
+                    shortestPath["crs"] = metadata["crs"]
+
+                for edgeID, isReversed, seq in zip(route["edgeIDs"], route["reversed"], route["seqs"]):
+                    feature = json.loads(features[edgeID])
+                    feature["properties"]["seq"] = seq
+                    if travelOrder and isReversed:
+                        feature["geometry"] = reverseGeometry(feature["geometry"])
+                    shortestPath["features"].append(feature)
+
+                yield shortestPath
+        finally:
+            connection.close()
+
+    @staticmethod
+    def writeSummary(folderPath, outputFilePath):
+        """
+        Stream the route summary of the store into a geojson FeatureCollection, without loading all the features.
+
+        :param folderPath: Folder of the store.
+        :param outputFilePath: Geojson file to create.
+        :return: Number of features of the summary.
+        """
+        outputFolderPath = os.path.dirname(outputFilePath)
+        if outputFolderPath and not os.path.exists(outputFolderPath):
+            os.makedirs(outputFolderPath)
+
+        metadata = RouteStore.readMetadata(folderPath)
+        totalFeatures = 0
+        with open(outputFilePath, "w") as outfile:
+            if metadata["crs"] is not None:
+                outfile.write('{"crs": %s, ' % json.dumps(metadata["crs"], sort_keys=True))
+            else:
+                outfile.write("{")
+            outfile.write('"features": [')
+            with open(os.path.join(folderPath, RouteStore.SUMMARY_FILENAME)) as summaryFile:
+                for line in summaryFile:
+                    if totalFeatures > 0:
+                        outfile.write(", ")
+                    outfile.write(line.rstrip("\n"))
+                    totalFeatures += 1
+            outfile.write('], "totalFeatures": %s, "type": "FeatureCollection"}' % totalFeatures)
+
+        return totalFeatures
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class RunManifest:
+    def __init__(self, filePath):
+        """
+        Persistent (SQLite) record of the work finished by a run, so a restarted run skips it.
+
+        A unit is a piece of work that is either finished or computed again (e.g. a start file, end file and impedance
+        of an entry list), and a unit can record the blocks already finished inside it with the state needed to resume
+        after them (e.g. the length of the summary files). Units and blocks are stored with a fingerprint of their
+        inputs, when the fingerprint changes the recorded work is discarded.
+
+        :param filePath: SQLite file, created if it does not exist.
+        """
+        folder = os.path.dirname(filePath)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
+        self.filePath = filePath
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(filePath, timeout=60, check_same_thread=False)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS unit ("
+                                  "unit_key TEXT PRIMARY KEY, "
+                                  "fingerprint TEXT NOT NULL, "
+                                  "completed_at REAL NOT NULL)")
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS block ("
+                                  "unit_key TEXT NOT NULL, "
+                                  "block_index INTEGER NOT NULL, "
+                                  "fingerprint TEXT NOT NULL, "
+                                  "state TEXT NOT NULL, "
+                                  "PRIMARY KEY (unit_key, block_index)) WITHOUT ROWID")
+        self.__connection.commit()
+
+    @staticmethod
+    def createFingerprint(*parts):
+        """
+        :param parts: Values identifying the inputs of a unit or block, their ``repr`` is hashed.
+        :return: Hash of the parts.
+        """
+        digest = hashlib.sha1()
+        for part in parts:
+            digest.update(repr(part).encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def createFileFingerprint(*filePaths):
+        """
+        :return: Hash of the path, modification time and size of the files, changing when any file is modified.
+        """
+        fileKeys = []
+        for filePath in filePaths:
+            fileStat = os.stat(filePath)
+            fileKeys.append((os.path.abspath(filePath), fileStat.st_mtime_ns, fileStat.st_size))
+        return RunManifest.createFingerprint(*fileKeys)
+
+    def isUnitCompleted(self, unitKey, fingerprint):
+        """
+        :return: True if the unit was completed with the same fingerprint.
+        """
+        with self.__lock:
+            row = self.__connection.execute("SELECT fingerprint FROM unit WHERE unit_key = ?", (unitKey,)).fetchone()
+        return row is not None and row[0] == fingerprint
+
+    def completeUnit(self, unitKey, fingerprint):
+        """
+        Record the unit as completed, its blocks are not needed anymore.
+        """
+        with self.__lock:
+            self.__connection.execute("INSERT OR REPLACE INTO unit (unit_key, fingerprint, completed_at) "
+                                      "VALUES (?, ?, ?)", (unitKey, fingerprint, time.time()))
+            self.__connection.execute("DELETE FROM block WHERE unit_key = ?", (unitKey,))
+            self.__connection.commit()
+
+    def getCompletedBlocks(self, unitKey, fingerprint):
+        """
+        Discard the blocks of the unit recorded with a different fingerprint.
+
+        :return: Dictionary {block index: state} of the completed blocks of the unit.
+        """
+        with self.__lock:
+            self.__connection.execute("DELETE FROM block WHERE unit_key = ? AND fingerprint != ?",
+                                      (unitKey, fingerprint))
+            self.__connection.commit()
+            rows = self.__connection.execute("SELECT block_index, state FROM block WHERE unit_key = ?",
+                                             (unitKey,)).fetchall()
+        return {blockIndex: json.loads(state) for blockIndex, state in rows}
+
+    def completeBlock(self, unitKey, fingerprint, blockIndex, state):
+        """
+        :param state: json serializable state needed to resume the unit after this block.
+        """
+        with self.__lock:
+            self.__connection.execute("INSERT OR REPLACE INTO block (unit_key, block_index, fingerprint, state) "
+                                      "VALUES (?, ?, ?, ?)", (unitKey, blockIndex, fingerprint, json.dumps(state)))
+            self.__connection.commit()
+
+    def discardBlocks(self, unitKey):
+        with self.__lock:
+            self.__connection.execute("DELETE FROM block WHERE unit_key = ?", (unitKey,))
+            self.__connection.commit()
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
@@ -0,0 +1,57 @@
+import json
+import os
+
+
+class SummaryGeojsonWriter:
+    def __init__(self, geojsonFilePath):
+        """
+        Append the features of a summary geojson block by block, so the whole FeatureCollection is never held in
+        memory. The file has the same content than ``FileActions.writeFile`` of the whole collection, except that the
+        features are numbered in the order they are written.
+
+        :param geojsonFilePath: geojson file, overwritten if it already exists.
+        """
+        folder = os.path.dirname(geojsonFilePath)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
+        self.filePath = geojsonFilePath
+        self.numberOfFeatures = 0
+        self.__suffix = None
+        self.__file = open(geojsonFilePath, "w")
+
+    def writeFeatures(self, geojson):
+        """
+        :param geojson: FeatureCollection with the next features, the other members (e.g. crs) of the first one are
+                        the members of the stored collection.
+        """
+        if self.__suffix is None:
+            self.__writeMembers(geojson)
+
+        for feature in geojson["features"]:
+            feature["id"] = str(self.numberOfFeatures)
+            if self.numberOfFeatures > 0:
+                self.__file.write(", ")
+            json.dump(feature, self.__file, sort_keys=True)
+            self.numberOfFeatures += 1
+
+    def __writeMembers(self, geojson):
+        members = sorted((key, value) for key, value in geojson.items() if key != "features")
+        before = ["%s: %s" % (json.dumps(key), json.dumps(value, sort_keys=True)) for key, value in members
+                  if key < "features"]
+        after = ["%s: %s" % (json.dumps(key), json.dumps(value, sort_keys=True)) for key, value in members
+                 if key > "features"]
+        self.__file.write("{" + "".join(member + ", " for member in before) + "\"features\": [")
+        self.__suffix = "]" + "".join(", " + member for member in after) + "}"
+
+    def close(self):
+        if self.__suffix is None:
+            self.__writeMembers({"type": "FeatureCollection"})
+        self.__file.write(self.__suffix)
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
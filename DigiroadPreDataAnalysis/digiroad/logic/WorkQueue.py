@@ -0,0 +1,149 @@
+import os
+import shutil
+import sqlite3
+import time
+
+from digiroad.util import FileActions
+
+
+class WorkQueue:
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    UNITS_FOLDER = "units"
+    SUMMARY_FOLDER = "summary"
+    # state of the incremental summaries, kept only in the unit folder
+    UNIT_STATE_SUFFIXES = ("_incremental.json", ".previous")
+
+    def __init__(self, filePath, timeout=60):
+        """
+        Durable (SQLite) queue of units of work shared by several processes: the coordinator adds the units and each
+        worker process claims the next pending unit, runs it and reports if it is done or failed.
+
+        Every process must open its own WorkQueue (the SQLite connection can not be shared between processes).
+
+        :param filePath: SQLite file, created if it does not exist.
+        :param timeout: Seconds to wait for the lock of the other processes.
+        """
+        folder = os.path.dirname(filePath)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
+        self.filePath = filePath
+        self.__connection = sqlite3.connect(filePath, timeout=timeout, isolation_level=None)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS unit ("
+                                  "unit_id INTEGER PRIMARY KEY, "
+                                  "start_file TEXT NOT NULL, "
+                                  "end_file TEXT NOT NULL, "
+                                  "impedance TEXT NOT NULL, "
+                                  "status TEXT NOT NULL, "
+                                  "attempts INTEGER NOT NULL DEFAULT 0, "
+                                  "worker TEXT, "
+                                  "error TEXT, "
+                                  "updated_at REAL NOT NULL, "
+                                  "UNIQUE (start_file, end_file, impedance))")
+
+    def addUnits(self, units):
+        """
+        Add the units not already in the queue and make every unit of a previous run pending again, done ones
+        included: whether a done unit is still up to date (same files, network and output configuration) is decided
+        by the run manifest when the unit is run.
+
+        :param units: List of (start file, end file, impedance).
+        """
+        now = time.time()
+        self.__connection.execute("BEGIN IMMEDIATE")
+        try:
+            self.__connection.executemany("INSERT OR IGNORE INTO unit (start_file, end_file, impedance, status, "
+                                          "updated_at) VALUES (?, ?, ?, ?, ?)",
+                                          [unit + (WorkQueue.PENDING, now) for unit in units])
+            self.__connection.execute("UPDATE unit SET status = ?, attempts = 0, worker = NULL, updated_at = ?",
+                                      (WorkQueue.PENDING, now))
+            self.__connection.execute("COMMIT")
+        except Exception:
+            self.__connection.execute("ROLLBACK")
+            raise
+
+    def claimUnit(self, worker):
+        """
+        :param worker: Name of the worker claiming the unit.
+        :return: (unit id, start file, end file, impedance) of the next pending unit, None if there are no pending
+                 units.
+        """
+        self.__connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.__connection.execute("SELECT unit_id, start_file, end_file, impedance FROM unit "
+                                            "WHERE status = ? ORDER BY attempts, unit_id LIMIT 1",
+                                            (WorkQueue.PENDING,)).fetchone()
+            if row:
+                self.__connection.execute("UPDATE unit SET status = ?, attempts = attempts + 1, worker = ?, "
+                                          "updated_at = ? WHERE unit_id = ?",
+                                          (WorkQueue.RUNNING, worker, time.time(), row[0]))
+            self.__connection.execute("COMMIT")
+        except Exception:
+            self.__connection.execute("ROLLBACK")
+            raise
+        return row
+
+    def completeUnit(self, unitId):
+        self.__connection.execute("UPDATE unit SET status = ?, error = NULL, updated_at = ? WHERE unit_id = ?",
+                                  (WorkQueue.DONE, time.time(), unitId))
+
+    def failUnit(self, unitId, error, maxTries):
+        """
+        :param error: Error message stored with the unit.
+        :param maxTries: The unit is pending again (claimed after the units with fewer attempts) until it has failed
+                         ``maxTries`` times.
+        """
+        self.__connection.execute("UPDATE unit SET status = CASE WHEN attempts < ? THEN ? ELSE ? END, error = ?, "
+                                  "updated_at = ? WHERE unit_id = ?",
+                                  (maxTries, WorkQueue.PENDING, WorkQueue.FAILED, error, time.time(), unitId))
+
+    def getStatusCounts(self):
+        """
+        :return: Dictionary {status: number of units}.
+        """
+        return dict(self.__connection.execute("SELECT status, COUNT(*) FROM unit GROUP BY status").fetchall())
+
+    def close(self):
+        self.__connection.close()
+
+    @staticmethod
+    def getUnitFolderPath(outputFolderPath, unitId):
+        """
+        :return: Output folder of a unit, the workers never write the same files at the same time.
+        """
+        return os.path.join(outputFolderPath, WorkQueue.UNITS_FOLDER, "unit-%s" % unitId)
+
+    @staticmethod
+    def mergeUnitSummary(unitFolderPath, outputFolderPath):
+        """
+        Copy the summary files of a unit into the summary folder of the output folder: the files of the unit zips
+        are added to the zips with the same name (replacing the files of a previous run) and the other files are
+        copied. Not process-safe, the workers merge their units one at a time.
+
+        :param unitFolderPath: Output folder of the unit.
+        :param outputFolderPath: Output folder of the whole run.
+        """
+        unitSummaryFolderPath = os.path.join(unitFolderPath, WorkQueue.SUMMARY_FOLDER)
+        if not os.path.isdir(unitSummaryFolderPath):
+            return
+
+        fileActions = FileActions()
+        summaryFolderPath = os.path.join(outputFolderPath, WorkQueue.SUMMARY_FOLDER)
+        if not os.path.exists(summaryFolderPath):
+            os.makedirs(summaryFolderPath)
+
+        for filename in sorted(os.listdir(unitSummaryFolderPath)):
+            filePath = os.path.join(unitSummaryFolderPath, filename)
+            if not os.path.isfile(filePath) or filename.endswith(WorkQueue.UNIT_STATE_SUFFIXES):
+                continue
+
+            if filename.endswith(".zip"):
+                fileActions.mergeZipFile(summaryFolderPath, filename, filePath)
+            else:
+                temporaryFilePath = os.path.join(summaryFolderPath, filename + ".tmp")
+                shutil.copyfile(filePath, temporaryFilePath)
+                os.replace(temporaryFilePath, os.path.join(summaryFolderPath, filename))
@@ -8,24 +8,34 @@ from digiroad.util import LinkedList
 
 
 class Reflection:
+    def __init__(self):
+        self.__additionalLayerOperations = None
+
     def getLinkedAbstractAdditionalLayerOperation(self):
         """
         Create a linked list of all the Additional Layers operations pre-defined.
         The linked list is used to give a specific order to the operations execution just in case that one of them depends from the execution of a previous task.
         If you define a new operation, then you must to add it to the linked list in the right position of execution.
 
+        The operations are instantiated (and read the configuration) only the first time, the next calls return a new
+        linked list of the same operations.
+
         :return: The Additional Layers operations linked list.
         """
-        euclideanDistanceAdditionalLayerOperation = EuclideanDistanceOperation()
-        walkingAdditionalLayerOperation = WalkingTimeOperation()
-        parkingAdditionalLayerOperation = ParkingTimeOperation()
-        propertyTransference = PropertyTransference()
+        if self.__additionalLayerOperations is None:
+            euclideanDistanceAdditionalLayerOperation = EuclideanDistanceOperation()
+            walkingAdditionalLayerOperation = WalkingTimeOperation()
+            parkingAdditionalLayerOperation = ParkingTimeOperation()
+            propertyTransference = PropertyTransference()
+
+            self.__additionalLayerOperations = [propertyTransference,
+                                                euclideanDistanceAdditionalLayerOperation,
+                                                walkingAdditionalLayerOperation,
+                                                parkingAdditionalLayerOperation]
 
         additionalLayersLinkedList = LinkedList()
-        additionalLayersLinkedList.add(propertyTransference)
-        additionalLayersLinkedList.add(euclideanDistanceAdditionalLayerOperation)
-        additionalLayersLinkedList.add(walkingAdditionalLayerOperation)
-        additionalLayersLinkedList.add(parkingAdditionalLayerOperation)
+        for additionalLayerOperation in self.__additionalLayerOperations:
+            additionalLayersLinkedList.add(additionalLayerOperation)
 
         return additionalLayersLinkedList
 
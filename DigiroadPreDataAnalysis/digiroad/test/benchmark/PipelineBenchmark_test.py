@@ -0,0 +1,52 @@
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+from digiroad.benchmark.PipelineBenchmark import createConfiguration, runBenchmark, snapPoints, STAGES
+from digiroad.benchmark.SyntheticNetwork import SyntheticNetwork
+from digiroad.benchmark.SyntheticPrivateCarTransportMode import SyntheticPrivateCarTransportMode
+from digiroad.logic.MetropAccessDigiroad import MetropAccessDigiroadApplication
+from digiroad.util import CostAttributes
+
+
+def readSummaryLines(outputFolderPath):
+    with zipfile.ZipFile(os.path.join(outputFolderPath, "summary", "summary_csv.zip")) as zipFile:
+        return zipFile.read("distance_synthetic.csv").decode("utf-8").splitlines()
+
+
+class PipelineBenchmarkTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_givenASyntheticNetwork_then_timeEveryStageAndWriteTheSameSummaryAsTheStreamedSummary(self):
+        costAttributes = [CostAttributes.DISTANCE, CostAttributes.RUSH_HOUR_DELAY]
+        benchmarkFolder = os.path.join(self.folder, "benchmark")
+        result = runBenchmark(rows=15, columns=20, numberOfStartPoints=30, numberOfEndPoints=20,
+                              costAttributes=costAttributes, seed=5, outputFolderPath=benchmarkFolder)
+
+        self.assertEqual(STAGES, list(result["stage_seconds"]))
+        self.assertTrue(all(seconds >= 0 for seconds in result["stage_seconds"].values()))
+        self.assertEqual(300, result["vertices"])
+        self.assertEqual(30, result["snapped_start_points"])
+        self.assertTrue(result["summary_rows"][CostAttributes.DISTANCE] > 0)
+
+        configuration = createConfiguration()
+        application = MetropAccessDigiroadApplication(
+            transportMode=SyntheticPrivateCarTransportMode(SyntheticNetwork(15, 20, seed=5), configuration),
+            configuration=configuration)
+        startVerticesID, startPointsFeaturesList = snapPoints(application,
+                                                              os.path.join(benchmarkFolder, "startPoints.geojson"))
+        endVerticesID, endPointsFeaturesList = snapPoints(application,
+                                                          os.path.join(benchmarkFolder, "endPoints.geojson"))
+        streamedFolder = os.path.join(self.folder, "streamed")
+        application.streamGeneralSummary(costAttributes, startVerticesID, startPointsFeaturesList, endVerticesID,
+                                         endPointsFeaturesList, streamedFolder, "synthetic")
+
+        benchmarkLines = readSummaryLines(benchmarkFolder)
+        self.assertEqual(result["summary_rows"][CostAttributes.DISTANCE] + 1, len(benchmarkLines))
+        self.assertEqual(sorted(benchmarkLines), sorted(readSummaryLines(streamedFolder)))
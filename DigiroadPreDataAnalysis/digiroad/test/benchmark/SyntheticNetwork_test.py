@@ -0,0 +1,55 @@
+import unittest
+
+import numpy as np
+
+from digiroad.benchmark.SyntheticNetwork import SyntheticNetwork, FIRST_YKR_ID
+from digiroad.util import CostAttributes
+
+
+class SyntheticNetworkTest(unittest.TestCase):
+    def setUp(self):
+        self.network = SyntheticNetwork(rows=20, columns=30, oneWayRatio=0.3, pedestrianRatio=0.1, seed=7)
+
+    def test_givenTheGridSize_then_joinEveryVertexWithItsRightAndUpperNeighbours(self):
+        self.assertEqual(600, len(self.network.vertexIDs))
+        self.assertEqual(20 * 29 + 19 * 30, len(self.network.edges))
+        np.testing.assert_allclose(self.network.edges[CostAttributes.DISTANCE].values,
+                                   np.linalg.norm(self.network.vertexCoordinates[self.network.edges["target"] - 1] -
+                                                  self.network.vertexCoordinates[self.network.edges["source"] - 1],
+                                                  axis=1))
+
+    def test_givenTheSameSeed_then_generateTheSameNetwork(self):
+        network = SyntheticNetwork(rows=20, columns=30, oneWayRatio=0.3, pedestrianRatio=0.1, seed=7)
+
+        self.assertTrue(self.network.edges.equals(network.edges))
+        self.assertEqual(self.network.getFingerprint(), network.getFingerprint())
+
+    def test_givenTheTrafficRules_then_onlyTheAllowedDirectionsHaveCost(self):
+        edges = self.network.edges
+        routableEdges = self.network.getRoutableEdges([CostAttributes.RUSH_HOUR_DELAY])
+        costs = routableEdges[CostAttributes.RUSH_HOUR_DELAY + "_cost"].values
+        reverseCosts = routableEdges[CostAttributes.RUSH_HOUR_DELAY + "_reverse_cost"].values
+
+        pedestrian = edges["TOIMINN_LK"].values == 8
+        self.assertTrue(pedestrian.any())
+        self.assertTrue((costs[pedestrian] == -1).all() and (reverseCosts[pedestrian] == -1).all())
+
+        againstDigitizing = ~pedestrian & (edges["AJOSUUNTA"].values == 3)
+        alongDigitizing = ~pedestrian & (edges["AJOSUUNTA"].values == 4)
+        bothDirections = ~pedestrian & (edges["AJOSUUNTA"].values == 2)
+        self.assertTrue((costs[againstDigitizing] == -1).all() and (reverseCosts[againstDigitizing] > 0).all())
+        self.assertTrue((costs[alongDigitizing] > 0).all() and (reverseCosts[alongDigitizing] == -1).all())
+        np.testing.assert_array_equal(edges[CostAttributes.RUSH_HOUR_DELAY].values[bothDirections],
+                                      reverseCosts[bothDirections])
+
+        self.assertTrue((edges[CostAttributes.RUSH_HOUR_DELAY] > edges[CostAttributes.SPEED_LIMIT_TIME]).all())
+
+    def test_givenANumberOfPoints_then_createYKRPointsWithinTheNetwork(self):
+        points = self.network.createYKRPoints(25, seed=1)
+
+        self.assertEqual(list(range(FIRST_YKR_ID, FIRST_YKR_ID + 25)),
+                         [feature["properties"]["YKR_ID"] for feature in points["features"]])
+        minimumX, minimumY, maximumX, maximumY = self.network.getBoundingBox()
+        for feature in points["features"]:
+            x, y = feature["geometry"]["coordinates"]
+            self.assertTrue(minimumX <= x <= maximumX and minimumY <= y <= maximumY)
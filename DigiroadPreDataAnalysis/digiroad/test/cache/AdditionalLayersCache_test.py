@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from digiroad.cache.AdditionalLayersCache import AdditionalLayersCache
+
+
+class AdditionalLayersCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.pointsURL = os.path.join(self.folder, "points.geojson")
+        self.polygonsURL = os.path.join(self.folder, "polygons.geojson")
+        self.writeFile(self.pointsURL, '{"features": []}')
+        self.writeFile(self.polygonsURL, '{"features": []}')
+        self.layers = [("walking_distance", self.polygonsURL, ["walking_distance"])]
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def writeFile(self, filePath, content):
+        with open(filePath, "w") as file:
+            file.write(content)
+
+    def test_givenTheSamePolygonLayer_then_readItOnlyOnce(self):
+        cache = AdditionalLayersCache()
+        readLayers = []
+
+        def readPolygonLayer(polygonsURL, attributes):
+            readLayers.append(polygonsURL)
+            return object()
+
+        firstLayer = cache.getPolygonLayer(self.polygonsURL, ["walking_distance"], readPolygonLayer)
+        secondLayer = cache.getPolygonLayer(self.polygonsURL, ["walking_distance"], readPolygonLayer)
+        cache.getPolygonLayer(self.polygonsURL, ["parking_time"], readPolygonLayer)
+
+        self.assertIs(firstLayer, secondLayer)
+        self.assertEqual([self.polygonsURL, self.polygonsURL], readLayers)
+
+    def test_givenAModifiedPointsFile_then_createANewMergedLayerKey(self):
+        key = AdditionalLayersCache.createMergedLayerKey(self.pointsURL, self.layers)
+        self.assertEqual(key, AdditionalLayersCache.createMergedLayerKey(self.pointsURL, self.layers))
+
+        self.writeFile(self.pointsURL, '{"features": [{}]}')
+        self.assertNotEqual(key, AdditionalLayersCache.createMergedLayerKey(self.pointsURL, self.layers))
+
+    def test_givenACacheFolder_then_shareTheMergedLayersBetweenRuns(self):
+        cacheFolder = os.path.join(self.folder, "cache")
+        key = AdditionalLayersCache.createMergedLayerKey(self.pointsURL, self.layers)
+        mergedLayer = {"type": "FeatureCollection", "features": [{"properties": {"walking_distance": 180.0}}]}
+
+        AdditionalLayersCache(cacheFolder).putMergedLayer(key, mergedLayer)
+
+        self.assertIsNone(AdditionalLayersCache().getMergedLayer(key))
+        self.assertEqual(mergedLayer, AdditionalLayersCache(cacheFolder).getMergedLayer(key))
@@ -0,0 +1,40 @@
+import os
+import tempfile
+import unittest
+
+from digiroad.cache.NearestVertexCache import NearestVertexCache
+from digiroad.entities import Point
+
+
+class NearestVertexCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.filePath = os.path.join(tempfile.mkdtemp(), "nearestVertex.sqlite")
+        self.point = Point(latitute=6672380.0, longitude=385875.0, epsgCode="EPSG:3047")
+        self.pointKey = (5952155, NearestVertexCache.createCoordinatesHash(self.point))
+
+    def test_givenAStoredVertex_when_reopenWithTheSameNetwork_then_retrieveTheVertex(self):
+        cache = NearestVertexCache(self.filePath, "edges", "e.TOIMINN_LK <> 8", "edges:1:2:3:4:5")
+        cache.putVertices([self.pointKey + (59227, 2770620.8, 8443095.4)])
+        cache.close()
+
+        cache = NearestVertexCache(self.filePath, "edges", "e.TOIMINN_LK <> 8", "edges:1:2:3:4:5")
+        self.assertEqual({self.pointKey: (59227, 2770620.8, 8443095.4)}, cache.getVertices([self.pointKey]))
+
+    def test_givenAStoredVertex_when_theTransportModeFilterIsDifferent_then_notRetrieveTheVertex(self):
+        cache = NearestVertexCache(self.filePath, "edges", "e.TOIMINN_LK <> 8", "edges:1:2:3:4:5")
+        cache.putVertices([self.pointKey + (59227, 2770620.8, 8443095.4)])
+
+        bicycleCache = NearestVertexCache(self.filePath, "edges", "e.luokka <> 0 AND e.luokka <> 9", "edges:1:2:3:4:5")
+        self.assertEqual({}, bicycleCache.getVertices([self.pointKey]))
+
+    def test_givenAStoredVertex_when_theNetworkChanges_then_theCacheIsInvalidated(self):
+        cache = NearestVertexCache(self.filePath, "edges", "e.TOIMINN_LK <> 8", "edges:1:2:3:4:5")
+        cache.putVertices([self.pointKey + (59227, 2770620.8, 8443095.4)])
+        cache.close()
+
+        cache = NearestVertexCache(self.filePath, "edges", "e.TOIMINN_LK <> 8", "edges:1:2:3:4:6")
+        self.assertEqual({}, cache.getVertices([self.pointKey]))
+
+    def test_givenAMovedPoint_then_theCoordinatesHashIsDifferent(self):
+        movedPoint = Point(latitute=6672381.0, longitude=385875.0, epsgCode="EPSG:3047")
+        self.assertNotEqual(self.pointKey[1], NearestVertexCache.createCoordinatesHash(movedPoint))
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+from digiroad.cache.RouteCache import RouteCache
+
+
+class RouteCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.filePath = os.path.join(tempfile.mkdtemp(), "route.sqlite")
+
+    def test_givenStoredRoutes_when_reopenWithTheSameNetwork_then_retrieveTheRoutes(self):
+        cache = RouteCache(self.filePath, "edges", "e.TOIMINN_LK <> 8", "edges:1:2:3:4:5")
+        cache.putRoutes("pituus", 59227, {2692: [3, 1, 2], 78618: []})
+        cache.close()
+
+        cache = RouteCache(self.filePath, "edges", "e.TOIMINN_LK <> 8", "edges:1:2:3:4:5")
+        self.assertEqual({2692: [3, 1, 2], 78618: []}, cache.getRoutes("pituus", 59227, [2692, 78618, 45174]))
+        self.assertEqual({}, cache.getRoutes("ruuhka_aa", 59227, [2692]))
+        self.assertEqual({}, cache.getRoutes("pituus", 2692, [59227]))
+
+    def test_givenStoredRoutes_when_theNetworkChanges_then_theCacheIsInvalidated(self):
+        cache = RouteCache(self.filePath, "edges", "e.TOIMINN_LK <> 8", "edges:1:2:3:4:5")
+        cache.putRoutes("pituus", 59227, {2692: [3, 1, 2]})
+        cache.close()
+
+        cache = RouteCache(self.filePath, "edges", "e.TOIMINN_LK <> 8", "edges:1:2:3:4:6")
+        self.assertEqual({}, cache.getRoutes("pituus", 59227, [2692]))
+
+    def test_givenMoreRoutesThanTheMaximum_then_evictTheLeastRecentlyUsedRoutes(self):
+        cache = RouteCache(self.filePath, "edges", "e.TOIMINN_LK <> 8", "edges:1:2:3:4:5", maxRoutes=2)
+        cache.putRoutes("pituus", 1, {10: [100]})
+        cache.putRoutes("pituus", 1, {20: [200]})
+        cache.getRoutes("pituus", 1, [10])
+        cache.putRoutes("pituus", 1, {30: [300]})
+
+        self.assertEqual(2, cache.getNumberOfRoutes())
+        self.assertEqual({10: [100], 30: [300]}, cache.getRoutes("pituus", 1, [10, 20, 30]))
+
+    def test_givenRoutesStoredByAnotherProcess_then_countThemBeforeTheNextEviction(self):
+        cache = RouteCache(self.filePath, "edges", "e.TOIMINN_LK <> 8", "edges:1:2:3:4:5", maxRoutes=4)
+        otherCache = RouteCache(self.filePath, "edges", "e.TOIMINN_LK <> 8", "edges:1:2:3:4:5", maxRoutes=4)
+        otherCache.putRoutes("pituus", 2, {10: [100], 20: [200], 30: [300]})
+        cache.putRoutes("pituus", 1, {10: [100], 20: [200]})
+        self.assertEqual(5, cache.getNumberOfRoutes())
+
+        RouteCache.RECOUNT_INTERVAL, recountInterval = 1, RouteCache.RECOUNT_INTERVAL
+        try:
+            cache.putRoutes("pituus", 1, {30: [300]})
+        finally:
+            RouteCache.RECOUNT_INTERVAL = recountInterval
+
+        self.assertEqual(4, cache.getNumberOfRoutes())
+        self.assertEqual({}, otherCache.getRoutes("pituus", 2, [10, 20]))
+
+    def test_givenMoreEndVerticesThanTheQueryBlock_then_retrieveTheRoutesInTheirOrder(self):
+        cache = RouteCache(self.filePath, "edges", "e.TOIMINN_LK <> 8", "edges:1:2:3:4:5")
+        cache.putRoutes("pituus", 1, {endVertexId: [endVertexId] for endVertexId in range(1200)})
+
+        endVerticesID = list(range(1300, 0, -2))
+        self.assertEqual([(endVertexId, [endVertexId]) for endVertexId in endVerticesID if endVertexId < 1200],
+                         list(cache.getRoutes("pituus", 1, endVerticesID).items()))
@@ -0,0 +1,48 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from digiroad.connection.AsyncPostgisServiceProvider import AsyncPostgisServiceProvider
+
+
+class AsyncPostgisServiceProviderTest(unittest.TestCase):
+    def setUp(self):
+        self.serviceProvider = AsyncPostgisServiceProvider(concurrency=4)
+
+    def tearDown(self):
+        self.serviceProvider.close()
+
+    def test_givenManyQueries_then_runThemConcurrentlyWithAtMostConcurrencyConnections(self):
+        dataFrames = self.serviceProvider.executeQueriesReturningDataFrames(
+            ["SELECT %s AS value, pg_backend_pid() AS pid FROM pg_sleep(0.05)" % value for value in range(40)])
+
+        self.assertEqual(list(range(40)), [dataFrame["value"][0] for dataFrame in dataFrames])
+        self.assertLessEqual(len(set(dataFrame["pid"][0] for dataFrame in dataFrames)), 4)
+
+    def test_givenABinaryCopy_then_retrieveTheSameArraysThanThePostgisServiceProvider(self):
+        arrays = self.serviceProvider.executeCopyReturningArrays(
+            "SELECT i::bigint AS id, (i / 2.0)::double precision AS cost FROM generate_series(1, 1000) AS i",
+            [("id", np.int64), ("cost", np.float64)], capacity=10)
+
+        self.assertEqual(list(range(1, 1001)), arrays["id"].tolist())
+        self.assertEqual([i / 2.0 for i in range(1, 1001)], arrays["cost"].tolist())
+
+    def test_givenAGeometryQuery_then_retrieveTheGeojson(self):
+        geojson = self.serviceProvider.execute("SELECT 1 AS id, ST_SetSRID(ST_MakePoint(1, 2), 3857) AS geom")
+
+        self.assertEqual([1.0, 2.0], list(geojson["features"][0]["geometry"]["coordinates"]))
+
+    def test_givenAFailedPoolCreation_then_createThePoolAgainInTheNextQuery(self):
+        attempts = []
+
+        async def createPool(**kwargs):
+            attempts.append(kwargs)
+            raise ConnectionRefusedError("database down")
+
+        with mock.patch("asyncpg.create_pool", createPool):
+            for _ in range(2):
+                with self.assertRaises(ConnectionRefusedError):
+                    self.serviceProvider.executeQueryReturningDataFrame("SELECT 1 AS value")
+
+        self.assertEqual(2, len(attempts))
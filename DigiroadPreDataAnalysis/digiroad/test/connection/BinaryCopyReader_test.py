@@ -0,0 +1,45 @@
+import struct
+import unittest
+
+import numpy as np
+
+from digiroad.connection.BinaryCopyReader import BinaryCopyReader
+
+COLUMNS = [("start_vertex_id", np.int64), ("end_vertex_id", np.int64), ("total_cost", np.float64)]
+
+
+def createBinaryCopy(rows):
+    data = BinaryCopyReader.SIGNATURE + struct.pack(">ii", 0, 0)
+    for startVertexID, endVertexID, totalCost in rows:
+        data += struct.pack(">h", 3)
+        data += struct.pack(">iq", 8, startVertexID)
+        data += struct.pack(">iq", 8, endVertexID)
+        data += struct.pack(">id", 8, totalCost) if totalCost is not None else struct.pack(">i", -1)
+    return data + BinaryCopyReader.TRAILER
+
+
+class BinaryCopyReaderTest(unittest.TestCase):
+    def test_givenABinaryCopyInSeveralChunks_then_retrieveTheColumnArrays(self):
+        data = createBinaryCopy([(10, 20, 100.5), (10, 30, float("nan")), (20, 30, 25.0)])
+        reader = BinaryCopyReader(COLUMNS, capacity=2)
+
+        for position in range(0, len(data), 7):
+            reader.write(data[position:position + 7])
+        arrays = reader.getArrays()
+
+        self.assertEqual([10, 10, 20], arrays["start_vertex_id"].tolist())
+        self.assertEqual([20, 30, 30], arrays["end_vertex_id"].tolist())
+        self.assertEqual(100.5, arrays["total_cost"][0])
+        self.assertTrue(np.isnan(arrays["total_cost"][1]))
+        self.assertEqual(np.int64, arrays["start_vertex_id"].dtype)
+
+    def test_givenAnEmptyBinaryCopy_then_retrieveEmptyArrays(self):
+        reader = BinaryCopyReader(COLUMNS)
+        reader.write(createBinaryCopy([]))
+
+        self.assertEqual(0, len(reader.getArrays()["total_cost"]))
+
+    def test_givenANullValue_then_throwValueError(self):
+        reader = BinaryCopyReader(COLUMNS)
+
+        self.assertRaises(ValueError, reader.write, createBinaryCopy([(10, 20, None), (10, 30, 1.0)]))
@@ -0,0 +1,46 @@
+import unittest
+
+import psycopg2.errors
+
+from digiroad.connection.BlockScheduler import BlockScheduler
+
+
+class BlockSchedulerTest(unittest.TestCase):
+    def test_givenAFixedBlockSize_then_coverAllThePairsInOrder(self):
+        scheduler = BlockScheduler(blockSize=2)
+
+        blocks = list(scheduler.iterateBlocks([1, 2, 3], [4, 5, 6], lambda start, end: (start, end), jobs=2))
+
+        self.assertEqual([([1, 2], [4, 5]), ([1, 2], [6]), ([3], [4, 5]), ([3], [6])], blocks)
+
+    def test_givenAStatementTimeout_then_splitTheBlockInHalves(self):
+        def runBlock(start, end):
+            if len(start) * len(end) > 2:
+                raise psycopg2.errors.QueryCanceled("canceling statement due to statement timeout")
+            return start, end
+
+        scheduler = BlockScheduler(blockSize=4)
+
+        blocks = list(scheduler.iterateBlocks([1, 2, 3, 4], [5, 6], runBlock))
+
+        self.assertEqual([([1], [5, 6]), ([2], [5, 6]), ([3], [5, 6]), ([4], [5, 6])], blocks)
+        self.assertEqual(3, scheduler.numberOfSplits)
+        self.assertEqual(1, scheduler.blockSize)
+
+    def test_givenASingleFailingPair_then_throwTheError(self):
+        def runBlock(start, end):
+            raise psycopg2.errors.OutOfMemory("out of memory")
+
+        scheduler = BlockScheduler(blockSize=2)
+
+        self.assertRaises(psycopg2.errors.OutOfMemory, list, scheduler.iterateBlocks([1, 2], [3], runBlock))
+
+    def test_givenFastBlocks_then_growTheBlockSizeUpToTheMaximum(self):
+        scheduler = BlockScheduler(blockSize=2, targetSeconds=60, maxBlockSize=8)
+
+        blocks = list(scheduler.iterateBlocks(list(range(20)), [1], lambda start, end: len(start)))
+
+        self.assertEqual(20, sum(blocks))
+        self.assertEqual(2, blocks[0])
+        self.assertEqual(8, max(blocks))
+        self.assertEqual(8, scheduler.blockSize)
@@ -0,0 +1,43 @@
+import unittest
+
+from joblib import Parallel, delayed
+
+from digiroad.connection.PostgisConnectionPool import PostgisConnectionPool
+from digiroad.util import getConfigurationProperties
+
+
+class PostgisConnectionPoolTest(unittest.TestCase):
+    def setUp(self):
+        databaseConfig = getConfigurationProperties(section="DATABASE_CONFIG")
+        self.pool = PostgisConnectionPool(
+            connectionParameters={
+                "database": databaseConfig["database_name"],
+                "user": databaseConfig["user"],
+                "password": databaseConfig["password"],
+                "host": databaseConfig["host"]
+            },
+            minConnections=1,
+            maxConnections=2,
+            sessionSettings=[("application_name", "digiroad_pool_test")]
+        )
+
+    def tearDown(self):
+        self.pool.closeAll()
+
+    def test_givenMoreWorkersThanConnections_then_theWorkersWaitForAConnection(self):
+        def executeQuery(value):
+            with self.pool.connection() as con:
+                cursor = con.cursor()
+                cursor.execute("SELECT %s, pg_backend_pid()", (value,))
+                return cursor.fetchone()
+
+        results = Parallel(n_jobs=6, backend="threading")(delayed(executeQuery)(value) for value in range(30))
+
+        self.assertEqual(list(range(30)), [result[0] for result in results])
+        self.assertLessEqual(len(set(result[1] for result in results)), 2)
+
+    def test_givenSessionSettings_then_theyAreAppliedToTheConnections(self):
+        with self.pool.connection() as con:
+            cursor = con.cursor()
+            cursor.execute("SHOW application_name")
+            self.assertEqual("digiroad_pool_test", cursor.fetchone()[0])
@@ -0,0 +1,87 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import zipfile
+from unittest import mock
+
+from digiroad import digiroadInit
+from digiroad.logic.RunManifest import RunManifest
+from digiroad.logic.WorkQueue import WorkQueue
+from digiroad.util import Configuration, CostAttributes, FileActions, getConfigurationPath
+
+
+def analyzeUnit(outputFolder, startPointsGeojsonFilename, endPointsGeojsonFilename, starterApplication,
+                impedanceList, impedances, allImpedanceAttribute, summaryOnly, routesOnly, prefix):
+    # the same shared files than calculateTotalTimeTravel and createGeneralSummary: the routes folder of the
+    # impedance is created again and the summary csv is added to the summary zip
+    fileActions = FileActions()
+    routesFolder = os.path.join(outputFolder, "geoms", impedanceList[0])
+    fileActions.deleteFolder(path=routesFolder)
+    os.makedirs(routesFolder)
+    summaryFolder = os.path.join(outputFolder, "summary")
+    filePath = fileActions.writeFile(summaryFolder, prefix + impedanceList[0] + ".csv", [prefix])
+    time.sleep(0.2)
+    fileActions.compressOutputFile(summaryFolder, "summary_csv.zip", filePath)
+    os.remove(filePath)
+
+
+class DigiroadInitTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.outputFolder = os.path.join(self.dir, "output")
+        self.startPointsFolder = os.path.join(self.dir, "start")
+        self.endPointsFolder = os.path.join(self.dir, "end")
+        for folder, filenames in [(self.startPointsFolder, ["start1.geojson", "start2.geojson", "start3.geojson"]),
+                                  (self.endPointsFolder, ["end1.geojson"])]:
+            os.makedirs(folder)
+            for filename in filenames:
+                open(os.path.join(folder, filename), "w").close()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    @mock.patch.object(digiroadInit, "executeSpatialDataAnalysis", analyzeUnit)
+    @mock.patch.object(digiroadInit, "createStarterApplication", mock.MagicMock())
+    def test_givenTwoWorkersWithUnitsOfTheSameImpedance_then_mergeTheSummaryOfEveryUnit(self):
+        configuration = Configuration(getConfigurationPath())
+        configuration.workers = 2
+        configuration.incremental = False
+        digiroadInit.executeWorkQueue(self.outputFolder, self.startPointsFolder, self.endPointsFolder, "PRIVATE_CAR",
+                                      [CostAttributes.DISTANCE], {}, False, True, False, configuration,
+                                      mock.MagicMock(), 1)
+
+        workQueue = WorkQueue(os.path.join(self.outputFolder, "work_queue.sqlite"))
+        self.assertEqual({WorkQueue.DONE: 3}, workQueue.getStatusCounts())
+        workQueue.close()
+
+        with zipfile.ZipFile(os.path.join(self.outputFolder, "summary", "summary_csv.zip")) as zipFile:
+            self.assertEqual(["start%s.geojson_end1.geojson-pituus.csv" % start for start in range(1, 4)],
+                             sorted(zipFile.namelist()))
+        for unitId in range(1, 4):
+            self.assertTrue(os.path.isdir(os.path.join(WorkQueue.getUnitFolderPath(self.outputFolder, unitId),
+                                                       "geoms", CostAttributes.DISTANCE)))
+
+    def test_givenACompletedUnit_when_theOutputConfigurationChanges_then_runTheUnitAgain(self):
+        runManifest = RunManifest(os.path.join(self.dir, "run_manifest.sqlite"))
+        starterApplication = mock.MagicMock(runManifest=runManifest,
+                                            configuration=Configuration(getConfigurationPath()))
+        starterApplication.transportMode.getNetworkFingerprint.return_value = "network:1"
+
+        def runUnit():
+            digiroadInit.executeSpatialDataAnalysis(self.outputFolder,
+                                                    os.path.join(self.startPointsFolder, "start1.geojson"),
+                                                    os.path.join(self.endPointsFolder, "end1.geojson"),
+                                                    starterApplication, [CostAttributes.DISTANCE], {}, False, True,
+                                                    False, "prefix-")
+
+        runUnit()
+        runUnit()
+        starterApplication.configuration.summaryFormat = "parquet"
+        runUnit()
+        starterApplication.transportMode.getNetworkFingerprint.return_value = "network:2"
+        runUnit()
+        runManifest.close()
+
+        self.assertEqual(3, starterApplication.createGeneralSummary.call_count)
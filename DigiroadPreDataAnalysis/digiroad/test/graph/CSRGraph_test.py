@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from digiroad.graph.CSRGraph import CSRGraph
+
+
+class CSRGraphTest(unittest.TestCase):
+    def setUp(self):
+        #  1 <-> 2 (10), 2 -> 3 (5), 4 <- 3 (2, only reverse), 1 <-> 3 (30), 1 -> 2 (7, parallel with a faster time)
+        self.graph = CSRGraph.fromEdges(
+            edgeIDs=[100, 200, 300, 400, 500],
+            sources=[1, 2, 4, 1, 1],
+            targets=[2, 3, 3, 3, 2],
+            costs={
+                "pituus": [10, 5, -1, 30, 12],
+                "digiroa_aa": [2, 1, -1, 3, 1]
+            },
+            reverseCosts={
+                "pituus": [10, -1, 2, 30, -1],
+                "digiroa_aa": [2, -1, 1, 3, -1]
+            },
+            vertexIDs=[4, 3, 2, 1, 5],
+            vertexCoordinates=[[4.0, 4.0], [3.0, 3.0], [2.0, 2.0], [1.0, 1.0], [5.0, 5.0]]
+        )
+
+    def test_givenTheEdges_then_buildTheCSRArrays(self):
+        self.assertEqual(5, self.graph.getNumberOfVertices())
+        self.assertEqual(7, self.graph.getNumberOfArcs())
+        self.assertEqual([1, 2, 3, 4, 5], self.graph.vertexIDs.tolist())
+        self.assertEqual([3.0, 3.0], self.graph.vertexCoordinates[2].tolist())
+        self.assertEqual([0, 1, 3, -1], self.graph.getVertexIndices([1, 2, 4, 99]).tolist())
+
+    def test_givenOneWayEdges_then_calculateTheDirectedCosts(self):
+        startIndices = self.graph.getVertexIndices([1, 2, 3, 4])
+        costs = self.graph.calculateShortestPathCosts(startIndices, startIndices, "pituus")
+
+        expected = np.array([
+            [0, 10, 15, 17],
+            [10, 0, 5, 7],
+            [30, 40, 0, 2],
+            [np.inf, np.inf, np.inf, 0]
+        ])
+        np.testing.assert_array_equal(expected, costs)
+
+    def test_givenFewerEndVerticesThanStartVertices_then_calculateTheSameCostsBackwards(self):
+        startIndices = self.graph.getVertexIndices([1, 2, 3, 4, 99])
+        endIndices = self.graph.getVertexIndices([3, 4])
+        costs = self.graph.calculateShortestPathCosts(startIndices, endIndices, "pituus")
+
+        np.testing.assert_array_equal([[15, 17], [5, 7], [0, 2], [np.inf, 0], [np.inf, np.inf]], costs)
+
+    def test_givenParallelEdges_then_useTheCheapestEdgeForEachCostAttribute(self):
+        startIndices = self.graph.getVertexIndices([1])
+        endIndices = self.graph.getVertexIndices([2, 3])
+
+        np.testing.assert_array_equal([[10, 15]], self.graph.calculateShortestPathCosts(startIndices, endIndices,
+                                                                                        "pituus"))
+        np.testing.assert_array_equal([[1, 2]], self.graph.calculateShortestPathCosts(startIndices, endIndices,
+                                                                                      "digiroa_aa"))
+
+    def test_givenAStartVertex_then_followTheShortestPathTreeToEachEndVertex(self):
+        startIndex = int(self.graph.getVertexIndices([1])[0])
+        endIndices = self.graph.getVertexIndices([1, 2, 3, 4, 5, 99])
+
+        self.assertEqual([[], [100], [100, 200], [100, 200, 300], None, None],
+                         self.graph.calculateShortestPathsEdges(startIndex, endIndices, "pituus"))
+        self.assertEqual([[500], [500, 200]],
+                         self.graph.calculateShortestPathsEdges(startIndex, endIndices[1:3], "digiroa_aa"))
+
+    def test_givenAVertexOutsideTheGraph_then_returnInfiniteCost(self):
+        startIndices = self.graph.getVertexIndices([1, 99])
+        endIndices = self.graph.getVertexIndices([99, 5])
+
+        costs = self.graph.calculateShortestPathCosts(startIndices, endIndices, "pituus")
+        self.assertTrue(np.isinf(costs).all())
+
+    def test_givenAStoredGraph_then_loadTheSameGraph(self):
+        folder = tempfile.mkdtemp()
+        try:
+            path = os.path.join(folder, "graph.npz")
+            self.graph.save(path)
+            loadedGraph = CSRGraph.load(path)
+        finally:
+            shutil.rmtree(folder)
+
+        self.assertEqual(sorted(self.graph.getCostAttributes()), sorted(loadedGraph.getCostAttributes()))
+        np.testing.assert_array_equal(self.graph.indptr, loadedGraph.indptr)
+        np.testing.assert_array_equal(self.graph.weights["pituus"], loadedGraph.weights["pituus"])
+        np.testing.assert_array_equal(self.graph.vertexCoordinates, loadedGraph.vertexCoordinates)
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from digiroad.graph.CSRGraph import CSRGraph
+from digiroad.graph.ContractionHierarchy import ContractionHierarchy
+from digiroad.util import CostAttributes
+
+
+def createGridGraph(size, seed=0):
+    """
+    Grid network with random costs and some one-way and closed directions.
+    """
+    randomState = np.random.RandomState(seed)
+    sources = []
+    targets = []
+    for row in range(size):
+        for column in range(size):
+            vertex = row * size + column
+            if column + 1 < size:
+                sources.append(vertex)
+                targets.append(vertex + 1)
+            if row + 1 < size:
+                sources.append(vertex)
+                targets.append(vertex + size)
+
+    costs = randomState.uniform(1, 100, len(sources))
+    reverseCosts = costs.copy()
+    reverseCosts[randomState.uniform(size=len(sources)) < 0.2] = -1
+    costs[randomState.uniform(size=len(sources)) < 0.1] = -1
+
+    return CSRGraph.fromEdges(edgeIDs=np.arange(len(sources)) + 1,
+                              sources=sources,
+                              targets=targets,
+                              costs={CostAttributes.DISTANCE: costs},
+                              reverseCosts={CostAttributes.DISTANCE: reverseCosts})
+
+
+class ContractionHierarchyTest(unittest.TestCase):
+    def setUp(self):
+        self.graph = createGridGraph(8)
+        self.hierarchy = ContractionHierarchy.build(self.graph, CostAttributes.DISTANCE)
+        self.vertices = np.arange(self.graph.getNumberOfVertices())
+
+    def test_givenAGraph_then_theManyToManyCostsAreEqualToDijkstra(self):
+        expected = self.graph.calculateShortestPathCosts(self.vertices, self.vertices, CostAttributes.DISTANCE)
+        costs = self.hierarchy.queryManyToMany(self.vertices, self.vertices)
+
+        np.testing.assert_allclose(expected, costs)
+
+    def test_givenAPairOfVertices_then_theOneToOneCostIsEqualToDijkstra(self):
+        expected = self.graph.calculateShortestPathCosts(self.vertices, self.vertices, CostAttributes.DISTANCE)
+
+        for start in range(0, len(self.vertices), 5):
+            for end in range(0, len(self.vertices), 3):
+                self.assertAlmostEqual(expected[start, end], self.hierarchy.getShortestPathCost(start, end))
+
+    def test_givenAPairOfVertices_then_theUnpackedEdgesFormTheShortestPath(self):
+        weights = {}
+        heads = {}
+        tails = self.graph.getTails()
+        for arc in range(self.graph.getNumberOfArcs()):
+            key = (int(self.graph.arcEdgeIDs[arc]), bool(self.graph.arcForward[arc]))
+            weights[key] = self.graph.weights[CostAttributes.DISTANCE][arc]
+            heads[key] = (int(tails[arc]), int(self.graph.heads[arc]))
+
+        start = 0
+        end = len(self.vertices) - 1
+        cost, edgeIDs, directions = self.hierarchy.getShortestPathArcs(start, end)
+
+        vertex = start
+        total = 0.0
+        for edgeId, forward in zip(edgeIDs, directions):
+            tail, head = heads[(edgeId, forward)]
+            self.assertEqual(vertex, tail)
+            total += weights[(edgeId, forward)]
+            vertex = head
+
+        self.assertEqual(end, vertex)
+        self.assertAlmostEqual(cost, total)
+
+    def test_givenAHierarchy_when_saveAndLoad_then_retrieveTheSameCosts(self):
+        filePath = os.path.join(tempfile.mkdtemp(), "hierarchy.npz")
+        self.hierarchy.save(filePath)
+        loaded = ContractionHierarchy.load(filePath)
+
+        self.assertEqual(CostAttributes.DISTANCE, loaded.costAttribute)
+        np.testing.assert_allclose(self.hierarchy.queryManyToMany(self.vertices, self.vertices),
+                                   loaded.queryManyToMany(self.vertices, self.vertices))
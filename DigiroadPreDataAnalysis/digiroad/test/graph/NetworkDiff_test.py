@@ -0,0 +1,52 @@
+import unittest
+
+import numpy as np
+
+from digiroad.graph.CSRGraph import CSRGraph
+from digiroad.graph.NetworkDiff import NetworkDiff
+
+
+def createGraph(edges):
+    edgeIDs, sources, targets, costs = zip(*edges)
+    return CSRGraph.fromEdges(edgeIDs=edgeIDs,
+                              sources=sources,
+                              targets=targets,
+                              costs={"pituus": costs},
+                              reverseCosts={"pituus": costs})
+
+
+class NetworkDiffTest(unittest.TestCase):
+    def setUp(self):
+        #  1 <-> 2 (1), 2 <-> 3 (1), 3 <-> 4 (1), 1 <-> 4 (10), 5 <-> 6 (1)
+        self.previousGraph = createGraph([(10, 1, 2, 1), (20, 2, 3, 1), (30, 3, 4, 1), (50, 1, 4, 10), (40, 5, 6, 1)])
+        # 1 <-> 4 is faster, 5 <-> 6 is removed and the vertex 7 is added
+        self.currentGraph = createGraph([(10, 1, 2, 1), (20, 2, 3, 1), (30, 3, 4, 1), (50, 1, 4, 2), (60, 6, 7, 1)])
+        self.networkDiff = NetworkDiff(self.previousGraph, self.currentGraph)
+
+    def test_givenTwoNetworkVersions_then_findTheChangedArcs(self):
+        changedArcs = self.networkDiff.getChangedArcs("pituus")
+
+        self.assertEqual([40, 40, 50, 50, 60, 60], changedArcs["edgeID"].tolist())
+        self.assertEqual([10, 10], changedArcs["previousWeight"][2:4].tolist())
+        self.assertEqual([2, 2, 1, 1], changedArcs["currentWeight"][2:].tolist())
+        self.assertEqual([-1, -1], changedArcs["currentTail"][:2].tolist())
+        self.assertEqual([np.inf, np.inf], changedArcs["previousWeight"][4:].tolist())
+        self.assertEqual([40, 50, 60], self.networkDiff.getChangedEdgeIDs(["pituus"]).tolist())
+
+    def test_givenTwoNetworkVersions_then_findTheStartVerticesWhoseShortestPathTreeTouchesTheChanges(self):
+        startVerticesID = [1, 2, 3, 4, 5, 6, 7]
+
+        affected = self.networkDiff.getAffectedStartVertices(startVerticesID, ["pituus"], blockSize=1)
+
+        self.assertEqual([1, 4, 5, 6, 7], affected.tolist())
+
+        # the costs of the other start vertices do not change
+        unaffected = [2, 3]
+        endVerticesID = [1, 2, 3, 4, 5, 6]
+        np.testing.assert_array_equal(
+            self.previousGraph.calculateShortestPathCosts(self.previousGraph.getVertexIndices(unaffected),
+                                                          self.previousGraph.getVertexIndices(endVerticesID),
+                                                          "pituus"),
+            self.currentGraph.calculateShortestPathCosts(self.currentGraph.getVertexIndices(unaffected),
+                                                         self.currentGraph.getVertexIndices(endVerticesID),
+                                                         "pituus"))
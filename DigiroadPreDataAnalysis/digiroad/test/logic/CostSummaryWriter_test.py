@@ -0,0 +1,62 @@
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from digiroad.logic.CostSummaryWriter import CostSummaryWriter
+from digiroad.logic.MetropAccessDigiroad import createVertexPointsIndex, expandVertexPairs
+
+
+class CostSummaryWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_givenSeveralBlocks_then_appendAllTheRowsAfterTheHeader(self):
+        csvFilePath = os.path.join(self.dir, "summary", "travel_time.csv")
+        with CostSummaryWriter(csvFilePath, ["ykr_from_id", "ykr_to_id", "travel_time"]) as writer:
+            writer.writeRows(np.array([1, 1]), np.array([2, 3]), np.array([1.5, 2.5]))
+            writer.writeRows([4], [5], [3.0])
+
+        self.assertEqual(3, writer.numberOfRows)
+        with open(csvFilePath, newline="") as csvFile:
+            rows = list(csv.reader(csvFile, delimiter=";"))
+        self.assertEqual([["ykr_from_id", "ykr_to_id", "travel_time"],
+                          ["1", "2", "1.5"],
+                          ["1", "3", "2.5"],
+                          ["4", "5", "3.0"]], rows)
+
+    def test_givenACheckpoint_when_resumed_then_discardTheRowsWrittenAfterTheCheckpoint(self):
+        csvFilePath = os.path.join(self.dir, "travel_time.csv")
+        with CostSummaryWriter(csvFilePath, ["ykr_from_id", "ykr_to_id", "travel_time"]) as writer:
+            writer.writeRows([1], [2], [1.5])
+            checkpoint = writer.checkpoint()
+            writer.writeRows([1], [3], [2.5])
+
+        with CostSummaryWriter(csvFilePath, ["ykr_from_id", "ykr_to_id", "travel_time"],
+                               checkpoint=checkpoint) as writer:
+            writer.writeRows([4], [5], [3.0])
+
+        self.assertEqual(2, writer.numberOfRows)
+        with open(csvFilePath, newline="") as csvFile:
+            rows = list(csv.reader(csvFile, delimiter=";"))
+        self.assertEqual([["ykr_from_id", "ykr_to_id", "travel_time"],
+                          ["1", "2", "1.5"],
+                          ["4", "5", "3.0"]], rows)
+
+    def test_givenPointsSharingTheNearestVertex_then_expandEachPairOfVerticesToAllThePairsOfPoints(self):
+        startPointsIndex = createVertexPointsIndex([5, 3, 5])
+        endPointsIndex = createVertexPointsIndex([7, 7, 9])
+
+        pairPositions, startPositions, endPositions = expandVertexPairs(np.array([5, 3, 5, 8]),
+                                                                        np.array([7, 9, 9, 7]),
+                                                                        startPointsIndex,
+                                                                        endPointsIndex)
+
+        self.assertEqual([(0, 0, 0), (0, 0, 1), (0, 2, 0), (0, 2, 1), (1, 1, 2), (2, 0, 2), (2, 2, 2)],
+                         list(zip(pairPositions.tolist(), startPositions.tolist(), endPositions.tolist())))
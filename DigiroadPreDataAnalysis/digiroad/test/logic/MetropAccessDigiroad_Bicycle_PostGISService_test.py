@@ -11,6 +11,7 @@ from digiroad.carRoutingExceptions import WFSNotDefinedException, NotURLDefinedE
     TransportModeNotDefinedException
 from digiroad.connection.PostgisServiceProvider import PostgisServiceProvider
 from digiroad.logic.MetropAccessDigiroad import MetropAccessDigiroadApplication
+from digiroad.logic.RouteStore import RouteStore
 from digiroad.transportMode.BicycleTransportMode import BicycleTransportMode
 from digiroad.transportMode.PrivateCarTransportMode import PrivateCarTransportMode
 from digiroad.util import CostAttributes, getEnglishMeaning, FileActions, Logger
@@ -79,13 +80,10 @@ class MetropAccessDigiroadTest(unittest.TestCase):
             geomsOutputFolderFeaturesURL = outputFolderFeaturesURL + "geoms" + os.sep + getEnglishMeaning(
                 CostAttributes.BICYCLE_FAST_TIME) + os.sep
 
-        outputFileList = self.readOutputFolderFiles(geomsOutputFolderFeaturesURL)
-
-        outputFilename = outputFileList[0]
-        outputFilePath = outputFolderFeaturesURL + os.sep + "geoms" + os.sep + getEnglishMeaning(
-            CostAttributes.BICYCLE_FAST_TIME) + os.sep + outputFilename
-
-        outputResult = self.fileActions.readJson(outputFilePath)
+        outputResult = next(RouteStore.iterateRoutes(geomsOutputFolderFeaturesURL))
+        del outputResult["routeId"]
+        # the routes are rebuilt in travel order
+        expectedResult["features"].sort(key=lambda feature: feature["properties"]["seq"])
 
         for feature in expectedResult["features"]:
             if "id" in feature:
@@ -132,12 +130,12 @@ class MetropAccessDigiroadTest(unittest.TestCase):
                 geomsOutputFolderFeaturesURL = outputFolderFeaturesURL + "geoms" + os.sep + getEnglishMeaning(
                     distanceCostAttribute[key]) + os.sep
 
-            outputFileList = self.readOutputFolderFiles(geomsOutputFolderFeaturesURL)
+            numberOfRoutes = RouteStore.readMetadata(geomsOutputFolderFeaturesURL)["numberOfRoutes"]
 
             totalCombinatory = len(inputCoordinatesGeojson["features"]) * len(
                 inputCoordinatesGeojson["features"]) - len(
                 inputCoordinatesGeojson["features"])
-            self.assertEqual(totalCombinatory, len(outputFileList))
+            self.assertEqual(totalCombinatory, numberOfRoutes)
 
     def test_givenAListOfGeojson_then_createSummary(self):
         self.maxDiff = None
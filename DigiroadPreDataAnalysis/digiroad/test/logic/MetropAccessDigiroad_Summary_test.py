@@ -0,0 +1,408 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+import numpy as np
+
+from digiroad.cache.RouteCache import RouteCache
+from digiroad.carRoutingExceptions import NearestVertexNotFoundException
+from digiroad.connection.PostgisServiceProvider import PostgisServiceProvider
+from digiroad.graph.CSRGraph import CSRGraph
+from digiroad.logic.MetropAccessDigiroad import MetropAccessDigiroadApplication
+from digiroad.logic.RunManifest import RunManifest
+from digiroad.transportMode import AbstractTransportMode
+from digiroad.transportMode.InMemoryPrivateCarTransportMode import InMemoryPrivateCarTransportMode
+from digiroad.util import Configuration, CostAttributes, FileActions, getConfigurationPath
+
+
+def createPointFeature(pointId, vertexID, x, y):
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [x, y]},
+        "properties": {
+            "YKR_ID": pointId,
+            "vertex_id": vertexID,
+            "selectedPointCoordinates": [x, y],
+            "nearestVertexCoordinates": [x + 10, y + 10],
+            "coordinatesCRS": "epsg:3857"
+        }
+    }
+
+
+class InterruptedTransportMode(AbstractTransportMode):
+    def __init__(self, failingCall):
+        self.failingCall = failingCall
+        self.startVerticesCalls = []
+
+    def iterateTotalShortestPathCostMatrixBlocks(self, startVerticesID, endVerticesID, costAttributes):
+        self.startVerticesCalls.append(list(startVerticesID))
+        if len(self.startVerticesCalls) == self.failingCall:
+            raise RuntimeError("connection lost")
+
+        startVertices = np.repeat(np.array(startVerticesID, dtype=np.int64), len(endVerticesID))
+        endVertices = np.tile(np.array(endVerticesID, dtype=np.int64), len(startVerticesID))
+        block = {"start_vertex_id": startVertices, "end_vertex_id": endVertices}
+        for costAttribute in costAttributes:
+            block[costAttribute] = (startVertices + endVertices).astype(np.float64)
+        yield block
+
+
+class CostSummaryTransportMode(InterruptedTransportMode):
+    def __init__(self):
+        super(CostSummaryTransportMode, self).__init__(failingCall=None)
+
+    def getTotalShortestPathCost(self, startVerticesID, endVerticesID, costAttribute):
+        block = next(self.iterateTotalShortestPathCostMatrixBlocks(startVerticesID, endVerticesID, [costAttribute]))
+        return FileActions().createCostSummaryGeojson(block["start_vertex_id"], block["end_vertex_id"],
+                                                      {"total_cost": block[costAttribute]})
+
+    def getTotalShortestPathCostAllImpedances(self, startVerticesID, endVerticesID, costAttributes):
+        block = next(self.iterateTotalShortestPathCostMatrixBlocks(startVerticesID, endVerticesID, costAttributes))
+        return FileActions().createCostSummaryGeojson(block["start_vertex_id"], block["end_vertex_id"],
+                                                      {costAttribute: block[costAttribute]
+                                                       for costAttribute in costAttributes})
+
+
+class EdgesTransportMode(AbstractTransportMode):
+    tableName = "edges"
+
+    def __init__(self):
+        self.searches = []
+
+    def getRoutableEdgeFilterSQL(self):
+        return "e.TOIMINN_LK <> 8"
+
+    def getNetworkFingerprint(self):
+        return "edges:1:2:3:4:5"
+
+    def getShortestPathsFromAnOrigin(self, startVertexId, endVerticesID, cost):
+        self.searches.append(list(endVerticesID))
+        return self.getShortestPathsFromEdges({endVertexId: [endVertexId * 10, endVertexId * 10 + 1]
+                                               for endVertexId in endVerticesID})
+
+    def getShortestPathsFromEdges(self, pathsEdgeIDs):
+        return {endVertexId: {
+            "type": "FeatureCollection",
+            "features": [{"properties": {"seq": seq, "id": edgeID}} for seq, edgeID in enumerate(edgeIDs, start=1)]
+        } for endVertexId, edgeIDs in pathsEdgeIDs.items()}
+
+
+class SnappingTransportMode(AbstractTransportMode):
+    def __init__(self):
+        self.oneByOnePoints = []
+
+    def getEPSGCode(self):
+        return "EPSG:3857"
+
+    def getNearestRoutableVerticesFromPoints(self, points):
+        # the bulk snapping misses the points with a negative longitude
+        vertexIDs = np.array([int(point.getLongitude()) if point.getLongitude() > 0 else -1 for point in points])
+        coordinates = np.array([[point.getLongitude(), point.getLatitude()] if point.getLongitude() > 0
+                                else [np.nan, np.nan] for point in points])
+        return vertexIDs, coordinates
+
+    def getNearestRoutableVertexFromAPoint(self, coordinates, radius=500):
+        # one by one only the points at longitude -1 have a routable vertex
+        self.oneByOnePoints.append(coordinates.getLongitude())
+        geojson = {
+            "type": "FeatureCollection",
+            "crs": {"type": "name", "properties": {"name": "urn:ogc:def:crs:EPSG::3857"}},
+            "features": []
+        }
+        if coordinates.getLongitude() == -1:
+            geojson["features"].append({"type": "Feature",
+                                        "geometry": {"type": "Point", "coordinates": [-5.0, 5.0]},
+                                        "properties": {"id": 99}})
+        return geojson
+
+
+class NetworkVersionTransportMode(InMemoryPrivateCarTransportMode):
+    def __init__(self, networkFingerprint, distances, configuration):
+        #  10 <-> 20 <-> 30 <-> 40, 50 <-> 60
+        graph = CSRGraph.fromEdges(edgeIDs=[1, 2, 3, 4],
+                                   sources=[10, 20, 30, 50],
+                                   targets=[20, 30, 40, 60],
+                                   costs={CostAttributes.DISTANCE: distances},
+                                   reverseCosts={CostAttributes.DISTANCE: distances})
+        super(NetworkVersionTransportMode, self).__init__(PostgisServiceProvider(), graph=graph,
+                                                          configuration=configuration)
+        self.networkFingerprint = networkFingerprint
+        self.startVerticesCalls = []
+
+    def getNetworkFingerprint(self):
+        return self.networkFingerprint
+
+    def iterateTotalShortestPathCostMatrixBlocks(self, startVerticesID, endVerticesID, costAttributes):
+        self.startVerticesCalls.append(list(startVerticesID))
+        return super(NetworkVersionTransportMode, self).iterateTotalShortestPathCostMatrixBlocks(
+            startVerticesID, endVerticesID, costAttributes)
+
+
+class MetropAccessDigiroadSummaryTest(unittest.TestCase):
+    def setUp(self):
+        configuration = Configuration(getConfigurationPath())
+        configuration.pointIdentifier = "YKR_ID"
+        self.metroAccessDigiroad = MetropAccessDigiroadApplication(configuration=configuration)
+
+    def test_givenACostSummary_then_joinTheCostOfEachPairOfPointsWithTheirAdditionalProperties(self):
+        startPointsFeaturesList = [createPointFeature(1, 10, 2776000.0, 8438000.0),
+                                   createPointFeature(2, 11, 2777000.0, 8439000.0),
+                                   createPointFeature(3, 10, 2776000.0, 8438000.0)]
+        endPointsFeaturesList = [createPointFeature(4, 20, 2778000.0, 8440000.0),
+                                 createPointFeature(5, 21, 2779000.0, 8441000.0)]
+        totals = {
+            "features": [
+                {"properties": {"start_vertex_id": 10, "end_vertex_id": 21, "total_cost": 1.0}, "geometry": None},
+                {"properties": {"start_vertex_id": 10, "end_vertex_id": 20, "total_cost": 2.0}, "geometry": None},
+                {"properties": {"start_vertex_id": 11, "end_vertex_id": 20, "total_cost": 3.0}, "geometry": None}
+            ]
+        }
+
+        summary = self.metroAccessDigiroad.createSummaryDataFrame(CostAttributes.DISTANCE, totals,
+                                                                  startPointsFeaturesList, endPointsFeaturesList)
+
+        # the pair (2, 5) is not reachable
+        self.assertEqual([(1, 4), (1, 5), (2, 4), (3, 4), (3, 5)],
+                         list(zip(summary["startPoint_YKR_ID"], summary["endPoint_YKR_ID"])))
+        self.assertEqual([2.0, 1.0, 3.0, 2.0, 1.0], summary["distance"].tolist())
+        self.assertEqual(["distance"] * 5, summary["costAttribute"].tolist())
+
+        expectedProperties = self.metroAccessDigiroad.insertAdditionalProperties(startPointsFeaturesList[1],
+                                                                                 endPointsFeaturesList[0])
+        features = self.metroAccessDigiroad.createSummaryFeatures(summary, totals)
+        for key in expectedProperties:
+            self.assertEqual(expectedProperties[key], features[2]["properties"][key])
+        self.assertEqual(11, features[2]["properties"]["startVertexId"])
+        self.assertEqual([2777000.0, 8439000.0], features[2]["properties"]["selectedStartCoordinates"])
+        self.assertEqual([2778010.0, 8440010.0], features[2]["properties"]["nearestEndCoordinates"])
+
+    def test_givenSeveralImpedances_then_storeTheSummaryGeojsonOfEachImpedance(self):
+        folder = tempfile.mkdtemp()
+        try:
+            configuration = self.metroAccessDigiroad.configuration
+            configuration.debug = False
+            configuration.matrixOnly = False
+            configuration.summaryFormat = "csv"
+            configuration.incremental = False
+            self.metroAccessDigiroad.transportMode = CostSummaryTransportMode()
+            summaryPoints = ([10, 11], [createPointFeature(1, 10, 2776000.0, 8438000.0),
+                                        createPointFeature(2, 11, 2777000.0, 8439000.0)],
+                             [20], [createPointFeature(3, 20, 2778000.0, 8440000.0)])
+            self.metroAccessDigiroad.prepareSummaryPoints = lambda **kwargs: summaryPoints
+
+            self.metroAccessDigiroad.createGeneralSummaryForAllImpedances(
+                startCoordinatesGeojsonFilename="start.geojson",
+                endCoordinatesGeojsonFilename="end.geojson",
+                costAttributes=[CostAttributes.DISTANCE, CostAttributes.SPEED_LIMIT_TIME],
+                outputFolderPath=folder,
+                outputFilename="summary")
+
+            summaryFolder = os.path.join(folder, "summary")
+            with zipfile.ZipFile(os.path.join(summaryFolder, "summary.zip")) as zipFile:
+                self.assertEqual(["distance_summary.geojson", "speed_limit_time_summary.geojson"],
+                                 sorted(zipFile.namelist()))
+                self.assertEqual(2, len(json.loads(zipFile.read("distance_summary.geojson"))["features"]))
+            with zipfile.ZipFile(os.path.join(summaryFolder, "summary_csv.zip")) as zipFile:
+                self.assertEqual(["distance_summary.csv", "speed_limit_time_summary.csv"],
+                                 sorted(zipFile.namelist()))
+            self.assertEqual(["summary.zip", "summary_csv.zip"], sorted(os.listdir(summaryFolder)))
+        finally:
+            shutil.rmtree(folder)
+
+    def test_givenSeveralBlocksOfStartPoints_then_storeTheSameSummaryThanASingleBlock(self):
+        folder = tempfile.mkdtemp()
+        try:
+            configuration = self.metroAccessDigiroad.configuration
+            configuration.debug = False
+            configuration.matrixOnly = False
+            configuration.summaryFormat = "csv"
+            configuration.incremental = False
+            summaryPoints = ([10, 11, 10], [createPointFeature(1, 10, 2776000.0, 8438000.0),
+                                            createPointFeature(2, 11, 2777000.0, 8439000.0),
+                                            createPointFeature(3, 10, 2776000.0, 8438000.0)],
+                             [20, 21], [createPointFeature(4, 20, 2778000.0, 8440000.0),
+                                        createPointFeature(5, 21, 2779000.0, 8441000.0)])
+            self.metroAccessDigiroad.prepareSummaryPoints = lambda **kwargs: summaryPoints
+
+            def createGeneralSummary(checkpointVertices):
+                configuration.checkpointVertices = checkpointVertices
+                transportMode = CostSummaryTransportMode()
+                self.metroAccessDigiroad.transportMode = transportMode
+                outputFolderPath = os.path.join(folder, str(checkpointVertices))
+                self.metroAccessDigiroad.createGeneralSummary(startCoordinatesGeojsonFilename="start.geojson",
+                                                              endCoordinatesGeojsonFilename="end.geojson",
+                                                              costAttribute=CostAttributes.DISTANCE,
+                                                              outputFolderPath=outputFolderPath,
+                                                              outputFilename="summary")
+                summaryFolder = os.path.join(outputFolderPath, "summary")
+                with zipfile.ZipFile(os.path.join(summaryFolder, "summary.zip")) as zipFile:
+                    geojson = json.loads(zipFile.read("distance_summary.geojson"))
+                with zipfile.ZipFile(os.path.join(summaryFolder, "summary_csv.zip")) as zipFile:
+                    rows = zipFile.read("distance_summary.csv").decode("utf-8").splitlines()
+                return transportMode.startVerticesCalls, geojson, rows
+
+            startVerticesCalls, geojson, rows = createGeneralSummary(1000)
+            blockStartVerticesCalls, blockGeojson, blockRows = createGeneralSummary(2)
+
+            self.assertEqual([[10, 11]], startVerticesCalls)
+            self.assertEqual([[10, 11], [10]], blockStartVerticesCalls)
+            self.assertEqual(rows, blockRows)
+            self.assertEqual(["1;4", "1;5", "2;4", "2;5", "3;4", "3;5"], [row.rsplit(";", 1)[0] for row in rows[1:]])
+            self.assertEqual(geojson, blockGeojson)
+            self.assertEqual([str(position) for position in range(6)],
+                             [feature["id"] for feature in geojson["features"]])
+            self.assertEqual("urn:ogc:def:crs:EPSG::3857", geojson["crs"]["properties"]["name"])
+        finally:
+            shutil.rmtree(folder)
+
+    def test_givenAnInterruptedStreamedSummary_when_runAgain_then_solveOnlyTheMissingBlocks(self):
+        folder = tempfile.mkdtemp()
+        try:
+            configuration = self.metroAccessDigiroad.configuration
+            configuration.debug = True
+            configuration.summaryFormat = "csv"
+            configuration.checkpointVertices = 1
+            self.metroAccessDigiroad.runManifest = RunManifest(os.path.join(folder, "run_manifest.sqlite"))
+
+            startPointsFeaturesList = [createPointFeature(1, 10, 2776000.0, 8438000.0),
+                                       createPointFeature(2, 11, 2777000.0, 8439000.0),
+                                       createPointFeature(3, 12, 2776000.0, 8438000.0)]
+            endPointsFeaturesList = [createPointFeature(4, 20, 2778000.0, 8440000.0),
+                                     createPointFeature(5, 21, 2779000.0, 8441000.0)]
+
+            def streamGeneralSummary():
+                self.metroAccessDigiroad.streamGeneralSummary(costAttributes=[CostAttributes.DISTANCE],
+                                                              startVerticesID=[10, 11, 12],
+                                                              startPointsFeaturesList=startPointsFeaturesList,
+                                                              endVerticesID=[20, 21],
+                                                              endPointsFeaturesList=endPointsFeaturesList,
+                                                              outputFolderPath=folder,
+                                                              outputFilename="summary")
+
+            self.metroAccessDigiroad.transportMode = InterruptedTransportMode(failingCall=3)
+            self.assertRaises(RuntimeError, streamGeneralSummary)
+
+            transportMode = InterruptedTransportMode(failingCall=None)
+            self.metroAccessDigiroad.transportMode = transportMode
+            streamGeneralSummary()
+
+            self.assertEqual([[12]], transportMode.startVerticesCalls)
+            with open(os.path.join(folder, "summary", "distance_summary.csv"), newline="") as csvFile:
+                rows = list(csv.reader(csvFile, delimiter=";"))
+            self.assertEqual(["ykr_from_id", "ykr_to_id", "travel_time"], rows[0])
+            self.assertEqual([("1", "4"), ("1", "5"), ("2", "4"), ("2", "5"), ("3", "4"), ("3", "5")],
+                             [(row[0], row[1]) for row in rows[1:]])
+            self.assertAlmostEqual(1.0, float(rows[2][2]) - float(rows[1][2]))
+            self.metroAccessDigiroad.runManifest.close()
+        finally:
+            shutil.rmtree(folder)
+
+    def test_givenANetworkChange_when_incremental_then_solveOnlyTheStartVerticesAffected(self):
+        folder = tempfile.mkdtemp()
+        try:
+            configuration = self.metroAccessDigiroad.configuration
+            configuration.debug = False
+            configuration.summaryFormat = "csv"
+            configuration.incremental = True
+
+            startPointsFeaturesList = [createPointFeature(1, 10, 2776000.0, 8438000.0),
+                                       createPointFeature(2, 30, 2777000.0, 8439000.0),
+                                       createPointFeature(3, 50, 2776000.0, 8438000.0)]
+            endPointsFeaturesList = [createPointFeature(4, 40, 2778000.0, 8440000.0),
+                                     createPointFeature(5, 60, 2779000.0, 8441000.0)]
+
+            def streamGeneralSummary(transportMode, outputFolderPath):
+                self.metroAccessDigiroad.transportMode = transportMode
+                self.metroAccessDigiroad.streamGeneralSummary(costAttributes=[CostAttributes.DISTANCE],
+                                                              startVerticesID=[10, 30, 50],
+                                                              startPointsFeaturesList=startPointsFeaturesList,
+                                                              endVerticesID=[40, 60],
+                                                              endPointsFeaturesList=endPointsFeaturesList,
+                                                              outputFolderPath=outputFolderPath,
+                                                              outputFilename="summary")
+                with zipfile.ZipFile(os.path.join(outputFolderPath, "summary", "summary_csv.zip")) as zipFile:
+                    self.assertEqual(["distance_summary.csv"], zipFile.namelist())
+                    return sorted(zipFile.read("distance_summary.csv").decode("utf-8").splitlines())
+
+            streamGeneralSummary(NetworkVersionTransportMode("edges:1", [100, 50, 25, 10], configuration), folder)
+
+            # the edge 50 <-> 60 is slower
+            transportMode = NetworkVersionTransportMode("edges:2", [100, 50, 25, 20], configuration)
+            rows = streamGeneralSummary(transportMode, folder)
+
+            self.assertEqual([[50]], transportMode.startVerticesCalls)
+            configuration.incremental = False
+            self.assertEqual(streamGeneralSummary(NetworkVersionTransportMode("edges:2", [100, 50, 25, 20],
+                                                                              configuration),
+                                                  os.path.join(folder, "scratch")), rows)
+        finally:
+            shutil.rmtree(folder)
+
+    def test_givenATransportModeWithoutGraph_when_incremental_then_calculateTheSummaryFromScratch(self):
+        folder = tempfile.mkdtemp()
+        try:
+            configuration = self.metroAccessDigiroad.configuration
+            configuration.debug = False
+            configuration.summaryFormat = "csv"
+            configuration.incremental = True
+            transportMode = InterruptedTransportMode(failingCall=None)
+            self.metroAccessDigiroad.transportMode = transportMode
+
+            with self.assertLogs(level="WARNING") as logs:
+                self.metroAccessDigiroad.streamGeneralSummary(
+                    costAttributes=[CostAttributes.DISTANCE],
+                    startVerticesID=[10, 11],
+                    startPointsFeaturesList=[createPointFeature(1, 10, 2776000.0, 8438000.0),
+                                             createPointFeature(2, 11, 2777000.0, 8439000.0)],
+                    endVerticesID=[20],
+                    endPointsFeaturesList=[createPointFeature(3, 20, 2778000.0, 8440000.0)],
+                    outputFolderPath=folder,
+                    outputFilename="summary")
+
+            self.assertEqual([[10, 11]], transportMode.startVerticesCalls)
+            self.assertIn("requires an in-memory transport mode", logs.output[0])
+            self.assertFalse(os.path.exists(os.path.join(folder, "summary", "network")))
+        finally:
+            shutil.rmtree(folder)
+
+    def test_givenARouteCache_then_searchOnlyThePathsNotCached(self):
+        folder = tempfile.mkdtemp()
+        try:
+            transportMode = EdgesTransportMode()
+            self.metroAccessDigiroad.transportMode = transportMode
+            self.metroAccessDigiroad.routeCache = RouteCache(os.path.join(folder, "route.sqlite"), "edges",
+                                                             transportMode.getRoutableEdgeFilterSQL(),
+                                                             transportMode.getNetworkFingerprint())
+
+            getShortestPaths = self.metroAccessDigiroad.getShortestPathsFromAnOrigin
+            firstShortestPaths = getShortestPaths(1, [2, 3], CostAttributes.DISTANCE)
+            shortestPaths = getShortestPaths(1, [3, 4, 2], CostAttributes.DISTANCE)
+
+            self.assertEqual([[2, 3], [4]], transportMode.searches)
+            self.assertEqual(firstShortestPaths[3], shortestPaths[3])
+            self.assertEqual([40, 41], transportMode.getShortestPathEdges(shortestPaths[4]))
+            self.metroAccessDigiroad.routeCache.close()
+        finally:
+            shutil.rmtree(folder)
+
+    def test_givenPointsMissedByTheBulkSnapping_then_snapThemOneByOne(self):
+        transportMode = SnappingTransportMode()
+        self.metroAccessDigiroad.transportMode = transportMode
+        geojson = {"features": [createPointFeature(1, None, 7.0, 1.0), createPointFeature(2, None, -1.0, 1.0)]}
+
+        verticesID, features = self.metroAccessDigiroad.getVerticesID(geojson, "epsg:3857")
+
+        self.assertEqual([7, 99], verticesID)
+        self.assertEqual([-1.0], transportMode.oneByOnePoints)
+        self.assertEqual([-5.0, 5.0], features[1]["properties"]["nearestVertexCoordinates"])
+
+    def test_givenAPointWithoutRoutableVertex_then_raiseAnError(self):
+        self.metroAccessDigiroad.transportMode = SnappingTransportMode()
+        geojson = {"features": [createPointFeature(1, None, 7.0, 1.0), createPointFeature(2, None, -2.0, 1.0)]}
+
+        self.assertRaises(NearestVertexNotFoundException, self.metroAccessDigiroad.getVerticesID, geojson,
+                          "epsg:3857")
@@ -5,6 +5,7 @@ from digiroad.carRoutingExceptions import NotURLDefinedException, \
     TransportModeNotDefinedException
 from digiroad.connection.PostgisServiceProvider import PostgisServiceProvider
 from digiroad.logic.MetropAccessDigiroad import MetropAccessDigiroadApplication
+from digiroad.logic.RouteStore import RouteStore
 from digiroad.transportMode.PrivateCarTransportMode import PrivateCarTransportMode
 from digiroad.util import CostAttributes, getEnglishMeaning, FileActions
 
@@ -69,14 +70,10 @@ class MetropAccessDigiroadTest(unittest.TestCase):
             geomsOutputFolderFeaturesURL = outputFolderFeaturesURL + "geoms" + os.sep + getEnglishMeaning(
                 CostAttributes.DISTANCE) + os.sep
 
-        outputFileList = self.readOutputFolderFiles(geomsOutputFolderFeaturesURL)
-
-        outputFilename = outputFileList[0]
-        outputFilePath = outputFolderFeaturesURL  + os.sep + "geoms" + os.sep + getEnglishMeaning(
-            CostAttributes.DISTANCE) + os.sep + outputFilename
-
-
-        outputResult = self.fileActions.readJson(outputFilePath)
+        outputResult = next(RouteStore.iterateRoutes(geomsOutputFolderFeaturesURL))
+        del outputResult["routeId"]
+        # the routes are rebuilt in travel order
+        expectedResult["features"].sort(key=lambda feature: feature["properties"]["seq"])
 
         for feature in expectedResult["features"]:
             if "id" in feature:
@@ -121,11 +118,11 @@ class MetropAccessDigiroadTest(unittest.TestCase):
                 geomsOutputFolderFeaturesURL = outputFolderFeaturesURL + "geoms" + os.sep + getEnglishMeaning(
                     distanceCostAttribute[key]) + os.sep
 
-            outputFileList = self.readOutputFolderFiles(geomsOutputFolderFeaturesURL)
+            numberOfRoutes = RouteStore.readMetadata(geomsOutputFolderFeaturesURL)["numberOfRoutes"]
 
             totalCombinatory = len(inputCoordinatesGeojson["features"]) * len(inputCoordinatesGeojson["features"]) - len(
                 inputCoordinatesGeojson["features"])
-            self.assertEqual(totalCombinatory, len(outputFileList))
+            self.assertEqual(totalCombinatory, numberOfRoutes)
 
     def test_givenAListOfGeojson_then_createSummary(self):
         self.maxDiff = None
@@ -3,7 +3,7 @@ import unittest
 
 from digiroad.connection.WFSServiceProvider import WFSServiceProvider
 from digiroad.entities import Point
-from digiroad.logic.Operations import Operations
+from digiroad.logic.Operations import Operations, getTransformer
 from digiroad.util import FileActions, Logger
 
 
@@ -36,10 +36,8 @@ class OperationsTest(unittest.TestCase):
     def test_givenASetOfPoints_then_mergeAllTheMergeableLayersWithTheOriginalPoints(self):
         expectedMergedLayerURL = self.dir + '%digiroad%test%data%geojson%mergedLayer.geojson'.replace("%", os.sep)
         testPointsURL = self.dir + '%digiroad%test%data%geojson%reititinTestPoints.geojson'.replace("%", os.sep)
-        outputFolderFeaturesURL = self.dir + '%digiroad%test%data%outputFolder%'.replace("%", os.sep)
 
-        mergedLayer = self.operations.mergeAdditionalLayers(originalJsonURL=testPointsURL,
-                                                            outputFolderPath=outputFolderFeaturesURL)
+        mergedLayer = self.operations.mergeAdditionalLayers(originalJsonURL=testPointsURL)
 
         expectedMergedLayer = self.fileActions.readJson(expectedMergedLayerURL)
         self.assertEqual(expectedMergedLayer, mergedLayer)
@@ -101,6 +99,43 @@ class OperationsTest(unittest.TestCase):
         self.assertEqual(euclideanDistanceExpected,
                          self.operations.calculateEuclideanDistance(startPoint, endPoint))
 
+    def test_givenSeveralPairsOfPoints_then_calculateTheSameEuclideanDistancesAsPointByPoint(self):
+        startCoordinates = [(2770620.87667954, 8443095.452975733), (2776000.0, 8438000.0)]
+        endCoordinates = [(2770621.87667954, 8443096.452975733), (2776230.0, 8438150.0)]
+
+        euclideanDistances = self.operations.calculateEuclideanDistances(
+            startLongitudes=[x for x, y in startCoordinates],
+            startLatitudes=[y for x, y in startCoordinates],
+            endLongitudes=[x for x, y in endCoordinates],
+            endLatitudes=[y for x, y in endCoordinates],
+            epsgCode="EPSG:3857"
+        )
+
+        for euclideanDistance, (startX, startY), (endX, endY) in zip(euclideanDistances, startCoordinates,
+                                                                     endCoordinates):
+            self.assertAlmostEqual(
+                self.operations.calculateEuclideanDistance(Point(latitute=startY, longitude=startX,
+                                                                 epsgCode="EPSG:3857"),
+                                                           Point(latitute=endY, longitude=endX,
+                                                                 epsgCode="EPSG:3857")),
+                euclideanDistance,
+                places=6
+            )
+
+    def test_givenSeveralPoints_then_transformThemInBulkAsPointByPoint(self):
+        points = [Point(latitute=8443095.452975733, longitude=2770620.87667954, epsgCode="EPSG:3857"),
+                  Point(latitute=6672380.0, longitude=385875.0, epsgCode="EPSG:3047"),
+                  Point(latitute=60.2, longitude=24.9, epsgCode="epsg:4326")]
+
+        transformedPoints = self.operations.transformPoints(points, "epsg:4326")
+
+        for point, transformedPoint in zip(points, transformedPoints):
+            expectedPoint = self.operations.transformPoint(point, "epsg:4326")
+            self.assertAlmostEqual(expectedPoint.getLongitude(), transformedPoint.getLongitude())
+            self.assertAlmostEqual(expectedPoint.getLatitude(), transformedPoint.getLatitude())
+        self.assertIs(points[2], transformedPoints[2])
+        self.assertIs(getTransformer("epsg:3857", "epsg:4326"), getTransformer("epsg:3857", "epsg:4326"))
+
     def test_transformPoint_to_newCoordinateSystem(self):
         url = self.dir + '%digiroad%test%data%geojson%Subsets%1_Origs_WGS84.geojson'.replace("%", os.sep)
         epsgCode = self.operations.extractCRSWithGeopandas(url)
@@ -0,0 +1,40 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pyarrow.parquet as pq
+
+from digiroad.logic.ParquetCostSummaryWriter import ParquetCostSummaryWriter
+
+
+class ParquetCostSummaryWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_givenSeveralBlocks_then_writeRowGroupsSortedByStartPointWithCompactTypes(self):
+        parquetFilePath = os.path.join(self.dir, "summary", "travel_time.parquet")
+        with ParquetCostSummaryWriter(parquetFilePath, "travel_time", rowGroupSize=3) as writer:
+            writer.writeRows(np.array([7, 5]), np.array([2, 3]), np.array([1.5, 2.5]))
+            writer.writeRows([5], [1], [3.0])
+            writer.writeRows([4], [5], [4.0])
+
+        self.assertEqual(4, writer.numberOfRows)
+        parquetFile = pq.ParquetFile(parquetFilePath)
+        self.assertEqual(2, parquetFile.num_row_groups)
+
+        table = parquetFile.read()
+        self.assertEqual("int32", str(table.schema.field("ykr_from_id").type))
+        self.assertEqual("float", str(table.schema.field("travel_time").type))
+        self.assertEqual("dictionary<values=string, indices=int8, ordered=0>",
+                         str(table.schema.field("cost_attribute").type))
+        self.assertEqual([5, 5, 7, 4], table.column("ykr_from_id").to_pylist())
+        self.assertEqual([1, 3, 2, 5], table.column("ykr_to_id").to_pylist())
+        self.assertEqual(["travel_time"] * 4, table.column("cost_attribute").to_pylist())
+
+        origin = pq.read_table(parquetFilePath, filters=[("ykr_from_id", "=", 4)])
+        self.assertEqual([4.0], origin.column("travel_time").to_pylist())
@@ -0,0 +1,106 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from digiroad.logic.RouteStore import RouteStore, createRouteSummaryFeature, getReversedSegments
+from digiroad.util import FileActions
+
+
+class RouteStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = os.getcwd()
+        self.tempDir = tempfile.mkdtemp()
+        self.fileActions = FileActions()
+        geomsFolderPath = self.dir + "%digiroad%test%data%outputFolder%geoms%distance%".replace("%", os.sep)
+        self.shortestPaths = [self.fileActions.readJson(geomsFolderPath + filename)
+                              for filename in sorted(os.listdir(geomsFolderPath))]
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+
+    def test_givenShortestPaths_then_storeThemInShardsWithTheirSummary(self):
+        folderPath = os.path.join(self.tempDir, "geoms", "distance")
+        summaryFeatures = [createRouteSummaryFeature(shortestPath, "distance") for shortestPath in self.shortestPaths]
+        with RouteStore(folderPath, "distance", routesPerShard=1) as routeStore:
+            for index, shortestPath in enumerate(self.shortestPaths):
+                routeStore.addRoute("shortestPath-distance-%s" % index, shortestPath)
+
+        self.assertTrue(RouteStore.isRouteStore(folderPath))
+        metadata = RouteStore.readMetadata(folderPath)
+        self.assertEqual(len(self.shortestPaths), metadata["numberOfRoutes"])
+        self.assertEqual(len(self.shortestPaths), len(metadata["shards"]))
+        self.assertEqual(self.shortestPaths[0]["crs"], metadata["crs"])
+
+        routes = list(RouteStore.iterateRoutes(folderPath))
+        self.assertEqual(["shortestPath-distance-0", "shortestPath-distance-1"],
+                         [route.pop("routeId") for route in routes])
+        for shortestPath in self.shortestPaths:
+            # the routes are rebuilt in travel order, without the feature ids of the query
+            shortestPath["features"].sort(key=lambda feature: feature["properties"]["seq"])
+            for feature in shortestPath["features"]:
+                del feature["id"]
+        self.assertEqual(self.shortestPaths, routes)
+
+        compactRoutes = list(RouteStore.iterateCompactRoutes(folderPath))
+        self.assertEqual([feature["properties"]["id"] for feature in self.shortestPaths[0]["features"]],
+                         compactRoutes[0]["edgeIDs"])
+        self.assertAlmostEqual(sum(feature["properties"]["distance"] for feature in self.shortestPaths[0]["features"]),
+                               compactRoutes[0]["totals"]["distance"])
+        shardsSize = sum(os.path.getsize(os.path.join(folderPath, shard)) for shard in metadata["shards"])
+        self.assertLess(shardsSize * 10, len(json.dumps(self.shortestPaths)))
+
+        summaryFilePath = os.path.join(self.tempDir, "summary", "distance_summary.geojson")
+        self.assertEqual(len(self.shortestPaths), RouteStore.writeSummary(folderPath, summaryFilePath))
+        with open(summaryFilePath) as summaryFile:
+            summary = json.load(summaryFile)
+
+        self.assertEqual({
+            "crs": self.shortestPaths[0]["crs"],
+            "features": summaryFeatures,
+            "totalFeatures": len(self.shortestPaths),
+            "type": "FeatureCollection"
+        }, summary)
+
+    def test_givenStoreRoutesDisabled_then_storeOnlyTheRouteSummary(self):
+        folderPath = os.path.join(self.tempDir, "geoms", "distance")
+        with RouteStore(folderPath, "distance", storeRoutes=False) as routeStore:
+            for index, shortestPath in enumerate(self.shortestPaths):
+                routeStore.addRoute("shortestPath-distance-%s" % index, shortestPath)
+
+        self.assertEqual([], RouteStore.readMetadata(folderPath)["shards"])
+        self.assertEqual([], list(RouteStore.iterateRoutes(folderPath)))
+        summaryFeatures = list(RouteStore.iterateSummaryFeatures(folderPath))
+        self.assertEqual(len(self.shortestPaths), len(summaryFeatures))
+        self.assertEqual("distance", summaryFeatures[0]["properties"]["costAttribute"])
+
+    def test_givenSegmentsInTravelOrder_then_findTheSegmentsTravelledAgainstTheirDigitizingDirection(self):
+        geometries = [
+            {"type": "LineString", "coordinates": [[1.0, 0.0], [0.0, 0.0]]},
+            {"type": "LineString", "coordinates": [[1.0, 0.0], [2.0, 0.0]]},
+            {"type": "MultiLineString", "coordinates": [[[3.0, 0.0], [2.5, 0.0]], [[2.5, 0.0], [2.0, 0.0]]]},
+            {"type": "LineString", "coordinates": [[4.0, 0.0], [3.0, 0.0]]}
+        ]
+
+        self.assertEqual([True, False, True, True], getReversedSegments(geometries))
+        self.assertEqual([False], getReversedSegments(geometries[:1]))
+
+    def test_givenAnUnreachablePair_then_storeTheEmptyRouteWithoutSummaryFeature(self):
+        folderPath = os.path.join(self.tempDir, "geoms", "distance")
+        unreachablePath = {
+            "type": "FeatureCollection",
+            "features": [],
+            "totalFeatures": 0,
+            "overallProperties": dict(self.shortestPaths[0]["overallProperties"])
+        }
+        with RouteStore(folderPath, "distance") as routeStore:
+            routeStore.addRoute("shortestPath-distance-0", self.shortestPaths[0])
+            routeStore.addRoute("shortestPath-distance-1", unreachablePath)
+
+        self.assertIsNone(createRouteSummaryFeature(unreachablePath, "distance"))
+        self.assertEqual(2, RouteStore.readMetadata(folderPath)["numberOfRoutes"])
+        compactRoutes = list(RouteStore.iterateCompactRoutes(folderPath))
+        self.assertEqual([], compactRoutes[1]["edgeIDs"])
+        self.assertEqual([], list(RouteStore.iterateRoutes(folderPath))[1]["features"])
+        self.assertEqual(1, len(list(RouteStore.iterateSummaryFeatures(folderPath))))
@@ -0,0 +1,50 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from digiroad.logic.RunManifest import RunManifest
+
+
+class RunManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filePath = os.path.join(self.dir, "run_manifest.sqlite")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_givenACompletedUnit_when_reopened_then_theUnitIsCompletedOnlyWithTheSameFingerprint(self):
+        manifest = RunManifest(self.filePath)
+        manifest.completeBlock("start_end|DISTANCE", "a", 0, {"distance": [100, 5]})
+        manifest.completeUnit("start_end|DISTANCE", "a")
+        manifest.close()
+
+        manifest = RunManifest(self.filePath)
+        self.assertTrue(manifest.isUnitCompleted("start_end|DISTANCE", "a"))
+        self.assertFalse(manifest.isUnitCompleted("start_end|DISTANCE", "b"))
+        self.assertFalse(manifest.isUnitCompleted("start_end|SPEED_LIMIT_TIME", "a"))
+        self.assertEqual({}, manifest.getCompletedBlocks("start_end|DISTANCE", "a"))
+        manifest.close()
+
+    def test_givenCompletedBlocks_then_discardTheBlocksOfAnotherFingerprint(self):
+        manifest = RunManifest(self.filePath)
+        manifest.completeBlock("summary", "a", 0, {"distance": [100, 5]})
+        manifest.completeBlock("summary", "a", 1, {"distance": [200, 10]})
+
+        self.assertEqual({0: {"distance": [100, 5]}, 1: {"distance": [200, 10]}},
+                         manifest.getCompletedBlocks("summary", "a"))
+        self.assertEqual({}, manifest.getCompletedBlocks("summary", "b"))
+        self.assertEqual({}, manifest.getCompletedBlocks("summary", "a"))
+        manifest.close()
+
+    def test_givenAModifiedFile_then_changeTheFileFingerprint(self):
+        filePath = os.path.join(self.dir, "points.geojson")
+        with open(filePath, "w") as pointsFile:
+            pointsFile.write("{}")
+        fingerprint = RunManifest.createFileFingerprint(filePath)
+
+        with open(filePath, "w") as pointsFile:
+            pointsFile.write('{"features": []}')
+
+        self.assertNotEqual(fingerprint, RunManifest.createFileFingerprint(filePath))
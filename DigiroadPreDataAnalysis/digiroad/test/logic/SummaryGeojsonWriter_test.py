@@ -0,0 +1,50 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from digiroad.logic.SummaryGeojsonWriter import SummaryGeojsonWriter
+from digiroad.util import FileActions
+
+
+def createFeature(startVertexID, endVertexID):
+    return {
+        "id": "0",
+        "type": "Feature",
+        "properties": {"start_vertex_id": startVertexID, "end_vertex_id": endVertexID, "total_cost": 1.5},
+        "geometry": {"type": "LineString", "coordinates": [[0.0, 0.0], [1.0, 1.0]]}
+    }
+
+
+class SummaryGeojsonWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_givenSeveralBlocks_then_storeTheSameFileThanTheWholeCollection(self):
+        crs = {"properties": {"name": "urn:ogc:def:crs:EPSG::3857"}, "type": "name"}
+        geojsonFilePath = os.path.join(self.dir, "summary", "distance_summary.geojson")
+        with SummaryGeojsonWriter(geojsonFilePath) as writer:
+            writer.writeFeatures({"type": "FeatureCollection", "crs": crs,
+                                  "features": [createFeature(1, 2), createFeature(1, 3)]})
+            writer.writeFeatures({"type": "FeatureCollection", "crs": crs, "features": []})
+            writer.writeFeatures({"type": "FeatureCollection", "crs": crs, "features": [createFeature(4, 2)]})
+
+        self.assertEqual(3, writer.numberOfFeatures)
+        features = [createFeature(1, 2), createFeature(1, 3), createFeature(4, 2)]
+        for position, feature in enumerate(features):
+            feature["id"] = str(position)
+        expectedFilePath = FileActions().writeFile(self.dir, "expected.geojson",
+                                                   {"type": "FeatureCollection", "crs": crs, "features": features})
+        with open(geojsonFilePath) as geojsonFile, open(expectedFilePath) as expectedFile:
+            self.assertEqual(expectedFile.read(), geojsonFile.read())
+
+    def test_givenNoFeatures_then_storeAnEmptyCollection(self):
+        geojsonFilePath = os.path.join(self.dir, "empty.geojson")
+        SummaryGeojsonWriter(geojsonFilePath).close()
+
+        with open(geojsonFilePath) as geojsonFile:
+            self.assertEqual({"type": "FeatureCollection", "features": []}, json.load(geojsonFile))
@@ -0,0 +1,75 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+
+from digiroad.logic.WorkQueue import WorkQueue
+
+
+def claimAllUnits(workQueuePath, workerName, claimedUnits):
+    workQueue = WorkQueue(workQueuePath)
+    unit = workQueue.claimUnit(workerName)
+    while unit:
+        claimedUnits.put(unit[0])
+        workQueue.completeUnit(unit[0])
+        unit = workQueue.claimUnit(workerName)
+    workQueue.close()
+
+
+class WorkQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.workQueuePath = os.path.join(self.dir, "work_queue.sqlite")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_givenAFailingUnit_then_retryItAfterThePendingUnitsUntilMaxTries(self):
+        workQueue = WorkQueue(self.workQueuePath)
+        workQueue.addUnits([("start1", "end1", "distance"), ("start1", "end2", "distance")])
+
+        unitId = workQueue.claimUnit("worker-0")[0]
+        workQueue.failUnit(unitId, "connection lost", maxTries=2)
+        self.assertEqual(("start1", "end2", "distance"), workQueue.claimUnit("worker-0")[1:])
+        self.assertEqual(unitId, workQueue.claimUnit("worker-0")[0])
+        workQueue.failUnit(unitId, "connection lost", maxTries=2)
+
+        self.assertIsNone(workQueue.claimUnit("worker-0"))
+        self.assertEqual({WorkQueue.FAILED: 1, WorkQueue.RUNNING: 1}, workQueue.getStatusCounts())
+        workQueue.close()
+
+    def test_givenARestartedRun_then_queueEveryUnitAgain(self):
+        units = [("start1", "end1", "distance"), ("start1", "end2", "distance"), ("start2", "end1", "distance")]
+        workQueue = WorkQueue(self.workQueuePath)
+        workQueue.addUnits(units)
+        workQueue.completeUnit(workQueue.claimUnit("worker-0")[0])
+        workQueue.failUnit(workQueue.claimUnit("worker-0")[0], "connection lost", maxTries=1)
+        workQueue.claimUnit("worker-1")
+        workQueue.close()
+
+        workQueue = WorkQueue(self.workQueuePath)
+        workQueue.addUnits(units + [("start2", "end2", "distance")])
+
+        # the run manifest decides whether the units done by the previous run are still up to date
+        self.assertEqual({WorkQueue.PENDING: 4}, workQueue.getStatusCounts())
+        self.assertEqual(("start1", "end1", "distance"), workQueue.claimUnit("worker-0")[1:])
+        workQueue.close()
+
+    def test_givenSeveralWorkerProcesses_then_eachUnitIsClaimedOnce(self):
+        workQueue = WorkQueue(self.workQueuePath)
+        workQueue.addUnits([("start%s" % start, "end%s" % end, "distance") for start in range(10) for end in range(5)])
+
+        claimedUnits = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=claimAllUnits,
+                                             args=(self.workQueuePath, "worker-%s" % worker, claimedUnits))
+                     for worker in range(3)]
+        for process in processes:
+            process.start()
+        unitIds = [claimedUnits.get(timeout=30) for _ in range(50)]
+        for process in processes:
+            process.join()
+
+        self.assertEqual(list(range(1, 51)), sorted(unitIds))
+        self.assertEqual({WorkQueue.DONE: 50}, workQueue.getStatusCounts())
+        workQueue.close()
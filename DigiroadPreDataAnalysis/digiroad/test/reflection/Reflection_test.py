@@ -2,6 +2,8 @@ import os
 import time
 import unittest
 
+import pandas as pd
+
 from digiroad.additionalOperations import AbstractAdditionalLayerOperation
 from digiroad.reflection import Reflection
 from digiroad.util import dgl_timer
@@ -44,6 +46,38 @@ class ReflectionTest(unittest.TestCase):
 
         self.assertEqual(4, counter)
 
+    def test_givenSeveralPoints_then_runBatchReturnsTheSamePropertiesAsRunOperation(self):
+        featuresProperties = [
+            {"YKR_ID": 1, "selectedPointCoordinates": [2776000.0, 8438000.0],
+             "nearestVertexCoordinates": [2776100.0, 8438010.0], "coordinatesCRS": "epsg:3857",
+             "walking_distance": None, "parking_time": None},
+            {"YKR_ID": 2, "selectedPointCoordinates": [2777000.0, 8439000.0],
+             "nearestVertexCoordinates": [2777000.0, 8439050.0], "coordinatesCRS": "epsg:3857",
+             "walking_distance": 140, "parking_time": "200"}
+        ]
+        properties = pd.DataFrame(featuresProperties, dtype=object)
+        properties = properties.where(pd.notnull(properties), None)
+
+        additionalLayerOperationLinkedList = self.reflection.getLinkedAbstractAdditionalLayerOperation()
+        while additionalLayerOperationLinkedList.hasNext():
+            additionalLayerOperation = additionalLayerOperationLinkedList.next()
+            batchProperties = additionalLayerOperation.runBatch(properties, prefix="startPoint_").to_dict("records")
+            for featureProperties, newProperties in zip(featuresProperties, batchProperties):
+                expectedProperties = additionalLayerOperation.runOperation({"properties": featureProperties},
+                                                                           prefix="startPoint_")
+                self.assertEqual(sorted(expectedProperties), sorted(newProperties))
+                for key in expectedProperties:
+                    if isinstance(expectedProperties[key], float):
+                        self.assertAlmostEqual(expectedProperties[key], newProperties[key], places=6)
+                    else:
+                        self.assertEqual(expectedProperties[key], newProperties[key])
+
+    def test_givenSeveralCalls_then_reuseTheSameOperations(self):
+        firstLinkedList = self.reflection.getLinkedAbstractAdditionalLayerOperation()
+        secondLinkedList = self.reflection.getLinkedAbstractAdditionalLayerOperation()
+        while firstLinkedList.hasNext():
+            self.assertIs(firstLinkedList.next(), secondLinkedList.next())
+
     def test_createTimerDecorator(self):
         self.captureProcessDuration(delay=3)
 
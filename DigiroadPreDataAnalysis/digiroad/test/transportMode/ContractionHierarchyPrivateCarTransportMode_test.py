@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from digiroad.connection.PostgisServiceProvider import PostgisServiceProvider
+from digiroad.graph.CSRGraph import CSRGraph
+from digiroad.graph.ContractionHierarchy import ContractionHierarchy
+from digiroad.transportMode.ContractionHierarchyPrivateCarTransportMode import \
+    ContractionHierarchyPrivateCarTransportMode
+from digiroad.test.transportMode.InMemoryPrivateCarTransportMode_test import SegmentsServiceProvider
+from digiroad.util import Configuration, CostAttributes, getConfigurationPath
+
+
+class NetworkVersionTransportMode(ContractionHierarchyPrivateCarTransportMode):
+    def __init__(self, networkFingerprint, graph, configuration):
+        super(NetworkVersionTransportMode, self).__init__(PostgisServiceProvider(), graph=graph,
+                                                          configuration=configuration)
+        self.networkFingerprint = networkFingerprint
+        self.builds = 0
+
+    def getNetworkFingerprint(self):
+        return self.networkFingerprint
+
+    def buildContractionHierarchy(self, costAttribute):
+        self.builds += 1
+        return super(NetworkVersionTransportMode, self).buildContractionHierarchy(costAttribute)
+
+
+def createGraph(distances, vertexIDs=(10, 20, 30, 40)):
+    return CSRGraph.fromEdges(edgeIDs=[1, 2, 3],
+                              sources=[10, 20, 30],
+                              targets=[20, 30, 40],
+                              costs={CostAttributes.DISTANCE: distances},
+                              reverseCosts={CostAttributes.DISTANCE: distances},
+                              vertexIDs=list(vertexIDs))
+
+
+class ContractionHierarchyPrivateCarTransportModeTest(unittest.TestCase):
+    def setUp(self):
+        graph = CSRGraph.fromEdges(
+            edgeIDs=[1, 2, 3],
+            sources=[10, 20, 30],
+            targets=[20, 30, 40],
+            costs={CostAttributes.DISTANCE: [100, 50, 25]},
+            reverseCosts={CostAttributes.DISTANCE: [100, -1, -1]},
+            vertexIDs=[10, 20, 30, 40],
+            vertexCoordinates=[[0.0, 0.0], [100.0, 0.0], [150.0, 0.0], [175.0, 0.0]]
+        )
+        hierarchies = {CostAttributes.DISTANCE: ContractionHierarchy.build(graph, CostAttributes.DISTANCE)}
+        self.transportMode = ContractionHierarchyPrivateCarTransportMode(PostgisServiceProvider(), graph=graph,
+                                                                         hierarchies=hierarchies)
+
+    def test_givenASetOfVertexesVsASetOfVertexes_then_retrieveTheCostSummaryGeojson(self):
+        summary = self.transportMode.getTotalShortestPathCostManyToMany(
+            startVerticesID=[10, 30, 40],
+            endVerticesID=[10, 20, 40],
+            costAttribute=CostAttributes.DISTANCE
+        )
+
+        costs = {}
+        for feature in summary["features"]:
+            properties = feature["properties"]
+            costs[(properties["start_vertex_id"], properties["end_vertex_id"])] = properties["total_cost"]
+
+        self.assertEqual({(10, 20): 100.0, (10, 40): 175.0, (30, 40): 25.0}, costs)
+
+    def test_givenAPairOfVertex_then_retrieveTheTotalCost(self):
+        summary = self.transportMode.getTotalShortestPathCostOneToOne(
+            startVertexID=20,
+            endVertexID=10,
+            costAttribute=CostAttributes.DISTANCE
+        )
+
+        self.assertEqual(1, len(summary["features"]))
+        self.assertEqual(100.0, summary["features"][0]["properties"]["total_cost"])
+
+    def test_givenAPath_then_theSegmentsSQLKeepsTheRouteOrder(self):
+        sql = self.transportMode.getShortestPathSegmentsSQL([3, 1, 2])
+
+        self.assertIn("unnest(ARRAY[3,1,2]::bigint[]) WITH ORDINALITY AS r(edge_id, seq)", sql)
+        self.assertIn("ORDER BY r.seq", sql)
+
+    def test_givenAStartVertexAndSeveralEndVertices_then_unpackEachPathOfTheHierarchy(self):
+        serviceProvider = SegmentsServiceProvider()
+        transportMode = ContractionHierarchyPrivateCarTransportMode(serviceProvider,
+                                                                    graph=self.transportMode.getGraph(),
+                                                                    hierarchies=self.transportMode.hierarchies)
+
+        shortestPaths = transportMode.getShortestPathsFromAnOrigin(startVertexId=10,
+                                                                   endVerticesID=[40, 20, 40, 99],
+                                                                   cost=CostAttributes.DISTANCE)
+
+        self.assertEqual(1, len(serviceProvider.sqls))
+        self.assertEqual([40, 20, 99], list(shortestPaths.keys()))
+        self.assertEqual([1, 2, 3], transportMode.getShortestPathEdges(shortestPaths[40]))
+        self.assertEqual([1], transportMode.getShortestPathEdges(shortestPaths[20]))
+        self.assertEqual([], shortestPaths[99]["features"])
+
+    def test_givenAStoredHierarchy_when_theNetworkChanges_then_buildTheHierarchyAgain(self):
+        folder = tempfile.mkdtemp()
+        try:
+            configuration = Configuration(getConfigurationPath())
+            configuration.getSection("CONTRACTION_HIERARCHY")["folder"] = folder
+
+            def getCost(networkFingerprint, graph):
+                transportMode = NetworkVersionTransportMode(networkFingerprint, graph, configuration)
+                hierarchy = transportMode.getContractionHierarchy(CostAttributes.DISTANCE)
+                startIndex, endIndex = graph.getVertexIndices([10, 40]).tolist()
+                return transportMode.builds, hierarchy.getShortestPathCost(startIndex, endIndex)
+
+            self.assertEqual((1, 175.0), getCost("edges:1", createGraph([100, 50, 25])))
+            self.assertEqual((0, 175.0), getCost("edges:1", createGraph([100, 50, 25])))
+            # the edge 20 <-> 30 is slower
+            self.assertEqual((1, 185.0), getCost("edges:2", createGraph([100, 60, 25])))
+            # a new vertex changes the internal index of the vertices
+            self.assertEqual((1, 185.0), getCost("edges:2", createGraph([100, 60, 25], (5, 10, 20, 30, 40))))
+            self.assertEqual((0, 185.0), getCost("edges:2", createGraph([100, 60, 25], (5, 10, 20, 30, 40))))
+        finally:
+            shutil.rmtree(folder)
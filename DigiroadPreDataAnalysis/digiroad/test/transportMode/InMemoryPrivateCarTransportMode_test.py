@@ -0,0 +1,131 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from digiroad.connection.PostgisServiceProvider import PostgisServiceProvider
+from digiroad.graph.CSRGraph import CSRGraph
+from digiroad.transportMode.InMemoryPrivateCarTransportMode import InMemoryPrivateCarTransportMode
+from digiroad.util import CostAttributes, Configuration
+
+
+class InMemoryPrivateCarTransportModeTest(unittest.TestCase):
+    def setUp(self):
+        graph = CSRGraph.fromEdges(
+            edgeIDs=[1, 2, 3],
+            sources=[10, 20, 30],
+            targets=[20, 30, 40],
+            costs={CostAttributes.DISTANCE: [100, 50, 25]},
+            reverseCosts={CostAttributes.DISTANCE: [100, -1, -1]},
+            vertexIDs=[10, 20, 30, 40],
+            vertexCoordinates=[[0.0, 0.0], [100.0, 0.0], [150.0, 0.0], [175.0, 0.0]]
+        )
+        self.transportMode = InMemoryPrivateCarTransportMode(PostgisServiceProvider(), graph=graph)
+
+    def test_givenASetOfVertexesVsASetOfVertexes_then_retrieveTheCostSummaryGeojson(self):
+        summary = self.transportMode.getTotalShortestPathCostManyToMany(
+            startVerticesID=[10, 30],
+            endVerticesID=[10, 30, 40],
+            costAttribute=CostAttributes.DISTANCE
+        )
+
+        costs = {}
+        for feature in summary["features"]:
+            properties = feature["properties"]
+            costs[(properties["start_vertex_id"], properties["end_vertex_id"])] = properties["total_cost"]
+
+        # same vertex pairs and unreachable pairs are not included, as in pgr_dijkstraCost
+        self.assertEqual({(10, 30): 150.0, (10, 40): 175.0, (30, 40): 25.0}, costs)
+
+    def test_givenAPairOfVertex_then_retrieveTheLineBetweenTheVertices(self):
+        summary = self.transportMode.getTotalShortestPathCostOneToOne(
+            startVertexID=10,
+            endVertexID=40,
+            costAttribute=CostAttributes.DISTANCE
+        )
+
+        self.assertEqual(1, len(summary["features"]))
+        self.assertEqual([[0.0, 0.0], [175.0, 0.0]], summary["features"][0]["geometry"]["coordinates"])
+        self.assertEqual("urn:ogc:def:crs:EPSG::3857", summary["crs"]["properties"]["name"])
+
+    def test_givenAStartVertexAndSeveralEndVertices_then_retrieveEachPathFromASingleSearch(self):
+        serviceProvider = SegmentsServiceProvider()
+        transportMode = InMemoryPrivateCarTransportMode(serviceProvider, graph=self.transportMode.getGraph())
+
+        shortestPaths = transportMode.getShortestPathsFromAnOrigin(startVertexId=10,
+                                                                   endVerticesID=[40, 20, 40, 99],
+                                                                   cost=CostAttributes.DISTANCE)
+
+        self.assertEqual(1, len(serviceProvider.sqls))
+        self.assertEqual([40, 20, 99], list(shortestPaths.keys()))
+        self.assertEqual([(1, 1), (2, 2), (3, 3)],
+                         [(feature["properties"]["id"], feature["properties"]["seq"])
+                          for feature in shortestPaths[40]["features"]])
+        self.assertEqual([(1, 1)], [(feature["properties"]["id"], feature["properties"]["seq"])
+                                    for feature in shortestPaths[20]["features"]])
+        self.assertEqual([], shortestPaths[99]["features"])
+        self.assertEqual("urn:ogc:def:crs:EPSG::3857", shortestPaths[99]["crs"]["properties"]["name"])
+
+    def test_givenSeveralImpedances_then_retrieveACostPropertyPerImpedance(self):
+        graph = CSRGraph.fromEdges(
+            edgeIDs=[1, 2],
+            sources=[10, 20],
+            targets=[20, 30],
+            costs={CostAttributes.DISTANCE: [100, 50], CostAttributes.RUSH_HOUR_DELAY: [2, -1]},
+            reverseCosts={CostAttributes.DISTANCE: [-1, -1], CostAttributes.RUSH_HOUR_DELAY: [-1, -1]}
+        )
+        transportMode = InMemoryPrivateCarTransportMode(PostgisServiceProvider(), graph=graph)
+
+        summary = transportMode.getTotalShortestPathCostAllImpedances(
+            startVerticesID=[10, 20],
+            endVerticesID=[20, 30],
+            costAttributes=[CostAttributes.DISTANCE, CostAttributes.RUSH_HOUR_DELAY]
+        )
+
+        costs = {}
+        for feature in summary["features"]:
+            properties = feature["properties"]
+            costs[(properties["start_vertex_id"], properties["end_vertex_id"])] = (
+                properties[CostAttributes.DISTANCE], properties[CostAttributes.RUSH_HOUR_DELAY])
+
+        self.assertEqual({(10, 20): (100.0, 2.0), (10, 30): (150.0, None), (20, 30): (50.0, None)}, costs)
+
+    def test_givenMatrixOnlyMode_then_retrieveTheCostSummaryWithoutGeometries(self):
+        folder = tempfile.mkdtemp()
+        try:
+            configurationPath = os.path.join(folder, "configuration.properties")
+            with open(configurationPath, "w") as configurationFile:
+                configurationFile.write("[WFS_CONFIG]\nmatrixOnly=True\n"
+                                        "[DATABASE_CONFIG]\ntable_name=edges\n"
+                                        "[PARALLELIZATION]\nmax_vertices_blocks=100\n")
+            transportMode = InMemoryPrivateCarTransportMode(PostgisServiceProvider(), graph=self.transportMode.graph,
+                                                            configuration=Configuration(configurationPath))
+
+            summary = transportMode.getTotalShortestPathCostOneToOne(
+                startVertexID=10,
+                endVertexID=40,
+                costAttribute=CostAttributes.DISTANCE
+            )
+        finally:
+            shutil.rmtree(folder)
+
+        self.assertEqual(175.0, summary["features"][0]["properties"]["total_cost"])
+        self.assertIsNone(summary["features"][0]["geometry"])
+
+
+class SegmentsServiceProvider(PostgisServiceProvider):
+    def __init__(self):
+        super(SegmentsServiceProvider, self).__init__()
+        self.sqls = []
+
+    def execute(self, sql):
+        self.sqls.append(sql)
+        return {
+            "type": "FeatureCollection",
+            "crs": {"properties": {"name": "urn:ogc:def:crs:EPSG::3857"}, "type": "name"},
+            "features": [{
+                "type": "Feature",
+                "properties": {"seq": edgeID, "id": edgeID, CostAttributes.DISTANCE: 10},
+                "geometry": {"type": "LineString", "coordinates": [[edgeID, 0.0], [edgeID + 1, 0.0]]}
+            } for edgeID in [1, 2, 3]]
+        }
@@ -1,6 +1,8 @@
 import os
 import unittest
 
+import pandas as pd
+
 from digiroad.connection.PostgisServiceProvider import PostgisServiceProvider
 from digiroad.entities import Point
 from digiroad.logic.Operations import Operations
@@ -8,6 +10,30 @@ from digiroad.transportMode.PrivateCarTransportMode import PrivateCarTransportMo
 from digiroad.util import CostAttributes, FileActions
 
 
+class ConcurrentServiceProvider(PostgisServiceProvider):
+    concurrency = 4
+
+    def __init__(self):
+        super().__init__()
+        self.numberOfPointsPerQuery = []
+        self.radiusPerQuery = []
+
+    def executeQueriesReturningDataFrames(self, sqls):
+        dataFrames = []
+        for sql in sqls:
+            # the fake vertex of each point is its longitude, the points at longitude 0 are not routable
+            longitudes = [float(value) for value in sql.split("ARRAY[")[1].split("]")[0].split(",")]
+            self.numberOfPointsPerQuery.append(len(longitudes))
+            self.radiusPerQuery.append(int(sql.split("::geography,")[1].split(")")[0]))
+            dataFrames.append(pd.DataFrame({
+                "seq": range(1, len(longitudes) + 1),
+                "id": [longitude if longitude else None for longitude in longitudes],
+                "x": longitudes,
+                "y": longitudes
+            }))
+        return dataFrames
+
+
 class PrivateCarTransportModeTest(unittest.TestCase):
     def setUp(self):
         postgisServiceProvider = PostgisServiceProvider()
@@ -47,6 +73,36 @@ class PrivateCarTransportModeTest(unittest.TestCase):
 
         self.assertEqual(nearestVertexExpectedGeojson, geoJson)
 
+    def test_givenASetOfPoints_then_retrieveTheSameNearestVerticesThanOneByOne(self):
+        points = []
+        for longitude, latitude in [(385875.0, 6672380.0), (386875.0, 6673380.0), (384875.0, 6671380.0)]:
+            point = Point(latitute=latitude,
+                          longitude=longitude,
+                          epsgCode="EPSG:3047")
+            points.append(self.operations.transformPoint(point, self.privateCarTransportMode.getEPSGCode()))
+
+        vertexIDs, coordinates = self.privateCarTransportMode.getNearestRoutableVerticesFromPoints(points)
+
+        for position, point in enumerate(points):
+            geoJson = self.privateCarTransportMode.getNearestRoutableVertexFromAPoint(point)
+            self.assertEqual(geoJson["features"][0]["properties"]["id"], vertexIDs[position])
+            self.assertAlmostEqual(geoJson["features"][0]["geometry"]["coordinates"][0], coordinates[position][0], 4)
+            self.assertAlmostEqual(geoJson["features"][0]["geometry"]["coordinates"][1], coordinates[position][1], 4)
+
+    def test_givenAConcurrentServiceProvider_then_snapThePointsInBlocksKeepingTheirOrder(self):
+        serviceProvider = ConcurrentServiceProvider()
+        transportMode = PrivateCarTransportMode(serviceProvider)
+        points = [Point(latitute=0.0, longitude=float(position % 7), epsgCode="EPSG:3857") for position in range(1200)]
+
+        vertexIDs, coordinates = transportMode.getNearestRoutableVerticesFromPoints(points)
+
+        # the 172 points without vertex are queried again with a growing radius, as one by one
+        self.assertEqual([500, 500, 200] + [172] * 5, serviceProvider.numberOfPointsPerQuery)
+        self.assertEqual([500, 500, 500, 1000, 1500, 2000, 2500, 3000], serviceProvider.radiusPerQuery)
+        self.assertEqual([position % 7 if position % 7 else -1 for position in range(1200)], vertexIDs.tolist())
+        self.assertEqual([float(position % 7) for position in range(1200) if position % 7],
+                         [x for x in coordinates[:, 0].tolist() if x == x])
+
     def test_givenAPairOfVertex_then_retrieveDijsktraOneToOneCostSummaryGeojson(self):
         dir = self.dir + '%digiroad%test%data%geojson%oneToOneCostSummary.geojson'.replace("%", os.sep)
 
@@ -58,6 +114,23 @@ class PrivateCarTransportModeTest(unittest.TestCase):
         )
         self.assertEqual(expectedSummary, summaryShortestPathCostOneToOne)
 
+    def test_givenAVertexVsASetOfVertexes_then_retrieveTheSameShortestPathsThanOneByOne(self):
+        endVerticesID = [2692, 78618, 45174]
+        shortestPaths = self.privateCarTransportMode.getShortestPathsFromAnOrigin(
+            startVertexId=59227,
+            endVerticesID=endVerticesID,
+            cost=CostAttributes.DISTANCE
+        )
+
+        for endVertexId in endVerticesID:
+            expectedShortestPath = self.privateCarTransportMode.getShortestPath(
+                startVertexId=59227,
+                endVertexId=endVertexId,
+                cost=CostAttributes.DISTANCE
+            )
+            self.assertEqual(sorted(feature["properties"]["id"] for feature in expectedShortestPath["features"]),
+                             sorted(feature["properties"]["id"] for feature in shortestPaths[endVertexId]["features"]))
+
     def test_givenASetOfVertexesVsOneVertex_then_retrieveDijsktraManyToOneCostSummaryGeojson(self):
         dir = self.dir + '%digiroad%test%data%geojson%manyToOneCostSummary.geojson'.replace("%", os.sep)
 
@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from digiroad.carRoutingExceptions import InvalidConfigurationException
+from digiroad.util import Configuration
+
+
+class ConfigurationTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.configurationPath = os.path.join(self.folder, "configuration.properties")
+        self.writeConfiguration(jobs="4", timerEnabled="False")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def writeConfiguration(self, jobs, timerEnabled):
+        with open(self.configurationPath, "w") as configurationFile:
+            configurationFile.write("[WFS_CONFIG]\n"
+                                    "timerEnabled=%s\n"
+                                    "point_identifier=YKR_ID\n"
+                                    "[PARALLELIZATION]\n"
+                                    "jobs=%s\n"
+                                    "verbose=5\n"
+                                    "max_vertices_blocks=100\n"
+                                    "[ATTRIBUTES_MAPPING]\n"
+                                    "attribute1=startPoint_YKR_ID,ykr_from_id\n"
+                                    "attribute2=distance,distance\n" % (timerEnabled, jobs))
+
+    def test_givenAConfigurationFile_then_retrieveTypedProperties(self):
+        configuration = Configuration(self.configurationPath)
+
+        self.assertEqual(4, configuration.jobs)
+        self.assertEqual(1, configuration.workers)
+        self.assertEqual(100, configuration.maxVerticesBlocks)
+        self.assertFalse(configuration.timerEnabled)
+        self.assertFalse(configuration.debug)
+        self.assertEqual("YKR_ID", configuration.pointIdentifier)
+        self.assertEqual(";", configuration.csvSeparator)
+        self.assertEqual("csv", configuration.summaryFormat)
+        self.assertFalse(configuration.runManifest)
+        self.assertEqual(1000, configuration.checkpointVertices)
+        self.assertFalse(configuration.incremental)
+        self.assertEqual(1000000, configuration.routeCacheMaxRoutes)
+        self.assertEqual([("startPoint_YKR_ID", "ykr_from_id"), ("distance", "distance")],
+                         configuration.attributesMapping)
+        self.assertEqual("YKR_ID", configuration.getSection("WFS_CONFIG")["point_identifier"])
+        self.assertIsNone(configuration.getString("CACHE", "nearest_vertex_cache"))
+
+    def test_givenAModifiedConfigurationFile_when_reload_then_retrieveTheNewProperties(self):
+        configuration = Configuration(self.configurationPath)
+        self.writeConfiguration(jobs="2", timerEnabled="True")
+
+        self.assertEqual(4, configuration.jobs)
+        configuration.reload()
+        self.assertEqual(2, configuration.jobs)
+        self.assertTrue(configuration.timerEnabled)
+
+    def test_givenANotNumericProperty_then_throwInvalidConfigurationException(self):
+        self.writeConfiguration(jobs="<jobs>", timerEnabled="True")
+
+        self.assertRaises(InvalidConfigurationException, Configuration, self.configurationPath)
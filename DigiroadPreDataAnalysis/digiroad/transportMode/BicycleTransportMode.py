@@ -1,17 +1,21 @@
-from joblib import Parallel, delayed
+import numpy as np
 
-from digiroad.connection.PostgisServiceProvider import executePostgisQueryReturningDataFrame
+from digiroad.connection.BlockScheduler import BlockScheduler
 from digiroad.transportMode import AbstractTransportMode
-from digiroad.util import getConfigurationProperties, FileActions, dgl_timer, parallel_job_print, Logger
+from digiroad.util import Configuration, FileActions, dgl_timer, Logger
 
 
 class BicycleTransportMode(AbstractTransportMode):
-    def __init__(self, geojsonServiceProvider, epsgCode="EPSG:3857"):
+    SNAPPING_BLOCK_SIZE = 500
+
+    def __init__(self, geojsonServiceProvider, epsgCode="EPSG:3857", configuration=None):
         self.epsgCode = epsgCode
         self.fileActions = FileActions()
         self.serviceProvider = geojsonServiceProvider
-        config = getConfigurationProperties(section="DATABASE_CONFIG")
-        self.tableName = config["table_name"]
+        self.configuration = configuration if configuration else Configuration.getInstance()
+        self.tableName = self.configuration.getString("DATABASE_CONFIG", "table_name")
+        self.blockScheduler = BlockScheduler.fromConfiguration(self.configuration,
+                                                               geojsonServiceProvider.splittableErrors)
 
     def getNearestVertexFromAPoint(self, coordinates):
         """
@@ -120,6 +124,103 @@ class BicycleTransportMode(AbstractTransportMode):
                    str(radius),
                    str(coordinates.getLongitude()), str(coordinates.getLatitude()), epsgCode)
 
+    @dgl_timer
+    def getNearestRoutableVerticesFromPoints(self, points, radius=500):
+        """
+        From the Database retrieve the nearest routable vertex of every point, snapping all the points in a single
+        query.
+
+        As ``getNearestRoutableVertexFromAPoint``, the points without a routable vertex within the ``radius`` (meters)
+        are queried again up to 5 times, adding 500 meters to the radius each time.
+
+        :param points: List of Point, all of them in the same coordinate reference system.
+        :param radius: Initial distance in meters between the point and its nearest vertex.
+        :return: Tuple (vertex ids array, (n, 2) array with the vertex coordinates in the coordinate reference system
+                 of the network), -1 and NaN for the points without a routable vertex within the largest radius.
+        """
+        vertexIDs = np.full(len(points), -1, dtype=np.int64)
+        coordinates = np.full((len(points), 2), np.nan)
+        if len(points) == 0:
+            return vertexIDs, coordinates
+
+        epsgCode = points[0].getEPSGCode().split(":")[1]
+        maxTries = 5
+        tries = 0
+        pendingPositions = np.arange(len(points))
+        while True:
+            if self.serviceProvider.concurrency:
+                # providers running concurrent queries snap the points in blocks, one query per block
+                positionsBlocks = [pendingPositions[position:position + self.SNAPPING_BLOCK_SIZE]
+                                   for position in range(0, len(pendingPositions), self.SNAPPING_BLOCK_SIZE)]
+            else:
+                positionsBlocks = [pendingPositions]
+
+            dataFrames = self.serviceProvider.executeQueriesReturningDataFrames(
+                [self.getNearestRoutableVerticesSQL([points[position] for position in positionsBlock], epsgCode,
+                                                    radius)
+                 for positionsBlock in positionsBlocks])
+
+            for positionsBlock, dataFrame in zip(positionsBlocks, dataFrames):
+                found = dataFrame["id"].notnull().values
+                positions = positionsBlock[dataFrame["seq"].values[found].astype(np.int64) - 1]
+                vertexIDs[positions] = dataFrame["id"].values[found].astype(np.int64)
+                coordinates[positions] = dataFrame[["x", "y"]].values[found]
+
+            pendingPositions = pendingPositions[vertexIDs[pendingPositions] < 0]
+            if len(pendingPositions) == 0 or tries == maxTries:
+                return vertexIDs, coordinates
+            tries += 1
+            radius += 500
+
+    def getNearestRoutableVerticesSQL(self, points, epsgCode, radius):
+        """
+        SQL sentence that joins every point (unnest of the coordinates arrays) with its nearest routable vertex using
+        a LATERAL k-nearest-neighbour subquery.
+
+        :return: SQL sentence with the columns seq (1-based position of the point), id, x and y, NULL id if there is
+                 not any routable vertex within the radius.
+        """
+        return "SELECT " \
+               "p.seq, " \
+               "v.id::bigint AS id, " \
+               "ST_X(ST_SnapToGrid(v.the_geom, 0.00000001))::double precision AS x, " \
+               "ST_Y(ST_SnapToGrid(v.the_geom, 0.00000001))::double precision AS y " \
+               "FROM " \
+               "unnest(ARRAY[%s]::double precision[], ARRAY[%s]::double precision[]) " \
+               "WITH ORDINALITY AS p(x, y, seq) " \
+               "LEFT JOIN LATERAL (" \
+               "SELECT " \
+               "vr.id, vr.the_geom " \
+               "FROM table_name_vertices_pgr AS vr " \
+               "WHERE " \
+               "EXISTS (SELECT 1 FROM table_name AS e " \
+               "WHERE (e.source = vr.id OR e.target = vr.id) AND %s) " \
+               "AND ST_DWithin(ST_Transform(vr.the_geom, 4326)," \
+               "ST_Transform(ST_SetSRID(ST_MakePoint(p.x, p.y), %s), 4326)::geography," \
+               "%s) " \
+               "ORDER BY vr.the_geom <-> ST_SetSRID(ST_MakePoint(p.x, p.y), %s) " \
+               "LIMIT 1" \
+               ") AS v ON true " \
+               "ORDER BY p.seq".replace("table_name", self.tableName) % (
+                   ",".join(repr(float(point.getLongitude())) for point in points),
+                   ",".join(repr(float(point.getLatitude())) for point in points),
+                   self.getRoutableEdgeFilterSQL(),
+                   epsgCode,
+                   str(radius),
+                   epsgCode)
+
+    def getRoutableEdgeFilterSQL(self):
+        """
+        :return: SQL condition over the edges table alias ``e`` that the edges of a routable vertex must fulfill.
+        """
+        return "e.luokka <> 0 AND e.luokka <> 9"
+
+    def getNetworkFingerprint(self):
+        """
+        :return: Fingerprint of the network table, it changes when the network is modified.
+        """
+        return self.serviceProvider.getTableFingerprint(self.tableName)
+
     def getShortestPath(self, startVertexId, endVertexId, cost):
         """
         From a pair of vertices (startVertexId, endVertexId) and based on the "cost" attribute,
@@ -196,6 +297,79 @@ class BicycleTransportMode(AbstractTransportMode):
         # print("End getShortestPath")
         return geojson
 
+    def getShortestPathsFromAnOrigin(self, startVertexId, endVerticesID, cost):
+        """
+        Retrieve the shortest paths from one start vertex to several end vertices with a single one-to-many
+        pgr_dijkstra search, the segments are split back into one path per end vertex.
+
+        :param startVertexId: Start vertex of the requested paths.
+        :param endVerticesID: End vertices of the requested paths.
+        :param cost: Attribute to calculate the cost of the shortest paths.
+        :return: Dictionary {end vertex id: Geojson (Geometry type: LineString) with the segment features of the
+                 shortest path}.
+        """
+        endVerticesID = list(dict.fromkeys(endVerticesID))
+        geojson = self.serviceProvider.execute(
+            self.getShortestPathsFromAnOriginSQL(startVertexId, endVerticesID, cost))
+        return self.splitShortestPaths(geojson, endVerticesID)
+
+    def getShortestPathsFromAnOriginSQL(self, startVertexId, endVerticesID, cost):
+        """
+        :return: SQL sentence with the segments of the shortest paths from the start vertex to each end vertex, with
+                 the same columns as the ``getShortestPath`` sentence plus the end_vertex_id of the path.
+        """
+        return "SELECT " \
+               "r.end_vid::bigint AS end_vertex_id, " \
+               "min(r.path_seq) AS seq, " \
+               "e.id AS id, " \
+               "e.liikennevi::integer as direction," \
+               "sum(e.pituus) AS distance," \
+               "sum(e.fast_time) AS fast_time," \
+               "sum(e.slow_time) AS slow_time," \
+               "ST_SnapToGrid(e.the_geom, 0.00000001) AS geom " \
+               "FROM " \
+               "pgr_dijkstra('SELECT " \
+               "id::integer," \
+               "source::integer," \
+               "target::integer," \
+               "(CASE  " \
+               "WHEN luokka <> 0 AND luokka <> 9 AND (liikennevi = 0 OR liikennevi = 2 OR liikennevi = 5 OR liikennevi = 4)  " \
+               "THEN %s " \
+               "ELSE -1 " \
+               "END)::double precision AS cost, " \
+               "(CASE " \
+               "WHEN luokka <> 0 AND luokka <> 9 AND (liikennevi = 0 OR liikennevi = 2 OR liikennevi = 5 OR liikennevi = 3) " \
+               "THEN %s " \
+               "ELSE -1 " \
+               "END)::double precision AS reverse_cost " \
+               "FROM table_name', %s, ARRAY[%s]::bigint[], true) AS r, " \
+               "table_name AS e " \
+               "WHERE " \
+               "r.edge = e.id " \
+               "GROUP BY r.end_vid, e.id, e.liikennevi " \
+               "ORDER BY r.end_vid, seq".replace("table_name", self.tableName) % (
+                   cost, cost, str(startVertexId), ",".join(map(str, endVerticesID)))
+
+    def getShortestPathSegmentsSQL(self, edgeIDs):
+        """
+        :param edgeIDs: Ordered edge ids of the shortest path.
+        :return: SQL sentence returning the segments with the same columns as the ``getShortestPath`` sentence.
+        """
+        return "SELECT " \
+               "r.seq::integer AS seq, " \
+               "e.id AS id, " \
+               "e.liikennevi::integer as direction," \
+               "e.pituus AS distance," \
+               "e.fast_time AS fast_time," \
+               "e.slow_time AS slow_time," \
+               "ST_SnapToGrid(e.the_geom, 0.00000001) AS geom " \
+               "FROM " \
+               "unnest(ARRAY[%s]::bigint[]) WITH ORDINALITY AS r(edge_id, seq), " \
+               "table_name AS e " \
+               "WHERE " \
+               "r.edge_id = e.id " \
+               "ORDER BY r.seq".replace("table_name", self.tableName) % ",".join(map(str, edgeIDs))
+
     def getTotalShortestPathCostOneToOne(self, startVertexID, endVertexID, costAttribute):
         """
         Using the power of pgr_Dijsktra algorithm this function calculate the total routing cost for a pair of points.
@@ -208,39 +382,7 @@ class BicycleTransportMode(AbstractTransportMode):
 
         Logger.getInstance().info("Start getTotalShortestPathCostOneToOne")
 
-        sql = "SELECT " \
-              "s.id AS start_vertex_id," \
-              "e.id  AS end_vertex_id," \
-              "r.agg_cost as total_cost," \
-              "ST_MakeLine(s.the_geom, e.the_geom) AS geom " \
-              "FROM(" \
-              "SELECT * " \
-              "FROM pgr_dijkstraCost(" \
-              "\'SELECT " \
-              "id::integer," \
-              "source::integer," \
-              "target::integer," \
-              "(CASE  " \
-              "WHEN luokka <> 0 AND luokka <> 9 AND (liikennevi = 0 OR liikennevi = 2 OR liikennevi = 5 OR liikennevi = 4)  " \
-              "THEN %s " \
-              "ELSE -1 " \
-              "END)::double precision AS cost," \
-              "(CASE " \
-              "WHEN luokka <> 0 AND luokka <> 9 AND (liikennevi = 0 OR liikennevi = 2 OR liikennevi = 5 OR liikennevi = 3) " \
-              "THEN %s " \
-              "ELSE -1 " \
-              "END)::double precision AS reverse_cost " \
-              "FROM table_name', %s, %s, true)) as r," \
-              "table_name_vertices_pgr AS s," \
-              "table_name_vertices_pgr AS e " \
-              "WHERE " \
-              "s.id = r.start_vid " \
-              "and e.id = r.end_vid ".replace("table_name", self.tableName) \
-              % (costAttribute, costAttribute, startVertexID, endVertexID)
-        # "GROUP BY " \
-        # "s.id, e.id, r.agg_cost" \
-
-        geojson = self.serviceProvider.execute(sql)
+        geojson = self.getTotalShortestPathCostSummary([startVertexID], [endVertexID], costAttribute)
         Logger.getInstance().info("End getTotalShortestPathCostOneToOne")
         return geojson
 
@@ -255,40 +397,7 @@ class BicycleTransportMode(AbstractTransportMode):
         """
 
         Logger.getInstance().info("Start getTotalShortestPathCostManyToOne")
-        sql = "SELECT " \
-              "s.id AS start_vertex_id," \
-              "e.id  AS end_vertex_id," \
-              "r.agg_cost as total_cost," \
-              "ST_MakeLine(s.the_geom, e.the_geom) AS geom " \
-              "FROM(" \
-              "SELECT * " \
-              "FROM pgr_dijkstraCost(" \
-              "\'SELECT " \
-              "id::integer," \
-              "source::integer," \
-              "target::integer," \
-              "(CASE  " \
-              "WHEN luokka <> 0 AND luokka <> 9 AND (liikennevi = 0 OR liikennevi = 2 OR liikennevi = 5 OR liikennevi = 4)  " \
-              "THEN %s " \
-              "ELSE -1 " \
-              "END)::double precision AS cost," \
-              "(CASE " \
-              "WHEN luokka <> 0 AND luokka <> 9 AND (liikennevi = 0 OR liikennevi = 2 OR liikennevi = 5 OR liikennevi = 3) " \
-              "THEN %s " \
-              "ELSE -1 " \
-              "END)::double precision AS reverse_cost " \
-              "FROM table_name', ARRAY[%s], %s, true)) as r," \
-              "table_name_vertices_pgr AS s," \
-              "table_name_vertices_pgr AS e " \
-              "WHERE " \
-              "s.id = r.start_vid " \
-              "and e.id = r.end_vid ".replace("table_name", self.tableName) \
-              % (costAttribute, costAttribute, ",".join(map(str, startVerticesID)), endVertexID)
-        # "GROUP BY " \
-        # "s.id, e.id, r.agg_cost" \
-
-
-        geojson = self.serviceProvider.execute(sql)
+        geojson = self.getTotalShortestPathCostSummary(startVerticesID, [endVertexID], costAttribute)
         Logger.getInstance().info("End getTotalShortestPathCostManyToOne")
         return geojson
 
@@ -304,40 +413,7 @@ class BicycleTransportMode(AbstractTransportMode):
 
         Logger.getInstance().info("Start getTotalShortestPathCostOneToMany")
 
-        sql = "SELECT " \
-              "s.id AS start_vertex_id," \
-              "e.id  AS end_vertex_id," \
-              "r.agg_cost as total_cost," \
-              "ST_MakeLine(s.the_geom, e.the_geom) AS geom " \
-              "FROM(" \
-              "SELECT * " \
-              "FROM pgr_dijkstraCost(" \
-              "\'SELECT " \
-              "id::integer," \
-              "source::integer," \
-              "target::integer," \
-              "(CASE  " \
-              "WHEN luokka <> 0 AND luokka <> 9 AND (liikennevi = 0 OR liikennevi = 2 OR liikennevi = 5 OR liikennevi = 4)  " \
-              "THEN %s " \
-              "ELSE -1 " \
-              "END)::double precision AS cost," \
-              "(CASE " \
-              "WHEN luokka <> 0 AND luokka <> 9 AND (liikennevi = 0 OR liikennevi = 2 OR liikennevi = 5 OR liikennevi = 3) " \
-              "THEN %s " \
-              "ELSE -1 " \
-              "END)::double precision AS reverse_cost " \
-              "FROM table_name', %s, ARRAY[%s], true)) as r," \
-              "table_name_vertices_pgr AS s," \
-              "table_name_vertices_pgr AS e " \
-              "WHERE " \
-              "s.id = r.start_vid " \
-              "and e.id = r.end_vid ".replace("table_name", self.tableName) \
-              % (costAttribute, costAttribute, startVertexID, ",".join(map(str, endVerticesID)))
-        # "GROUP BY " \
-        # "s.id, e.id, r.agg_cost" \
-
-
-        geojson = self.serviceProvider.execute(sql)
+        geojson = self.getTotalShortestPathCostSummary([startVertexID], endVerticesID, costAttribute)
         Logger.getInstance().info("End getTotalShortestPathCostOneToMany")
         return geojson
 
@@ -407,88 +483,138 @@ class BicycleTransportMode(AbstractTransportMode):
         :param costAttribute: Impedance/cost to measure the weight of the route.
         :return: Shortest path summary json.
         """
+        return self.getTotalShortestPathCostSummary(startVerticesID, endVerticesID, costAttribute)
 
-        startVerticesCounter = 0
-        startJump = int(getConfigurationProperties(section="PARALLELIZATION")["max_vertices_blocks"])
-
-        sqlExecutionList = []
-
-        while startVerticesCounter < len(startVerticesID):
-            if startVerticesCounter + startJump > len(startVerticesID):
-                startJump = len(startVerticesID) % startJump
-
-            startBottomLimit = startVerticesCounter
-            startUpperLimit = startVerticesCounter + startJump
-
-            startVerticesCounter = startVerticesCounter + startJump
-
-            endVerticesCounter = 0
-            endJump = int(getConfigurationProperties(section="PARALLELIZATION")["max_vertices_blocks"])
-
-            while endVerticesCounter < len(endVerticesID):
-                if endVerticesCounter + endJump > len(endVerticesID):
-                    endJump = len(endVerticesID) % endJump
-
-                endBottomLimit = endVerticesCounter
-                endUpperLimit = endVerticesCounter + endJump
-
-                endVerticesCounter = endVerticesCounter + endJump
-
-                sql = "SELECT " \
-                      "s.id AS start_vertex_id," \
-                      "e.id  AS end_vertex_id," \
-                      "r.agg_cost as total_cost," \
-                      "ST_MakeLine(s.the_geom, e.the_geom) AS geom " \
-                      "FROM(" \
-                      "SELECT * " \
-                      "FROM pgr_dijkstraCost(" \
-                      "\'SELECT " \
-                      "id::integer," \
-                      "source::integer," \
-                      "target::integer," \
-                      "(CASE  " \
-                      "WHEN luokka <> 0 AND luokka <> 9 AND (liikennevi = 0 OR liikennevi = 2 OR liikennevi = 5 OR liikennevi = 4)  " \
-                      "THEN %s " \
-                      "ELSE -1 " \
-                      "END)::double precision AS cost," \
-                      "(CASE " \
-                      "WHEN luokka <> 0 AND luokka <> 9 AND (liikennevi = 0 OR liikennevi = 2 OR liikennevi = 5 OR liikennevi = 3) " \
-                      "THEN %s " \
-                      "ELSE -1 " \
-                      "END)::double precision AS reverse_cost " \
-                      "FROM table_name', ARRAY[%s], ARRAY[%s], true)) as r," \
-                      "table_name_vertices_pgr AS s," \
-                      "table_name_vertices_pgr AS e " \
-                      "WHERE " \
-                      "s.id = r.start_vid " \
-                      "and e.id = r.end_vid ".replace("table_name", self.tableName) \
-                      % (costAttribute, costAttribute,
-                         ",".join(map(str, startVerticesID[startBottomLimit:startUpperLimit])),
-                         ",".join(map(str, endVerticesID[endBottomLimit:endUpperLimit]))
-                         )
-                # "GROUP BY " \
-                # "s.id, e.id, r.agg_cost" \
-
-                sqlExecutionList.append(sql)
-
-        dataFrame = None
-
-        with Parallel(n_jobs=int(getConfigurationProperties(section="PARALLELIZATION")["jobs"]),
-                      backend="threading",
-                      verbose=int(getConfigurationProperties(section="PARALLELIZATION")["verbose"])) as parallel:
-            parallel._print = parallel_job_print
-            returns = parallel(delayed(executePostgisQueryReturningDataFrame)(self.serviceProvider, sql)
-                               for sql in sqlExecutionList)
-
-            for newDataFrame in returns:
-                if dataFrame is not None:
-                    dataFrame = dataFrame.append(newDataFrame, ignore_index=True)
-                else:
-                    dataFrame = newDataFrame
-
-        geojson = self.fileActions.convertToGeojson(dataFrame)
+    @dgl_timer
+    def getTotalShortestPathCostAllImpedances(self, startVerticesID=[], endVerticesID=[], costAttributes=[]):
+        """
+        Calculate the total routing cost from a set of points to another set of points for several impedances at
+        once, with a single query per block of vertices that joins one pgr_dijkstraCost per impedance.
 
-        return geojson
+        :param startVerticesID: Set of initial vertexes to calculate the shortest path.
+        :param endVerticesID: Set of ending vertexes to calculate the shortest path.
+        :param costAttributes: List of impedance/cost attributes.
+        :return: Shortest path summary json with a cost property per impedance.
+        """
+        costMatrix = self.getTotalShortestPathCostMatrix(startVerticesID, endVerticesID, costAttributes)
+
+        return self.createCostSummary(costMatrix,
+                                      {costAttribute: costAttribute for costAttribute in costAttributes},
+                                      startVerticesID, endVerticesID)
+
+    def getTotalShortestPathCostSummary(self, startVerticesID, endVerticesID, costAttribute):
+        """
+        :return: Shortest path summary json with the total_cost of each pair of vertices, calculated with the
+                 geometry-free cost matrix queries.
+        """
+        costMatrix = self.getTotalShortestPathCostMatrix(startVerticesID, endVerticesID, [costAttribute])
+        return self.createCostSummary(costMatrix, {"total_cost": costAttribute}, startVerticesID, endVerticesID)
+
+    def createCostSummary(self, costMatrix, costProperties, startVerticesID, endVerticesID):
+        """
+        Create the summary geojson of a cost matrix, in ``matrixOnly`` mode the features have no geometry.
+
+        :param costMatrix: Dictionary of arrays returned by ``getTotalShortestPathCostMatrix``.
+        :param costProperties: Dictionary {summary property: cost attribute of the matrix}.
+        :return: Shortest path summary json.
+        """
+        vertices = None
+        if not self.configuration.matrixOnly:
+            verticesID = np.unique(np.concatenate([np.asarray(startVerticesID, dtype=np.int64),
+                                                   np.asarray(endVerticesID, dtype=np.int64)]))
+            vertices = self.serviceProvider.getVerticesCoordinates(self.tableName, verticesID)
+
+        return self.fileActions.createCostSummaryGeojson(
+            startVerticesID=costMatrix["start_vertex_id"],
+            endVerticesID=costMatrix["end_vertex_id"],
+            costs={summaryProperty: costMatrix[costAttribute]
+                   for summaryProperty, costAttribute in costProperties.items()},
+            vertices=vertices
+        )
+
+    def getTotalShortestPathCostMatrix(self, startVerticesID, endVerticesID, costAttributes):
+        """
+        Calculate the total routing cost of every pair of vertices in blocks of ``max_vertices_blocks`` vertices.
+        The results of each block are streamed in binary format straight into NumPy arrays.
+
+        :param startVerticesID: Set of initial vertexes to calculate the shortest path.
+        :param endVerticesID: Set of ending vertexes to calculate the shortest path.
+        :param costAttributes: List of impedance/cost attributes.
+        :return: Dictionary with the arrays start_vertex_id, end_vertex_id and one array per cost attribute (NaN if
+                 the pair is not reachable with that cost).
+        """
+        columns = self.getCostMatrixColumns(costAttributes)
+        blocks = list(self.iterateTotalShortestPathCostMatrixBlocks(startVerticesID, endVerticesID, costAttributes))
+
+        return {name: np.concatenate([block[name] for block in blocks]) if blocks else np.empty(0, dtype=dtype)
+                for name, dtype in columns}
+
+    def iterateTotalShortestPathCostMatrixBlocks(self, startVerticesID, endVerticesID, costAttributes):
+        """
+        Calculate the total routing cost of every pair of vertices in blocks of vertices, returning each block as
+        soon as it is finished. The ``blockScheduler`` adapts the block size to the query latency and splits the
+        blocks cancelled by a statement timeout or out of memory.
+
+        :param startVerticesID: Set of initial vertexes to calculate the shortest path.
+        :param endVerticesID: Set of ending vertexes to calculate the shortest path.
+        :param costAttributes: List of impedance/cost attributes.
+        :return: Generator of dictionaries of arrays in the format of ``getTotalShortestPathCostMatrix``.
+        """
+        columns = self.getCostMatrixColumns(costAttributes)
+
+        def runBlock(startVerticesBlock, endVerticesBlock):
+            return self.serviceProvider.executeCopyReturningArrays(
+                self.getShortestPathCostMatrixSQL(costAttributes, startVerticesBlock, endVerticesBlock),
+                columns,
+                capacity=len(startVerticesBlock) * len(endVerticesBlock)
+            )
+
+        return self.blockScheduler.iterateBlocks(startVerticesID, endVerticesID, runBlock,
+                                                 jobs=self.serviceProvider.concurrency or self.configuration.jobs)
+
+    def getCostMatrixColumns(self, costAttributes):
+        return [("start_vertex_id", np.int64), ("end_vertex_id", np.int64)] + \
+               [(costAttribute, np.float64) for costAttribute in costAttributes]
+
+    def getShortestPathCostMatrixSQL(self, costAttributes, startVerticesID, endVerticesID):
+        """
+        :return: SQL sentence with the columns start_vertex_id, end_vertex_id and one column per cost attribute
+                 ('NaN' if the pair is not reachable with that cost), without geometries so it can be copied in
+                 binary format.
+        """
+        costQueries = []
+        for position, costAttribute in enumerate(costAttributes):
+            costQueries.append(
+                "pgr_dijkstraCost(" \
+                "\'SELECT " \
+                "id::integer," \
+                "source::integer," \
+                "target::integer," \
+                "(CASE  " \
+                "WHEN luokka <> 0 AND luokka <> 9 AND (liikennevi = 0 OR liikennevi = 2 OR liikennevi = 5 OR liikennevi = 4)  " \
+                "THEN %s " \
+                "ELSE -1 " \
+                "END)::double precision AS cost," \
+                "(CASE " \
+                "WHEN luokka <> 0 AND luokka <> 9 AND (liikennevi = 0 OR liikennevi = 2 OR liikennevi = 5 OR liikennevi = 3) " \
+                "THEN %s " \
+                "ELSE -1 " \
+                "END)::double precision AS reverse_cost " \
+                "FROM table_name\', ARRAY[%s], ARRAY[%s], true) AS c%s".replace("table_name", self.tableName) % (
+                    costAttribute, costAttribute,
+                    ",".join(map(str, startVerticesID)),
+                    ",".join(map(str, endVerticesID)),
+                    position))
+
+        return "SELECT " \
+               "start_vid::bigint AS start_vertex_id," \
+               "end_vid::bigint AS end_vertex_id," \
+               "%s " \
+               "FROM %s" % (
+                   ",".join("COALESCE(c%s.agg_cost, 'NaN')::double precision AS %s" % (position, costAttribute)
+                            for position, costAttribute in enumerate(costAttributes)),
+                   " FULL JOIN ".join(costQuery if position == 0 else costQuery + " USING (start_vid, end_vid)"
+                                      for position, costQuery in enumerate(costQueries)))
 
     def getEPSGCode(self):
         return self.epsgCode
@@ -0,0 +1,154 @@
+import os
+import threading
+
+import numpy as np
+
+from digiroad.graph.ContractionHierarchy import ContractionHierarchy
+from digiroad.transportMode.InMemoryPrivateCarTransportMode import InMemoryPrivateCarTransportMode
+from digiroad.util import dgl_timer, Logger
+
+
+class ContractionHierarchyPrivateCarTransportMode(InMemoryPrivateCarTransportMode):
+    def __init__(self, geojsonServiceProvider, epsgCode="EPSG:3857", graph=None, hierarchies=None,
+                 configuration=None):
+        """
+        Private car transport mode that answers the shortest path queries with a contraction hierarchy of the
+        network, one hierarchy per impedance/cost attribute.
+
+        The hierarchies are read from the ``CONTRACTION_HIERARCHY`` folder and, if a hierarchy file does not exist or
+        was built from another version of the network, it is built from the in-memory graph and stored in that
+        folder.
+
+        :param geojsonServiceProvider: Postgis service provider used to load the network.
+        :param epsgCode: Coordinate reference system of the network.
+        :param graph: Optional CSRGraph already loaded, e.g. from a file.
+        :param hierarchies: Optional dictionary {costAttribute: ContractionHierarchy}.
+        :param configuration: Application Configuration, by default the one of the working directory.
+        """
+        super(ContractionHierarchyPrivateCarTransportMode, self).__init__(geojsonServiceProvider, epsgCode, graph,
+                                                                          configuration)
+        self.hierarchies = hierarchies if hierarchies is not None else {}
+        self.__hierarchiesLock = threading.Lock()
+
+    def getHierarchyFilePath(self, costAttribute):
+        return os.path.join(self.configuration.getString("CONTRACTION_HIERARCHY", "folder"),
+                            "%s_%s_ch.npz" % (self.tableName, costAttribute))
+
+    def getContractionHierarchy(self, costAttribute):
+        """
+        :param costAttribute: Impedance/cost attribute.
+        :return: The contraction hierarchy of the cost attribute, loaded or built the first time it is requested.
+        """
+        with self.__hierarchiesLock:
+            if costAttribute not in self.hierarchies:
+                filePath = self.getHierarchyFilePath(costAttribute)
+                hierarchy = None
+                if os.path.exists(filePath):
+                    Logger.getInstance().info("Loading contraction hierarchy: %s" % filePath)
+                    hierarchy = ContractionHierarchy.load(filePath)
+                    if not self.isCurrentContractionHierarchy(hierarchy):
+                        Logger.getInstance().warning("The contraction hierarchy %s was built from another version of "
+                                                     "the network, it is built again" % filePath)
+                        hierarchy = None
+
+                if hierarchy is None:
+                    hierarchy = self.buildContractionHierarchy(costAttribute)
+                    folder = os.path.dirname(filePath)
+                    if folder and not os.path.exists(folder):
+                        os.makedirs(folder)
+                    hierarchy.save(filePath)
+                self.hierarchies[costAttribute] = hierarchy
+
+        return self.hierarchies[costAttribute]
+
+    def isCurrentContractionHierarchy(self, hierarchy):
+        """
+        The queries use the internal vertex indices of the in-memory graph, so a stored hierarchy is only valid for
+        the same network and the same vertices.
+
+        :param hierarchy: ContractionHierarchy loaded from a file.
+        :return: True if the hierarchy was built from the current network.
+        """
+        return hierarchy.networkFingerprint == self.getNetworkFingerprint() and \
+               np.array_equal(hierarchy.vertexIDs, self.getGraph().vertexIDs)
+
+    @dgl_timer
+    def buildContractionHierarchy(self, costAttribute):
+        """
+        :param costAttribute: Impedance/cost attribute.
+        :return: New ContractionHierarchy built from the in-memory graph.
+        """
+        return ContractionHierarchy.build(self.getGraph(), costAttribute,
+                                          witnessSettleLimit=self.configuration.getInt("CONTRACTION_HIERARCHY",
+                                                                                       "witness_settle_limit", 500),
+                                          networkFingerprint=self.getNetworkFingerprint())
+
+    def iterateShortestPathCostBlocks(self, startIndices, endIndices, costAttribute):
+        """
+        Calculate the cost matrix with the contraction hierarchy: a bidirectional query for a single pair of
+        vertices, otherwise the bucket based many-to-many query. The buckets of the end vertices are
+        created once and scanned by the upward search of each start vertex, in blocks of ``max_vertices_blocks``.
+
+        :param startIndices: Internal indices of the start vertices.
+        :param endIndices: Internal indices of the end vertices.
+        :param costAttribute: Impedance/cost to measure the weight of the route.
+        :return: Generator of (position of the first start vertex of the block, block cost matrix).
+        """
+        hierarchy = self.getContractionHierarchy(costAttribute)
+        if len(startIndices) == 1 and len(endIndices) == 1:
+            yield 0, np.array([[hierarchy.getShortestPathCost(int(startIndices[0]), int(endIndices[0]))]])
+            return
+
+        blockSize = self.configuration.maxVerticesBlocks
+        buckets = hierarchy.createBuckets(endIndices)
+        for blockStart in range(0, len(startIndices), blockSize):
+            blockEnd = blockStart + blockSize
+            yield blockStart, hierarchy.queryBuckets(startIndices[blockStart:blockEnd], len(endIndices), buckets)
+
+    def getShortestPath(self, startVertexId, endVertexId, cost):
+        """
+        Retrieve the shortest path unpacking the contraction hierarchy shortcuts and reading the geometry and
+        attributes of the resulting segments from the database in a single query.
+
+        :param startVertexId: Start vertex from the requested path.
+        :param endVertexId: End vertex from the requested path.
+        :param cost: Attribute to calculate the cost of the shortest path
+        :return: Geojson (Geometry type: LineString) containing the segment features of the shortest path.
+        """
+        hierarchy = self.getContractionHierarchy(cost)
+        startIndex, endIndex = self.getGraph().getVertexIndices([startVertexId, endVertexId])
+        _totalCost, edgeIDs, _directions = hierarchy.getShortestPathArcs(int(startIndex), int(endIndex))
+
+        if not edgeIDs:
+            return {
+                "type": "FeatureCollection",
+                "features": []
+            }
+
+        return self.serviceProvider.execute(self.getShortestPathSegmentsSQL(edgeIDs))
+
+    def getShortestPathsFromAnOrigin(self, startVertexId, endVerticesID, cost):
+        """
+        Retrieve the shortest paths from one start vertex to several end vertices with a bidirectional contraction
+        hierarchy query per end vertex, unpacking the shortcuts of each path, and read the geometry and attributes of
+        all the segments of the paths from the database in a single query.
+
+        :param startVertexId: Start vertex of the requested paths.
+        :param endVerticesID: End vertices of the requested paths.
+        :param cost: Attribute to calculate the cost of the shortest paths.
+        :return: Dictionary {end vertex id: Geojson (Geometry type: LineString) with the segment features of the
+                 shortest path}.
+        """
+        hierarchy = self.getContractionHierarchy(cost)
+        graph = self.getGraph()
+        endVerticesID = list(dict.fromkeys(endVerticesID))
+        startIndex = int(graph.getVertexIndices([startVertexId])[0])
+
+        pathsEdgeIDs = {}
+        for endVertexId, endIndex in zip(endVerticesID, graph.getVertexIndices(endVerticesID).tolist()):
+            pathsEdgeIDs[endVertexId] = None
+            if startIndex >= 0 and endIndex >= 0:
+                _totalCost, pathsEdgeIDs[endVertexId], _directions = hierarchy.getShortestPathArcs(startIndex,
+                                                                                                  int(endIndex))
+
+        return self.getShortestPathsFromEdges(pathsEdgeIDs)
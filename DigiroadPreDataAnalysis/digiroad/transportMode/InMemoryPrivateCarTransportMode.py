@@ -0,0 +1,265 @@
+import threading
+
+import numpy as np
+
+from digiroad.graph.CSRGraph import CSRGraph
+from digiroad.transportMode.PrivateCarTransportMode import PrivateCarTransportMode
+from digiroad.util import dgl_timer, Logger, CostAttributes
+
+CAR_COST_ATTRIBUTES = [CostAttributes.DISTANCE,
+                       CostAttributes.SPEED_LIMIT_TIME,
+                       CostAttributes.DAY_AVG_DELAY_TIME,
+                       CostAttributes.MIDDAY_DELAY_TIME,
+                       CostAttributes.RUSH_HOUR_DELAY]
+
+
+class InMemoryPrivateCarTransportMode(PrivateCarTransportMode):
+    def __init__(self, geojsonServiceProvider, epsgCode="EPSG:3857", graph=None, configuration=None):
+        """
+        Private car transport mode that loads the routable network once into a CSR graph and calculates the
+        shortest path costs in-process instead of calling pgr_dijkstraCost for each block of vertices.
+
+        The nearest vertex and the shortest path geometries are still retrieved from the database.
+
+        :param geojsonServiceProvider: Postgis service provider used to load the network.
+        :param epsgCode: Coordinate reference system of the network.
+        :param graph: Optional CSRGraph already loaded, e.g. from a file.
+        :param configuration: Application Configuration, by default the one of the working directory.
+        """
+        super(InMemoryPrivateCarTransportMode, self).__init__(geojsonServiceProvider, epsgCode, configuration)
+        self.graph = graph
+        self.__graphLock = threading.Lock()
+
+    def getGraph(self):
+        """
+        :return: The CSR graph, loaded from the database the first time it is requested.
+        """
+        with self.__graphLock:
+            if self.graph is None:
+                self.graph = self.loadGraph()
+        return self.graph
+
+    def supportsIncrementalUpdate(self):
+        return True
+
+    @dgl_timer
+    def loadGraph(self, costAttributes=CAR_COST_ATTRIBUTES):
+        """
+        Read the routable edges and the vertices from the database and build the CSR graph.
+
+        :param costAttributes: Impedance/cost attributes to load.
+        :return: CSRGraph instance.
+        """
+        edges = self.serviceProvider.executeQueryReturningDataFrame(self.getRoutableEdgesSQL(costAttributes))
+        vertices = self.serviceProvider.executeQueryReturningDataFrame(self.getVerticesSQL())
+
+        costs = {}
+        reverseCosts = {}
+        for costAttribute in costAttributes:
+            costs[costAttribute] = edges[costAttribute + "_cost"].values
+            reverseCosts[costAttribute] = edges[costAttribute + "_reverse_cost"].values
+
+        graph = CSRGraph.fromEdges(edgeIDs=edges["id"].values,
+                                   sources=edges["source"].values,
+                                   targets=edges["target"].values,
+                                   costs=costs,
+                                   reverseCosts=reverseCosts,
+                                   vertexIDs=vertices["id"].values,
+                                   vertexCoordinates=vertices[["x", "y"]].values)
+
+        Logger.getInstance().info("CSR graph loaded: %s vertices, %s arcs" % (graph.getNumberOfVertices(),
+                                                                              graph.getNumberOfArcs()))
+        return graph
+
+    def getTotalShortestPathCostOneToOne(self, startVertexID, endVertexID, costAttribute):
+        """
+        Using an in-process Dijkstra over the CSR graph, calculate the total routing cost for a pair of points.
+
+        :param startVertexID: Initial Vertex to calculate the shortest path.
+        :param endVertexID: Last Vertex to calculate the shortest path.
+        :param costAttribute: Impedance/cost to measure the weight of the route.
+        :return: Shortest path summary json.
+        """
+        return self.calculateTotalShortestPathCost([startVertexID], [endVertexID], costAttribute)
+
+    def getTotalShortestPathCostManyToOne(self, startVerticesID=[], endVertexID=None, costAttribute=None):
+        """
+        Using an in-process Dijkstra over the CSR graph, calculate the total routing cost from a set of point to a
+        single point.
+
+        :param startVerticesID: Set of initial vertexes to calculate the shortest path.
+        :param endVertexID: Last Vertex to calculate the shortest path.
+        :param costAttribute: Impedance/cost to measure the weight of the route.
+        :return: Shortest path summary json.
+        """
+        return self.calculateTotalShortestPathCost(startVerticesID, [endVertexID], costAttribute)
+
+    def getTotalShortestPathCostOneToMany(self, startVertexID=None, endVerticesID=[], costAttribute=None):
+        """
+        Using an in-process Dijkstra over the CSR graph, calculate the total routing cost from a single point to a
+        set of points.
+
+        :param startVertexID: Initial vertexes to calculate the shortest path.
+        :param endVerticesID: Set of ending vertexes to calculate the shortest path.
+        :param costAttribute: Impedance/cost to measure the weight of the route.
+        :return: Shortest path summary json.
+        """
+        return self.calculateTotalShortestPathCost([startVertexID], endVerticesID, costAttribute)
+
+    @dgl_timer
+    def getTotalShortestPathCostManyToMany(self, startVerticesID=[], endVerticesID=[], costAttribute=None):
+        """
+        Using an in-process Dijkstra over the CSR graph, calculate the total routing cost from a set of points to
+        another set of points.
+
+        :param startVerticesID: Set of initial vertexes to calculate the shortest path.
+        :param endVerticesID: Set of ending vertexes to calculate the shortest path.
+        :param costAttribute: Impedance/cost to measure the weight of the route.
+        :return: Shortest path summary json.
+        """
+        return self.calculateTotalShortestPathCost(startVerticesID, endVerticesID, costAttribute)
+
+    @dgl_timer
+    def getTotalShortestPathCostAllImpedances(self, startVerticesID=[], endVerticesID=[], costAttributes=[]):
+        """
+        Calculate the total routing cost from a set of points to another set of points for several impedances in a
+        single pass over the blocks of start vertices.
+
+        :param startVerticesID: Set of initial vertexes to calculate the shortest path.
+        :param endVerticesID: Set of ending vertexes to calculate the shortest path.
+        :param costAttributes: List of impedance/cost attributes.
+        :return: Shortest path summary json with a cost property per impedance.
+        """
+        return self.calculateShortestPathCostSummary(startVerticesID, endVerticesID, costAttributes)
+
+    def calculateTotalShortestPathCost(self, startVerticesID, endVerticesID, costAttribute):
+        """
+        Calculate the cost summary in the same format produced by the pgr_dijkstraCost queries: one LineString
+        feature per reachable pair with the properties start_vertex_id, end_vertex_id and total_cost.
+        As in pgr_dijkstraCost, the unreachable pairs and the pairs with the same start and end vertex are not
+        included.
+
+        :param startVerticesID: Set of initial vertexes to calculate the shortest path.
+        :param endVerticesID: Set of ending vertexes to calculate the shortest path.
+        :param costAttribute: Impedance/cost to measure the weight of the route.
+        :return: Shortest path summary json.
+        """
+        summary = self.calculateShortestPathCostSummary(startVerticesID, endVerticesID, [costAttribute])
+        for feature in summary["features"]:
+            feature["properties"]["total_cost"] = feature["properties"].pop(costAttribute)
+        return summary
+
+    def calculateShortestPathCostSummary(self, startVerticesID, endVerticesID, costAttributes):
+        """
+        Calculate the cost summary with one property per cost attribute, None when the pair is not reachable with
+        that cost. The pairs not reachable with any cost and the pairs with the same start and end vertex are not
+        included.
+
+        :param startVerticesID: Set of initial vertexes to calculate the shortest path.
+        :param endVerticesID: Set of ending vertexes to calculate the shortest path.
+        :param costAttributes: List of impedance/cost attributes.
+        :return: Shortest path summary json.
+        """
+        blocks = list(self.iterateTotalShortestPathCostMatrixBlocks(startVerticesID, endVerticesID, costAttributes))
+        costMatrix = {name: np.concatenate([block[name] for block in blocks]) if blocks else np.empty(0, dtype=dtype)
+                      for name, dtype in self.getCostMatrixColumns(costAttributes)}
+
+        graph = self.getGraph()
+        vertices = None
+        if graph.vertexCoordinates is not None and not self.configuration.matrixOnly:
+            verticesID = np.unique(np.concatenate([costMatrix["start_vertex_id"], costMatrix["end_vertex_id"]]))
+            coordinates = graph.vertexCoordinates[graph.getVertexIndices(verticesID)]
+            vertices = {"id": verticesID, "x": coordinates[:, 0], "y": coordinates[:, 1]}
+
+        return self.fileActions.createCostSummaryGeojson(
+            startVerticesID=costMatrix["start_vertex_id"],
+            endVerticesID=costMatrix["end_vertex_id"],
+            costs={costAttribute: costMatrix[costAttribute] for costAttribute in costAttributes},
+            vertices=vertices
+        )
+
+    def iterateTotalShortestPathCostMatrixBlocks(self, startVerticesID, endVerticesID, costAttributes):
+        """
+        Calculate the total routing cost of every pair of vertices, one block of ``max_vertices_blocks`` start
+        vertices at a time.
+
+        :param startVerticesID: Set of initial vertexes to calculate the shortest path.
+        :param endVerticesID: Set of ending vertexes to calculate the shortest path.
+        :param costAttributes: List of impedance/cost attributes.
+        :return: Generator of dictionaries with the arrays start_vertex_id, end_vertex_id and one array per cost
+                 attribute (NaN if the pair is not reachable with that cost). The pairs not reachable with any cost
+                 and the pairs with the same start and end vertex are not included.
+        """
+        graph = self.getGraph()
+
+        startVerticesID = np.unique(np.asarray(startVerticesID, dtype=np.int64))
+        endVerticesID = np.unique(np.asarray(endVerticesID, dtype=np.int64))
+        startIndices = graph.getVertexIndices(startVerticesID)
+        endIndices = graph.getVertexIndices(endVerticesID)
+
+        # The blocks of every cost attribute are generated in step to keep a single block of costs in memory.
+        blockGenerators = [self.iterateShortestPathCostBlocks(startIndices, endIndices, costAttribute)
+                           for costAttribute in costAttributes]
+
+        for blocks in zip(*blockGenerators):
+            blockStart = blocks[0][0]
+            costs = [block[1] for block in blocks]
+            reachable = np.zeros(costs[0].shape, dtype=bool)
+            for costMatrix in costs:
+                reachable |= np.isfinite(costMatrix)
+
+            rows, columns = np.nonzero(reachable)
+            blockStartVerticesID = startVerticesID[blockStart + rows]
+            blockEndVerticesID = endVerticesID[columns]
+            different = blockStartVerticesID != blockEndVerticesID
+
+            block = {
+                "start_vertex_id": blockStartVerticesID[different],
+                "end_vertex_id": blockEndVerticesID[different]
+            }
+            for costAttribute, costMatrix in zip(costAttributes, costs):
+                values = costMatrix[rows[different], columns[different]].astype(np.float64)
+                values[~np.isfinite(values)] = np.nan
+                block[costAttribute] = values
+
+            yield block
+
+    def iterateShortestPathCostBlocks(self, startIndices, endIndices, costAttribute):
+        """
+        Calculate the cost matrix in blocks of ``max_vertices_blocks`` start vertices to bound the memory used by
+        the Dijkstra distance arrays.
+
+        :param startIndices: Internal indices of the start vertices.
+        :param endIndices: Internal indices of the end vertices.
+        :param costAttribute: Impedance/cost to measure the weight of the route.
+        :return: Generator of (position of the first start vertex of the block, block cost matrix).
+        """
+        graph = self.getGraph()
+        blockSize = self.configuration.maxVerticesBlocks
+
+        for blockStart in range(0, len(startIndices), blockSize):
+            blockEnd = blockStart + blockSize
+            yield blockStart, graph.calculateShortestPathCosts(startIndices[blockStart:blockEnd], endIndices,
+                                                               costAttribute)
+
+    def getShortestPathsFromAnOrigin(self, startVertexId, endVerticesID, cost):
+        """
+        Retrieve the shortest paths from one start vertex to several end vertices from a single in-process Dijkstra
+        search, following the predecessors of its shortest path tree, and read the geometry and attributes of all
+        the segments of the paths from the database in a single query.
+
+        :param startVertexId: Start vertex of the requested paths.
+        :param endVerticesID: End vertices of the requested paths.
+        :param cost: Attribute to calculate the cost of the shortest paths.
+        :return: Dictionary {end vertex id: Geojson (Geometry type: LineString) with the segment features of the
+                 shortest path}.
+        """
+        graph = self.getGraph()
+        endVerticesID = list(dict.fromkeys(endVerticesID))
+        startIndex = int(graph.getVertexIndices([startVertexId])[0])
+        if startIndex < 0:
+            pathsEdgeIDs = [None] * len(endVerticesID)
+        else:
+            pathsEdgeIDs = graph.calculateShortestPathsEdges(startIndex, graph.getVertexIndices(endVerticesID), cost)
+
+        return self.getShortestPathsFromEdges(dict(zip(endVerticesID, pathsEdgeIDs)))
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class AbstractTransportMode:
     def getNearestVertexFromAPoint(self, coordinates):
         raise NotImplementedError("Should have implemented this")
@@ -5,9 +8,122 @@ class AbstractTransportMode:
     def getNearestRoutableVertexFromAPoint(self, coordinates, radius=500):
         raise NotImplementedError("Should have implemented this")
 
+    def getNearestRoutableVerticesFromPoints(self, points):
+        """
+        Find the nearest routable vertex of each point. This default implementation calls
+        ``getNearestRoutableVertexFromAPoint`` once per point, the transport modes backed by a database override it to
+        snap all the points in a single query.
+
+        :param points: List of Point, in the coordinate reference system of the transport mode.
+        :return: Tuple (vertex ids array, (n, 2) array with the vertex coordinates in the coordinate reference system
+                 of the network), -1 and NaN for the points without a routable vertex nearby.
+        """
+        vertexIDs = np.full(len(points), -1, dtype=np.int64)
+        coordinates = np.full((len(points), 2), np.nan)
+        for position, point in enumerate(points):
+            geojson = self.getNearestRoutableVertexFromAPoint(point)
+            if len(geojson["features"]) > 0:
+                feature = geojson["features"][0]
+                vertexIDs[position] = feature["properties"]["id"]
+                coordinates[position] = feature["geometry"]["coordinates"][:2]
+
+        return vertexIDs, coordinates
+
+    def getRoutableEdgeFilterSQL(self):
+        raise NotImplementedError("Should have implemented this")
+
+    def supportsIncrementalUpdate(self):
+        """
+        :return: True if the transport mode keeps the routing graph in memory (``getGraph``), needed to compare the
+                 network with the snapshot of a previous summary and update only the start vertices affected.
+        """
+        return False
+
+    def getNetworkFingerprint(self):
+        raise NotImplementedError("Should have implemented this")
+
     def getShortestPath(self, startVertexId, endVertexId, cost):
         raise NotImplementedError("Should have implemented this")
 
+    def getShortestPathsFromAnOrigin(self, startVertexId, endVerticesID, cost):
+        """
+        Retrieve the shortest paths from one start vertex to several end vertices. This default implementation calls
+        ``getShortestPath`` once per end vertex, the transport modes able to get all the paths from a single search
+        override it.
+
+        :param startVertexId: Start vertex of the requested paths.
+        :param endVerticesID: End vertices of the requested paths.
+        :param cost: Attribute to calculate the cost of the shortest paths.
+        :return: Dictionary {end vertex id: Geojson (Geometry type: LineString) with the segment features of the
+                 shortest path}.
+        """
+        return {endVertexId: self.getShortestPath(startVertexId, endVertexId, cost) for endVertexId in endVerticesID}
+
+    def getShortestPathSegmentsSQL(self, edgeIDs):
+        raise NotImplementedError("Should have implemented this")
+
+    def getShortestPathsFromEdges(self, pathsEdgeIDs):
+        """
+        Build the shortest paths from their ordered edge ids, reading the geometry and attributes of all the segments
+        from the database in a single query.
+
+        :param pathsEdgeIDs: Dictionary {end vertex id: ordered edge ids of the path, None or empty if the end vertex
+                             is not reachable}.
+        :return: Dictionary {end vertex id: Geojson (Geometry type: LineString) with the segment features of the
+                 shortest path}.
+        """
+        edgeIDs = sorted(set(edgeID for pathEdgeIDs in pathsEdgeIDs.values() if pathEdgeIDs
+                             for edgeID in pathEdgeIDs))
+        geojson = {
+            "type": "FeatureCollection",
+            "features": []
+        }
+        if edgeIDs:
+            geojson = self.serviceProvider.execute(self.getShortestPathSegmentsSQL(edgeIDs))
+        segments = {feature["properties"]["id"]: feature for feature in geojson["features"]}
+
+        shortestPaths = self.splitShortestPaths(dict(geojson, features=[]), list(pathsEdgeIDs.keys()))
+        for endVertexId, pathEdgeIDs in pathsEdgeIDs.items():
+            for seq, edgeID in enumerate(pathEdgeIDs or [], start=1):
+                segment = segments[edgeID]
+                shortestPaths[endVertexId]["features"].append(
+                    dict(segment, properties=dict(segment["properties"], seq=seq)))
+
+        return shortestPaths
+
+    @staticmethod
+    def getShortestPathEdges(shortestPath):
+        """
+        :param shortestPath: Geojson with the segment features of a shortest path.
+        :return: List with the edge ids of the segments, ordered by their ``seq``.
+        """
+        return [feature["properties"]["id"]
+                for feature in sorted(shortestPath["features"], key=lambda feature: feature["properties"]["seq"])]
+
+    def splitShortestPaths(self, geojson, endVerticesID):
+        """
+        Split the segment features of several shortest paths by their ``end_vertex_id`` property.
+
+        :param geojson: Geojson with the segment features of all the shortest paths.
+        :param endVerticesID: End vertices of the requested paths.
+        :return: Dictionary {end vertex id: Geojson with the segment features of the path}, without features if the
+                 end vertex is not reachable.
+        """
+        shortestPaths = {}
+        for endVertexId in endVerticesID:
+            shortestPaths[endVertexId] = {
+                "type": "FeatureCollection",
+                "features": []
+            }
+            if "crs" in geojson:
+                shortestPaths[endVertexId]["crs"] = geojson["crs"]
+
+        for feature in geojson["features"]:
+            endVertexId = feature["properties"].pop("end_vertex_id")
+            shortestPaths[endVertexId]["features"].append(feature)
+
+        return shortestPaths
+
     def getTotalShortestPathCostOneToOne(self, startVertexID, endVertexID, costAttribute):
         raise NotImplementedError("Should have implemented this")
 
@@ -18,4 +134,104 @@ class AbstractTransportMode:
         raise NotImplementedError("Should have implemented this")
 
     def getTotalShortestPathCostManyToMany(self, startVerticesID=[], endVerticesID=[], costAttribute=None):
-        raise NotImplementedError("Should have implemented this")
\ No newline at end of file
+        raise NotImplementedError("Should have implemented this")
+
+    def getTotalShortestPathCost(self, startVerticesID=[], endVerticesID=[], costAttribute=None):
+        """
+        Calculate the total routing cost between two sets of vertices, calling the one-to-one, one-to-many,
+        many-to-one or many-to-many implementation depending on the size of the sets.
+
+        :param startVerticesID: Set of initial vertexes to calculate the shortest path.
+        :param endVerticesID: Set of ending vertexes to calculate the shortest path.
+        :param costAttribute: Impedance/cost to measure the weight of the route.
+        :return: Shortest path summary json.
+        """
+        if len(startVerticesID) == 1 and len(endVerticesID) == 1:
+            return self.getTotalShortestPathCostOneToOne(
+                startVertexID=startVerticesID[0],
+                endVertexID=endVerticesID[0],
+                costAttribute=costAttribute
+            )
+        elif len(startVerticesID) == 1 and len(endVerticesID) > 1:
+            return self.getTotalShortestPathCostOneToMany(
+                startVertexID=startVerticesID[0],
+                endVerticesID=endVerticesID,
+                costAttribute=costAttribute
+            )
+        elif len(startVerticesID) > 1 and len(endVerticesID) == 1:
+            return self.getTotalShortestPathCostManyToOne(
+                startVerticesID=startVerticesID,
+                endVertexID=endVerticesID[0],
+                costAttribute=costAttribute
+            )
+        elif len(startVerticesID) > 1 and len(endVerticesID) > 1:
+            return self.getTotalShortestPathCostManyToMany(
+                startVerticesID=startVerticesID,
+                endVerticesID=endVerticesID,
+                costAttribute=costAttribute
+            )
+        return None
+
+    def getTotalShortestPathCostAllImpedances(self, startVerticesID=[], endVerticesID=[], costAttributes=[]):
+        """
+        Calculate the total routing cost between two sets of vertices for several impedance/cost attributes.
+
+        The returned summary has one feature per pair of vertices with the properties start_vertex_id,
+        end_vertex_id and one property per cost attribute (None if the pair is not reachable with that cost).
+        This default implementation runs one routing pass per cost attribute, the transport modes able to share
+        the work between the cost attributes override it.
+
+        :param startVerticesID: Set of initial vertexes to calculate the shortest path.
+        :param endVerticesID: Set of ending vertexes to calculate the shortest path.
+        :param costAttributes: List of impedance/cost attributes.
+        :return: Shortest path summary json with a cost property per impedance.
+        """
+        allImpedancesSummary = None
+        featuresMap = {}
+        for costAttribute in costAttributes:
+            totals = self.getTotalShortestPathCost(startVerticesID, endVerticesID, costAttribute)
+            if allImpedancesSummary is None:
+                allImpedancesSummary = totals
+
+            for feature in totals["features"]:
+                properties = feature["properties"]
+                key = (properties["start_vertex_id"], properties["end_vertex_id"])
+                if key not in featuresMap:
+                    featuresMap[key] = feature
+                    for attribute in costAttributes:
+                        properties[attribute] = None
+
+                featuresMap[key]["properties"][costAttribute] = properties["total_cost"]
+
+        for feature in featuresMap.values():
+            feature["properties"].pop("total_cost", None)
+
+        allImpedancesSummary["features"] = list(featuresMap.values())
+        return allImpedancesSummary
+
+    def iterateTotalShortestPathCostMatrixBlocks(self, startVerticesID=[], endVerticesID=[], costAttributes=[]):
+        """
+        Calculate the total routing cost between two sets of vertices as blocks of arrays, to be consumed as soon as
+        each block is finished. This default implementation returns the whole ``getTotalShortestPathCostAllImpedances``
+        summary as a single block.
+
+        :param startVerticesID: Set of initial vertexes to calculate the shortest path.
+        :param endVerticesID: Set of ending vertexes to calculate the shortest path.
+        :param costAttributes: List of impedance/cost attributes.
+        :return: Generator of dictionaries with the arrays start_vertex_id, end_vertex_id and one array per cost
+                 attribute (NaN if the pair is not reachable with that cost).
+        """
+        summary = self.getTotalShortestPathCostAllImpedances(startVerticesID, endVerticesID, costAttributes)
+        properties = [feature["properties"] for feature in summary["features"]]
+
+        block = {
+            "start_vertex_id": np.array([featureProperties["start_vertex_id"] for featureProperties in properties],
+                                        dtype=np.int64),
+            "end_vertex_id": np.array([featureProperties["end_vertex_id"] for featureProperties in properties],
+                                      dtype=np.int64)
+        }
+        for costAttribute in costAttributes:
+            block[costAttribute] = np.array([np.nan if featureProperties[costAttribute] is None
+                                             else featureProperties[costAttribute]
+                                             for featureProperties in properties], dtype=np.float64)
+        yield block
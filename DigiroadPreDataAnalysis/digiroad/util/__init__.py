@@ -4,9 +4,11 @@ import datetime
 import json
 import logging
 import logging.config
+import math
 import numpy
 import os
 import shutil
+import threading
 import time
 import zipfile
 
@@ -36,7 +38,8 @@ CostAttributes = enum(DISTANCE='pituus',
                       BICYCLE_FAST_TIME='fast_time',
                       BICYCLE_SLOW_TIME='slow_time')
 
-TransportModes = enum(PRIVATE_CAR='PRIVATE_CAR', BICYCLE='BICYCLE')
+TransportModes = enum(PRIVATE_CAR='PRIVATE_CAR', BICYCLE='BICYCLE', PRIVATE_CAR_IN_MEMORY='PRIVATE_CAR_IN_MEMORY',
+                      PRIVATE_CAR_CH='PRIVATE_CAR_CH')
 
 GeometryType = enum(POINT="Point", MULTI_POINT='MultiPoint', LINE_STRING='LineString')
 
@@ -63,11 +66,156 @@ def timeDifference(startTime, endTime):
     return totalTime
 
 
+def getConfigurationPath():
+    return os.getcwd() + "%resources%configuration.properties".replace("%", os.sep)
+
+
+class Configuration:
+    __instance = None
+    __lock = threading.Lock()
+
+    BOOLEAN_PROPERTIES = {
+        "WFS_CONFIG": ["timerEnabled", "debug", "storeShortPathFile", "matrixOnly"],
+        "CHECKPOINT": ["run_manifest", "incremental"]
+    }
+    INTEGER_PROPERTIES = {
+        "PARALLELIZATION": ["jobs", "workers", "verbose", "max_vertices_blocks", "min_vertices_blocks",
+                            "max_adaptive_vertices_blocks", "async_concurrency"],
+        "CHECKPOINT": ["checkpoint_vertices", "recovery_wait_time"],
+        "CACHE": ["route_cache_max_routes"]
+    }
+    FLOAT_PROPERTIES = {
+        "WFS_CONFIG": ["walkingDistance", "walkingSpeed", "parkingTime"],
+        "PARALLELIZATION": ["block_target_seconds"]
+    }
+    CHOICE_PROPERTIES = {
+        "WFS_CONFIG": {"summary_format": ["csv", "parquet"]}
+    }
+
+    def __init__(self, configurationPath=None):
+        """
+        Configuration of the application, parsed once from resources/configuration.properties.
+
+        The properties used in the hot paths are validated when the file is read and exposed as typed attributes,
+        the other properties are still available per section with ``getSection``.
+
+        :param configurationPath: Properties file, by default resources/configuration.properties of the working
+                                  directory.
+        """
+        self.configurationPath = configurationPath if configurationPath else getConfigurationPath()
+        self.reload()
+
+    @staticmethod
+    def getInstance():
+        """
+        :return: Configuration of the working directory, parsed the first time it is requested (or when the working
+                 directory changes).
+        """
+        configurationPath = getConfigurationPath()
+        with Configuration.__lock:
+            if not Configuration.__instance or Configuration.__instance.configurationPath != configurationPath:
+                Configuration.__instance = Configuration(configurationPath)
+            return Configuration.__instance
+
+    def reload(self):
+        """
+        Read the properties file again, e.g. after it has been edited during a long run.
+        """
+        config = configparser.ConfigParser()
+        config.read(self.configurationPath)
+        self.__validate(config)
+        self.__config = config
+
+        self.timerEnabled = self.getBoolean("WFS_CONFIG", "timerEnabled")
+        self.debug = self.getBoolean("WFS_CONFIG", "debug")
+        self.storeShortPathFile = self.getBoolean("WFS_CONFIG", "storeShortPathFile")
+        self.matrixOnly = self.getBoolean("WFS_CONFIG", "matrixOnly")
+        self.pointIdentifier = self.getString("WFS_CONFIG", "point_identifier")
+        self.csvSeparator = self.getString("WFS_CONFIG", "csv_separator", ";")
+        self.summaryFormat = self.getString("WFS_CONFIG", "summary_format", "csv").lower()
+        self.jobs = self.getInt("PARALLELIZATION", "jobs", 1)
+        self.workers = self.getInt("PARALLELIZATION", "workers", 1)
+        self.asyncConcurrency = self.getInt("PARALLELIZATION", "async_concurrency", 0)
+        self.verbose = self.getInt("PARALLELIZATION", "verbose", 0)
+        self.maxVerticesBlocks = self.getInt("PARALLELIZATION", "max_vertices_blocks", 100)
+        self.minVerticesBlocks = self.getInt("PARALLELIZATION", "min_vertices_blocks", 1)
+        self.maxAdaptiveVerticesBlocks = self.getInt("PARALLELIZATION", "max_adaptive_vertices_blocks", 1000)
+        self.blockTargetSeconds = self.getFloat("PARALLELIZATION", "block_target_seconds", 0.0)
+        self.runManifest = self.getBoolean("CHECKPOINT", "run_manifest")
+        self.checkpointVertices = self.getInt("CHECKPOINT", "checkpoint_vertices", 1000)
+        self.recoveryWaitTime = self.getInt("CHECKPOINT", "recovery_wait_time", 480)
+        self.incremental = self.getBoolean("CHECKPOINT", "incremental")
+        self.routeCacheMaxRoutes = self.getInt("CACHE", "route_cache_max_routes", 1000000)
+        self.attributesMapping = [tuple(self.__config["ATTRIBUTES_MAPPING"][key].split(",")[:2])
+                                  for key in self.__config["ATTRIBUTES_MAPPING"]] \
+            if self.hasSection("ATTRIBUTES_MAPPING") else []
+
+    def __validate(self, config):
+        for properties, parse in [(Configuration.BOOLEAN_PROPERTIES, "getboolean"),
+                                  (Configuration.INTEGER_PROPERTIES, "getint"),
+                                  (Configuration.FLOAT_PROPERTIES, "getfloat")]:
+            for section, keys in properties.items():
+                if not config.has_section(section):
+                    continue
+                for key in keys:
+                    try:
+                        getattr(config[section], parse)(key)
+                    except ValueError as err:
+                        raise exc.InvalidConfigurationException(
+                            "Invalid value for %s.%s in %s: %s" % (section, key, self.configurationPath, err))
+        for section, choices in Configuration.CHOICE_PROPERTIES.items():
+            if not config.has_section(section):
+                continue
+            for key, values in choices.items():
+                value = config[section].get(key)
+                if value is not None and value.lower() not in values:
+                    raise exc.InvalidConfigurationException(
+                        "Invalid value for %s.%s in %s: %s not in %s" % (section, key, self.configurationPath, value,
+                                                                         values))
+
+    def getOutputProperties(self):
+        """
+        :return: Dictionary with the properties that change the content of the output files, e.g. to run again the
+                 units of work completed with another configuration.
+        """
+        return {
+            "matrixOnly": self.matrixOnly,
+            "summaryFormat": self.summaryFormat,
+            "pointIdentifier": self.pointIdentifier,
+            "csvSeparator": self.csvSeparator,
+            "storeShortPathFile": self.storeShortPathFile,
+            "maxVerticesBlocks": self.maxVerticesBlocks,
+            "attributesMapping": self.attributesMapping,
+            "walkingDistance": self.getFloat("WFS_CONFIG", "walkingDistance"),
+            "walkingSpeed": self.getFloat("WFS_CONFIG", "walkingSpeed"),
+            "parkingTime": self.getFloat("WFS_CONFIG", "parkingTime")
+        }
+
+    def hasSection(self, section):
+        return self.__config.has_section(section)
+
+    def getSection(self, section):
+        """
+        :param section: Section name.
+        :return: Section of the configuration, KeyError if it does not exist.
+        """
+        return self.__config[section]
+
+    def getString(self, section, key, fallback=None):
+        return self.__config.get(section, key, fallback=fallback)
+
+    def getBoolean(self, section, key, fallback=False):
+        return self.__config.getboolean(section, key, fallback=fallback)
+
+    def getInt(self, section, key, fallback=None):
+        return self.__config.getint(section, key, fallback=fallback)
+
+    def getFloat(self, section, key, fallback=None):
+        return self.__config.getfloat(section, key, fallback=fallback)
+
+
 def getConfigurationProperties(section="WFS_CONFIG"):
-    config = configparser.ConfigParser()
-    configurationPath = os.getcwd() + "%resources%configuration.properties".replace("%", os.sep)
-    config.read(configurationPath)
-    return config[section]
+    return Configuration.getInstance().getSection(section)
 
 
 def extractCRS(geojson):
@@ -90,8 +238,7 @@ def createPointFromPointFeature(newFeaturePoint, epsgCode):
 
 def dgl_timer(func):
     def func_wrapper(*args, **kwargs):
-        timerEnabled = "True".__eq__(getConfigurationProperties(section="WFS_CONFIG")["timerEnabled"])
-        if timerEnabled:
+        if Configuration.getInstance().timerEnabled:
             functionName = func.__name__
             startTime = time.time()
             Logger.getInstance().info("%s Start Time: %s" % (functionName, getFormattedDatetime(timemilis=startTime)))
@@ -293,6 +440,61 @@ class FileActions:
         }
         return newJson
 
+    def createCostSummaryGeojson(self, startVerticesID, endVerticesID, costs, vertices=None):
+        """
+        Create the cost summary geojson, one feature per pair of vertices with the properties start_vertex_id,
+        end_vertex_id and the costs, directly from arrays.
+
+        :param startVerticesID: Array with the start vertex of each pair.
+        :param endVerticesID: Array with the end vertex of each pair.
+        :param costs: Dictionary {property name: array with the cost of each pair}, NaN is stored as None.
+        :param vertices: Dictionary with the arrays id, x and y of the vertices, the feature geometry is the line
+                         between the start and end vertex. None to create the features without geometry.
+        :return: Cost summary geojson.
+        """
+        coordinatesMap = {}
+        if vertices is not None:
+            coordinatesMap = dict(zip(vertices["id"].tolist(),
+                                      zip(vertices["x"].tolist(), vertices["y"].tolist())))
+
+        costLists = [(name, numpy.asarray(values, dtype=float).tolist()) for name, values in costs.items()]
+
+        features = []
+        for position, (startVertexID, endVertexID) in enumerate(zip(numpy.asarray(startVerticesID).tolist(),
+                                                                    numpy.asarray(endVerticesID).tolist())):
+            properties = {
+                "start_vertex_id": startVertexID,
+                "end_vertex_id": endVertexID
+            }
+            for name, values in costLists:
+                cost = values[position]
+                properties[name] = None if math.isnan(cost) else cost
+
+            geometry = None
+            if startVertexID in coordinatesMap and endVertexID in coordinatesMap:
+                geometry = {
+                    "type": "LineString",
+                    "coordinates": [list(coordinatesMap[startVertexID]), list(coordinatesMap[endVertexID])]
+                }
+
+            features.append({
+                "id": str(position),
+                "type": "Feature",
+                "properties": properties,
+                "geometry": geometry
+            })
+
+        return {
+            "type": "FeatureCollection",
+            "features": features,
+            "crs": {
+                "properties": {
+                    "name": "urn:ogc:def:crs:%s" % (GPD_CRS.PSEUDO_MERCATOR["init"].replace(":", "::"))
+                },
+                "type": "name"
+            }
+        }
+
     def writeFile(self, folderPath, filename, data):
         if not os.path.exists(folderPath):
             os.makedirs(folderPath)
@@ -324,8 +526,54 @@ class FileActions:
 
     @dgl_timer
     def compressOutputFile(self, folderPath, zip_filename, filepath):
-        zipf = zipfile.ZipFile(folderPath + os.sep + zip_filename, "a", zipfile.ZIP_DEFLATED, allowZip64=True)
-        zipf.write(filepath, os.path.basename(filepath))
+        zipFilePath = folderPath + os.sep + zip_filename
+        arcname = os.path.basename(filepath)
+        if os.path.isfile(zipFilePath):
+            with zipfile.ZipFile(zipFilePath) as zipf:
+                replaceFile = arcname in zipf.namelist()
+            if replaceFile:
+                # the file of a previous run is replaced, the zip is copied without it
+                self.removeFileFromZip(zipFilePath, arcname)
+
+        with zipfile.ZipFile(zipFilePath, "a", zipfile.ZIP_DEFLATED, allowZip64=True) as zipf:
+            zipf.write(filepath, arcname)
+
+    def mergeZipFile(self, folderPath, zip_filename, sourceZipFilePath):
+        """
+        Add all the files of another zip, replacing the files with the same name.
+
+        :param folderPath: Folder of the zip to update, created if it does not exist.
+        :param zip_filename: Name of the zip to update.
+        :param sourceZipFilePath: Zip with the files to add.
+        """
+        if not os.path.exists(folderPath):
+            os.makedirs(folderPath)
+
+        zipFilePath = folderPath + os.sep + zip_filename
+        with zipfile.ZipFile(sourceZipFilePath) as source:
+            if os.path.isfile(zipFilePath):
+                with zipfile.ZipFile(zipFilePath) as zipf:
+                    replacedFiles = set(source.namelist()) & set(zipf.namelist())
+                if replacedFiles:
+                    self.removeFilesFromZip(zipFilePath, replacedFiles)
+
+            with zipfile.ZipFile(zipFilePath, "a", zipfile.ZIP_DEFLATED, allowZip64=True) as target:
+                for item in source.infolist():
+                    with source.open(item) as sourceFile, target.open(item, "w", force_zip64=True) as targetFile:
+                        shutil.copyfileobj(sourceFile, targetFile)
+
+    def removeFileFromZip(self, zipFilePath, arcname):
+        self.removeFilesFromZip(zipFilePath, [arcname])
+
+    def removeFilesFromZip(self, zipFilePath, arcnames):
+        temporaryZipFilePath = zipFilePath + ".tmp"
+        with zipfile.ZipFile(zipFilePath) as source, \
+                zipfile.ZipFile(temporaryZipFilePath, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as target:
+            for item in source.infolist():
+                if item.filename not in arcnames:
+                    with source.open(item) as sourceFile, target.open(item, "w", force_zip64=True) as targetFile:
+                        shutil.copyfileobj(sourceFile, targetFile)
+        os.replace(temporaryZipFilePath, zipFilePath)
 
     @dgl_timer
     def transformGeojsonInDataFrame(self, geojson):
@@ -346,12 +594,7 @@ class FileActions:
         if not os.path.isfile(file):
             fieldList = []
 
-            attributes = getConfigurationProperties(section="ATTRIBUTES_MAPPING")
-
-            for attribute_key in attributes:
-                attribute_splitted = attributes[attribute_key].split(",")
-                key = attribute_splitted[0]
-                value = attribute_splitted[1]
+            for key, value in Configuration.getInstance().attributesMapping:
                 fieldList.append(value)
 
             with open(file, 'w', newline='') as outputFile:
@@ -376,7 +619,7 @@ def parallel_job_print(msg, msg_args):
     # else:
     #     writer = sys.stdout.write
     msg = msg % msg_args
-    self = "Parallel(n_jobs=%s)" % getConfigurationProperties(section="PARALLELIZATION")["jobs"]
+    self = "Parallel(n_jobs=%s)" % Configuration.getInstance().jobs
     # writer('[%s]: %s\n' % (self, msg))
     Logger.getInstance().info('[%s]: %s' % (self, msg))
 